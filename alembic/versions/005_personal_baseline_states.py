@@ -0,0 +1,43 @@
+"""Add personal baseline state table
+
+Revision ID: 005_personal_baseline_states
+Revises: 004_a2_tables
+Create Date: 2026-10-19
+
+Stores streaming personal baseline state (quantile sketches + running moments)
+per user and marker. Non-breaking, additive migration only.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_personal_baseline_states'
+down_revision = '004_a2_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create personal_baseline_states table."""
+    op.create_table(
+        'personal_baseline_states',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('marker_name', sa.String(), nullable=False),
+        sa.Column('stream_type', sa.String(), nullable=True),
+        sa.Column('state_json', sa.JSON(), nullable=False),
+        sa.Column('observation_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'marker_name', name='uq_personal_baseline_user_marker')
+    )
+    op.create_index(op.f('ix_personal_baseline_states_id'), 'personal_baseline_states', ['id'], unique=False)
+    op.create_index(op.f('ix_personal_baseline_states_user_id'), 'personal_baseline_states', ['user_id'], unique=False)
+    op.create_index(op.f('ix_personal_baseline_states_marker_name'), 'personal_baseline_states', ['marker_name'], unique=False)
+
+
+def downgrade() -> None:
+    """Remove personal_baseline_states table."""
+    op.drop_table('personal_baseline_states')
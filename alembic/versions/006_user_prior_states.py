@@ -0,0 +1,46 @@
+"""Add user prior state table
+
+Revision ID: 006_user_prior_states
+Revises: 005_personal_baseline_states
+Create Date: 2026-10-19
+
+Stores per-user prior/posterior parameters for the priors decay engine so
+posterior updates accumulate across submissions. Non-breaking, additive
+migration only.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_user_prior_states'
+down_revision = '005_personal_baseline_states'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create user_prior_states table."""
+    op.create_table(
+        'user_prior_states',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('marker_name', sa.String(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=False),
+        sa.Column('std', sa.Float(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('half_life_days', sa.Float(), nullable=False),
+        sa.Column('established_at', sa.DateTime(), nullable=False),
+        sa.Column('last_measurement_date', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'marker_name', name='uq_user_prior_user_marker')
+    )
+    op.create_index(op.f('ix_user_prior_states_id'), 'user_prior_states', ['id'], unique=False)
+    op.create_index(op.f('ix_user_prior_states_user_id'), 'user_prior_states', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Remove user_prior_states table."""
+    op.drop_table('user_prior_states')
@@ -0,0 +1,36 @@
+"""Add composite indexes for provenance audit queries
+
+Revision ID: 007_provenance_query_indexes
+Revises: 006_user_prior_states
+Create Date: 2026-10-19
+
+Composite indexes backing filtered, keyset-paginated provenance queries
+(newest first by created_at, id). Additive-only migration.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007_provenance_query_indexes'
+down_revision = '006_user_prior_states'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create composite provenance indexes."""
+    op.create_index(
+        'ix_provenance_user_panel_metric_created',
+        'inference_provenance',
+        ['user_id', 'panel_name', 'metric_name', 'created_at', 'id']
+    )
+    op.create_index(
+        'ix_provenance_user_created',
+        'inference_provenance',
+        ['user_id', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    """Drop composite provenance indexes."""
+    op.drop_index('ix_provenance_user_created', table_name='inference_provenance')
+    op.drop_index('ix_provenance_user_panel_metric_created', table_name='inference_provenance')
@@ -0,0 +1,43 @@
+"""Add ISF stream derived-result cache table
+
+Revision ID: 008_isf_stream_derived
+Revises: 007_provenance_query_indexes
+Create Date: 2026-10-19
+
+Stores results derived from one ISF stream (e.g. glycemic metrics) keyed by
+(stream, kind), so inference reuses them instead of rescanning the stream.
+Additive-only migration.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_isf_stream_derived'
+down_revision = '007_provenance_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Create isf_stream_derived table."""
+    op.create_table(
+        'isf_stream_derived',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('stream_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('source_value_count', sa.Integer(), nullable=False),
+        sa.Column('payload_json', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['stream_id'], ['isf_analyte_streams.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stream_id', 'kind', name='uq_isf_stream_derived_stream_kind')
+    )
+    op.create_index(op.f('ix_isf_stream_derived_id'), 'isf_stream_derived', ['id'], unique=False)
+    op.create_index(op.f('ix_isf_stream_derived_stream_id'), 'isf_stream_derived', ['stream_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Remove isf_stream_derived table."""
+    op.drop_table('isf_stream_derived')
@@ -0,0 +1,46 @@
+"""Backfill chart pyramids for stored ISF streams
+
+Revision ID: 009_chart_pyramid_backfill
+Revises: 008_isf_stream_derived
+Create Date: 2026-10-19
+
+Streams stored before chart pyramids were built at ingest get one here, so
+stream chart queries stay read-only. Data-only migration.
+"""
+from alembic import op
+from sqlalchemy.orm import Session
+
+# revision identifiers, used by Alembic.
+revision = '009_chart_pyramid_backfill'
+down_revision = '008_isf_stream_derived'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 100
+
+
+def upgrade() -> None:
+    """Store a chart pyramid for every stream missing a current one."""
+    from app.features.downsampling import PYRAMID_KIND, PYRAMID_VERSION, stream_pyramid
+    from app.features.stream_cache import fresh_stream_derived
+    from app.models.part_a_models import ISFAnalyteStream
+
+    session = Session(bind=op.get_bind())
+    last_id = 0
+    while True:
+        streams = session.query(ISFAnalyteStream).filter(
+            ISFAnalyteStream.id > last_id
+        ).order_by(ISFAnalyteStream.id).limit(BATCH_SIZE).all()
+        if not streams:
+            break
+        for stream in streams:
+            if fresh_stream_derived(stream, PYRAMID_KIND, PYRAMID_VERSION) is None:
+                stream_pyramid(stream)
+        session.flush()
+        last_id = streams[-1].id
+        session.expunge_all()
+    session.close()
+
+
+def downgrade() -> None:
+    """Pyramids are rebuilt as needed; nothing to undo."""
@@ -12,6 +12,8 @@ from app.api.deps import get_current_user
 from app.models.inference_pack_v2 import InferencePackV2
 from app.models.run_v2 import RunV2
 from app.features.preprocess_v2 import preprocess_v2 as preprocess_v2_pipeline, FeaturePackV2
+from app.features.stream_cache import load_user_isf_series
+from app.features.temporal_series import run_utc_offset_s
 from app.ml.inference_v2 import InferenceV2
 
 router = APIRouter(prefix="/ai", tags=["ai"])
@@ -317,9 +319,15 @@ def preprocess_v2_endpoint(
     run_v2_payload = db_run.payload
     run_v2 = RunV2(**run_v2_payload)
     
+    # The user's stored ISF monitor streams up to the run give the temporal
+    # stage full-resolution series instead of the run's few specimen points
+    series = load_user_isf_series(
+        db, current_user.id, end=run_v2.created_at, utc_offset_s=run_utc_offset_s(run_v2)
+    )
+    
     # Run preprocess_v2
     try:
-        feature_pack_v2 = preprocess_v2_pipeline(run_v2)
+        feature_pack_v2 = preprocess_v2_pipeline(run_v2, series=series)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -4,13 +4,14 @@ Complete API for ingesting all PART A raw data user inputs.
 Non-breaking, additive endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
+from sqlalchemy.orm import Session, defer
 from typing import Optional, List
 from datetime import datetime
 import logging
 import uuid
 import json
+import numpy as np
 
 from app.db.session import get_db
 from app.api.deps import get_current_user
@@ -44,6 +45,11 @@ from ingestion.reports.imaging import parse_imaging_report
 
 from encoding.qualitative_to_quantitative import get_encoding_registry
 from app.services.a2_orchestrator import a2_orchestrator
+from app.features.glycemic_metrics import stream_glycemic_metrics
+from app.features.state_space import seed_kalman_states
+from app.features.signal_quality import lab_anchors, stream_signal_quality
+from app.features.downsampling import DOWNSAMPLE_METHODS, chart_series, stream_pyramid
+from app.features.stream_cache import parse_stream_timestamps
 
 logger = logging.getLogger(__name__)
 
@@ -275,6 +281,76 @@ def get_submission(
     }
 
 
+@router.get("/submissions/{submission_id}/streams/{analyte}")
+def get_submission_stream(
+    submission_id: str,
+    analyte: str,
+    points: int = Query(500, ge=10, le=5000, description="Approximate number of points to return"),
+    method: str = Query("lttb", description="lttb (shape-preserving) or minmax (per-bucket envelope)"),
+    start: Optional[datetime] = Query(None, description="Only readings at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only readings at or before this time"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Retrieve one ISF analyte of a submission downsampled for charting.
+    
+    Reduces the stream's precomputed pyramid level that covers the range;
+    the readings columns are deferred, so long ranges read only the stored
+    pyramid and raw readings load just for short ranges.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown method '{method}'; expected one of {list(DOWNSAMPLE_METHODS)}"
+        )
+    
+    submission = db.query(PartASubmission).filter(
+        PartASubmission.submission_id == submission_id,
+        PartASubmission.user_id == current_user.id
+    ).first()
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    streams = db.query(ISFAnalyteStream).options(
+        defer(ISFAnalyteStream.values_json),
+        defer(ISFAnalyteStream.timestamps_json)
+    ).filter(
+        ISFAnalyteStream.submission_id == submission.id,
+        ISFAnalyteStream.name == analyte
+    ).all()
+    
+    if not streams:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No '{analyte}' stream in submission"
+        )
+    
+    range_start = float(parse_stream_timestamps([start])[0]) if start else None
+    range_end = float(parse_stream_timestamps([end])[0]) if end else None
+    series = chart_series(streams, points, method, range_start, range_end)
+    
+    return {
+        "submission_id": submission.submission_id,
+        "analyte": analyte,
+        "unit": streams[0].unit,
+        "method": series.method,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "source_levels": series.source_levels,
+        "source_points": series.source_points,
+        "n_points": len(series.values),
+        "timestamps": [
+            str(ts) for ts in np.datetime_as_string((series.timestamps * 1e6).astype("datetime64[us]"), unit="s")
+        ],
+        "values": series.values.tolist()
+    }
+
+
 @router.get("/submissions")
 def list_submissions(
     skip: int = 0,
@@ -432,6 +508,7 @@ def _store_isf_streams(db: Session, submission_id: int, isf_data: ISFMonitorData
                   (isf_data.renal_metabolic or []) + \
                   (isf_data.inflammation_oxidative or [])
     
+    isf_streams = []
     for stream in all_streams:
         isf_stream = ISFAnalyteStream(
             submission_id=submission_id,
@@ -446,7 +523,21 @@ def _store_isf_streams(db: Session, submission_id: int, isf_data: ISFMonitorData
             noise_score=isf_data.signal_quality.noise_score,
             dropout_percentage=isf_data.signal_quality.dropout_percentage
         )
+        if stream.name == "glucose":
+            # Cache CGM metrics with the stream so inference never rescans it
+            stream_glycemic_metrics(isf_stream)
+        
+        # Chart pyramid, so stream queries never downsample every reading
+        stream_pyramid(isf_stream)
+        
+        # Measured quality is persisted beside the stream; the submitted
+        # scores stay as reported and serve as the fallback
+        stream_signal_quality(isf_stream, lab_anchors(db, submission_id, stream.name, stream.unit))
         db.add(isf_stream)
+        isf_streams.append(isf_stream)
+    
+    # Smooth every analyte stream in one batched pass and persist the states
+    seed_kalman_states(isf_streams)
 
 
 def _store_vitals(db: Session, submission_id: int, vitals_data: VitalsData):
@@ -0,0 +1,101 @@
+"""
+Provenance API Endpoints
+
+Audit queries over inference provenance:
+- Filtered, keyset-paginated record listing
+- Streaming NDJSON export
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_user
+from app.models import User
+from app.models.provenance import ProvenanceHelper
+
+router = APIRouter(prefix="/provenance", tags=["Provenance"])
+
+
+# Response Schemas
+
+class ProvenancePageResponse(BaseModel):
+    """One page of provenance records."""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+# Endpoints
+
+def _filters(
+    panel_name: Optional[str] = None,
+    metric_name: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=100.0),
+    max_confidence: Optional[float] = Query(None, ge=0.0, le=100.0)
+) -> Dict[str, Any]:
+    """Shared query filters for listing and export."""
+    return {
+        "panel_name": panel_name,
+        "metric_name": metric_name,
+        "created_after": created_after,
+        "created_before": created_before,
+        "min_confidence": min_confidence,
+        "max_confidence": max_confidence
+    }
+
+
+@router.get("/records")
+def list_provenance_records(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    filters: Dict[str, Any] = Depends(_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> ProvenancePageResponse:
+    """
+    List provenance records, newest first.
+    
+    Pass `next_cursor` from the previous response as `cursor` to fetch the next page.
+    """
+    try:
+        records, next_cursor = ProvenanceHelper.query_provenance_records(
+            db, current_user.id, cursor=cursor, limit=limit, **filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return ProvenancePageResponse(
+        items=[ProvenanceHelper.to_dict(r) for r in records],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/export")
+def export_provenance_records(
+    filters: Dict[str, Any] = Depends(_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    Export every matching provenance record as newline-delimited JSON.
+    
+    Rows are streamed page by page, so the export never holds the full result in memory.
+    """
+    user_id = current_user.id
+    
+    def generate():
+        for record in ProvenanceHelper.iter_provenance_records(db, user_id, **filters):
+            yield json.dumps(ProvenanceHelper.to_dict(record)) + "\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=provenance.ndjson"}
+    )
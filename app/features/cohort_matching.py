@@ -19,13 +19,22 @@ Design Principles:
 - Respect privacy (anonymized data only)
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 import math
 from collections import defaultdict
 
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Optional large reference population; built by scripts/build_reference_population.py
+REFERENCE_POPULATION_PATH = (
+    Path(__file__).parent.parent.parent / "data" / "priors_pack" / "reference_population.npz"
+)
+
 
 class CohortDimension(str, Enum):
     """Dimensions used for cohort matching."""
@@ -134,6 +143,9 @@ class CohortMatchResult:
     why_this_cohort: str
     key_similarities: List[str]
     key_differences: List[str]
+    
+    # Nearest neighbours from the reference population (when loaded)
+    neighbor_cohort: Optional["NeighborCohort"] = None
 
 
 @dataclass
@@ -157,6 +169,314 @@ class TrajectoryBand:
     trajectory_interpretation: str  # "stable", "improving", "worsening"
 
 
+@dataclass
+class NeighborCohort:
+    """k nearest reference individuals for a user."""
+    k: int
+    neighbor_indices: List[int]
+    mean_distance: float  # in standardized units
+    similarity: float  # 0.0 to 1.0
+    dimensions_used: List[str]
+    
+    # Population percentile of the user's value per feature (0-100)
+    percentiles: Dict[str, float] = field(default_factory=dict)
+    # Neighbour medians per feature (observed values only)
+    neighbor_medians: Dict[str, float] = field(default_factory=dict)
+    
+    # Outcome prevalence among neighbours (if the reference carries it)
+    diabetes_prevalence: Optional[float] = None
+    cvd_prevalence: Optional[float] = None
+
+
+@dataclass
+class _MaskGroup:
+    """Reference rows observed on the same subset of the query dimensions."""
+    rows: np.ndarray
+    columns: List[int]  # positions within the query dimensions
+    scale: float  # partial distance -> full dimension count
+    tree: cKDTree  # over the rows' observed columns
+
+
+@dataclass
+class _CandidateRows:
+    """Reference rows searchable for one (sex, dimension set)."""
+    groups: List[_MaskGroup]  # largest first
+    # Rows of groups too small for a tree (most observed first), searched exhaustively
+    small: np.ndarray
+    small_values: np.ndarray  # (len(small), len(dims)) z-scores
+    small_observed: np.ndarray  # (len(small), len(dims)) mask as 0/1
+    small_scale: np.ndarray  # (len(small),) partial distance -> full dimension count
+
+
+class ReferencePopulationIndex:
+    """
+    k-NN index over a large anonymized reference population.
+    
+    Features are standardized (z-scores). A user missing e.g. A1c is
+    matched on the remaining dimensions only; a reference row missing some
+    of those dimensions is compared on the ones it has, its partial
+    distance scaled up to the full dimension count (rows with none are
+    skipped). Per (sex, user dimensions), rows are grouped by which of
+    those dimensions they observe, and each group gets a lazily built
+    KD-tree over its observed columns; the many tiny groups (rows missing
+    several dimensions) are pooled and scanned in one vectorized pass. A
+    query searches the largest tree, then the pool, then the remaining
+    trees bounded by the current k-th best distance, so groups that cannot
+    improve the result cost one root visit. Percentiles come from
+    pre-sorted columns (binary search), so per-user lookups stay
+    sub-millisecond for hundreds of thousands of rows.
+    """
+    
+    # Observed-dimension groups smaller than this are searched exhaustively
+    MIN_TREE_ROWS = 2048
+    
+    # Matching dimensions, aligned with CohortMatchingProfile fields
+    FEATURES = ("age", "bmi", "glucose", "a1c", "total_cholesterol", "hdl")
+    PROFILE_FIELDS = {
+        "age": "age",
+        "bmi": "bmi",
+        "glucose": "glucose_mean",
+        "a1c": "a1c",
+        "total_cholesterol": "cholesterol_total",
+        "hdl": "hdl",
+    }
+    OUTCOMES = ("diabetes", "cvd")
+    
+    def __init__(
+        self,
+        features: np.ndarray,
+        sex: Optional[np.ndarray] = None,
+        outcomes: Optional[Dict[str, np.ndarray]] = None
+    ):
+        """
+        Args:
+            features: (n, len(FEATURES)) raw values, NaN where missing
+            sex: (n,) "M"/"F" codes (optional)
+            outcomes: outcome name -> (n,) 0/1 indicators (optional)
+        """
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim != 2 or features.shape[1] != len(self.FEATURES):
+            raise ValueError(
+                f"Expected (n, {len(self.FEATURES)}) feature matrix, got {features.shape}"
+            )
+        
+        self.size = features.shape[0]
+        self.observed = ~np.isnan(features)
+        self.means = np.nanmean(features, axis=0)
+        stds = np.nanstd(features, axis=0)
+        self.stds = np.where(stds > 0, stds, 1.0)
+        self.standardized = np.where(self.observed, (features - self.means) / self.stds, 0.0)
+        
+        self.sex = None if sex is None else np.asarray(sex).astype(str)
+        self.outcomes = {
+            name: np.asarray(values, dtype=np.float64)
+            for name, values in (outcomes or {}).items()
+        }
+        
+        # Row subsets per sex (None = everyone)
+        self._rows: Dict[Optional[str], np.ndarray] = {None: np.arange(self.size)}
+        if self.sex is not None:
+            for code in np.unique(self.sex):
+                self._rows[code] = np.flatnonzero(self.sex == code)
+        
+        # Sorted observed values per (sex, feature) for percentile lookups
+        self._sorted: Dict[Tuple[Optional[str], int], np.ndarray] = {}
+        for code, rows in self._rows.items():
+            for j in range(len(self.FEATURES)):
+                column = features[rows, j]
+                self._sorted[(code, j)] = np.sort(column[~np.isnan(column)])
+        
+        self._candidates: Dict[Tuple[Optional[str], Tuple[int, ...]], "_CandidateRows"] = {}
+    
+    @classmethod
+    def from_csv(cls, path: Union[str, Path]) -> "ReferencePopulationIndex":
+        """Load from CSV with FEATURES columns (+ optional sex and outcome columns)."""
+        import pandas as pd
+        
+        frame = pd.read_csv(path)
+        features = frame.reindex(columns=list(cls.FEATURES)).to_numpy(dtype=np.float64)
+        sex = frame["sex"].to_numpy() if "sex" in frame else None
+        outcomes = {name: frame[name].to_numpy() for name in cls.OUTCOMES if name in frame}
+        return cls(features, sex=sex, outcomes=outcomes)
+    
+    @classmethod
+    def from_npz(cls, path: Union[str, Path]) -> "ReferencePopulationIndex":
+        """Load from NPZ with a `features` matrix (+ optional `sex` and outcome arrays)."""
+        with np.load(path, allow_pickle=False) as data:
+            sex = data["sex"] if "sex" in data else None
+            outcomes = {name: data[name] for name in cls.OUTCOMES if name in data}
+            return cls(data["features"], sex=sex, outcomes=outcomes)
+    
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ReferencePopulationIndex":
+        """Load from .csv or .npz by extension."""
+        path = Path(path)
+        if path.suffix == ".csv":
+            return cls.from_csv(path)
+        return cls.from_npz(path)
+    
+    def save_npz(self, path: Union[str, Path]):
+        """Write the raw reference data as NPZ (fast reload)."""
+        raw = np.where(self.observed, self.standardized * self.stds + self.means, np.nan)
+        arrays = {"features": raw, **self.outcomes}
+        if self.sex is not None:
+            arrays["sex"] = self.sex
+        np.savez_compressed(path, **arrays)
+    
+    def profile_vector(self, profile: "CohortMatchingProfile") -> np.ndarray:
+        """Raw feature vector for a profile (NaN where missing)."""
+        return np.array([
+            np.nan if getattr(profile, self.PROFILE_FIELDS[name]) is None
+            else float(getattr(profile, self.PROFILE_FIELDS[name]))
+            for name in self.FEATURES
+        ])
+    
+    def _sex_key(self, sex: Optional[str]) -> Optional[str]:
+        return sex if sex in self._rows else None
+    
+    def _candidate_rows(self, sex_key: Optional[str], dims: Tuple[int, ...]) -> "_CandidateRows":
+        key = (sex_key, dims)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            rows = self._rows[sex_key]
+            # Observed-dimension mask of each row as a bit code
+            codes = self.observed[np.ix_(rows, dims)] @ (1 << np.arange(len(dims)))
+            groups = []
+            small = []
+            for code in np.unique(codes[codes > 0]):
+                members = rows[codes == code]
+                if members.size < self.MIN_TREE_ROWS:
+                    small.append(members)
+                    continue
+                columns = [c for c in range(len(dims)) if code >> c & 1]
+                groups.append(_MaskGroup(
+                    rows=members,
+                    columns=columns,
+                    scale=math.sqrt(len(dims) / len(columns)),
+                    tree=cKDTree(self.standardized[np.ix_(members, [dims[c] for c in columns])])
+                ))
+            groups.sort(key=lambda group: -group.rows.size)
+            small = np.concatenate(small) if small else np.empty(0, dtype=np.int64)
+            # Ties go to the better-observed row, as with the trees searched first
+            small = small[np.argsort(-self.observed[np.ix_(small, dims)].sum(axis=1), kind="stable")]
+            small_observed = self.observed[np.ix_(small, dims)].astype(np.float64)
+            candidates = _CandidateRows(
+                groups=groups,
+                small=small,
+                small_values=self.standardized[np.ix_(small, dims)],
+                small_observed=small_observed,
+                small_scale=np.sqrt(len(dims) / small_observed.sum(axis=1))
+            )
+            self._candidates[key] = candidates
+        return candidates
+    
+    def query(
+        self,
+        values: np.ndarray,
+        k: int = 50,
+        sex: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, Tuple[int, ...]]:
+        """
+        k nearest reference rows for a raw feature vector (NaN = missing).
+        
+        Returns:
+            (distances, row indices, dimensions used), nearest first
+        """
+        values = np.asarray(values, dtype=np.float64)
+        dims = tuple(int(j) for j in np.flatnonzero(~np.isnan(values)))
+        if not dims:
+            return np.empty(0), np.empty(0, dtype=np.int64), dims
+        candidates = self._candidate_rows(self._sex_key(sex), dims)
+        
+        point = (values[list(dims)] - self.means[list(dims)]) / self.stds[list(dims)]
+        distances = np.empty(0)
+        indices = np.empty(0, dtype=np.int64)
+        
+        def keep_nearest(found: np.ndarray, rows: np.ndarray):
+            nonlocal distances, indices
+            distances = np.concatenate([distances, found])
+            indices = np.concatenate([indices, rows])
+            if distances.size > 4 * k:
+                # Drop rows beyond the k-th distance (ties kept) before the stable sort
+                within = np.flatnonzero(distances <= np.partition(distances, k - 1)[k - 1])
+                distances, indices = distances[within], indices[within]
+            nearest = np.argsort(distances, kind="stable")[:k]
+            distances, indices = distances[nearest], indices[nearest]
+        
+        def search_group(group: _MaskGroup):
+            # Only rows that could displace the current k-th best
+            bound = np.inf if distances.size < k else np.nextafter(distances[-1] / group.scale, np.inf)
+            found, positions = group.tree.query(
+                point[group.columns], k=min(k, group.rows.size), distance_upper_bound=bound
+            )
+            found, positions = np.atleast_1d(found), np.atleast_1d(positions)
+            hit = np.isfinite(found)
+            if hit.any():
+                keep_nearest(found[hit] * group.scale, group.rows[positions[hit]])
+        
+        if candidates.groups:
+            search_group(candidates.groups[0])
+        if candidates.small.size:
+            diff = candidates.small_values - point
+            diff *= candidates.small_observed
+            squared = np.einsum("ij,ij->i", diff, diff)
+            keep_nearest(np.sqrt(squared) * candidates.small_scale, candidates.small)
+        for group in candidates.groups[1:]:
+            search_group(group)
+        return distances, indices, dims
+    
+    def percentile(self, feature: str, value: float, sex: Optional[str] = None) -> Optional[float]:
+        """Mid-rank population percentile (0-100) of a value."""
+        column = self._sorted[(self._sex_key(sex), self.FEATURES.index(feature))]
+        if column.size == 0:
+            return None
+        below = np.searchsorted(column, value, side="left")
+        at_or_below = np.searchsorted(column, value, side="right")
+        return float(100.0 * (below + at_or_below) / (2 * column.size))
+    
+    def match(
+        self,
+        profile: "CohortMatchingProfile",
+        k: int = 50
+    ) -> Optional[NeighborCohort]:
+        """Nearest-neighbour cohort for a user profile."""
+        values = self.profile_vector(profile)
+        distances, indices, dims = self.query(values, k=k, sex=profile.sex)
+        if indices.size == 0:
+            return None
+        
+        mean_distance = float(distances.mean())
+        names = [self.FEATURES[j] for j in dims]
+        
+        percentiles = {}
+        neighbor_medians = {}
+        for j, name in zip(dims, names):
+            percentiles[name] = self.percentile(name, values[j], sex=profile.sex)
+            observed = self.observed[indices, j]
+            if observed.any():
+                neighbor_medians[name] = float(np.median(
+                    self.standardized[indices[observed], j] * self.stds[j] + self.means[j]
+                ))
+        
+        prevalence = {
+            name: float(values_[indices].mean())
+            for name, values_ in self.outcomes.items()
+        }
+        
+        return NeighborCohort(
+            k=int(indices.size),
+            neighbor_indices=indices.tolist(),
+            mean_distance=mean_distance,
+            # Per-dimension RMS distance of 0 -> 1.0, 1 SD -> ~0.37
+            similarity=math.exp(-mean_distance / math.sqrt(len(dims))),
+            dimensions_used=names,
+            percentiles=percentiles,
+            neighbor_medians=neighbor_medians,
+            diabetes_prevalence=prevalence.get("diabetes"),
+            cvd_prevalence=prevalence.get("cvd")
+        )
+
+
 class CohortMatchingEngine:
     """
     Engine that matches users to physiological neighbors for contextualization.
@@ -187,6 +507,17 @@ class CohortMatchingEngine:
         
         # Similarity threshold for suppression
         self.suppression_threshold = 0.30
+        
+        # Large reference population (optional; loaded if shipped)
+        self.reference_index: Optional[ReferencePopulationIndex] = None
+        self.neighbor_k = 50
+        if REFERENCE_POPULATION_PATH.exists():
+            self.load_reference_population(REFERENCE_POPULATION_PATH)
+    
+    def load_reference_population(self, path: Union[str, Path]) -> ReferencePopulationIndex:
+        """Load a reference population (CSV or NPZ) for k-NN matching."""
+        self.reference_index = ReferencePopulationIndex.load(path)
+        return self.reference_index
     
     def match_cohort(
         self,
@@ -253,6 +584,22 @@ class CohortMatchingEngine:
         # 9. Compute match confidence
         match_conf = self._compute_match_confidence(overall_score, dim_scores)
         
+        # 10. Nearest neighbours in the reference population: empirical
+        # percentiles and outcome prevalence replace the cohort-range estimates
+        neighbors = None
+        diabetes_prev = matched_cohort.diabetes_prevalence
+        cvd_prev = matched_cohort.cvd_prevalence
+        if self.reference_index is not None:
+            neighbors = self.reference_index.match(user_profile, k=self.neighbor_k)
+            if neighbors is not None:
+                glucose_pct = neighbors.percentiles.get("glucose", glucose_pct)
+                a1c_pct = neighbors.percentiles.get("a1c", a1c_pct)
+                bmi_pct = neighbors.percentiles.get("bmi", bmi_pct)
+                if neighbors.diabetes_prevalence is not None:
+                    diabetes_prev = neighbors.diabetes_prevalence
+                if neighbors.cvd_prevalence is not None:
+                    cvd_prev = neighbors.cvd_prevalence
+        
         return CohortMatchResult(
             matched_cohort_id=matched_cohort.cohort_id,
             matched_cohort_name=matched_cohort.cohort_name,
@@ -264,13 +611,14 @@ class CohortMatchingEngine:
             bmi_percentile=bmi_pct,
             expected_glucose_trajectory=expected_traj if not suppress else None,
             trajectory_deviation=traj_deviation,
-            cohort_diabetes_prevalence=matched_cohort.diabetes_prevalence,
-            cohort_cvd_prevalence=matched_cohort.cvd_prevalence,
+            cohort_diabetes_prevalence=diabetes_prev,
+            cohort_cvd_prevalence=cvd_prev,
             match_confidence=match_conf,
             suppress_cohort_claims=suppress,
             why_this_cohort=why,
             key_similarities=similarities_list,
-            key_differences=differences_list
+            key_differences=differences_list,
+            neighbor_cohort=neighbors
         )
     
     def estimate_trajectory_bands(
@@ -8,10 +8,12 @@ Implements Requirement A2.4: Detect physiologic contradictions before inference.
 - Conflicts propagate to confidence logic downstream
 """
 
-from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from pydantic import BaseModel, Field
 from enum import Enum
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +91,67 @@ class ConflictDetectionReport(BaseModel):
     processing_notes: List[str] = Field(default_factory=list)
 
 
+@dataclass
+class ConflictInterval:
+    """
+    A run of consecutive time points on which one rule fires.
+    
+    Plain dataclass rather than a Pydantic model: a long history can yield
+    tens of thousands of intervals, and they are built from trusted rule
+    metadata.
+    """
+    rule: str  # Same identifier as DetectedConflict.conflict_id
+    conflict_type: ConflictType
+    severity: ConflictSeverity
+    variables_involved: List[str]
+    confidence_impact: str
+    start_ts: float  # Epoch seconds of first flagged point
+    end_ts: float  # Epoch seconds of last flagged point
+    start_index: int
+    end_index: int  # Inclusive
+    
+    @property
+    def n_points(self) -> int:
+        return self.end_index - self.start_index + 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule": self.rule,
+            "conflict_type": self.conflict_type.value,
+            "severity": self.severity.value,
+            "variables_involved": self.variables_involved,
+            "confidence_impact": self.confidence_impact,
+            "start_ts": self.start_ts,
+            "end_ts": self.end_ts,
+            "start_index": self.start_index,
+            "end_index": self.end_index,
+            "n_points": self.n_points
+        }
+
+
+@dataclass
+class ConflictScanReport:
+    """Conflict intervals over a longitudinal history."""
+    intervals: List[ConflictInterval] = field(default_factory=list)
+    n_timepoints: int = 0
+    flagged_timepoints: int = 0
+    critical_intervals: int = 0
+    warning_intervals: int = 0
+    info_intervals: int = 0
+    schema_version: str = "conflict_scan_v1.0"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "schema_version": self.schema_version,
+            "intervals": [i.to_dict() for i in self.intervals],
+            "n_timepoints": self.n_timepoints,
+            "flagged_timepoints": self.flagged_timepoints,
+            "critical_intervals": self.critical_intervals,
+            "warning_intervals": self.warning_intervals,
+            "info_intervals": self.info_intervals
+        }
+
+
 # ============================================================================
 # PHYSIOLOGIC RANGE CHECKS
 # ============================================================================
@@ -370,6 +433,215 @@ def check_blood_pressure_consistency(values: Dict[str, float]) -> List[DetectedC
     return conflicts
 
 
+# ============================================================================
+# TIME-SERIES SCANNING
+# ============================================================================
+
+@dataclass
+class SeriesRule:
+    """Vectorized form of one snapshot check."""
+    rule: str
+    conflict_type: ConflictType
+    severity: ConflictSeverity
+    variables_involved: List[str]
+    confidence_impact: str
+    mask: Callable[[Dict[str, np.ndarray]], np.ndarray]
+
+
+def _range_rule(var_name: str, limits: Dict[str, Any]) -> SeriesRule:
+    return SeriesRule(
+        rule=f"range_{var_name}",
+        conflict_type=ConflictType.PHYSIOLOGIC_IMPOSSIBLE,
+        severity=ConflictSeverity.CRITICAL,
+        variables_involved=[var_name],
+        confidence_impact="suppress_output",
+        mask=lambda v: (v[var_name] < limits["min"]) | (v[var_name] > limits["max"]),
+    )
+
+
+def _anion_gap(v: Dict[str, np.ndarray]) -> np.ndarray:
+    return v["sodium_na"] - (v["chloride_cl"] + v["co2_bicarb"])
+
+
+def _pulse_pressure(v: Dict[str, np.ndarray]) -> np.ndarray:
+    return v["blood_pressure_systolic"] - v["blood_pressure_diastolic"]
+
+
+def _na_k_ratio(v: Dict[str, np.ndarray]) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return v["sodium_na"] / v["potassium_k"]
+
+
+# Mirrors check_physiologic_ranges, check_electrolyte_balance and
+# check_blood_pressure_consistency; NaN comparisons are False, so a missing
+# marker never fires a rule (as with an absent key in the snapshot checks)
+SERIES_RULES: List[SeriesRule] = [
+    _range_rule(var_name, limits) for var_name, limits in PHYSIOLOGIC_ABSOLUTE_LIMITS.items()
+] + [
+    SeriesRule(
+        rule="negative_anion_gap",
+        conflict_type=ConflictType.ELECTROLYTE_IMBALANCE,
+        severity=ConflictSeverity.CRITICAL,
+        variables_involved=["sodium_na", "chloride_cl", "co2_bicarb"],
+        confidence_impact="suppress_output",
+        mask=lambda v: _anion_gap(v) < 0,
+    ),
+    SeriesRule(
+        rule="extreme_anion_gap",
+        conflict_type=ConflictType.ELECTROLYTE_IMBALANCE,
+        severity=ConflictSeverity.WARNING,
+        variables_involved=["sodium_na", "chloride_cl", "co2_bicarb"],
+        confidence_impact="reduce_confidence",
+        mask=lambda v: _anion_gap(v) > 30,
+    ),
+    SeriesRule(
+        rule="na_k_ratio_abnormal",
+        conflict_type=ConflictType.ELECTROLYTE_IMBALANCE,
+        severity=ConflictSeverity.INFO,
+        variables_involved=["sodium_na", "potassium_k"],
+        confidence_impact="reduce_confidence",
+        mask=lambda v: (_na_k_ratio(v) < 20) | (_na_k_ratio(v) > 50),
+    ),
+    SeriesRule(
+        rule="bp_inversion",
+        conflict_type=ConflictType.PHYSIOLOGIC_IMPOSSIBLE,
+        severity=ConflictSeverity.CRITICAL,
+        variables_involved=["blood_pressure_systolic", "blood_pressure_diastolic"],
+        confidence_impact="suppress_output",
+        mask=lambda v: v["blood_pressure_diastolic"] >= v["blood_pressure_systolic"],
+    ),
+    SeriesRule(
+        rule="bp_narrow_pulse_pressure",
+        conflict_type=ConflictType.RANGE_VIOLATION,
+        severity=ConflictSeverity.WARNING,
+        variables_involved=["blood_pressure_systolic", "blood_pressure_diastolic"],
+        confidence_impact="reduce_confidence",
+        mask=lambda v: _pulse_pressure(v) < 20,
+    ),
+    SeriesRule(
+        rule="bp_wide_pulse_pressure",
+        conflict_type=ConflictType.RANGE_VIOLATION,
+        severity=ConflictSeverity.WARNING,
+        variables_involved=["blood_pressure_systolic", "blood_pressure_diastolic"],
+        confidence_impact="reduce_confidence",
+        mask=lambda v: _pulse_pressure(v) > 100,
+    ),
+]
+
+
+def evaluate_series_rules(
+    series: Dict[str, np.ndarray],
+    n: int,
+    rules: Optional[List[SeriesRule]] = None
+) -> Tuple[List[SeriesRule], np.ndarray]:
+    """
+    Evaluate every applicable rule over aligned marker arrays.
+    
+    Args:
+        series: Marker name -> values (length n, NaN = not measured)
+        n: Number of time points
+        rules: Rules to evaluate (default SERIES_RULES)
+    
+    Returns:
+        (rules evaluated, bool matrix of shape (len(rules), n))
+    """
+    rules = SERIES_RULES if rules is None else rules
+    arrays = {k: np.asarray(v, dtype=float) for k, v in series.items()}
+    
+    applicable = [r for r in rules if all(var in arrays for var in r.variables_involved)]
+    masks = np.zeros((len(applicable), n), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for row, rule in enumerate(applicable):
+            masks[row] = rule.mask(arrays)
+    return applicable, masks
+
+
+def scan_conflicts(
+    timestamps: np.ndarray,
+    series: Dict[str, np.ndarray],
+    max_gap_s: Optional[float] = None,
+    rules: Optional[List[SeriesRule]] = None
+) -> ConflictScanReport:
+    """
+    Scan a longitudinal history for conflicts in one vectorized pass.
+    
+    Every rule is evaluated as a mask over all time points; consecutive
+    flagged points collapse into one ConflictInterval.
+    
+    Args:
+        timestamps: Epoch seconds, sorted ascending (length n)
+        series: Marker name -> values aligned with timestamps (NaN = not measured)
+        max_gap_s: If set, a time gap larger than this splits an interval
+        rules: Rules to evaluate (default SERIES_RULES)
+    
+    Returns:
+        ConflictScanReport with intervals ordered by start time, then rule
+    """
+    ts = np.asarray(timestamps, dtype=float)
+    n = ts.size
+    for name, values in series.items():
+        if np.shape(values) != (n,):
+            raise ValueError(f"Series '{name}' has shape {np.shape(values)}, expected ({n},)")
+    
+    applicable, masks = evaluate_series_rules(series, n, rules)
+    if n == 0 or not applicable:
+        return ConflictScanReport(n_timepoints=n)
+    
+    # Run boundaries for all rules at once: rising/falling edges of each row
+    padded = np.zeros((len(applicable), n + 2), dtype=np.int8)
+    padded[:, 1:-1] = masks
+    if max_gap_s is not None:
+        # A break between i-1 and i acts as a falling and a rising edge
+        breaks = np.flatnonzero(np.diff(ts) > max_gap_s) + 1
+    else:
+        breaks = np.array([], dtype=int)
+    
+    edges = np.diff(padded, axis=1)
+    start_rows, start_idx = np.nonzero(edges == 1)
+    end_rows, end_idx = np.nonzero(edges == -1)
+    end_idx = end_idx - 1
+    
+    if breaks.size:
+        both = masks[:, breaks] & masks[:, breaks - 1]
+        brk_rows, brk_cols = np.nonzero(both)
+        start_rows = np.concatenate([start_rows, brk_rows])
+        start_idx = np.concatenate([start_idx, breaks[brk_cols]])
+        end_rows = np.concatenate([end_rows, brk_rows])
+        end_idx = np.concatenate([end_idx, breaks[brk_cols] - 1])
+    
+    # Pair starts with ends per rule (both sorted by (row, index))
+    start_order = np.lexsort((start_idx, start_rows))
+    end_order = np.lexsort((end_idx, end_rows))
+    start_rows, start_idx = start_rows[start_order], start_idx[start_order]
+    end_idx = end_idx[end_order]
+    
+    order = np.lexsort((start_rows, start_idx))
+    intervals = []
+    for k in order:
+        rule = applicable[start_rows[k]]
+        s, e = int(start_idx[k]), int(end_idx[k])
+        intervals.append(ConflictInterval(
+            rule=rule.rule,
+            conflict_type=rule.conflict_type,
+            severity=rule.severity,
+            variables_involved=rule.variables_involved,
+            confidence_impact=rule.confidence_impact,
+            start_ts=float(ts[s]),
+            end_ts=float(ts[e]),
+            start_index=s,
+            end_index=e,
+        ))
+    
+    return ConflictScanReport(
+        intervals=intervals,
+        n_timepoints=n,
+        flagged_timepoints=int(masks.any(axis=0).sum()),
+        critical_intervals=sum(1 for i in intervals if i.severity == ConflictSeverity.CRITICAL),
+        warning_intervals=sum(1 for i in intervals if i.severity == ConflictSeverity.WARNING),
+        info_intervals=sum(1 for i in intervals if i.severity == ConflictSeverity.INFO),
+    )
+
+
 # ============================================================================
 # ORCHESTRATOR
 # ============================================================================
@@ -8,10 +8,12 @@ Implements Requirement A2.1: Per-stream coverage truth object.
 - No inference may exceed confidence implied by coverage
 """
 
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 import logging
+import numpy as np
 
 from app.models.run_v2 import RunV2, SpecimenTypeEnum
 
@@ -39,6 +41,8 @@ class StreamCoverage(BaseModel):
     first_seen_ts: Optional[datetime] = None
     expected_data_points: Optional[int] = None
     coverage_gaps: List[Dict[str, Any]] = Field(default_factory=list, description="List of gaps > threshold")
+    gap_histogram: Optional[Dict[str, int]] = Field(None, description="Counts of inter-sample intervals by duration bin")
+    longest_gap_days: Optional[float] = Field(None, description="Longest interval between consecutive samples")
     temporal_density: Optional[float] = Field(None, description="Data points per day average")
     consistency_score: Optional[float] = Field(None, ge=0.0, le=1.0, description="Regularity of measurements")
     
@@ -85,118 +89,136 @@ class CoverageTruthPack(BaseModel):
     processing_notes: List[str] = Field(default_factory=list)
 
 
-def compute_stream_coverage(
+SECONDS_PER_DAY = 86400.0
+
+# Gap histogram bin edges (days) and labels
+GAP_HISTOGRAM_EDGES_DAYS = np.array([1.0 / 24.0, 0.25, 1.0, 3.0, 7.0])
+GAP_HISTOGRAM_LABELS = ["<1h", "1h-6h", "6h-1d", "1d-3d", "3d-7d", ">7d"]
+
+
+def _to_epoch_seconds(ts: datetime) -> float:
+    """Epoch seconds for a datetime; naive datetimes are taken as UTC."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _utc_offset_seconds(ts: datetime) -> float:
+    """UTC offset of a datetime's local time in seconds; 0 for naive datetimes."""
+    offset = ts.utcoffset()
+    return offset.total_seconds() if offset is not None else 0.0
+
+
+def _empty_coverage(
     stream_key: str,
-    data_points: List[Dict[str, Any]],
-    window_days: float = 30.0,
-    stream_type: str = "lab",
-    specimen_type: Optional[str] = None,
+    stream_type: str,
+    specimen_type: Optional[str],
+    window_days: float,
+    data_points: int,
+    reason: str,
+) -> StreamCoverage:
+    return StreamCoverage(
+        stream_key=stream_key,
+        stream_type=stream_type,
+        specimen_type=specimen_type,
+        days_in_window=window_days,
+        days_covered=0.0,
+        data_points=data_points,
+        missing_rate=1.0,
+        last_seen_ts=None,
+        quality_score=0.0,
+        max_confidence_allowed=0.0,
+        coverage_penalty_factors=[reason],
+    )
+
+
+def _coverage_from_epoch(
+    stream_key: str,
+    ts: np.ndarray,
+    n_points: int,
+    window_days: float,
+    stream_type: str,
+    specimen_type: Optional[str],
+    expected_interval_s: Optional[float],
+    gap_threshold_days: float,
+    ts_objects: Optional[List[datetime]] = None,
+    utc_offsets_s: Optional[np.ndarray] = None,
 ) -> StreamCoverage:
     """
-    Compute coverage metrics for a single data stream.
+    Coverage metrics from valid epoch-second timestamps.
     
-    Args:
-        stream_key: Unique identifier for stream
-        data_points: List of data point dicts with 'timestamp' and 'value'
-        window_days: Observation window in days
-        stream_type: Type of stream (lab, continuous, vitals, etc.)
-        specimen_type: For lab streams
-    
-    Returns:
-        StreamCoverage object
+    `n_points` is the sample count used for density and sample-size penalties.
+    When `ts_objects` (aligned with `ts`) is given, reported timestamps reuse
+    those objects instead of UTC datetimes rebuilt from epoch seconds.
+    `utc_offsets_s` (aligned with `ts`) shifts each reading to its local
+    time before days are bucketed; without it days are UTC days.
     """
-    if not data_points:
-        return StreamCoverage(
-            stream_key=stream_key,
-            stream_type=stream_type,
-            specimen_type=specimen_type,
-            days_in_window=window_days,
-            days_covered=0.0,
-            data_points=0,
-            missing_rate=1.0,
-            quality_score=0.0,
-            max_confidence_allowed=0.0,
-            coverage_penalty_factors=["no_data_points"],
-        )
-    
-    # Extract timestamps
-    timestamps = []
-    for dp in data_points:
-        ts = dp.get("timestamp")
-        if isinstance(ts, str):
-            ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-        if ts:
-            timestamps.append(ts)
-    
-    if not timestamps:
-        return StreamCoverage(
-            stream_key=stream_key,
-            stream_type=stream_type,
-            specimen_type=specimen_type,
-            days_in_window=window_days,
-            days_covered=0.0,
-            data_points=len(data_points),
-            missing_rate=1.0,
-            quality_score=0.0,
-            max_confidence_allowed=0.0,
-            coverage_penalty_factors=["no_valid_timestamps"],
-        )
+    # Device streams usually arrive sorted; skip the argsort then
+    if ts.size > 1 and np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+    else:
+        order = np.arange(ts.size)
     
-    timestamps.sort()
-    first_ts = timestamps[0]
-    last_ts = timestamps[-1]
+    def as_datetime(sorted_pos: int) -> datetime:
+        if ts_objects is not None:
+            return ts_objects[int(order[sorted_pos])]
+        return datetime.utcfromtimestamp(float(ts[sorted_pos]))
     
-    # Calculate days covered (unique days with data)
-    unique_days = set()
-    for ts in timestamps:
-        day_key = ts.date()
-        unique_days.add(day_key)
-    days_covered = len(unique_days)
+    first_ts = as_datetime(0)
+    last_ts = as_datetime(len(ts) - 1)
     
-    # Calculate actual window span
-    actual_span_days = (last_ts - first_ts).total_seconds() / 86400.0
-    actual_span_days = max(actual_span_days, 1.0)  # At least 1 day
+    # Days covered: distinct local-date buckets
+    if utc_offsets_s is None or not np.any(utc_offsets_s):
+        # UTC days follow ts order, so count bucket changes
+        day_buckets = np.floor(ts / SECONDS_PER_DAY)
+        days_covered = 1 + int(np.count_nonzero(np.diff(day_buckets)))
+    else:
+        # Offsets can differ across readings (DST, travel), so local days need not be monotone
+        day_buckets = np.floor((ts + utc_offsets_s[order]) / SECONDS_PER_DAY)
+        days_covered = int(np.unique(day_buckets).size)
     
-    # Use provided window or actual span
+    actual_span_days = max((ts[-1] - ts[0]) / SECONDS_PER_DAY, 1.0)
     effective_window = max(window_days, actual_span_days)
     
-    # Calculate coverage rate
-    coverage_rate = days_covered / effective_window if effective_window > 0 else 0.0
+    # Partial days at both ends can make the bucket count exceed the span
+    coverage_rate = min(days_covered / effective_window, 1.0) if effective_window > 0 else 0.0
     missing_rate = 1.0 - coverage_rate
+    temporal_density = n_points / effective_window if effective_window > 0 else 0.0
+    
+    intervals_s = np.diff(ts)
+    intervals_days = intervals_s / SECONDS_PER_DAY
+    
+    # Gaps over threshold
+    gap_idx = np.flatnonzero(intervals_days > gap_threshold_days)
+    gaps = [
+        {
+            "start": as_datetime(i).isoformat(),
+            "end": as_datetime(i + 1).isoformat(),
+            "duration_days": round(float(intervals_days[i]), 2)
+        }
+        for i in gap_idx
+    ]
     
-    # Calculate temporal density
-    temporal_density = len(data_points) / effective_window if effective_window > 0 else 0.0
-    
-    # Detect gaps (simplified: gaps > 3 days)
-    gaps = []
-    for i in range(1, len(timestamps)):
-        gap_duration = (timestamps[i] - timestamps[i-1]).total_seconds() / 86400.0
-        if gap_duration > 3.0:
-            gaps.append({
-                "start": timestamps[i-1].isoformat(),
-                "end": timestamps[i].isoformat(),
-                "duration_days": round(gap_duration, 2)
-            })
-    
-    # Calculate consistency score (inverse of gap variance)
-    if len(timestamps) > 1:
-        intervals = [(timestamps[i] - timestamps[i-1]).total_seconds() / 3600.0 
-                     for i in range(1, len(timestamps))]
-        if intervals:
-            import statistics
-            mean_interval = statistics.mean(intervals)
-            if len(intervals) > 1:
-                stdev_interval = statistics.stdev(intervals)
-                consistency_score = 1.0 / (1.0 + stdev_interval / (mean_interval + 1e-6))
-            else:
-                consistency_score = 1.0
-        else:
-            consistency_score = 1.0
+    gap_counts = np.bincount(
+        np.searchsorted(GAP_HISTOGRAM_EDGES_DAYS, intervals_days, side="right"),
+        minlength=len(GAP_HISTOGRAM_LABELS)
+    )
+    gap_histogram = dict(zip(GAP_HISTOGRAM_LABELS, (int(c) for c in gap_counts)))
+    longest_gap_days = float(intervals_days.max()) if intervals_days.size else 0.0
+    
+    # Consistency score (inverse of interval coefficient of variation)
+    if intervals_s.size > 1:
+        intervals_h = intervals_s / 3600.0
+        consistency_score = 1.0 / (1.0 + float(np.std(intervals_h, ddof=1)) / (float(intervals_h.mean()) + 1e-6))
     else:
         consistency_score = 1.0
-    
     consistency_score = min(max(consistency_score, 0.0), 1.0)
     
+    expected_data_points = None
+    if expected_interval_s:
+        expected_data_points = int(effective_window * SECONDS_PER_DAY // expected_interval_s)
+    
     # Calculate quality score (weighted combination)
     quality_score = (
         0.4 * coverage_rate +
@@ -217,10 +239,10 @@ def compute_stream_coverage(
         max_confidence = min(max_confidence, 0.75)
         penalties.append("moderate_coverage_under_70pct")
     
-    if len(data_points) < 10:
+    if n_points < 10:
         max_confidence = min(max_confidence, 0.60)
         penalties.append("low_sample_size_under_10")
-    elif len(data_points) < 50:
+    elif n_points < 50:
         max_confidence = min(max_confidence, 0.80)
         penalties.append("moderate_sample_size_under_50")
     
@@ -238,12 +260,15 @@ def compute_stream_coverage(
         specimen_type=specimen_type,
         days_in_window=effective_window,
         days_covered=days_covered,
-        data_points=len(data_points),
+        data_points=n_points,
         missing_rate=missing_rate,
         last_seen_ts=last_ts,
         quality_score=quality_score,
         first_seen_ts=first_ts,
+        expected_data_points=expected_data_points,
         coverage_gaps=gaps,
+        gap_histogram=gap_histogram,
+        longest_gap_days=longest_gap_days,
         temporal_density=temporal_density,
         consistency_score=consistency_score,
         max_confidence_allowed=max_confidence,
@@ -251,12 +276,110 @@ def compute_stream_coverage(
     )
 
 
-def compute_coverage_truth_pack(run_v2: RunV2) -> CoverageTruthPack:
+def compute_stream_coverage_arrays(
+    stream_key: str,
+    timestamps: np.ndarray,
+    values: Optional[np.ndarray] = None,
+    mask: Optional[np.ndarray] = None,
+    window_days: float = 30.0,
+    stream_type: str = "lab",
+    specimen_type: Optional[str] = None,
+    expected_interval_s: Optional[float] = None,
+    gap_threshold_days: float = 3.0,
+    utc_offsets_s: Optional[np.ndarray] = None,
+) -> StreamCoverage:
+    """
+    Compute coverage metrics for a single stream from arrays.
+    
+    Args:
+        stream_key: Unique identifier for stream
+        timestamps: Epoch seconds (UTC), any order
+        values: Optional values aligned with timestamps; NaN marks missing
+        mask: Optional boolean array; False marks missing samples
+        window_days: Observation window in days
+        stream_type: Type of stream (lab, continuous, vitals, etc.)
+        specimen_type: For lab streams
+        expected_interval_s: Nominal sampling interval; sets expected_data_points
+        gap_threshold_days: Minimum interval reported in coverage_gaps
+        utc_offsets_s: Optional UTC offsets (seconds, scalar or aligned with
+            timestamps) of the readings' local time
+    
+    Returns:
+        StreamCoverage object (days are bucketed on local dates when
+        utc_offsets_s is given, UTC dates otherwise)
+    """
+    ts = np.asarray(timestamps, dtype=float)
+    valid = np.isfinite(ts)
+    if mask is not None:
+        valid &= np.asarray(mask, dtype=bool)
+    if values is not None:
+        valid &= ~np.isnan(np.asarray(values, dtype=float))
+    if utc_offsets_s is not None:
+        utc_offsets_s = np.broadcast_to(np.asarray(utc_offsets_s, dtype=float), ts.shape)[valid]
+    ts = ts[valid]
+    
+    if ts.size == 0:
+        return _empty_coverage(stream_key, stream_type, specimen_type, window_days, 0, "no_data_points")
+    
+    return _coverage_from_epoch(
+        stream_key, ts, int(ts.size), window_days, stream_type, specimen_type,
+        expected_interval_s, gap_threshold_days, utc_offsets_s=utc_offsets_s
+    )
+
+
+def compute_stream_coverage(
+    stream_key: str,
+    data_points: List[Dict[str, Any]],
+    window_days: float = 30.0,
+    stream_type: str = "lab",
+    specimen_type: Optional[str] = None,
+) -> StreamCoverage:
+    """
+    Compute coverage metrics for a single data stream.
+    
+    Args:
+        stream_key: Unique identifier for stream
+        data_points: List of data point dicts with 'timestamp' and 'value'
+        window_days: Observation window in days
+        stream_type: Type of stream (lab, continuous, vitals, etc.)
+        specimen_type: For lab streams
+    
+    Returns:
+        StreamCoverage object (days are bucketed on each timestamp's own
+        local date; naive timestamps are taken as UTC)
+    """
+    if not data_points:
+        return _empty_coverage(stream_key, stream_type, specimen_type, window_days, 0, "no_data_points")
+    
+    # Extract timestamps
+    timestamps = []
+    for dp in data_points:
+        ts = dp.get("timestamp")
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        if ts:
+            timestamps.append(ts)
+    
+    if not timestamps:
+        return _empty_coverage(
+            stream_key, stream_type, specimen_type, window_days, len(data_points), "no_valid_timestamps"
+        )
+    
+    epoch = np.fromiter((_to_epoch_seconds(ts) for ts in timestamps), dtype=float, count=len(timestamps))
+    offsets = np.fromiter((_utc_offset_seconds(ts) for ts in timestamps), dtype=float, count=len(timestamps))
+    return _coverage_from_epoch(
+        stream_key, epoch, len(data_points), window_days, stream_type, specimen_type,
+        expected_interval_s=None, gap_threshold_days=3.0, ts_objects=timestamps, utc_offsets_s=offsets
+    )
+
+
+def compute_coverage_truth_pack(run_v2: RunV2, lookback_days: float = 30.0) -> CoverageTruthPack:
     """
     Compute comprehensive coverage truth for all streams in a run.
     
     Args:
         run_v2: RunV2 object with specimens and non_lab_inputs
+        lookback_days: Observation window in days
     
     Returns:
         CoverageTruthPack with coverage for all detected streams
@@ -266,30 +389,31 @@ def compute_coverage_truth_pack(run_v2: RunV2) -> CoverageTruthPack:
     stream_coverages: Dict[str, StreamCoverage] = {}
     processing_notes = []
     
-    # Process lab specimens
+    # Gather lab observations per stream, then compute each stream in one pass
+    stream_times: Dict[str, List[float]] = defaultdict(list)
+    stream_offsets: Dict[str, List[float]] = defaultdict(list)
+    stream_specimen_types: Dict[str, str] = {}
     for specimen in run_v2.specimens:
         specimen_type_str = specimen.specimen_type.value if hasattr(specimen.specimen_type, 'value') else str(specimen.specimen_type)
+        collected_at = _to_epoch_seconds(specimen.collected_at)
+        utc_offset = _utc_offset_seconds(specimen.collected_at)
         
         for var_name, var_value in specimen.raw_values.items():
             if var_value is not None:
                 stream_key = f"{var_name}_{specimen_type_str.lower()}"
-                
-                # Create data point from specimen
-                data_point = {
-                    "timestamp": specimen.collected_at,
-                    "value": var_value
-                }
-                
-                # Compute coverage for this stream
-                coverage = compute_stream_coverage(
-                    stream_key=stream_key,
-                    data_points=[data_point],
-                    window_days=30.0,
-                    stream_type="lab",
-                    specimen_type=specimen_type_str,
-                )
-                
-                stream_coverages[stream_key] = coverage
+                stream_times[stream_key].append(collected_at)
+                stream_offsets[stream_key].append(utc_offset)
+                stream_specimen_types[stream_key] = specimen_type_str
+    
+    for stream_key, times in stream_times.items():
+        stream_coverages[stream_key] = compute_stream_coverage_arrays(
+            stream_key=stream_key,
+            timestamps=np.array(times),
+            window_days=lookback_days,
+            stream_type="lab",
+            specimen_type=stream_specimen_types[stream_key],
+            utc_offsets_s=np.array(stream_offsets[stream_key]),
+        )
     
     # Process non-lab inputs (vitals, sleep, PROs)
     # Note: These fields may not be present in all schemas
@@ -5,23 +5,26 @@ Cross-specimen relationship modeling: kinetics, conservation, triangulation, art
 from typing import Dict, Optional, Tuple, List
 import math
 from app.models.run_v2 import RunV2, SpecimenTypeEnum
+from app.features.run_v2_index import RunV2Index
 from app.models.feature_pack_v2 import (
     LagModelParams, PlausibilityParams, TriangulationScores, ArtifactAndInterferenceRisks,
     CrossSpecimenRelationships
 )
 
 
-def model_lag_kinetics(run_v2: RunV2) -> LagModelParams:
+def model_lag_kinetics(run_v2: RunV2, index: Optional[RunV2Index] = None) -> LagModelParams:
     """
     Estimate lag between ISF and blood glucose using kinetic models.
     
     Returns lag in minutes + coherence score.
     Typical ISF→Blood lag: 5-15 minutes depending on individual and conditions.
     """
+    if index is None:
+        index = RunV2Index(run_v2)
     
-    isf_glucose = _get_specimen_value(run_v2, SpecimenTypeEnum.ISF, "glucose")
-    blood_glucose_cap = _get_specimen_value(run_v2, SpecimenTypeEnum.BLOOD_CAPILLARY, "glucose")
-    blood_glucose_ven = _get_specimen_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "glucose")
+    isf_glucose = index.get_value(SpecimenTypeEnum.ISF, "glucose")
+    blood_glucose_cap = index.get_value(SpecimenTypeEnum.BLOOD_CAPILLARY, "glucose")
+    blood_glucose_ven = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "glucose")
     blood_glucose = blood_glucose_cap or blood_glucose_ven
     
     lag_estimate = None
@@ -68,22 +71,24 @@ def model_lag_kinetics(run_v2: RunV2) -> LagModelParams:
     )
 
 
-def model_conservation_and_plausibility(run_v2: RunV2) -> PlausibilityParams:
+def model_conservation_and_plausibility(run_v2: RunV2, index: Optional[RunV2Index] = None) -> PlausibilityParams:
     """
     Check mass balance and conservation laws for electrolytes and fluid.
     
     Electrolyte conservation: Na in = Na out (sweat + urine + internal redistribution)
     Hydration balance: fluid_in + metabolic_water ≈ sweat + urine + respiratory_loss
     """
+    if index is None:
+        index = RunV2Index(run_v2)
     
     penalties = []
     electrolyte_balance_score = 0.8  # Default: assume reasonable
     hydration_balance_score = 0.8
     
     # Electrolyte conservation check
-    blood_na = _get_specimen_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "sodium_na")
-    sweat_na = _get_specimen_value(run_v2, SpecimenTypeEnum.SWEAT, "sodium_na")
-    sweat_rate = _get_specimen_value(run_v2, SpecimenTypeEnum.SWEAT, "sweat_rate")
+    blood_na = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "sodium_na")
+    sweat_na = index.get_value(SpecimenTypeEnum.SWEAT, "sodium_na")
+    sweat_rate = index.get_value(SpecimenTypeEnum.SWEAT, "sweat_rate")
     
     if blood_na is not None and sweat_na is not None and sweat_rate is not None:
         # Rough check: if high sweat rate but normal blood Na, suggests adequate replacement
@@ -95,8 +100,8 @@ def model_conservation_and_plausibility(run_v2: RunV2) -> PlausibilityParams:
             penalties.append("high_sweat_rate_with_elevated_sodium")
     
     # Hydration balance check
-    fluid_intake = _get_nonlab_value(run_v2, "intake_exposure.fluid_intake_ml_24h")
-    urine_sg = _get_specimen_value(run_v2, SpecimenTypeEnum.URINE_SPOT, "specific_gravity")
+    fluid_intake = index.get_nonlab("intake_exposure.fluid_intake_ml_24h")
+    urine_sg = index.get_value(SpecimenTypeEnum.URINE_SPOT, "specific_gravity")
     
     if fluid_intake is not None and urine_sg is not None:
         # High fluid intake with high urine SG (dilute urine) = good hydration
@@ -116,7 +121,7 @@ def model_conservation_and_plausibility(run_v2: RunV2) -> PlausibilityParams:
     )
 
 
-def model_proxy_triangulation(run_v2: RunV2) -> TriangulationScores:
+def model_proxy_triangulation(run_v2: RunV2, index: Optional[RunV2Index] = None) -> TriangulationScores:
     """
     Triangulate between proxy measures to assess internal consistency.
     
@@ -124,15 +129,17 @@ def model_proxy_triangulation(run_v2: RunV2) -> TriangulationScores:
     - Metabolic exertion: lactate + glucose + activity level should align
     - Inflammation/sleep: CRP + sleep fragmentation should align
     """
+    if index is None:
+        index = RunV2Index(run_v2)
     
     stress_coherence = 0.5
     metabolic_exertion_coherence = 0.5
     inflammation_sleep_coherence = 0.5
     
     # Stress axis triangulation
-    cortisol_morning = _get_specimen_value(run_v2, SpecimenTypeEnum.SALIVA, "cortisol_morning")
-    hrv = _get_nonlab_value(run_v2, "vitals_physiology.hrv")
-    sleep_quality = _get_nonlab_value(run_v2, "sleep_activity.sleep_quality_0_10")
+    cortisol_morning = index.get_value(SpecimenTypeEnum.SALIVA, "cortisol_morning")
+    hrv = index.get_nonlab("vitals_physiology.hrv")
+    sleep_quality = index.get_nonlab("sleep_activity.sleep_quality_0_10")
     
     if cortisol_morning is not None and hrv is not None and sleep_quality is not None:
         # Normal cortisol + high HRV + good sleep = good agreement
@@ -146,9 +153,9 @@ def model_proxy_triangulation(run_v2: RunV2) -> TriangulationScores:
             stress_coherence = 0.5
     
     # Metabolic exertion triangulation
-    lactate = _get_specimen_value(run_v2, SpecimenTypeEnum.ISF, "lactate")
-    glucose = _get_specimen_value(run_v2, SpecimenTypeEnum.ISF, "glucose")
-    activity_level = _get_nonlab_value(run_v2, "sleep_activity.activity_level_0_10")
+    lactate = index.get_value(SpecimenTypeEnum.ISF, "lactate")
+    glucose = index.get_value(SpecimenTypeEnum.ISF, "glucose")
+    activity_level = index.get_nonlab("sleep_activity.activity_level_0_10")
     
     if lactate is not None and glucose is not None and activity_level is not None:
         # High activity + high lactate/glucose = coherent exertion
@@ -162,8 +169,8 @@ def model_proxy_triangulation(run_v2: RunV2) -> TriangulationScores:
             metabolic_exertion_coherence = 0.4  # Incoherent
     
     # Inflammation/sleep triangulation
-    crp = _get_specimen_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "crp")
-    sleep_duration = _get_nonlab_value(run_v2, "sleep_activity.sleep_duration_hr")
+    crp = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "crp")
+    sleep_duration = index.get_nonlab("sleep_activity.sleep_duration_hr")
     
     if crp is not None and sleep_duration is not None:
         # High CRP + low sleep = coherent (both suggest inflammation/stress)
@@ -180,10 +187,12 @@ def model_proxy_triangulation(run_v2: RunV2) -> TriangulationScores:
     )
 
 
-def model_artifact_and_interference(run_v2: RunV2) -> ArtifactAndInterferenceRisks:
+def model_artifact_and_interference(run_v2: RunV2, index: Optional[RunV2Index] = None) -> ArtifactAndInterferenceRisks:
     """
     Assess risk of data quality issues and medication/physiological confounds.
     """
+    if index is None:
+        index = RunV2Index(run_v2)
     
     motion_artifact_risk = 0.0
     topical_contamination_risk = 0.0
@@ -193,13 +202,13 @@ def model_artifact_and_interference(run_v2: RunV2) -> ArtifactAndInterferenceRis
     # Motion artifact: check if wearable signal quality is poor
     # (This would come from ISF sensor metadata if available)
     # For now, use HRV variability as proxy for motion
-    hrv = _get_nonlab_value(run_v2, "vitals_physiology.hrv")
+    hrv = index.get_nonlab("vitals_physiology.hrv")
     if hrv is not None and hrv < 10:
         motion_artifact_risk = 0.6  # Very low HRV might indicate motion or stress
     
     # Topical contamination (sweat): if skin temp high or exertion high, contamination risk increases
-    skin_temp = _get_specimen_value(run_v2, SpecimenTypeEnum.SWEAT, "skin_temp")
-    exertion = _get_specimen_value(run_v2, SpecimenTypeEnum.SWEAT, "exertion_level")
+    skin_temp = index.get_value(SpecimenTypeEnum.SWEAT, "skin_temp")
+    exertion = index.get_value(SpecimenTypeEnum.SWEAT, "exertion_level")
     
     if skin_temp is not None and skin_temp > 35:
         topical_contamination_risk = 0.5  # High skin temp increases sweat collection artifact risk
@@ -208,7 +217,7 @@ def model_artifact_and_interference(run_v2: RunV2) -> ArtifactAndInterferenceRis
     topical_contamination_risk = min(topical_contamination_risk, 1.0)
     
     # Dehydration confounding (urine interpretation affected by hydration state)
-    urine_sg = _get_specimen_value(run_v2, SpecimenTypeEnum.URINE_SPOT, "specific_gravity")
+    urine_sg = index.get_value(SpecimenTypeEnum.URINE_SPOT, "specific_gravity")
     if urine_sg is not None and urine_sg > 1.025:
         dehydration_confounding_risk = 0.7  # High SG makes urine tests hard to interpret
     
@@ -239,14 +248,23 @@ def model_artifact_and_interference(run_v2: RunV2) -> ArtifactAndInterferenceRis
     )
 
 
-def build_cross_specimen_relationships(run_v2: RunV2) -> CrossSpecimenRelationships:
+def build_cross_specimen_relationships(
+    run_v2: RunV2,
+    index: Optional[RunV2Index] = None
+) -> CrossSpecimenRelationships:
     """
     Orchestrate all cross-specimen modules and return consolidated output.
+    
+    Args:
+        run_v2: Run to model
+        index: Shared RunV2Index (built here if not supplied)
     """
-    lag_model = model_lag_kinetics(run_v2)
-    plausibility = model_conservation_and_plausibility(run_v2)
-    triangulation = model_proxy_triangulation(run_v2)
-    artifact_risks = model_artifact_and_interference(run_v2)
+    if index is None:
+        index = RunV2Index(run_v2)
+    lag_model = model_lag_kinetics(run_v2, index)
+    plausibility = model_conservation_and_plausibility(run_v2, index)
+    triangulation = model_proxy_triangulation(run_v2, index)
+    artifact_risks = model_artifact_and_interference(run_v2, index)
     
     return CrossSpecimenRelationships(
         lag_model=lag_model,
@@ -254,37 +272,3 @@ def build_cross_specimen_relationships(run_v2: RunV2) -> CrossSpecimenRelationsh
         triangulation=triangulation,
         artifact_risks=artifact_risks,
     )
-
-
-# Helper functions
-def _get_specimen_value(run_v2: RunV2, specimen_type: SpecimenTypeEnum, variable_name: str) -> Optional[float]:
-    """Get a specific variable value from a specimen of given type."""
-    for specimen in run_v2.specimens:
-        if specimen.specimen_type == specimen_type:
-            # Defensive: check if variable exists in missingness dict
-            if variable_name in specimen.missingness:
-                missingness_entry = specimen.missingness[variable_name]
-                is_missing = missingness_entry.is_missing if hasattr(missingness_entry, 'is_missing') else True
-                if not is_missing:
-                    val = specimen.raw_values.get(variable_name)
-                    return float(val) if val is not None else None
-    return None
-
-
-def _get_nonlab_value(run_v2: RunV2, path: str) -> Optional[float]:
-    """
-    Get a non-lab value using dot-notation path.
-    E.g., "demographics.age" or "vitals_physiology.heart_rate"
-    """
-    parts = path.split(".")
-    obj = run_v2.non_lab_inputs
-    
-    for part in parts:
-        if obj is None:
-            return None
-        if isinstance(obj, dict):
-            obj = obj.get(part)
-        else:
-            obj = getattr(obj, part, None)
-    
-    return float(obj) if obj is not None else None
@@ -1,5 +1,6 @@
 import numpy as np
 from typing import List, Dict, Tuple
+from app.features.rolling import rolling_mean, rolling_std
 
 
 def compute_moving_average(values: List[float], window: int = 3) -> List[float]:
@@ -7,11 +8,10 @@ def compute_moving_average(values: List[float], window: int = 3) -> List[float]:
     if len(values) < window:
         return values
     arr = np.array(values, dtype=float)
-    result = np.convolve(arr, np.ones(window) / window, mode='valid')
-    # Pad with original values to maintain length
-    padding = len(values) - len(result)
-    padded = list(arr[:padding]) + result.tolist()
-    return padded
+    # Full windows only; the first window-1 entries keep their original values
+    result = rolling_mean(arr, window)
+    result[:window - 1] = arr[:window - 1]
+    return result.tolist()
 
 
 def compute_rolling_std(values: List[float], window: int = 3) -> List[float]:
@@ -19,11 +19,8 @@ def compute_rolling_std(values: List[float], window: int = 3) -> List[float]:
     if len(values) < window:
         return [0.0] * len(values)
     arr = np.array(values, dtype=float)
-    result = []
-    for i in range(len(arr)):
-        start = max(0, i - window + 1)
-        result.append(float(np.std(arr[start:i+1])))
-    return result
+    # Leading windows are partial (population std)
+    return rolling_std(arr, window, out=arr).tolist()
 
 
 def compute_derived_metric(features: List[float]) -> float:
@@ -8,11 +8,13 @@ Implements Requirement A2.3: Deterministic, non-ML derived clinical features.
 - Results are additive and don't replace existing outputs
 """
 
-from typing import Dict, Optional, List, Any
+from dataclasses import dataclass, field
+from typing import Dict, Optional, List, Any, Tuple, Union
 from pydantic import BaseModel, Field
 from enum import Enum
 import math
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -631,3 +633,188 @@ def compute_derived_features(values: Dict[str, Any], patient_info: Optional[Dict
             pack.features_computed += 1
     
     return pack
+
+
+# ============================================================================
+# COLUMNAR (ARRAY) CALCULATORS
+# ============================================================================
+
+ArrayLike = Union[float, np.ndarray]
+
+
+@dataclass
+class DerivedFeatureColumns:
+    """
+    Derived features over many lab draws, one array per feature.
+    
+    `values[name][i]` is the feature for draw i (NaN where its inputs are
+    missing or invalid); `is_within_normal[name][i]` matches the scalar
+    calculator's is_within_normal and is False wherever the value is NaN.
+    """
+    n_rows: int
+    timestamps: Optional[np.ndarray] = None
+    values: Dict[str, np.ndarray] = field(default_factory=dict)
+    is_within_normal: Dict[str, np.ndarray] = field(default_factory=dict)
+    units: Dict[str, str] = field(default_factory=dict)
+    feature_types: Dict[str, DerivedFeatureType] = field(default_factory=dict)
+    
+    def trajectory(self, feature_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps, values) for the draws where the feature is defined."""
+        values = self.values[feature_name]
+        ok = ~np.isnan(values)
+        ts = self.timestamps if self.timestamps is not None else np.arange(self.n_rows, dtype=float)
+        return ts[ok], values[ok]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "n_rows": self.n_rows,
+            "timestamps": None if self.timestamps is None else self.timestamps.tolist(),
+            "features": {
+                name: {
+                    "feature_type": self.feature_types[name].value,
+                    "unit": self.units[name],
+                    "values": [None if np.isnan(v) else float(v) for v in values],
+                    "is_within_normal": self.is_within_normal[name].tolist()
+                }
+                for name, values in self.values.items()
+            }
+        }
+
+
+def _add_column(
+    result: DerivedFeatureColumns,
+    name: str,
+    feature_type: DerivedFeatureType,
+    unit: str,
+    raw: np.ndarray,
+    decimals: int,
+    normal: np.ndarray
+):
+    """Store a feature rounded like its scalar calculator; `normal` is judged on raw values."""
+    finite = np.isfinite(raw)
+    result.values[name] = np.where(finite, np.round(raw, decimals), np.nan)
+    result.is_within_normal[name] = normal & finite
+    result.units[name] = unit
+    result.feature_types[name] = feature_type
+
+
+def compute_derived_features_arrays(
+    values: Dict[str, ArrayLike],
+    patient_info: Optional[Dict[str, Any]] = None,
+    timestamps: Optional[np.ndarray] = None
+) -> DerivedFeatureColumns:
+    """
+    Compute every applicable derived feature over aligned lab arrays.
+    
+    Columnar counterpart of compute_derived_features for a lab history or a
+    cohort: each calculator runs once over all rows. NaN marks a lab that was
+    not drawn. Formulas, rounding and normal cut-offs match the scalar
+    calculators.
+    
+    Args:
+        values: Variable name -> array of values (same length; scalars broadcast)
+        patient_info: Optional dict with age and sex, each a scalar or per-row array
+        timestamps: Optional epoch seconds aligned with the rows
+    
+    Returns:
+        DerivedFeatureColumns with one array per computed feature
+    """
+    cols = {
+        k: np.asarray(v, dtype=float) for k, v in values.items()
+        if k != "run_id" and v is not None
+    }
+    shapes = [c.shape for c in cols.values()]
+    if timestamps is not None:
+        shapes.append(np.shape(timestamps))
+    n_rows = int(np.broadcast_shapes(*shapes)[0]) if any(shapes) else 1
+    cols = {k: np.broadcast_to(v, (n_rows,)) for k, v in cols.items()}
+    
+    result = DerivedFeatureColumns(
+        n_rows=n_rows,
+        timestamps=None if timestamps is None else np.asarray(timestamps, dtype=float)
+    )
+    
+    def has(*keys: str) -> bool:
+        return all(k in cols for k in keys)
+    
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Renal features
+        age = (patient_info or {}).get("age")
+        sex = (patient_info or {}).get("sex")
+        if has("creatinine") and age is not None and sex is not None:
+            age = np.broadcast_to(np.asarray(age, dtype=float), (n_rows,))
+            female = np.broadcast_to(np.char.upper(np.asarray(sex, dtype=str)) == "F", (n_rows,))
+            kappa = np.where(female, 0.7, 0.9)
+            alpha = np.where(female, -0.241, -0.302)
+            scr_kappa = cols["creatinine"] / kappa
+            egfr = (
+                142
+                * np.minimum(scr_kappa, 1.0) ** alpha
+                * np.maximum(scr_kappa, 1.0) ** -1.200
+                * 0.9938 ** age
+                * np.where(female, 1.012, 1.0)
+            )
+            # Scalar path skips a falsy age
+            egfr = np.where(age > 0, egfr, np.nan)
+            # Stages 1-2 (>= 60) count as within normal
+            _add_column(result, "eGFR_CKD_EPI", DerivedFeatureType.RENAL, "mL/min/1.73m²", egfr, 1, egfr >= 60)
+        
+        if has("bun", "creatinine"):
+            ratio = cols["bun"] / cols["creatinine"]
+            _add_column(
+                result, "BUN_Creatinine_Ratio", DerivedFeatureType.RENAL, "ratio",
+                ratio, 1, (ratio >= 10) & (ratio <= 20)
+            )
+        
+        # Electrolyte features
+        if has("sodium_na", "chloride_cl", "co2_bicarb"):
+            gap = cols["sodium_na"] - (cols["chloride_cl"] + cols["co2_bicarb"])
+            _add_column(
+                result, "Anion_Gap", DerivedFeatureType.ELECTROLYTE, "mmol/L",
+                gap, 1, (gap >= 8) & (gap <= 12)
+            )
+            
+            if has("albumin"):
+                # Corrects the rounded gap, as the scalar path does
+                corrected = result.values["Anion_Gap"] + 2.5 * (4.0 - cols["albumin"])
+                _add_column(
+                    result, "Albumin_Corrected_Anion_Gap", DerivedFeatureType.ELECTROLYTE, "mmol/L",
+                    corrected, 1, (corrected >= 3) & (corrected <= 11)
+                )
+        
+        if has("sodium_na", "glucose", "bun"):
+            osmolarity = 2 * cols["sodium_na"] + cols["glucose"] / 18 + cols["bun"] / 2.8
+            _add_column(
+                result, "Estimated_Osmolarity", DerivedFeatureType.ELECTROLYTE, "mOsm/kg",
+                osmolarity, 1, (osmolarity >= 275) & (osmolarity <= 295)
+            )
+        
+        # Lipid features
+        if has("chol_total", "hdl"):
+            non_hdl = cols["chol_total"] - cols["hdl"]
+            _add_column(result, "Non_HDL", DerivedFeatureType.LIPID, "mg/dL", non_hdl, 1, non_hdl < 160)
+            
+            tc_hdl = cols["chol_total"] / cols["hdl"]
+            _add_column(result, "TC_HDL_Ratio", DerivedFeatureType.LIPID, "ratio", tc_hdl, 2, tc_hdl < 5.0)
+        
+        if has("triglycerides", "hdl"):
+            tg_hdl = cols["triglycerides"] / cols["hdl"]
+            _add_column(result, "TG_HDL_Ratio", DerivedFeatureType.LIPID, "ratio", tg_hdl, 2, tg_hdl < 2.0)
+        
+        if has("chol_total", "ldl", "hdl"):
+            remnant = cols["chol_total"] - cols["ldl"] - cols["hdl"]
+            _add_column(result, "Remnant_Cholesterol", DerivedFeatureType.LIPID, "mg/dL", remnant, 1, remnant < 30)
+        
+        # Blood pressure features
+        if has("blood_pressure_systolic", "blood_pressure_diastolic"):
+            sbp = cols["blood_pressure_systolic"]
+            dbp = cols["blood_pressure_diastolic"]
+            map_value = dbp + (sbp - dbp) / 3
+            _add_column(
+                result, "MAP", DerivedFeatureType.BLOOD_PRESSURE, "mmHg",
+                map_value, 1, (map_value >= 70) & (map_value <= 100)
+            )
+            pp = sbp - dbp
+            _add_column(result, "Pulse_Pressure", DerivedFeatureType.BLOOD_PRESSURE, "mmHg", pp, 1, (pp >= 40) & (pp <= 60))
+    
+    return result
@@ -0,0 +1,224 @@
+"""
+Downsampling ISF streams for charts.
+
+Two reducers pick a subset of readings that still looks like the series:
+- LTTB (largest-triangle-three-buckets): one point per count bucket, the
+  one spanning the largest triangle with the previous pick and the next
+  bucket's average. Keeps shape with exactly the requested point count.
+- Min/max envelope: the lowest and highest reading of each time bucket,
+  so every spike and dip survives.
+
+Each stream also gets a pyramid at ingest: successive min/max envelope
+levels, each FACTOR times smaller than the one below, stopping at
+PYRAMID_MIN_POINTS. A chart query reduces the finest level that covers
+the requested range within PYRAMID_OVERSAMPLE x the requested points, so a
+90-day request touches a few thousand stored points instead of every
+reading. Envelopes of envelopes keep each bucket's true extremes.
+
+Queries are read-only: with the readings columns deferred, a stream is
+sized by its SQL-side value_count and its raw readings load only when the
+finest level is itself under budget (short ranges). Pyramids are stored at
+ingest (and by migration for older streams); a missing or stale one is
+built in memory for the query without being saved.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.features.stream_cache import fresh_stream_derived, get_stream_derived, load_stream_series
+from app.features.temporal_series import Series
+from app.models.part_a_models import ISFAnalyteStream
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+# Cache key and version for per-stream pyramids
+PYRAMID_KIND = "chart_pyramid"
+PYRAMID_VERSION = 1
+
+# Each level keeps the min and max of every 2 * FACTOR points of the level below
+PYRAMID_FACTOR = 4
+PYRAMID_MIN_POINTS = 256
+# A level serves a query when it holds at most this many x the requested points
+PYRAMID_OVERSAMPLE = 4
+
+
+def _bucket_extremes(buckets: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Indices of each (nondecreasing) bucket's min and max, in index order."""
+    order = np.lexsort((values, buckets))
+    first = np.flatnonzero(np.concatenate(([True], buckets[order][1:] != buckets[order][:-1])))
+    last = np.concatenate((first[1:], [len(order)])) - 1
+    return np.unique(np.concatenate((order[first], order[last])))
+
+
+def minmax_envelope(timestamps: np.ndarray, values: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the min and max reading of n_out // 2 equal-time buckets
+    (all indices when the series is already small enough).
+    """
+    n = len(values)
+    if n <= n_out:
+        return np.arange(n)
+    n_buckets = max(n_out // 2, 1)
+    span = timestamps[-1] - timestamps[0]
+    if span <= 0:
+        return _bucket_extremes(np.zeros(n, dtype=np.int64), values)
+    buckets = np.minimum(((timestamps - timestamps[0]) / span * n_buckets).astype(np.int64), n_buckets - 1)
+    return _bucket_extremes(buckets, values)
+
+
+def lttb(timestamps: np.ndarray, values: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the largest-triangle-three-buckets downsample to n_out points
+    (first and last reading always kept).
+
+    Bucket averages are computed up front; the pick itself walks the
+    buckets because each one depends on the previous pick.
+    """
+    n = len(values)
+    if n <= n_out or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    x, y = timestamps, values
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    sizes = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / sizes, x[n - 1])
+    mean_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / sizes, y[n - 1])
+
+    picks = np.empty(n_out, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        picks[i + 1] = a
+    return picks
+
+
+def downsample(timestamps: np.ndarray, values: np.ndarray, n_out: int, method: str = "lttb") -> Series:
+    """Reduce a time-sorted series to about n_out points with `method`."""
+    if method == "lttb":
+        picks = lttb(timestamps, values, n_out)
+    elif method == "minmax":
+        picks = minmax_envelope(timestamps, values, n_out)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method} (expected one of {DOWNSAMPLE_METHODS})")
+    return timestamps[picks], values[picks]
+
+
+def build_pyramid(timestamps: np.ndarray, values: np.ndarray) -> List[Dict[str, List[float]]]:
+    """
+    Envelope levels above a time-sorted series, finest first; empty when the
+    series already has at most PYRAMID_MIN_POINTS readings.
+    """
+    levels = []
+    ts, vals = timestamps, values
+    while len(vals) > PYRAMID_MIN_POINTS:
+        picks = _bucket_extremes(np.arange(len(vals)) // (2 * PYRAMID_FACTOR), vals)
+        ts, vals = ts[picks], vals[picks]
+        levels.append({"timestamps": ts.tolist(), "values": vals.tolist()})
+    return levels
+
+
+def _compute_stream_pyramid(stream: ISFAnalyteStream) -> Dict[str, Any]:
+    timestamps, values = load_stream_series(stream)
+    return {
+        "n": len(values),
+        "first_ts": float(timestamps[0]) if len(values) else None,
+        "last_ts": float(timestamps[-1]) if len(values) else None,
+        "levels": build_pyramid(timestamps, values),
+    }
+
+
+def stream_pyramid(stream: ISFAnalyteStream) -> Dict[str, Any]:
+    """Chart pyramid for a stored stream, cached alongside it."""
+    return get_stream_derived(stream, PYRAMID_KIND, PYRAMID_VERSION, _compute_stream_pyramid)
+
+
+def _chart_pyramid(stream: ISFAnalyteStream) -> Dict[str, Any]:
+    return fresh_stream_derived(stream, PYRAMID_KIND, PYRAMID_VERSION) or _compute_stream_pyramid(stream)
+
+
+def _in_range(timestamps: np.ndarray, start: Optional[float], end: Optional[float]) -> slice:
+    lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+    hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="right"))
+    return slice(lo, hi)
+
+
+@dataclass
+class ChartSeries:
+    """A downsampled series and where it came from."""
+    timestamps: np.ndarray
+    values: np.ndarray
+    method: str
+    source_levels: List[int]  # Pyramid level used per stream in range (0: raw readings)
+    source_points: int  # Points in range the reduction started from
+
+
+def _overlaps(pyramid: Dict[str, Any], start: Optional[float], end: Optional[float]) -> bool:
+    if pyramid["first_ts"] is None:
+        return False
+    return (start is None or pyramid["last_ts"] >= start) and (end is None or pyramid["first_ts"] <= end)
+
+
+def _stream_source(
+    stream: ISFAnalyteStream,
+    levels: List[Dict[str, List[float]]],
+    n_points: int,
+    start: Optional[float],
+    end: Optional[float]
+) -> Tuple[Series, int]:
+    """In-range points of the finest pyramid level within budget, and its level."""
+    budget = PYRAMID_OVERSAMPLE * n_points
+    chosen = None
+    for depth in range(len(levels), 0, -1):
+        ts = np.asarray(levels[depth - 1]["timestamps"])
+        window = _in_range(ts, start, end)
+        if chosen is None or window.stop - window.start <= budget:
+            chosen = (depth, ts, window)
+        else:
+            break
+    # Raw readings only when the finest level is itself well under budget
+    if chosen is None or (chosen[0] == 1 and (chosen[2].stop - chosen[2].start) * PYRAMID_FACTOR <= budget):
+        timestamps, values = load_stream_series(stream)
+        window = _in_range(timestamps, start, end)
+        return (timestamps[window], values[window]), 0
+    depth, ts, window = chosen
+    values = np.asarray(levels[depth - 1]["values"])
+    return (ts[window], values[window]), depth
+
+
+def chart_series(
+    streams: Sequence[ISFAnalyteStream],
+    n_points: int,
+    method: str = "lttb",
+    start: Optional[float] = None,
+    end: Optional[float] = None
+) -> ChartSeries:
+    """
+    Streams (e.g. one analyte across devices) merged and downsampled to
+    about n_points within [start, end] (epoch seconds, wall clock).
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method: {method} (expected one of {DOWNSAMPLE_METHODS})")
+    pyramids = [(stream, _chart_pyramid(stream)) for stream in streams]
+    sources = [
+        _stream_source(stream, pyramid["levels"], n_points, start, end)
+        for stream, pyramid in pyramids if _overlaps(pyramid, start, end)
+    ]
+    timestamps = np.concatenate([ts for (ts, _), _ in sources]) if sources else np.empty(0)
+    values = np.concatenate([vals for (_, vals), _ in sources]) if sources else np.empty(0)
+    order = np.argsort(timestamps, kind="stable")
+    reduced_ts, reduced_values = downsample(timestamps[order], values[order], n_points, method)
+    return ChartSeries(
+        timestamps=reduced_ts,
+        values=reduced_values,
+        method=method,
+        source_levels=[depth for _, depth in sources],
+        source_points=len(values),
+    )
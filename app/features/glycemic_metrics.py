@@ -0,0 +1,264 @@
+"""
+Glycemic variability metrics over full-resolution glucose streams.
+
+One call computes the standard CGM summary for a stream: time in/above/
+below range, GMI, MAGE, CONGA, MODD, LBGI/HBGI and the ambulatory glucose
+profile (AGP percentiles by time of day). Everything is array arithmetic on
+the (timestamps, values) series except MAGE's turning-point walk, which
+only visits the local extrema.
+
+Values are mg/dL. Percentages are shares of readings (CGM consensus
+definitions assume regular sampling). Timestamps are epoch seconds whose
+time of day is the recorded wall-clock time (see temporal_series).
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.features.stream_cache import get_stream_derived, load_stream_series
+from app.features.temporal_series import Series
+from app.models.part_a_models import ISFAnalyteStream
+
+# Consensus glucose thresholds (mg/dL)
+VERY_LOW_MG_DL = 54.0
+TARGET_LOW_MG_DL = 70.0
+TARGET_HIGH_MG_DL = 180.0
+VERY_HIGH_MG_DL = 250.0
+
+MMOL_L_TO_MG_DL = 18.016
+
+CONGA_HOURS = 1.0
+MODD_LAG_S = 86400.0
+
+# Ambulatory glucose profile: 15-minute time-of-day bins
+AGP_BIN_S = 900.0
+AGP_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Cache key and version for per-stream results (bump when formulas change)
+GLYCEMIC_METRICS_KIND = "glycemic_metrics"
+GLYCEMIC_METRICS_VERSION = 1
+
+
+@dataclass
+class GlycemicMetrics:
+    """CGM summary metrics for one glucose series."""
+    n_readings: int
+    days_of_data: float
+    mean_mg_dl: float
+    sd_mg_dl: float
+    cv: float
+    gmi_pct: float
+    time_very_low_pct: float  # < 54
+    time_below_range_pct: float  # < 70
+    time_in_range_pct: float  # 70-180
+    time_above_range_pct: float  # > 180
+    time_very_high_pct: float  # > 250
+    lbgi: float
+    hbgi: float
+    mage: Optional[float] = None  # None without a complete swing of at least 1 SD
+    conga: Optional[float] = None  # None without readings CONGA_HOURS apart
+    modd: Optional[float] = None  # None with under a day of data
+    agp: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GlycemicMetrics":
+        return cls(**data)
+
+
+def _lagged_pairs(timestamps: np.ndarray, lag_s: float, tolerance_s: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index pairs (i, j) where reading j is the one nearest to lag_s before
+    reading i, kept only when it lies within tolerance_s of that instant.
+    """
+    target = timestamps - lag_s
+    after = np.clip(np.searchsorted(timestamps, target), 0, len(timestamps) - 1)
+    before = np.maximum(after - 1, 0)
+    nearest = np.where(
+        np.abs(timestamps[before] - target) <= np.abs(timestamps[after] - target), before, after
+    )
+    keep = np.abs(timestamps[nearest] - target) <= tolerance_s
+    return np.flatnonzero(keep), nearest[keep]
+
+
+def _turning_values(values: np.ndarray) -> np.ndarray:
+    """Endpoints and local extrema (plateaus collapsed) of a series."""
+    steps = np.diff(values)
+    moving = np.flatnonzero(steps)
+    if len(moving) == 0:
+        return values[:1]
+    direction = np.sign(steps[moving])
+    reversals = moving[np.flatnonzero(direction[1:] != direction[:-1]) + 1]
+    return values[np.concatenate(([0], reversals, [len(values) - 1]))]
+
+
+def mage(values: np.ndarray, threshold: Optional[float] = None) -> Optional[float]:
+    """
+    Mean amplitude of glycemic excursions: mean height of the peak-to-nadir
+    and nadir-to-peak swings of at least `threshold` (default: 1 SD), in
+    both directions. Smaller wiggles inside a swing do not break it; None
+    without a swing bounded by two confirmed turning points.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 3:
+        return None
+    threshold = float(values.std()) if threshold is None else threshold
+    if threshold <= 0:
+        return None
+
+    turning = _turning_values(values).tolist()
+    amplitudes: List[float] = []
+    low = high = pivot = extreme = turning[0]
+    low_at = high_at = 0
+    rising = None
+    # A swing counts once both ends are confirmed turning points: the series
+    # start is not one, and the final swing is never confirmed
+    partial = True
+    for i, value in enumerate(turning[1:], start=1):
+        if rising is None:
+            if value < low:
+                low, low_at = value, i
+            if value > high:
+                high, high_at = value, i
+            if high - low >= threshold:
+                rising = value == high
+                pivot, extreme = (low, value) if rising else (high, value)
+                partial = (low_at if rising else high_at) == 0
+        elif (value - extreme) * (1 if rising else -1) > 0:
+            extreme = value
+        elif abs(extreme - value) >= threshold:
+            if not partial:
+                amplitudes.append(abs(extreme - pivot))
+            pivot, extreme, rising, partial = extreme, value, not rising, False
+    return float(np.mean(amplitudes)) if amplitudes else None
+
+
+def risk_indices(values: np.ndarray) -> Tuple[float, float]:
+    """(LBGI, HBGI) from the Kovatchev symmetrized glucose risk function."""
+    values = np.maximum(np.asarray(values, dtype=np.float64), 1.0)
+    f = 1.509 * (np.log(values) ** 1.084 - 5.381)
+    risk = 10.0 * f * f
+    return float(np.where(f < 0, risk, 0.0).mean()), float(np.where(f > 0, risk, 0.0).mean())
+
+
+def ambulatory_profile(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    bin_s: float = AGP_BIN_S,
+    percentiles: Tuple[int, ...] = AGP_PERCENTILES
+) -> Dict[str, Any]:
+    """
+    Percentiles of glucose per time-of-day bin, pooled across days.
+
+    One lexsort by (bin, value) orders every bin at once; each percentile is
+    then a linear interpolation at per-bin offsets. Empty bins are None.
+    """
+    n_bins = int(round(86400.0 / bin_s))
+    bins = ((timestamps % 86400.0) // bin_s).astype(np.int64)
+    ordered = values[np.lexsort((values, bins))]
+    counts = np.bincount(bins, minlength=n_bins)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    filled = counts > 0
+
+    profile: Dict[str, Any] = {"bin_minutes": bin_s / 60.0, "counts": counts.tolist()}
+    for pct in percentiles:
+        position = (pct / 100.0) * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+        frac = position - lower
+        start = offsets[filled]
+        curve = np.full(n_bins, np.nan)
+        curve[filled] = (ordered[start + lower[filled]] * (1.0 - frac[filled])
+                         + ordered[start + upper[filled]] * frac[filled])
+        profile[f"p{pct}"] = [None if np.isnan(v) else round(float(v), 2) for v in curve]
+    return profile
+
+
+def compute_glycemic_metrics(timestamps: np.ndarray, values: np.ndarray) -> Optional[GlycemicMetrics]:
+    """
+    All glycemic metrics for a time-sorted glucose series (mg/dL).
+
+    Lagged metrics pair each reading with the reading nearest the lag,
+    within half the median sampling interval (at least a minute).
+
+    Returns:
+        GlycemicMetrics, or None for an empty series
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return None
+
+    mean = float(values.mean())
+    sd = float(values.std())
+    lbgi, hbgi = risk_indices(values)
+    tolerance_s = max(0.5 * float(np.median(np.diff(timestamps))), 60.0) if n > 1 else 60.0
+
+    conga = None
+    later, earlier = _lagged_pairs(timestamps, CONGA_HOURS * 3600.0, tolerance_s)
+    if len(later) > 1:
+        conga = float(np.std(values[later] - values[earlier], ddof=1))
+
+    modd = None
+    later, earlier = _lagged_pairs(timestamps, MODD_LAG_S, tolerance_s)
+    if len(later):
+        modd = float(np.abs(values[later] - values[earlier]).mean())
+
+    return GlycemicMetrics(
+        n_readings=n,
+        days_of_data=float(timestamps[-1] - timestamps[0]) / 86400.0,
+        mean_mg_dl=mean,
+        sd_mg_dl=sd,
+        cv=sd / mean if mean > 0 else 0.0,
+        gmi_pct=3.31 + 0.02392 * mean,
+        time_very_low_pct=100.0 * float((values < VERY_LOW_MG_DL).mean()),
+        time_below_range_pct=100.0 * float((values < TARGET_LOW_MG_DL).mean()),
+        time_in_range_pct=100.0 * float(((values >= TARGET_LOW_MG_DL) & (values <= TARGET_HIGH_MG_DL)).mean()),
+        time_above_range_pct=100.0 * float((values > TARGET_HIGH_MG_DL).mean()),
+        time_very_high_pct=100.0 * float((values > VERY_HIGH_MG_DL).mean()),
+        lbgi=lbgi,
+        hbgi=hbgi,
+        mage=mage(values, sd),
+        conga=conga,
+        modd=modd,
+        agp=ambulatory_profile(timestamps, values),
+    )
+
+
+def _glucose_mg_dl(stream: ISFAnalyteStream) -> Series:
+    timestamps, values = load_stream_series(stream)
+    if (stream.unit or "").replace(" ", "").lower() == "mmol/l":
+        values = values * MMOL_L_TO_MG_DL
+    return timestamps, values
+
+
+def _compute_stream_metrics(stream: ISFAnalyteStream) -> Optional[Dict[str, Any]]:
+    metrics = compute_glycemic_metrics(*_glucose_mg_dl(stream))
+    return metrics.to_dict() if metrics else None
+
+
+def stream_glycemic_metrics(stream: ISFAnalyteStream) -> Optional[Dict[str, Any]]:
+    """Glycemic metrics for a stored glucose stream, cached alongside it."""
+    return get_stream_derived(
+        stream, GLYCEMIC_METRICS_KIND, GLYCEMIC_METRICS_VERSION, _compute_stream_metrics
+    )
+
+
+def merged_glycemic_metrics(streams: List[ISFAnalyteStream]) -> Optional[Dict[str, Any]]:
+    """
+    Glycemic metrics across glucose streams: the cached result for a single
+    stream, otherwise computed over the streams' merged series.
+    """
+    if len(streams) == 1:
+        return stream_glycemic_metrics(streams[0])
+    series = [_glucose_mg_dl(stream) for stream in streams]
+    timestamps = np.concatenate([ts for ts, _ in series]) if series else np.empty(0)
+    values = np.concatenate([vals for _, vals in series]) if series else np.empty(0)
+    order = np.argsort(timestamps, kind="stable")
+    metrics = compute_glycemic_metrics(timestamps[order], values[order])
+    return metrics.to_dict() if metrics else None
@@ -19,9 +19,10 @@ Design Principles:
 - Clinician consultation prompts when appropriate
 """
 
+from bisect import bisect_right
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 import re
 
 
@@ -53,6 +54,112 @@ class SafePhrasing:
     evidence_grade_required: Optional[str] = None
 
 
+class PhraseScanner:
+    """
+    Single-pass multi-pattern scanner.
+    
+    The union of all patterns jumps straight to candidate positions; at each
+    one a single anchored probe with one optional named-group lookahead per
+    pattern records which patterns match there. Every pattern therefore
+    reports exactly the matches `re.finditer(pattern, text)` would, including
+    hits that overlap other patterns (e.g. "will" and "will develop"), while
+    the text is walked only once.
+    
+    Literal lists (literal=True) are matched against the lowercased text, the
+    same semantics as `phrase in text.lower()`.
+    
+    Used by LanguageController, render_rules and explanation_generator.
+    """
+    
+    # Joins texts for batch scans; patterns never match across it
+    _SEPARATOR = "\n\x00\n"
+    
+    def __init__(self, patterns: Sequence[str], literal: bool = False, flags: int = re.IGNORECASE):
+        self.patterns = list(patterns)
+        self._union = self._probes = None
+        if not self.patterns:
+            return
+        self._union, self._probes = self._compile(
+            [re.escape(p) if literal else p for p in self.patterns], flags
+        )
+        
+        # Case-insensitive literals: scan lowercased text case-sensitively, which
+        # keeps the regex engine's literal-prefix fast path (IGNORECASE disables it)
+        self._lowered = None
+        if literal and flags & re.IGNORECASE:
+            self._lowered = self._compile(
+                [re.escape(p.lower()) for p in self.patterns], flags & ~re.IGNORECASE
+            )
+    
+    @staticmethod
+    def _compile(sources: List[str], flags: int) -> Tuple[re.Pattern, re.Pattern]:
+        union = re.compile("|".join(f"(?:{src})" for src in sources), flags)
+        probes = re.compile("".join(f"(?:(?=(?P<p{i}>{src}))|)" for i, src in enumerate(sources)), flags)
+        return union, probes
+    
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (pattern_index, start, end) in text order, non-overlapping per pattern."""
+        if self._union is None:
+            return
+        union, probes = self._union, self._probes
+        if self._lowered is not None:
+            lowered = text.lower()
+            # Offsets only carry over when lowercasing preserves length
+            if len(lowered) == len(text):
+                text = lowered
+                union, probes = self._lowered
+        
+        last_end = [-1] * len(self.patterns)
+        # Group number of each pattern's probe; capturing groups inside a
+        # pattern shift the numbering, so look them up by name
+        slots = [probes.groupindex[f"p{i}"] for i in range(len(self.patterns))]
+        search = union.search
+        probe = probes.match
+        candidate = search(text)
+        while candidate is not None:
+            position = candidate.start()
+            match = probe(text, position)
+            groups = match.groups()
+            for i, slot in enumerate(slots):
+                if groups[slot - 1] is None:
+                    continue
+                start, end = match.span(slot)
+                if start >= last_end[i]:
+                    last_end[i] = end
+                    yield i, start, end
+            candidate = search(text, position + 1)
+    
+    def scan(self, text: str) -> List[Tuple[int, int, int]]:
+        """All matches, ordered by pattern then position (per-pattern finditer order)."""
+        return sorted(self.finditer(text))
+    
+    def scan_many(self, texts: Sequence[str]) -> List[List[Tuple[int, int, int]]]:
+        """
+        Scan many texts in one pass over their concatenation.
+        
+        Returns per-text match lists with text-local offsets.
+        """
+        starts = []
+        position = 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + len(self._SEPARATOR)
+        
+        results: List[List[Tuple[int, int, int]]] = [[] for _ in texts]
+        for i, start, end in self.finditer(self._SEPARATOR.join(texts)):
+            k = bisect_right(starts, start) - 1
+            results[k].append((i, start - starts[k], end - starts[k]))
+        return [sorted(r) for r in results]
+    
+    def found(self, text: str) -> List[int]:
+        """Sorted indices of patterns occurring at least once."""
+        return sorted({i for i, _, _ in self.finditer(text)})
+    
+    def found_many(self, texts: Sequence[str]) -> List[List[int]]:
+        """found() for many texts in one pass."""
+        return [sorted({i for i, _, _ in matches}) for matches in self.scan_many(texts)]
+
+
 class LanguageController:
     """
     Centralized language control system.
@@ -65,6 +172,14 @@ class LanguageController:
         # Forbidden phrases (regex patterns)
         self.forbidden_patterns = self._initialize_forbidden_patterns()
         
+        # Flattened (type, pattern, replacement) rows + combined scanner
+        self._forbidden_rows = [
+            (pattern_type, pattern, replacement_template)
+            for pattern_type, patterns in self.forbidden_patterns.items()
+            for pattern, replacement_template in patterns
+        ]
+        self._scanner = PhraseScanner([pattern for _, pattern, _ in self._forbidden_rows])
+        
         # Safe templates by category
         self.safe_templates = self._initialize_safe_templates()
         
@@ -80,22 +195,34 @@ class LanguageController:
         
         Returns list of violations (empty if clean).
         """
+        return self._to_violations(text, self._scanner.scan(text))
+    
+    def validate_texts(self, texts: Sequence[str]) -> List[List[LanguageViolation]]:
+        """
+        Validate many texts (e.g. every text of a report) in one scan.
+        
+        Returns one violation list per input text.
+        """
+        return [
+            self._to_violations(text, matches)
+            for text, matches in zip(texts, self._scanner.scan_many(texts))
+        ]
+    
+    def _to_violations(self, text: str, matches: List[Tuple[int, int, int]]) -> List[LanguageViolation]:
         violations = []
         
-        for pattern_type, patterns in self.forbidden_patterns.items():
-            for pattern, replacement_template in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    violations.append(LanguageViolation(
-                        violation_type=pattern_type,
-                        violating_phrase=match.group(0),
-                        context=text[max(0, match.start()-20):min(len(text), match.end()+20)],
-                        suggested_replacement=replacement_template,
-                        severity="ERROR" if pattern_type in [
-                            LanguageViolationType.DIAGNOSTIC_CLAIM,
-                            LanguageViolationType.MEDICAL_ADVICE
-                        ] else "WARNING"
-                    ))
+        for index, start, end in matches:
+            pattern_type, _, replacement_template = self._forbidden_rows[index]
+            violations.append(LanguageViolation(
+                violation_type=pattern_type,
+                violating_phrase=text[start:end],
+                context=text[max(0, start-20):min(len(text), end+20)],
+                suggested_replacement=replacement_template,
+                severity="ERROR" if pattern_type in [
+                    LanguageViolationType.DIAGNOSTIC_CLAIM,
+                    LanguageViolationType.MEDICAL_ADVICE
+                ] else "WARNING"
+            ))
         
         return violations
     
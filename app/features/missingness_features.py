@@ -3,7 +3,9 @@ Missingness-aware feature construction for feature_pack_v2.
 Treats missingness as a first-class feature, not a gap to ignore.
 """
 
-from typing import Dict, List, Tuple, Set
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Set
+import numpy as np
 from app.models.run_v2 import RunV2, MissingTypeEnum, SpecimenRecord
 from app.models.feature_pack_v2 import MissingnessFeatureVector
 
@@ -39,6 +41,191 @@ CRITICAL_ANCHORS = {
 }
 
 
+# One-hot order for missing_type embeddings
+MISSING_TYPES = [
+    "not_collected",
+    "user_skipped",
+    "biologically_unavailable",
+    "temporarily_unavailable",
+    "sensor_unavailable",
+    "not_applicable",
+]
+
+DOMAIN_NAMES = list(DOMAINS)
+
+# Variable vocabulary seeded with the domain variables (columns 0..n-1), and
+# domain / critical-anchor membership over it as (n_domains, n_variables) masks.
+# Run-specific variables are appended after these columns and belong to no domain.
+DOMAIN_VARIABLES = list(dict.fromkeys(v for vars_in_domain in DOMAINS.values() for v in vars_in_domain))
+_DOMAIN_VARIABLE_INDEX = {v: i for i, v in enumerate(DOMAIN_VARIABLES)}
+
+_DOMAIN_MASKS = np.zeros((len(DOMAIN_NAMES), len(DOMAIN_VARIABLES)), dtype=bool)
+_CRITICAL_MASKS = np.zeros_like(_DOMAIN_MASKS)
+for _row, _domain in enumerate(DOMAIN_NAMES):
+    _DOMAIN_MASKS[_row, [_DOMAIN_VARIABLE_INDEX[v] for v in DOMAINS[_domain]]] = True
+    _CRITICAL_MASKS[_row, [_DOMAIN_VARIABLE_INDEX[v] for v in CRITICAL_ANCHORS.get(_domain, ())]] = True
+_DOMAIN_MASKS_INT = _DOMAIN_MASKS.astype(np.int64)
+
+_MISSING_TYPE_CODES = {name: code for code, name in enumerate(MISSING_TYPES)}
+_NO_MISSING_TYPE = len(MISSING_TYPES)  # Not missing, or unknown type
+# Row per code; the last row (_NO_MISSING_TYPE) is all zeros
+_MISSING_TYPE_ONEHOT = np.vstack([
+    np.eye(len(MISSING_TYPES), dtype=np.int8),
+    np.zeros((1, len(MISSING_TYPES)), dtype=np.int8),
+])
+
+
+@dataclass
+class RunMissingnessArrays:
+    """
+    Missingness records of one run as (n_specimens, n_variables) arrays.
+    
+    Columns follow `variables` (DOMAIN_VARIABLES first, then the run's other
+    variables in first-seen order); rows follow run_v2.specimens.
+    """
+    specimen_ids: List[str]
+    variables: List[str]
+    recorded: np.ndarray  # bool: variable has a missingness record
+    present: np.ndarray  # bool: recorded and not missing
+    in_raw_values: np.ndarray  # bool: variable appears in raw_values
+    missing_type: np.ndarray  # int8 code into MISSING_TYPES (_NO_MISSING_TYPE = none/unknown)
+    
+    def missing_type_onehot(self) -> np.ndarray:
+        """(n_specimens, n_variables, len(MISSING_TYPES)) int8 one-hot embeddings."""
+        return _MISSING_TYPE_ONEHOT[self.missing_type]
+
+
+@dataclass
+class MissingnessMatrix:
+    """
+    Missingness for a batch of runs.
+    
+    present / recorded are (n_runs, n_variables): whether any specimen of the
+    run reports the variable present / has a record for it.
+    domain_missingness / domain_critical_missing are (n_runs, n_domains) over
+    DOMAIN_NAMES; aggregate_missingness is (n_runs,).
+    """
+    run_ids: List[str]
+    variables: List[str]
+    present: np.ndarray
+    recorded: np.ndarray
+    domain_missingness: np.ndarray
+    domain_critical_missing: np.ndarray
+    aggregate_missingness: np.ndarray
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_ids": self.run_ids,
+            "variables": self.variables,
+            "domains": DOMAIN_NAMES,
+            "present": self.present.astype(int).tolist(),
+            "recorded": self.recorded.astype(int).tolist(),
+            "domain_missingness": self.domain_missingness.tolist(),
+            "domain_critical_missing": self.domain_critical_missing.tolist(),
+            "aggregate_missingness": self.aggregate_missingness.tolist(),
+        }
+
+
+def _missing_type_code(missing_type) -> int:
+    # MissingTypeEnum is a str enum, so members hash and compare as their values
+    return _MISSING_TYPE_CODES.get(missing_type, _NO_MISSING_TYPE)
+
+
+def _extend_vocabulary(variables: List[str], index: Dict[str, int], names: Iterable[str]):
+    for var_name in names:
+        if var_name not in index:
+            index[var_name] = len(variables)
+            variables.append(var_name)
+
+
+def encode_run_missingness(
+    run_v2: RunV2,
+    variables: Optional[List[str]] = None
+) -> RunMissingnessArrays:
+    """
+    Encode a run's missingness records as arrays in one pass over the records.
+    
+    Args:
+        run_v2: Run to encode
+        variables: Column vocabulary to use (must start with DOMAIN_VARIABLES);
+            variables it lacks are appended. Defaults to DOMAIN_VARIABLES.
+    
+    Returns:
+        RunMissingnessArrays aligned with run_v2.specimens
+    """
+    variables = list(variables) if variables is not None else list(DOMAIN_VARIABLES)
+    index = {v: i for i, v in enumerate(variables)}
+    
+    def column(var_name: str) -> int:
+        col = index.get(var_name)
+        if col is None:
+            col = index[var_name] = len(variables)
+            variables.append(var_name)
+        return col
+    
+    # Gather flat coordinates per specimen, then scatter into the arrays at once
+    counts, cols, is_present, type_codes = [], [], [], []
+    raw_counts, raw_cols = [], []
+    for specimen in run_v2.specimens:
+        records = specimen.missingness.values()
+        counts.append(len(records))
+        cols.extend(map(column, specimen.missingness))
+        is_present.extend([not record.is_missing for record in records])
+        type_codes.extend([_missing_type_code(record.missing_type) for record in records])
+        raw_counts.append(len(specimen.raw_values))
+        raw_cols.extend(map(column, specimen.raw_values))
+    
+    n_specimens = len(run_v2.specimens)
+    rows = np.repeat(np.arange(n_specimens), counts)
+    raw_rows = np.repeat(np.arange(n_specimens), raw_counts)
+    
+    shape = (len(run_v2.specimens), len(variables))
+    recorded = np.zeros(shape, dtype=bool)
+    present = np.zeros(shape, dtype=bool)
+    in_raw_values = np.zeros(shape, dtype=bool)
+    missing_type = np.full(shape, _NO_MISSING_TYPE, dtype=np.int8)
+    recorded[rows, cols] = True
+    present[rows, cols] = is_present
+    missing_type[rows, cols] = type_codes
+    in_raw_values[raw_rows, raw_cols] = True
+    
+    return RunMissingnessArrays(
+        specimen_ids=[specimen.specimen_id for specimen in run_v2.specimens],
+        variables=variables,
+        recorded=recorded,
+        present=present,
+        in_raw_values=in_raw_values,
+        missing_type=missing_type,
+    )
+
+
+def _summarize_run(arrays: RunMissingnessArrays) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Domain scores, critical-anchor flags and aggregate missingness for one run.
+    
+    Domain scores count every (specimen, variable) record of the domain; a
+    domain without records scores 1.0 and is flagged critical-missing. Otherwise
+    it is flagged when any specimen lacks, or reports missing, a critical anchor.
+    """
+    # Domain masks only cover the leading DOMAIN_VARIABLES columns
+    n_domain_vars = len(DOMAIN_VARIABLES)
+    recorded_counts = _DOMAIN_MASKS_INT @ arrays.recorded[:, :n_domain_vars].sum(axis=0)
+    present_counts = _DOMAIN_MASKS_INT @ arrays.present[:, :n_domain_vars].sum(axis=0)
+    has_records = recorded_counts > 0
+    scores = np.where(has_records, 1.0 - present_counts / np.maximum(recorded_counts, 1), 1.0)
+    
+    # Anchor absent or missing in any specimen (unrecorded counts as not present)
+    anchor_gaps = ~arrays.present[:, :n_domain_vars].all(axis=0)
+    critical_flags = np.where(has_records, (_CRITICAL_MASKS & anchor_gaps).any(axis=1), True)
+    
+    # Aggregate over the last specimen for each specimen_id (later duplicates replace earlier ones)
+    last_rows = list({specimen_id: row for row, specimen_id in enumerate(arrays.specimen_ids)}.values())
+    n_recorded = int(arrays.recorded[last_rows].sum())
+    aggregate = 1.0 - (int(arrays.present[last_rows].sum()) / n_recorded) if n_recorded else 0.0
+    
+    return scores, critical_flags, aggregate
+
+
 def compute_missingness_feature_vector(run_v2: RunV2) -> MissingnessFeatureVector:
     """
     Compute missingness features for all variables across all specimens.
@@ -50,77 +237,65 @@ def compute_missingness_feature_vector(run_v2: RunV2) -> MissingnessFeatureVecto
         - Domain missingness scores
         - Critical anchor missing flags
     """
+    arrays = encode_run_missingness(run_v2)
+    scores, critical_flags, aggregate = _summarize_run(arrays)
+    onehot_rows = _MISSING_TYPE_ONEHOT.tolist()
     
     specimen_present_flags = {}
     missing_type_embeddings = {}
-    domain_var_presence = {domain: [] for domain in DOMAINS}
-    
-    # Iterate through specimens to gather missingness info
     for specimen in run_v2.specimens:
-        specimen_id = specimen.specimen_id
-        specimen_present_flags[specimen_id] = {}
-        missing_type_embeddings[specimen_id] = {}
-        
-        for var_name, missingness_record in specimen.missingness.items():
-            # Flag: is variable present?
-            is_present = not missingness_record.is_missing
-            specimen_present_flags[specimen_id][var_name] = is_present
-            
-            # One-hot encoding for missing_type
-            missing_type_onehot = _encode_missing_type(missingness_record.missing_type)
-            missing_type_embeddings[specimen_id][var_name] = missing_type_onehot
-            
-            # Track domain presence
-            for domain, vars_in_domain in DOMAINS.items():
-                if var_name in vars_in_domain:
-                    domain_var_presence[domain].append(is_present)
-    
-    # Compute domain missingness scores
-    domain_missingness_scores = {}
-    domain_critical_missing_flags = {}
-    
-    for domain, var_list in DOMAINS.items():
-        presence_for_domain = domain_var_presence.get(domain, [])
-        
-        if not presence_for_domain:
-            # No variables from this domain present
-            domain_missingness_scores[domain] = 1.0
-            domain_critical_missing_flags[domain] = True
-        else:
-            # Fraction of variables present in this domain
-            present_count = sum(presence_for_domain)
-            missingness_fraction = 1.0 - (present_count / len(presence_for_domain))
-            domain_missingness_scores[domain] = missingness_fraction
-            
-            # Critical anchor check
-            has_critical_missing = False
-            for specimen in run_v2.specimens:
-                for critical_var in CRITICAL_ANCHORS.get(domain, set()):
-                    # Defensive: check if variable exists in missingness dict
-                    if critical_var in specimen.missingness:
-                        missingness_entry = specimen.missingness[critical_var]
-                        if hasattr(missingness_entry, 'is_missing') and missingness_entry.is_missing:
-                            has_critical_missing = True
-                            break
-                    else:
-                        # Variable not in missingness dict = missing
-                        has_critical_missing = True
-                        break
-            domain_critical_missing_flags[domain] = has_critical_missing
-    
-    # Compute aggregate missingness
-    all_present_flags = []
-    for spec_flags in specimen_present_flags.values():
-        all_present_flags.extend(spec_flags.values())
-    
-    aggregate_missingness = 1.0 - (sum(all_present_flags) / len(all_present_flags)) if all_present_flags else 0.0
+        specimen_present_flags[specimen.specimen_id] = {
+            var_name: not record.is_missing for var_name, record in specimen.missingness.items()
+        }
+        missing_type_embeddings[specimen.specimen_id] = {
+            var_name: list(onehot_rows[_missing_type_code(record.missing_type)])
+            for var_name, record in specimen.missingness.items()
+        }
     
     return MissingnessFeatureVector(
         specimen_variable_present_flags=specimen_present_flags,
         missing_type_embeddings=missing_type_embeddings,
-        domain_missingness_scores=domain_missingness_scores,
-        domain_critical_missing_flags=domain_critical_missing_flags,
-        aggregate_missingness_0_1=aggregate_missingness,
+        domain_missingness_scores={d: float(s) for d, s in zip(DOMAIN_NAMES, scores)},
+        domain_critical_missing_flags={d: bool(f) for d, f in zip(DOMAIN_NAMES, critical_flags)},
+        aggregate_missingness_0_1=aggregate,
+    )
+
+
+def compute_missingness_matrix(runs: Sequence[RunV2]) -> MissingnessMatrix:
+    """
+    Batch mode: missingness for many runs over one shared variable vocabulary.
+    
+    Per-run domain scores, critical flags and aggregate match
+    compute_missingness_feature_vector.
+    """
+    variables = list(DOMAIN_VARIABLES)
+    index = {v: i for i, v in enumerate(variables)}
+    for run_v2 in runs:
+        for specimen in run_v2.specimens:
+            _extend_vocabulary(variables, index, specimen.missingness)
+    
+    n_runs = len(runs)
+    present = np.zeros((n_runs, len(variables)), dtype=bool)
+    recorded = np.zeros_like(present)
+    domain_missingness = np.ones((n_runs, len(DOMAIN_NAMES)))
+    domain_critical_missing = np.ones((n_runs, len(DOMAIN_NAMES)), dtype=bool)
+    aggregate_missingness = np.zeros(n_runs)
+    
+    for row, run_v2 in enumerate(runs):
+        arrays = encode_run_missingness(run_v2, variables)
+        n_cols = len(variables)
+        present[row] = arrays.present[:, :n_cols].any(axis=0)
+        recorded[row] = arrays.recorded[:, :n_cols].any(axis=0)
+        domain_missingness[row], domain_critical_missing[row], aggregate_missingness[row] = _summarize_run(arrays)
+    
+    return MissingnessMatrix(
+        run_ids=[run_v2.run_id for run_v2 in runs],
+        variables=variables,
+        present=present,
+        recorded=recorded,
+        domain_missingness=domain_missingness,
+        domain_critical_missing=domain_critical_missing,
+        aggregate_missingness=aggregate_missingness,
     )
 
 
@@ -129,43 +304,15 @@ def _encode_missing_type(missing_type: str) -> List[int]:
     One-hot encode missing_type.
     Order: not_collected, user_skipped, biologically_unavailable, temporarily_unavailable, sensor_unavailable, not_applicable
     """
-    missing_types = [
-        "not_collected",
-        "user_skipped",
-        "biologically_unavailable",
-        "temporarily_unavailable",
-        "sensor_unavailable",
-        "not_applicable",
-    ]
-    
-    if missing_type is None:
-        # Not missing
-        return [0] * len(missing_types)
-    
-    try:
-        idx = missing_types.index(missing_type)
-        encoding = [0] * len(missing_types)
-        encoding[idx] = 1
-        return encoding
-    except (ValueError, AttributeError):
-        # Unknown type
-        return [0] * len(missing_types)
+    return _MISSING_TYPE_ONEHOT[_missing_type_code(missing_type)].tolist()
 
 
 def get_domain_presence_summary(run_v2: RunV2) -> Dict[str, bool]:
     """
     Quick check: which domains have at least one variable present?
     """
-    domain_present = {domain: False for domain in DOMAINS}
-    
-    for specimen in run_v2.specimens:
-        for var_name in specimen.raw_values.keys():
-            for domain, vars_in_domain in DOMAINS.items():
-                # Defensive: check if variable exists in missingness dict
-                if var_name in vars_in_domain and var_name in specimen.missingness:
-                    missingness_entry = specimen.missingness[var_name]
-                    is_missing = missingness_entry.is_missing if hasattr(missingness_entry, 'is_missing') else True
-                    if not is_missing:
-                        domain_present[domain] = True
-    
-    return domain_present
+    arrays = encode_run_missingness(run_v2)
+    # Present variables must also carry a raw value
+    n_domain_vars = len(DOMAIN_VARIABLES)
+    reported = (arrays.present[:, :n_domain_vars] & arrays.in_raw_values[:, :n_domain_vars]).any(axis=0)
+    return {domain: bool(flag) for domain, flag in zip(DOMAIN_NAMES, (_DOMAIN_MASKS & reported).any(axis=1))}
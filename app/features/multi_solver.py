@@ -15,10 +15,13 @@ Solver types:
 from typing import Dict, List, Optional, Tuple, Any, Callable
 from dataclasses import dataclass, field
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import statistics
 import math
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,6 +50,27 @@ class SolverOutput:
     notes: str = ""
 
 
+@dataclass
+class SolverColumn:
+    """
+    One solver evaluated over a batch of markers (a column of the
+    markers x solvers matrix). Cells where the solver does not apply have
+    valid=False.
+    """
+    solver_type: SolverType
+    centers: np.ndarray
+    ranges: np.ndarray  # NaN where the solver gives no range
+    confidences: np.ndarray
+    valid: np.ndarray  # bool
+    
+    # Shared metadata for vectorized solvers
+    inputs_used: List[str] = field(default_factory=list)
+    notes: str = ""
+    
+    # Exact per-marker outputs when the column came from a scalar solver
+    outputs: Optional[List[Optional[SolverOutput]]] = None
+
+
 @dataclass
 class AgreementScore:
     """
@@ -95,9 +119,33 @@ class MultiSolverEngine:
     Runs multiple independent solvers and computes agreement.
     """
     
+    # Base weights by solver type
+    BASE_WEIGHTS = {
+        SolverType.DETERMINISTIC: 2.0,  # Highest weight
+        SolverType.COVARIANCE_CONDITIONAL: 1.5,
+        SolverType.LATENT_FACTOR: 1.3,
+        SolverType.TEMPORAL: 1.2,
+        SolverType.CONSTRAINT: 1.0,
+        SolverType.POPULATION_PRIOR: 0.8  # Lowest weight
+    }
+    
+    # Placeholder priors (mean, std)
+    POPULATION_PRIORS = {
+        "glucose": (95.0, 15.0),
+        "cholesterol": (190.0, 35.0),
+        "ldl_cholesterol": (110.0, 30.0),
+        "hdl_cholesterol": (55.0, 15.0),
+        "triglycerides": (120.0, 50.0),
+        "hemoglobin_a1c": (5.4, 0.5),
+        "crp": (2.0, 3.0),
+        "vitamin_d": (35.0, 15.0)
+    }
+    
     def __init__(self):
         """Initialize multi-solver engine."""
         self.solvers: Dict[SolverType, Callable] = {}
+        # Optional array forms: (markers, inputs, metadata) -> SolverColumn
+        self.batch_solvers: Dict[SolverType, Callable] = {}
         self._register_default_solvers()
     
     def _register_default_solvers(self):
@@ -110,8 +158,29 @@ class MultiSolverEngine:
         self.solvers[SolverType.COVARIANCE_CONDITIONAL] = self._covariance_solver
         self.solvers[SolverType.TEMPORAL] = self._temporal_solver
         
+        self.batch_solvers[SolverType.DETERMINISTIC] = self._deterministic_solver_batch
+        self.batch_solvers[SolverType.POPULATION_PRIOR] = self._population_prior_solver_batch
+        self.batch_solvers[SolverType.COVARIANCE_CONDITIONAL] = self._covariance_solver_batch
+        self.batch_solvers[SolverType.TEMPORAL] = self._temporal_solver_batch
+        
         logger.info(f"Registered {len(self.solvers)} solvers")
     
+    def register_solver(
+        self,
+        solver_type: SolverType,
+        solver: Callable,
+        batch_solver: Optional[Callable] = None
+    ):
+        """
+        Register a solver. Without a batch form, compute_agreement_batch
+        calls the scalar solver once per marker.
+        """
+        self.solvers[solver_type] = solver
+        if batch_solver is not None:
+            self.batch_solvers[solver_type] = batch_solver
+        else:
+            self.batch_solvers.pop(solver_type, None)
+    
     def compute_agreement(
         self,
         marker_name: str,
@@ -213,6 +282,196 @@ class MultiSolverEngine:
             notes=notes
         )
     
+    def compute_agreement_batch(
+        self,
+        marker_names: List[str],
+        inputs: Dict[str, float],
+        metadata: Optional[Dict[str, Any]] = None,
+        parallel: bool = False
+    ) -> Dict[str, AgreementScore]:
+        """
+        Compute multi-solver agreement for many markers at once.
+        
+        Each solver is evaluated over all markers as one column of a
+        markers x solvers matrix; consensus, CV and weights are then computed
+        with array operations instead of per-marker Python loops.
+        
+        Args:
+            marker_names: Markers to estimate
+            inputs: Available input values
+            metadata: Additional metadata
+            parallel: Run independent solvers concurrently (threads)
+        
+        Returns:
+            Dictionary of marker_name -> AgreementScore
+        """
+        metadata = metadata or {}
+        markers = list(dict.fromkeys(marker_names))
+        if not markers:
+            return {}
+        
+        solver_types = list(self.solvers)
+        if parallel and len(solver_types) > 1:
+            with ThreadPoolExecutor(max_workers=len(solver_types)) as pool:
+                columns = list(pool.map(
+                    lambda solver_type: self._run_solver_column(solver_type, markers, inputs, metadata),
+                    solver_types
+                ))
+        else:
+            columns = [
+                self._run_solver_column(solver_type, markers, inputs, metadata)
+                for solver_type in solver_types
+            ]
+        
+        # markers x solvers matrices
+        centers = np.stack([c.centers for c in columns], axis=1)
+        ranges = np.stack([c.ranges for c in columns], axis=1)
+        valid = np.stack([c.valid for c in columns], axis=1)
+        base_weights = np.array([self.BASE_WEIGHTS.get(t, 1.0) for t in solver_types])
+        confidences = np.stack([c.confidences for c in columns], axis=1)
+        weights = base_weights * confidences * valid
+        counts = valid.sum(axis=1)
+        masked_centers = np.where(valid, centers, 0.0)
+        has_range = valid & (ranges == ranges) & (ranges != 0)  # non-NaN, non-zero
+        range_counts = has_range.sum(axis=1)
+        weight_sums = weights.sum(axis=1)
+        
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Agreement metrics (sample CV across solvers)
+            mean_centers = masked_centers.sum(axis=1) / counts
+            deviations = (masked_centers - mean_centers[:, None]) * valid
+            stdevs = np.sqrt(np.einsum("ij,ij->i", deviations, deviations) / (counts - 1))
+            cvs = np.where(mean_centers == 0, 0.0, stdevs / np.abs(mean_centers))
+            
+            # Weighted consensus
+            consensus_centers = np.where(
+                weight_sums > 0,
+                np.einsum("ij,ij->i", masked_centers, weights) / weight_sums,
+                mean_centers
+            )
+            
+            # Consensus range (mean of non-empty ranges, else 20% of center)
+            consensus_ranges = np.where(
+                range_counts > 0,
+                np.where(has_range, ranges, 0.0).sum(axis=1) / range_counts,
+                np.abs(consensus_centers) * 0.20
+            )
+        
+        single = counts == 1
+        agreement = np.where(single, 1.0, np.clip(1.0 - cvs, 0.0, 1.0))
+        convergence = single | (cvs < 0.15)
+        
+        # Adjustment factors
+        good = convergence & (agreement > 0.7)
+        moderate = ~good & (agreement > 0.5)
+        widening = np.where(good | moderate, 1.0, 1.0 + (1.0 - agreement) * 0.50)
+        
+        # Plain lists from here: per-row numpy scalar access would dominate
+        column_lists = [
+            (c, c.centers.tolist(), c.ranges.tolist(), c.confidences.tolist())
+            for c in columns
+        ]
+        rows = zip(
+            markers, counts.tolist(), valid.tolist(), weights.tolist(),
+            good.tolist(), moderate.tolist(), agreement.tolist(), convergence.tolist(),
+            consensus_centers.tolist(), consensus_ranges.tolist(), widening.tolist()
+        )
+        
+        results: Dict[str, AgreementScore] = {}
+        for row, (marker, count, row_valid, row_weights, is_good, is_moderate,
+                  agreement_score, converged, center, consensus_range, widening_factor) in enumerate(rows):
+            if count == 0:
+                # No solvers produced output
+                logger.warning(f"No solvers produced output for {marker}")
+                results[marker] = self._create_no_agreement_score(marker)
+                continue
+            
+            if is_good:
+                notes = ["Solvers converged with high agreement"]
+            elif is_moderate:
+                notes = ["Solvers show moderate agreement"]
+            else:
+                notes = ["Solvers disagree; range widened"]
+            
+            solver_outputs = []
+            solver_weights = {}
+            for j, (column, column_centers, column_ranges, column_confidences) in enumerate(column_lists):
+                if not row_valid[j]:
+                    continue
+                if column.outputs is not None:
+                    solver_outputs.append(column.outputs[row])
+                else:
+                    estimate_range = column_ranges[row]
+                    solver_outputs.append(SolverOutput(
+                        solver_type=column.solver_type,
+                        estimate_center=column_centers[row],
+                        estimate_range=None if estimate_range != estimate_range else estimate_range,
+                        confidence=column_confidences[row],
+                        inputs_used=list(column.inputs_used),
+                        notes=column.notes
+                    ))
+                solver_weights[column.solver_type] = row_weights[j]
+            
+            results[marker] = AgreementScore(
+                marker_name=marker,
+                solver_outputs=solver_outputs,
+                solver_weights=solver_weights,
+                agreement_score=agreement_score,
+                convergence_flag=converged,
+                consensus_center=center,
+                consensus_range=consensus_range,
+                tightening_factor=0.90 if is_good else 1.0,
+                widening_factor=widening_factor,
+                notes=notes
+            )
+        
+        return results
+    
+    def _run_solver_column(
+        self,
+        solver_type: SolverType,
+        markers: List[str],
+        inputs: Dict[str, float],
+        metadata: Dict[str, Any]
+    ) -> SolverColumn:
+        """Evaluate one solver over all markers (array form when registered)."""
+        batch_solver = self.batch_solvers.get(solver_type)
+        if batch_solver is not None:
+            try:
+                return batch_solver(markers, inputs, metadata)
+            except Exception as e:
+                logger.warning(f"Batch solver {solver_type} failed; falling back per marker: {e}")
+        
+        solver_func = self.solvers[solver_type]
+        outputs: List[Optional[SolverOutput]] = []
+        for marker in markers:
+            try:
+                outputs.append(solver_func(marker, inputs, metadata) or None)
+            except Exception as e:
+                logger.warning(f"Solver {solver_type} failed for {marker}: {e}")
+                outputs.append(None)
+        
+        return SolverColumn(
+            solver_type=solver_type,
+            centers=np.array([o.estimate_center if o else np.nan for o in outputs], dtype=float),
+            ranges=np.array(
+                [o.estimate_range if o and o.estimate_range is not None else np.nan for o in outputs],
+                dtype=float
+            ),
+            confidences=np.array([o.confidence if o else 0.0 for o in outputs], dtype=float),
+            valid=np.array([o is not None for o in outputs], dtype=bool),
+            outputs=outputs
+        )
+    
+    def _empty_column(self, solver_type: SolverType, count: int) -> SolverColumn:
+        return SolverColumn(
+            solver_type=solver_type,
+            centers=np.full(count, np.nan),
+            ranges=np.full(count, np.nan),
+            confidences=np.zeros(count),
+            valid=np.zeros(count, dtype=bool)
+        )
+    
     def _compute_solver_weights(
         self,
         solver_outputs: List[SolverOutput]
@@ -222,18 +481,8 @@ class MultiSolverEngine:
         """
         weights = {}
         
-        # Base weights by solver type
-        base_weights = {
-            SolverType.DETERMINISTIC: 2.0,  # Highest weight
-            SolverType.COVARIANCE_CONDITIONAL: 1.5,
-            SolverType.LATENT_FACTOR: 1.3,
-            SolverType.TEMPORAL: 1.2,
-            SolverType.CONSTRAINT: 1.0,
-            SolverType.POPULATION_PRIOR: 0.8  # Lowest weight
-        }
-        
         for output in solver_outputs:
-            base_weight = base_weights.get(output.solver_type, 1.0)
+            base_weight = self.BASE_WEIGHTS.get(output.solver_type, 1.0)
             # Modulate by solver's own confidence
             weights[output.solver_type] = base_weight * output.confidence
         
@@ -303,22 +552,10 @@ class MultiSolverEngine:
         """
         Population prior-based solver (always produces output).
         """
-        # Placeholder priors
-        priors = {
-            "glucose": (95.0, 15.0),  # (mean, std)
-            "cholesterol": (190.0, 35.0),
-            "ldl_cholesterol": (110.0, 30.0),
-            "hdl_cholesterol": (55.0, 15.0),
-            "triglycerides": (120.0, 50.0),
-            "hemoglobin_a1c": (5.4, 0.5),
-            "crp": (2.0, 3.0),
-            "vitamin_d": (35.0, 15.0)
-        }
-        
-        if marker_name not in priors:
+        if marker_name not in self.POPULATION_PRIORS:
             return None
         
-        mean, std = priors[marker_name]
+        mean, std = self.POPULATION_PRIORS[marker_name]
         
         return SolverOutput(
             solver_type=SolverType.POPULATION_PRIOR,
@@ -361,11 +598,92 @@ class MultiSolverEngine:
         # Placeholder: skip for now
         return None
     
+    # ===== BATCH (ARRAY) FORMS OF THE SOLVERS ABOVE =====
+    
+    def _deterministic_solver_batch(
+        self,
+        markers: List[str],
+        inputs: Dict[str, float],
+        metadata: Dict[str, Any]
+    ) -> SolverColumn:
+        """Array form of _deterministic_solver."""
+        column = self._empty_column(SolverType.DETERMINISTIC, len(markers))
+        if "creatinine" not in inputs:
+            return column
+        
+        rows = np.array([m == "egfr" for m in markers], dtype=bool)
+        if not rows.any():
+            return column
+        
+        creatinine = inputs["creatinine"]
+        age = metadata.get("age", 40)
+        sex = metadata.get("sex", "M")
+        
+        # Simplified CKD-EPI formula
+        if sex == "F":
+            egfr = 144 * (creatinine / 0.7) ** -0.329
+        else:
+            egfr = 141 * (creatinine / 0.9) ** -0.411
+        
+        # Age adjustment
+        if age > 40:
+            egfr *= 0.993 ** (age - 40)
+        
+        column.centers[rows] = max(15, min(120, egfr))
+        column.ranges[rows] = 5.0  # Tight range for deterministic
+        column.confidences[rows] = 0.95
+        column.valid[rows] = True
+        column.inputs_used = ["creatinine", "age", "sex"]
+        column.notes = "CKD-EPI formula"
+        return column
+    
+    def _population_prior_solver_batch(
+        self,
+        markers: List[str],
+        inputs: Dict[str, float],
+        metadata: Dict[str, Any]
+    ) -> SolverColumn:
+        """Array form of _population_prior_solver."""
+        priors = np.array(
+            [self.POPULATION_PRIORS.get(m, (np.nan, np.nan)) for m in markers],
+            dtype=float
+        ).reshape(len(markers), 2)
+        valid = ~np.isnan(priors[:, 0])
+        
+        return SolverColumn(
+            solver_type=SolverType.POPULATION_PRIOR,
+            centers=priors[:, 0],
+            ranges=priors[:, 1] * 2,  # ±1 std
+            confidences=np.where(valid, 0.30, 0.0),  # Low confidence in priors alone
+            valid=valid,
+            notes="Population prior"
+        )
+    
+    def _covariance_solver_batch(
+        self,
+        markers: List[str],
+        inputs: Dict[str, float],
+        metadata: Dict[str, Any]
+    ) -> SolverColumn:
+        """Array form of _covariance_solver (placeholder: no output)."""
+        return self._empty_column(SolverType.COVARIANCE_CONDITIONAL, len(markers))
+    
+    def _temporal_solver_batch(
+        self,
+        markers: List[str],
+        inputs: Dict[str, float],
+        metadata: Dict[str, Any]
+    ) -> SolverColumn:
+        """Array form of _temporal_solver (placeholder: no output)."""
+        return self._empty_column(SolverType.TEMPORAL, len(markers))
+    
     def apply_solver_agreement(
         self,
         estimates: Dict[str, Dict[str, Any]],
         inputs: Dict[str, float],
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        batch: bool = False,
+        parallel: bool = False
     ) -> Dict[str, Dict[str, Any]]:
         """
         Apply multi-solver agreement to all estimates.
@@ -374,15 +692,25 @@ class MultiSolverEngine:
             estimates: Original estimates
             inputs: Available inputs
             metadata: Additional metadata
+            batch: Use compute_agreement_batch (pays off once solvers do
+                real array work; the placeholder solvers are cheaper per marker)
+            parallel: With batch, run independent solvers concurrently
         
         Returns:
             Adjusted estimates with solver agreement applied
         """
         adjusted = {}
         
+        if batch:
+            agreements = self.compute_agreement_batch(list(estimates), inputs, metadata, parallel)
+        else:
+            agreements = {
+                marker: self.compute_agreement(marker, inputs, metadata)
+                for marker in estimates
+            }
+        
         for marker, estimate in estimates.items():
-            # Compute agreement
-            agreement = self.compute_agreement(marker, inputs, metadata)
+            agreement = agreements[marker]
             
             # Apply adjustments
             adj_estimate = estimate.copy()
@@ -3,19 +3,58 @@ Pattern and combination feature layer: temporal windows, motifs, discordance det
 """
 
 from typing import Dict, List, Tuple, Optional
+import numpy as np
 from app.models.run_v2 import RunV2, SpecimenTypeEnum
+from app.features.run_v2_index import RunV2Index
+from app.features.temporal_series import (
+    Series, SeriesMotif, build_run_series, series_key, rolling_volatility, trend_direction, find_motifs,
+    run_utc_offset_s
+)
 from app.models.feature_pack_v2 import (
     PatternCombinationFeatures, MotifDetection, MotifEnum, RegimeEnum,
     DerivedTemporalFeatures, DiscordanceDetection
 )
 
 
-def compute_temporal_features(run_v2: RunV2) -> List[DerivedTemporalFeatures]:
+# Series motif thresholds per variable: (min spike rise, min dip drop) in
+# the variable's units; None disables that motif
+MOTIF_THRESHOLDS = {
+    "glucose": (30.0, 15.0),
+    "heart_rate": (None, 8.0),
+}
+
+# Occurrence start hours treated as nocturnal (window reaches into the night)
+NOCTURNAL_START_HOURS = {21, 22, 23, 0, 1, 2, 3, 4, 5}
+NOCTURNAL_MIN_SHARE = 0.6
+
+
+def compute_temporal_features(
+    run_v2: RunV2,
+    index: Optional[RunV2Index] = None,
+    series: Optional[Dict[str, Series]] = None
+) -> List[DerivedTemporalFeatures]:
     """
     Compute temporal features for each specimen: volatility, stability, trend, regime.
+    
+    Volatility and trend come from the specimen's stream (e.g. "glucose_isf")
+    when it holds two or more points; otherwise static per-type estimates
+    are used.
+    
+    Args:
+        run_v2: Run to analyze
+        index: Shared RunV2Index (built here if not supplied)
+        series: Streams keyed like "glucose_isf" (defaults to build_run_series)
     """
+    if index is None:
+        index = RunV2Index(run_v2)
+    if series is None:
+        series = build_run_series(run_v2)
+    stream_features: Dict[str, Tuple[Dict[str, Optional[float]], str]] = {}
     temporal_features_list = []
     
+    # Regime depends only on run-level context, so detect it once
+    regime, regime_confidence = _detect_regime(index)
+    
     for specimen in run_v2.specimens:
         specimen_id = specimen.specimen_id
         
@@ -27,24 +66,29 @@ def compute_temporal_features(run_v2: RunV2) -> List[DerivedTemporalFeatures]:
             missingness_entry = specimen.missingness[primary_var]
             is_missing = missingness_entry.is_missing if hasattr(missingness_entry, 'is_missing') else True
             
-            if not is_missing:
-                value = specimen.raw_values.get(primary_var)
+            value = specimen.raw_values.get(primary_var) if not is_missing else None
+            
+            # Stream-level features are shared by every specimen of the stream
+            key = series_key(primary_var, specimen.specimen_type)
+            if key not in stream_features:
+                stream_features[key] = _stream_temporal_features(series.get(key))
+            volatility, trend = stream_features[key]
             
-            # Compute volatility (would normally need time series, using static value as proxy)
-            volatility_5m = _estimate_volatility(value, specimen.specimen_type, window="5m")
-            volatility_30m = _estimate_volatility(value, specimen.specimen_type, window="30m")
-            volatility_2h = _estimate_volatility(value, specimen.specimen_type, window="2h")
+            if any(v is not None for v in volatility.values()):
+                volatility_5m = volatility["5m"]
+                volatility_30m = volatility["30m"]
+                volatility_2h = volatility["2h"]
+            else:
+                # Single reading: static per-type estimates
+                volatility_5m = _estimate_volatility(value, specimen.specimen_type, window="5m")
+                volatility_30m = _estimate_volatility(value, specimen.specimen_type, window="30m")
+                volatility_2h = _estimate_volatility(value, specimen.specimen_type, window="2h")
             
             # Stability score (inverse of volatility)
-            avg_volatility = (volatility_5m + volatility_30m + volatility_2h) / 3.0
+            available = [v for v in (volatility_5m, volatility_30m, volatility_2h) if v is not None]
+            avg_volatility = sum(available) / len(available)
             stability_score = 1.0 - min(avg_volatility / 100.0, 1.0)  # Normalize
             
-            # Trend direction (from non-lab context or specimen data)
-            trend_direction = _infer_trend_direction(specimen, primary_var)
-            
-            # Regime detection
-            regime, regime_confidence = _detect_regime(run_v2, specimen)
-            
             temporal_features_list.append(
                 DerivedTemporalFeatures(
                     specimen_id=specimen_id,
@@ -52,7 +96,7 @@ def compute_temporal_features(run_v2: RunV2) -> List[DerivedTemporalFeatures]:
                     volatility_30m=volatility_30m,
                     volatility_2h=volatility_2h,
                     stability_score_0_1=stability_score,
-                    trend_direction=trend_direction,
+                    trend_direction=trend,
                     regime_detected=regime,
                     regime_confidence_0_1=regime_confidence,
                 )
@@ -61,21 +105,31 @@ def compute_temporal_features(run_v2: RunV2) -> List[DerivedTemporalFeatures]:
     return temporal_features_list
 
 
-def detect_motifs(run_v2: RunV2, temporal_features: List[DerivedTemporalFeatures]) -> List[MotifDetection]:
+def detect_motifs(
+    run_v2: RunV2,
+    temporal_features: List[DerivedTemporalFeatures],
+    index: Optional[RunV2Index] = None,
+    series: Optional[Dict[str, Series]] = None
+) -> List[MotifDetection]:
     """
-    Detect named metabolic/physiological motifs from multi-variable patterns.
+    Detect named metabolic/physiological motifs from multi-variable patterns,
+    plus recurring spikes/dips found by matrix-profile search over streams.
     """
+    if index is None:
+        index = RunV2Index(run_v2)
+    if series is None:
+        series = build_run_series(run_v2)
     detected_motifs = []
     
     # Extract ISF values if available
-    isf_glucose = _get_value(run_v2, SpecimenTypeEnum.ISF, "glucose")
-    isf_lactate = _get_value(run_v2, SpecimenTypeEnum.ISF, "lactate")
+    isf_glucose = index.get_value(SpecimenTypeEnum.ISF, "glucose")
+    isf_lactate = index.get_value(SpecimenTypeEnum.ISF, "lactate")
     
     # Extract blood values
-    blood_glucose = _get_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "glucose")
+    blood_glucose = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "glucose")
     
     # Extract context
-    activity_level = _get_nonlab(run_v2, "sleep_activity.activity_level_0_10")
+    activity_level = index.get_nonlab("sleep_activity.activity_level_0_10")
     diet_pattern = None
     if run_v2.qualitative_inputs and run_v2.qualitative_inputs.diet_recent:
         diet_pattern = run_v2.qualitative_inputs.diet_recent.get("pattern")
@@ -111,9 +165,9 @@ def detect_motifs(run_v2: RunV2, temporal_features: List[DerivedTemporalFeatures
         )
     
     # Motif 3: Dehydration stress (electrolytes + hydration markers)
-    na = _get_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "sodium_na")
-    urine_sg = _get_value(run_v2, SpecimenTypeEnum.URINE_SPOT, "specific_gravity")
-    hrv = _get_nonlab(run_v2, "vitals_physiology.hrv")
+    na = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "sodium_na")
+    urine_sg = index.get_value(SpecimenTypeEnum.URINE_SPOT, "specific_gravity")
+    hrv = index.get_nonlab("vitals_physiology.hrv")
     
     if (na is not None and na > 145 and
         urine_sg is not None and urine_sg > 1.025 and
@@ -130,8 +184,8 @@ def detect_motifs(run_v2: RunV2, temporal_features: List[DerivedTemporalFeatures
         )
     
     # Motif 4: Inflammatory/sleep fragmentation
-    crp = _get_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "crp")
-    sleep_quality = _get_nonlab(run_v2, "sleep_activity.sleep_quality_0_10")
+    crp = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "crp")
+    sleep_quality = index.get_nonlab("sleep_activity.sleep_quality_0_10")
     
     if (crp is not None and crp > 3.0 and
         sleep_quality is not None and sleep_quality < 5):
@@ -146,9 +200,51 @@ def detect_motifs(run_v2: RunV2, temporal_features: List[DerivedTemporalFeatures
             )
         )
     
+    # Motifs 5-6: Recurring postprandial spikes / nocturnal dips in streams
+    detected_motifs.extend(detect_series_motifs(series, run_utc_offset_s(run_v2)))
+    
     return detected_motifs
 
 
+def detect_series_motifs(series: Dict[str, Series], utc_offset_s: float = 0.0) -> List[MotifDetection]:
+    """
+    Classify recurring stream motifs as postprandial spikes or nocturnal dips.
+    
+    A motif is a spike when its mean shape peaks after the start by at least
+    the variable's rise threshold, and a nocturnal dip when it bottoms out
+    inside the window, the drop threshold below its higher end, with most
+    occurrences starting at night. The strongest motif of each kind per stream is reported; strength
+    is occurrences per day of data (capped at 1), confidence the seed pair's
+    correlation. Night is judged in local time, utc_offset_s from UTC.
+    """
+    detections = []
+    for key, (timestamps, values) in series.items():
+        var_name = next((v for v in MOTIF_THRESHOLDS if key.startswith(f"{v}_")), None)
+        if var_name is None or len(values) < 2:
+            continue
+        min_rise, min_drop = MOTIF_THRESHOLDS[var_name]
+        n_days = max((timestamps[-1] - timestamps[0]) / 86400.0, 1.0)
+        
+        found = {}
+        for motif in find_motifs(timestamps, values, utc_offset_s=utc_offset_s):
+            motif_type = _classify_motif(motif, min_rise, min_drop)
+            if motif_type is None or motif_type in found:
+                continue
+            m = len(motif.shape)
+            found[motif_type] = MotifDetection(
+                motif_type=motif_type,
+                motif_strength_0_1=min(motif.n_occurrences / n_days, 1.0),
+                supporting_variables=[key],
+                expected_context=(
+                    f"{motif.n_occurrences} recurrences over {n_days:.0f} days"
+                    + (" (post-meal)" if motif_type == MotifEnum.POSTPRANDIAL_SPIKE else " (overnight)")
+                ),
+                confidence_0_1=float(np.clip(1.0 - motif.distance ** 2 / (2.0 * m), 0.0, 1.0)),
+            )
+        detections.extend(found.values())
+    return detections
+
+
 def compute_temporal_windows_features(run_v2: RunV2) -> Dict[str, Dict[str, float]]:
     """
     Compute aggregated features over multiple time windows (5m, 30m, 2h, 24h).
@@ -181,17 +277,19 @@ def compute_temporal_windows_features(run_v2: RunV2) -> Dict[str, Dict[str, floa
     return windows_features
 
 
-def detect_discordance(run_v2: RunV2) -> DiscordanceDetection:
+def detect_discordance(run_v2: RunV2, index: Optional[RunV2Index] = None) -> DiscordanceDetection:
     """
     Detect disagreement between specimens and unexplained inconsistencies.
     """
+    if index is None:
+        index = RunV2Index(run_v2)
     discordance_flags = []
     discordance_explanations = []
     specimen_agreement_scores = {}
     
     # ISF vs Blood Glucose
-    isf_glucose = _get_value(run_v2, SpecimenTypeEnum.ISF, "glucose")
-    blood_glucose = _get_value(run_v2, SpecimenTypeEnum.BLOOD_VENOUS, "glucose")
+    isf_glucose = index.get_value(SpecimenTypeEnum.ISF, "glucose")
+    blood_glucose = index.get_value(SpecimenTypeEnum.BLOOD_VENOUS, "glucose")
     
     if isf_glucose is not None and blood_glucose is not None:
         diff_pct = abs(blood_glucose - isf_glucose) / max(isf_glucose, 1.0)
@@ -217,8 +315,8 @@ def detect_discordance(run_v2: RunV2) -> DiscordanceDetection:
         specimen_agreement_scores["isf_vs_blood"] = agreement_score
     
     # Activity high but lactate flat
-    lactate = _get_value(run_v2, SpecimenTypeEnum.ISF, "lactate")
-    activity_level = _get_nonlab(run_v2, "sleep_activity.activity_level_0_10")
+    lactate = index.get_value(SpecimenTypeEnum.ISF, "lactate")
+    activity_level = index.get_nonlab("sleep_activity.activity_level_0_10")
     
     if lactate is not None and activity_level is not None:
         if activity_level > 7 and lactate < 1.5:
@@ -238,13 +336,21 @@ def detect_discordance(run_v2: RunV2) -> DiscordanceDetection:
 
 def build_pattern_combination_features(
     run_v2: RunV2,
-    temporal_features: List[DerivedTemporalFeatures]
+    temporal_features: List[DerivedTemporalFeatures],
+    index: Optional[RunV2Index] = None,
+    series: Optional[Dict[str, Series]] = None
 ) -> PatternCombinationFeatures:
     """
     Orchestrate pattern detection and return consolidated output.
+    
+    Args:
+        run_v2: Run to analyze
+        temporal_features: Output of compute_temporal_features
+        index: Shared RunV2Index (built here if not supplied)
+        series: Streams for motif search (defaults to build_run_series)
     """
     
-    motifs = detect_motifs(run_v2, temporal_features)
+    motifs = detect_motifs(run_v2, temporal_features, index, series)
     windows_features = compute_temporal_windows_features(run_v2)
     
     # Build regime labels from temporal features
@@ -301,17 +407,41 @@ def _estimate_volatility(value: float, specimen_type: SpecimenTypeEnum, window:
     return base * window_factor
 
 
-def _infer_trend_direction(specimen, primary_var: str) -> Optional[str]:
-    """Infer trend from specimen data (would need time series in real scenario)."""
-    # For now, return "stable" as default
-    return "stable"
+def _stream_temporal_features(stream: Optional[Series]) -> Tuple[Dict[str, Optional[float]], str]:
+    """Rolling volatility per window and recent trend for one stream."""
+    if stream is None or len(stream[1]) < 2:
+        return {"5m": None, "30m": None, "2h": None}, "stable"
+    timestamps, values = stream
+    return rolling_volatility(timestamps, values), trend_direction(timestamps, values)
+
 
+def _classify_motif(
+    motif: SeriesMotif,
+    min_rise: Optional[float],
+    min_drop: Optional[float]
+) -> Optional[MotifEnum]:
+    """Name a motif from its mean shape and time of day, or None."""
+    shape = motif.shape
+    peak, trough = int(np.argmax(shape)), int(np.argmin(shape))
+    
+    if min_rise is not None and peak > 0 and shape[peak] - shape[0] >= min_rise:
+        return MotifEnum.POSTPRANDIAL_SPIKE
+    
+    is_interior_dip = 0 < trough < len(shape) - 1
+    drop = max(shape[0], shape[-1]) - shape[trough]
+    if min_drop is not None and is_interior_dip and drop >= min_drop:
+        nocturnal = sum(h in NOCTURNAL_START_HOURS for h in motif.hours_of_day)
+        if nocturnal >= NOCTURNAL_MIN_SHARE * motif.n_occurrences:
+            return MotifEnum.NOCTURNAL_DIP
+    
+    return None
 
-def _detect_regime(run_v2: RunV2, specimen) -> Tuple[RegimeEnum, float]:
-    """Detect metabolic regime from specimen and context."""
+
+def _detect_regime(index: RunV2Index) -> Tuple[RegimeEnum, float]:
+    """Detect metabolic regime from run context."""
     # Simple heuristic
-    activity_level = _get_nonlab(run_v2, "sleep_activity.activity_level_0_10")
-    sleep_quality = _get_nonlab(run_v2, "sleep_activity.sleep_quality_0_10")
+    activity_level = index.get_nonlab("sleep_activity.activity_level_0_10")
+    sleep_quality = index.get_nonlab("sleep_activity.sleep_quality_0_10")
     
     if sleep_quality is not None and sleep_quality > 7:
         return RegimeEnum.SLEEP, 0.8
@@ -319,34 +449,3 @@ def _detect_regime(run_v2: RunV2, specimen) -> Tuple[RegimeEnum, float]:
         return RegimeEnum.EXERTION, 0.8
     else:
         return RegimeEnum.UNKNOWN, 0.5
-
-
-def _get_value(run_v2: RunV2, specimen_type, var_name: str) -> Optional[float]:
-    """Get a value from a specimen of a given type."""
-    for specimen in run_v2.specimens:
-        if specimen.specimen_type == specimen_type:
-            # Defensive: check if variable exists in missingness dict
-            if var_name in specimen.missingness:
-                missingness_entry = specimen.missingness[var_name]
-                is_missing = missingness_entry.is_missing if hasattr(missingness_entry, 'is_missing') else True
-                if not is_missing:
-                    val = specimen.raw_values.get(var_name)
-                    return float(val) if val is not None else None
-    return None
-    return None
-
-
-def _get_nonlab(run_v2: RunV2, path: str) -> Optional[float]:
-    """Get non-lab input value by path."""
-    parts = path.split(".")
-    obj = run_v2.non_lab_inputs
-    
-    for part in parts:
-        if obj is None:
-            return None
-        if isinstance(obj, dict):
-            obj = obj.get(part)
-        else:
-            obj = getattr(obj, part, None)
-    
-    return float(obj) if obj is not None else None
@@ -10,16 +10,24 @@ Features:
 - Deviation scoring (z-like)
 - Time-aware baselines (weekday/weekend, circadian)
 - Graceful fallback to population priors
+- Streaming per-user state (P² quantile sketches + Welford moments) with
+  O(1) baseline retrieval and bounded memory
 """
 
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any, Iterable
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
+from bisect import bisect_right, insort
 import logging
 import math
 import statistics
 
+from sqlalchemy.orm import Session
+
+from app.models.baseline_models import PersonalBaselineStateRecord
+
 logger = logging.getLogger(__name__)
 
 
@@ -104,6 +112,244 @@ class BaselineRequirements:
     require_weekday_weekend_coverage: bool = False
 
 
+# Distinct-day tracking saturates here; well above 2x any coverage requirement
+MAX_TRACKED_DAYS = 400
+
+
+@dataclass
+class P2Quantile:
+    """
+    Streaming quantile estimator (P² algorithm, Jain & Chlamtac 1985).
+    
+    Keeps five marker heights/positions, so memory and update cost are O(1)
+    regardless of stream length. Exact for the first five observations.
+    """
+    p: float
+    count: int = 0
+    heights: List[float] = field(default_factory=list)
+    positions: List[int] = field(default_factory=lambda: [1, 2, 3, 4, 5])
+    desired: Optional[List[float]] = None
+    
+    def __post_init__(self):
+        if self.desired is None:
+            p = self.p
+            self.desired = [1.0, 1.0 + 2 * p, 1.0 + 4 * p, 3.0 + 2 * p, 5.0]
+        self._increments = [0.0, self.p / 2.0, self.p, (1.0 + self.p) / 2.0, 1.0]
+    
+    def add(self, x: float):
+        """Incorporate one observation."""
+        self.count += 1
+        if self.count <= 5:
+            insort(self.heights, x)
+            return
+        
+        q = self.heights
+        n = self.positions
+        
+        # Cell containing x (extremes widen the outer markers)
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect_right(q, x) - 1
+        
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self._increments[i]
+        
+        # Nudge middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                candidate = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    # Parabolic step overshot; fall back to linear
+                    candidate = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = candidate
+                n[i] += s
+    
+    def value(self) -> Optional[float]:
+        """Current quantile estimate."""
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            # Same rule as the batch path in compute_baseline
+            if self.p == 0.5:
+                return statistics.median(self.heights)
+            return self.heights[min(self.count - 1, int(self.count * self.p))]
+        return self.heights[2]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "p": self.p,
+            "count": self.count,
+            "heights": list(self.heights),
+            "positions": list(self.positions),
+            "desired": list(self.desired)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "P2Quantile":
+        """Restore from to_dict() output."""
+        return cls(
+            p=data["p"],
+            count=data["count"],
+            heights=list(data["heights"]),
+            positions=list(data["positions"]),
+            desired=list(data["desired"])
+        )
+
+
+@dataclass
+class RunningMoments:
+    """Welford running mean/variance plus min/max."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    
+    def add(self, x: float):
+        """Incorporate one observation."""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.minimum = x if self.minimum is None else min(self.minimum, x)
+        self.maximum = x if self.maximum is None else max(self.maximum, x)
+    
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 with fewer than two observations)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "minimum": self.minimum,
+            "maximum": self.maximum
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningMoments":
+        """Restore from to_dict() output."""
+        return cls(**data)
+
+
+@dataclass
+class StreamingBaselineState:
+    """
+    Incremental baseline state for one (user, marker) pair.
+    
+    Holds everything compute_baseline derives from the full history
+    (p10/p50/p90, weekday/weekend medians, coverage and span) as fixed-size
+    sketches, so new observations are folded in without rescanning.
+    """
+    marker_name: str
+    stream_type: Optional[str] = None
+    
+    moments: RunningMoments = field(default_factory=RunningMoments)
+    p10: P2Quantile = field(default_factory=lambda: P2Quantile(0.10))
+    p50: P2Quantile = field(default_factory=lambda: P2Quantile(0.50))
+    p90: P2Quantile = field(default_factory=lambda: P2Quantile(0.90))
+    weekday_median: P2Quantile = field(default_factory=lambda: P2Quantile(0.50))
+    weekend_median: P2Quantile = field(default_factory=lambda: P2Quantile(0.50))
+    
+    # Coverage
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    day_ordinals: set = field(default_factory=set)  # capped at MAX_TRACKED_DAYS
+    
+    last_updated: datetime = field(default_factory=datetime.utcnow)
+    
+    @property
+    def data_points(self) -> int:
+        return self.moments.count
+    
+    @property
+    def days_covered(self) -> int:
+        return len(self.day_ordinals)
+    
+    @property
+    def span_days(self) -> float:
+        if self.first_seen is None:
+            return 0.0
+        return (self.last_seen - self.first_seen).total_seconds() / 86400.0
+    
+    def add(self, timestamp: datetime, value: float):
+        """Fold one (timestamp, value) observation into the state."""
+        self.moments.add(value)
+        self.p10.add(value)
+        self.p50.add(value)
+        self.p90.add(value)
+        
+        if timestamp.weekday() < 5:
+            self.weekday_median.add(value)
+        else:
+            self.weekend_median.add(value)
+        
+        if self.first_seen is None or timestamp < self.first_seen:
+            self.first_seen = timestamp
+        if self.last_seen is None or timestamp > self.last_seen:
+            self.last_seen = timestamp
+        if len(self.day_ordinals) < MAX_TRACKED_DAYS:
+            self.day_ordinals.add(timestamp.date().toordinal())
+        
+        self.last_updated = datetime.utcnow()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to JSON-serializable dictionary."""
+        return {
+            "marker_name": self.marker_name,
+            "stream_type": self.stream_type,
+            "moments": self.moments.to_dict(),
+            "p10": self.p10.to_dict(),
+            "p50": self.p50.to_dict(),
+            "p90": self.p90.to_dict(),
+            "weekday_median": self.weekday_median.to_dict(),
+            "weekend_median": self.weekend_median.to_dict(),
+            "first_seen": self.first_seen.isoformat() if self.first_seen else None,
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "day_ordinals": sorted(self.day_ordinals),
+            "last_updated": self.last_updated.isoformat()
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamingBaselineState":
+        """Restore from to_dict() output."""
+        parse = lambda v: datetime.fromisoformat(v) if v else None
+        return cls(
+            marker_name=data["marker_name"],
+            stream_type=data.get("stream_type"),
+            moments=RunningMoments.from_dict(data["moments"]),
+            p10=P2Quantile.from_dict(data["p10"]),
+            p50=P2Quantile.from_dict(data["p50"]),
+            p90=P2Quantile.from_dict(data["p90"]),
+            weekday_median=P2Quantile.from_dict(data["weekday_median"]),
+            weekend_median=P2Quantile.from_dict(data["weekend_median"]),
+            first_seen=parse(data.get("first_seen")),
+            last_seen=parse(data.get("last_seen")),
+            day_ordinals=set(data.get("day_ordinals", [])),
+            last_updated=parse(data.get("last_updated")) or datetime.utcnow()
+        )
+
+
 class PersonalBaselineEngine:
     """
     Computes and maintains personal baselines for markers and streams.
@@ -141,9 +387,15 @@ class PersonalBaselineEngine:
         )
     }
     
-    def __init__(self):
+    def __init__(self, user_cache_size: int = 256):
         """Initialize personal baseline engine."""
         self.requirements: Dict[str, BaselineRequirements] = self.DEFAULT_REQUIREMENTS.copy()
+        
+        # Hot users' streaming states by marker (LRU); users with unsaved
+        # changes are never evicted
+        self.user_cache_size = user_cache_size
+        self._states: "OrderedDict[int, Dict[str, StreamingBaselineState]]" = OrderedDict()
+        self._dirty: Dict[int, Set[str]] = {}
     
     def set_requirements(self, stream_or_marker: str, requirements: BaselineRequirements):
         """Set custom requirements for a stream or marker."""
@@ -295,7 +547,25 @@ class PersonalBaselineEngine:
         timestamps = [t for t, _ in historical_data]
         span_days = (max(timestamps) - min(timestamps)).total_seconds() / 86400.0
         
-        # Check requirements
+        return self._evaluate_requirements(
+            data_points=data_points,
+            days_covered=days_covered,
+            span_days=span_days,
+            has_weekday=any(d.weekday() < 5 for d in dates),
+            has_weekend=any(d.weekday() >= 5 for d in dates),
+            requirements=requirements
+        )
+    
+    def _evaluate_requirements(
+        self,
+        data_points: int,
+        days_covered: int,
+        span_days: float,
+        has_weekday: bool,
+        has_weekend: bool,
+        requirements: BaselineRequirements
+    ) -> Dict[str, Any]:
+        """Check coverage summary against requirements (shared by batch and streaming paths)."""
         reasons = []
         
         if data_points < requirements.min_data_points:
@@ -315,10 +585,7 @@ class PersonalBaselineEngine:
         
         # Check weekday/weekend coverage if required
         if requirements.require_weekday_weekend_coverage:
-            weekday_dates = set(t.date() for t, _ in historical_data if t.weekday() < 5)
-            weekend_dates = set(t.date() for t, _ in historical_data if t.weekday() >= 5)
-            
-            if not weekday_dates or not weekend_dates:
+            if not has_weekday or not has_weekend:
                 reasons.append("Missing weekday or weekend data")
         
         meets_requirements = len(reasons) == 0
@@ -385,6 +652,232 @@ class PersonalBaselineEngine:
         
         return baselines
     
+    # ===== Streaming Baselines =====
+    
+    def _user_states(self, user_id: int) -> Dict[str, StreamingBaselineState]:
+        """A user's streaming states, created on first use (marks the user recent)."""
+        states = self._states.get(user_id)
+        if states is None:
+            states = {}
+            self._states[user_id] = states
+            self._evict_clean_users(keep=(user_id,))
+        else:
+            self._states.move_to_end(user_id)
+        return states
+    
+    def _evict_clean_users(self, keep: Iterable[int] = ()):
+        """Trim the user LRU, skipping users with unsaved changes and `keep` users."""
+        excess = len(self._states) - self.user_cache_size
+        if excess <= 0:
+            return
+        keep = set(keep)
+        for user_id in list(self._states):
+            if excess <= 0:
+                break
+            if user_id not in self._dirty and user_id not in keep:
+                del self._states[user_id]
+                excess -= 1
+    
+    def update_baseline_state(
+        self,
+        user_id: int,
+        marker_name: str,
+        observations: Iterable[Tuple[datetime, float]],
+        stream_type: Optional[str] = None
+    ) -> StreamingBaselineState:
+        """
+        Fold new (timestamp, value) observations into a user's baseline state.
+        
+        Only the new observations are touched; the stored history is never
+        rescanned. Observations may arrive in any order.
+        """
+        states = self._user_states(user_id)
+        state = states.get(marker_name)
+        if state is None:
+            state = StreamingBaselineState(marker_name=marker_name, stream_type=stream_type)
+            states[marker_name] = state
+        elif stream_type:
+            state.stream_type = stream_type
+        
+        for timestamp, value in observations:
+            state.add(timestamp, value)
+        self._dirty.setdefault(user_id, set()).add(marker_name)
+        
+        return state
+    
+    def get_baseline_state(self, user_id: int, marker_name: str) -> Optional[StreamingBaselineState]:
+        """Get the in-memory streaming state for a user and marker."""
+        return self._states.get(user_id, {}).get(marker_name)
+    
+    def get_streaming_baseline(self, user_id: int, marker_name: str) -> Optional[PersonalBaseline]:
+        """
+        O(1) personal baseline from streaming state.
+        
+        Returns:
+            PersonalBaseline if the state meets requirements, None otherwise
+        """
+        state = self.get_baseline_state(user_id, marker_name)
+        if state is None:
+            return None
+        return self.baseline_from_state(state)
+    
+    def baseline_from_state(self, state: StreamingBaselineState) -> Optional[PersonalBaseline]:
+        """Build a PersonalBaseline from sketches (same rules as compute_baseline)."""
+        if state.data_points == 0:
+            return None
+        
+        requirements = self._get_requirements(state.marker_name, state.stream_type)
+        has_weekday = state.weekday_median.count > 0
+        has_weekend = state.weekend_median.count > 0
+        
+        adequacy = self._evaluate_requirements(
+            data_points=state.data_points,
+            days_covered=state.days_covered,
+            span_days=state.span_days,
+            has_weekday=has_weekday,
+            has_weekend=has_weekend,
+            requirements=requirements
+        )
+        
+        if not adequacy["meets_requirements"]:
+            logger.debug(
+                f"Insufficient data for {state.marker_name}: {adequacy['reason']}"
+            )
+            return None
+        
+        band_lower = state.p10.value()
+        band_upper = state.p90.value()
+        
+        weekday_baseline = None
+        weekend_baseline = None
+        if requirements.require_weekday_weekend_coverage and state.data_points >= 20:
+            if has_weekday and has_weekend:
+                weekday_baseline = state.weekday_median.value()
+                weekend_baseline = state.weekend_median.value()
+        
+        return PersonalBaseline(
+            marker_name=state.marker_name,
+            center=state.p50.value(),
+            band_lower=band_lower,
+            band_upper=band_upper,
+            band_width=band_upper - band_lower,
+            confidence=self._determine_confidence(
+                adequacy["data_points"],
+                adequacy["days_covered"],
+                adequacy["span_days"],
+                requirements
+            ),
+            data_points_count=state.data_points,
+            data_span_days=adequacy["span_days"],
+            weekday_baseline=weekday_baseline,
+            weekend_baseline=weekend_baseline,
+            last_updated=state.last_updated
+        )
+    
+    def save_baseline_states(self, db: Session, user_id: int) -> int:
+        """
+        Persist a user's changed streaming states (upsert per marker). Caller
+        commits.
+        
+        Returns:
+            Number of states written
+        """
+        markers = self._dirty.pop(user_id, set())
+        if not markers:
+            return 0
+        states = self._states[user_id]
+        existing = {
+            record.marker_name: record
+            for record in db.query(PersonalBaselineStateRecord).filter(
+                PersonalBaselineStateRecord.user_id == user_id
+            )
+        }
+        
+        written = 0
+        for marker_name in markers:
+            state = states[marker_name]
+            record = existing.get(marker_name)
+            if record is None:
+                record = PersonalBaselineStateRecord(user_id=user_id, marker_name=marker_name)
+                db.add(record)
+            record.stream_type = state.stream_type
+            record.state_json = state.to_dict()
+            record.observation_count = state.data_points
+            written += 1
+        
+        self._evict_clean_users()
+        return written
+    
+    def load_baseline_states(self, db: Session, user_id: int) -> int:
+        """
+        Replace a user's in-memory streaming states with the persisted ones.
+        
+        Markers with unsaved in-memory changes are kept as they are; other
+        markers take whatever another worker last committed.
+        
+        Returns:
+            Number of states loaded
+        """
+        records = db.query(PersonalBaselineStateRecord).filter(
+            PersonalBaselineStateRecord.user_id == user_id
+        ).all()
+        
+        dirty = self._dirty.get(user_id, set())
+        states = self._user_states(user_id)
+        reloaded = {marker: states[marker] for marker in dirty}
+        loaded = 0
+        for record in records:
+            if record.marker_name in dirty:
+                continue
+            reloaded[record.marker_name] = StreamingBaselineState.from_dict(record.state_json)
+            loaded += 1
+        self._states[user_id] = reloaded
+        
+        return loaded
+    
+    def sync_baseline_states(
+        self,
+        db: Session,
+        user_id: int,
+        historical_data: Dict[str, List[Tuple[datetime, float]]],
+        stream_types: Optional[Dict[str, str]] = None
+    ) -> Dict[str, PersonalBaseline]:
+        """
+        Bring a user's persisted streaming states up to date with a run's
+        history and save them. Caller commits.
+        
+        The states are reloaded from the database on every call, so runs in
+        other workers are folded on top of rather than overwritten.
+        
+        The history of each run usually overlaps the previous one, so only
+        observations after a state's last_seen are folded in (late,
+        out-of-order observations older than that are skipped).
+        
+        Returns:
+            Dictionary of marker_name -> streaming PersonalBaseline (only for
+            those meeting requirements)
+        """
+        self.load_baseline_states(db, user_id)
+        stream_types = stream_types or {}
+        
+        baselines = {}
+        for marker, observations in historical_data.items():
+            state = self.get_baseline_state(user_id, marker)
+            watermark = state.last_seen if state is not None else None
+            new_observations = [
+                (timestamp, value) for timestamp, value in observations
+                if watermark is None or timestamp > watermark
+            ]
+            if new_observations:
+                self.update_baseline_state(user_id, marker, new_observations, stream_types.get(marker))
+            
+            baseline = self.get_streaming_baseline(user_id, marker)
+            if baseline:
+                baselines[marker] = baseline
+        
+        self.save_baseline_states(db, user_id)
+        return baselines
+    
     def compare_to_baseline(
         self,
         baseline: PersonalBaseline,
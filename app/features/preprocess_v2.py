@@ -4,7 +4,7 @@ Produces feature_pack_v2 with missingness-aware, cross-specimen coherence-aware
 """
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 import logging
 
 from app.models.run_v2 import RunV2
@@ -15,18 +15,22 @@ from app.features.missingness_features import (
     compute_missingness_feature_vector, get_domain_presence_summary
 )
 from app.features.cross_specimen_modeling import build_cross_specimen_relationships
+from app.features.run_v2_index import RunV2Index
 from app.features.pattern_features import (
     compute_temporal_features, build_pattern_combination_features, detect_discordance
 )
+from app.features.temporal_series import Series, build_run_series
 
 logger = logging.getLogger(__name__)
 
 
-def preprocess_v2(run_v2: RunV2) -> FeaturePackV2:
+def preprocess_v2(run_v2: RunV2, series: Optional[Dict[str, Series]] = None) -> FeaturePackV2:
     """
     Main preprocess v2 pipeline.
     
-    Inputs: RunV2 with specimens, non_lab_inputs, qualitative_inputs
+    Inputs: RunV2 with specimens, non_lab_inputs, qualitative_inputs; optional
+        full-resolution streams (e.g. ISF monitor or vitals series) keyed like
+        "glucose_isf", which replace the streams assembled from the specimens
     Outputs: feature_pack_v2 with all advanced features, coherence scores, penalties
     
     Non-breaking: produces feature_pack_v2 without modifying legacy features.
@@ -34,6 +38,12 @@ def preprocess_v2(run_v2: RunV2) -> FeaturePackV2:
     
     logger.info(f"Starting preprocess_v2 for run_id {run_v2.run_id} with {len(run_v2.specimens)} specimens")
     
+    # Lookup index and streams shared by every stage below
+    index = RunV2Index(run_v2)
+    run_series = build_run_series(run_v2)
+    if series:
+        run_series.update(series)
+    
     # Step 1: Missingness-aware feature construction
     missingness_vector = compute_missingness_feature_vector(run_v2)
     logger.debug(f"Aggregate missingness: {missingness_vector.aggregate_missingness_0_1:.2f}")
@@ -42,14 +52,14 @@ def preprocess_v2(run_v2: RunV2) -> FeaturePackV2:
     normalized_values = _compute_normalized_values(run_v2)
     
     # Step 3: Temporal features
-    temporal_features = compute_temporal_features(run_v2)
+    temporal_features = compute_temporal_features(run_v2, index, run_series)
     
     # Step 4: Cross-specimen relationships
-    cross_specimen_rels = build_cross_specimen_relationships(run_v2)
+    cross_specimen_rels = build_cross_specimen_relationships(run_v2, index)
     
     # Step 5: Pattern/combination features
-    pattern_features = build_pattern_combination_features(run_v2, temporal_features)
-    discordance = detect_discordance(run_v2)
+    pattern_features = build_pattern_combination_features(run_v2, temporal_features, index, run_series)
+    discordance = detect_discordance(run_v2, index)
     
     # Step 6: Compute coherence scores
     coherence_scores = _compute_coherence_scores(
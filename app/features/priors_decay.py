@@ -10,17 +10,26 @@ Features:
 - Prior decay engine (exponential decay)
 - Stability reinforcement engine
 - Posterior updates when new measurements arrive
+- Per-user prior state (persisted, with an in-process LRU of hot users)
 """
 
-from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Any, Collection, Iterable, Set
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
 from enum import Enum
+from collections import OrderedDict
 import logging
 import math
 
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.prior_models import UserPriorStateRecord
+
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1)
+
 
 @dataclass
 class PriorDistribution:
@@ -99,6 +108,38 @@ class PriorDistribution:
         }
 
 
+def decay_priors(
+    priors: List[PriorDistribution],
+    current_time: Optional[datetime] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decay many priors to `current_time` in one vectorized pass.
+    
+    Equivalent to get_current_strength / get_decayed_distribution per prior.
+    
+    Returns:
+        (strengths, decayed_stds) arrays aligned with `priors`
+    """
+    current_time = current_time or datetime.utcnow()
+    if not priors:
+        return np.empty(0), np.empty(0)
+    
+    reference_s = np.array([
+        ((p.last_measurement_date or p.established_at) - _EPOCH).total_seconds()
+        for p in priors
+    ])
+    half_lives = np.array([p.half_life_days for p in priors], dtype=np.float64)
+    stds = np.array([p.std for p in priors], dtype=np.float64)
+    
+    days_elapsed = ((current_time - _EPOCH).total_seconds() - reference_s) / 86400.0
+    strengths = np.clip(np.exp(-math.log(2) * days_elapsed / half_lives), 0.01, 1.0)
+    strengths = np.where(days_elapsed <= 0, 1.0, strengths)
+    
+    # As prior weakens, increase uncertainty
+    decayed_stds = np.where(strengths > 0.01, stds / np.sqrt(strengths), stds * 10)
+    return strengths, decayed_stds
+
+
 class HalfLifeRegistry:
     """
     Registry of half-lives for different markers and states.
@@ -156,14 +197,59 @@ class PriorsDecayEngine:
     """
     Manages population priors and their decay over time.
     Handles posterior updates when new measurements arrive.
+    
+    Methods taking `user_id` operate on that user's prior set, seeded from
+    the population priors and persisted via save_user_priors/load_user_priors.
+    Without `user_id` they operate on the shared population priors.
     """
     
-    def __init__(self):
+    def __init__(self, user_cache_size: int = 256):
         """Initialize priors decay engine."""
         self.half_life_registry = HalfLifeRegistry()
         self.priors: Dict[str, PriorDistribution] = {}
+        
+        # Hot users' prior sets (LRU); users with unsaved changes are never evicted
+        self.user_cache_size = user_cache_size
+        self._user_priors: "OrderedDict[int, Dict[str, PriorDistribution]]" = OrderedDict()
+        self._dirty: Dict[int, Set[str]] = {}
+        
         self._initialize_population_priors()
     
+    def _priors_for(
+        self,
+        user_id: Optional[int],
+        keep: Collection[int] = ()
+    ) -> Dict[str, PriorDistribution]:
+        """Prior store for a user (population priors if None); `keep` users are not evicted."""
+        if user_id is None:
+            return self.priors
+        
+        user_priors = self._user_priors.get(user_id)
+        if user_priors is not None:
+            self._user_priors.move_to_end(user_id)
+            return user_priors
+        
+        user_priors = {marker: replace(prior) for marker, prior in self.priors.items()}
+        self._user_priors[user_id] = user_priors
+        self._evict_clean_users(keep)
+        return user_priors
+    
+    def _evict_clean_users(self, keep: Collection[int] = ()):
+        """Trim the user LRU, skipping users with unsaved changes and `keep` users."""
+        excess = len(self._user_priors) - self.user_cache_size
+        if excess <= 0:
+            return
+        for user_id in list(self._user_priors):
+            if excess <= 0:
+                break
+            if user_id not in self._dirty and user_id not in keep:
+                del self._user_priors[user_id]
+                excess -= 1
+    
+    def _mark_dirty(self, user_id: Optional[int], marker_name: str):
+        if user_id is not None:
+            self._dirty.setdefault(user_id, set()).add(marker_name)
+    
     def _initialize_population_priors(self):
         """Initialize default population priors."""
         # These are placeholder values
@@ -204,7 +290,8 @@ class PriorsDecayEngine:
         source: str = "population",
         established_at: Optional[datetime] = None,
         last_measurement_date: Optional[datetime] = None,
-        half_life_days: Optional[float] = None
+        half_life_days: Optional[float] = None,
+        user_id: Optional[int] = None
     ):
         """
         Set or update a prior for a marker.
@@ -217,6 +304,7 @@ class PriorsDecayEngine:
             established_at: When prior was established
             last_measurement_date: Date of last measurement
             half_life_days: Custom half-life (optional)
+            user_id: User whose prior set to update (population if None)
         """
         established_at = established_at or datetime.utcnow()
         
@@ -233,14 +321,16 @@ class PriorsDecayEngine:
             half_life_days=half_life_days
         )
         
-        self.priors[marker_name] = prior
+        self._priors_for(user_id)[marker_name] = prior
+        self._mark_dirty(user_id, marker_name)
         logger.debug(f"Set prior for {marker_name}: mean={mean:.1f}, std={std:.1f}, source={source}")
     
     def get_prior(
         self,
         marker_name: str,
         apply_decay: bool = True,
-        current_time: Optional[datetime] = None
+        current_time: Optional[datetime] = None,
+        user_id: Optional[int] = None
     ) -> Optional[PriorDistribution]:
         """
         Get prior for a marker.
@@ -249,14 +339,16 @@ class PriorsDecayEngine:
             marker_name: Name of marker
             apply_decay: Whether to apply decay
             current_time: Current time (for decay calculation)
+            user_id: User whose prior set to read (population if None)
         
         Returns:
             PriorDistribution or None if not found
         """
-        if marker_name not in self.priors:
+        priors = self._priors_for(user_id)
+        if marker_name not in priors:
             return None
         
-        prior = self.priors[marker_name]
+        prior = priors[marker_name]
         
         if not apply_decay:
             return prior
@@ -279,7 +371,8 @@ class PriorsDecayEngine:
         marker_name: str,
         measurement_value: float,
         measurement_uncertainty: float,
-        measurement_date: Optional[datetime] = None
+        measurement_date: Optional[datetime] = None,
+        user_id: Optional[int] = None
     ) -> PriorDistribution:
         """
         Update prior with new measurement (Bayesian update).
@@ -289,6 +382,7 @@ class PriorsDecayEngine:
             measurement_value: Measured value
             measurement_uncertainty: Measurement uncertainty (std)
             measurement_date: Date of measurement
+            user_id: User whose prior set to update (population if None)
         
         Returns:
             Updated (posterior) prior distribution
@@ -296,7 +390,9 @@ class PriorsDecayEngine:
         measurement_date = measurement_date or datetime.utcnow()
         
         # Get current prior (with decay)
-        prior = self.get_prior(marker_name, apply_decay=True, current_time=measurement_date)
+        prior = self.get_prior(
+            marker_name, apply_decay=True, current_time=measurement_date, user_id=user_id
+        )
         
         if prior is None:
             # No prior exists, create one from measurement
@@ -306,9 +402,10 @@ class PriorsDecayEngine:
                 std=measurement_uncertainty,
                 source="lab_measurement",
                 established_at=measurement_date,
-                last_measurement_date=measurement_date
+                last_measurement_date=measurement_date,
+                user_id=user_id
             )
-            return self.priors[marker_name]
+            return self._priors_for(user_id)[marker_name]
         
         # Bayesian update (Gaussian conjugate prior)
         # Posterior mean = weighted average of prior and measurement
@@ -331,7 +428,8 @@ class PriorsDecayEngine:
             std=posterior_std,
             source="lab_measurement",
             established_at=measurement_date,
-            last_measurement_date=measurement_date
+            last_measurement_date=measurement_date,
+            user_id=user_id
         )
         
         logger.info(
@@ -341,13 +439,14 @@ class PriorsDecayEngine:
             f"posterior=({posterior_mean:.1f}±{posterior_std:.1f})"
         )
         
-        return self.priors[marker_name]
+        return self._priors_for(user_id)[marker_name]
     
     def reinforce_stability(
         self,
         marker_name: str,
         stable_values: List[Tuple[datetime, float]],
-        reinforcement_factor: float = 0.5
+        reinforcement_factor: float = 0.5,
+        user_id: Optional[int] = None
     ):
         """
         Reinforce prior when longitudinal data shows stability.
@@ -356,14 +455,16 @@ class PriorsDecayEngine:
             marker_name: Name of marker
             stable_values: List of (timestamp, value) showing stability
             reinforcement_factor: How much to restore prior strength (0-1)
+            user_id: User whose prior set to reinforce (population if None)
         """
-        if marker_name not in self.priors:
+        priors = self._priors_for(user_id)
+        if marker_name not in priors:
             return
         
         if len(stable_values) < 3:
             return  # Need at least 3 points for stability
         
-        prior = self.priors[marker_name]
+        prior = priors[marker_name]
         
         # Compute statistics from stable values
         values = [v for _, v in stable_values]
@@ -392,7 +493,8 @@ class PriorsDecayEngine:
             restored_date = most_recent_time
         
         # Update prior with reinforced date
-        self.priors[marker_name].last_measurement_date = restored_date
+        prior.last_measurement_date = restored_date
+        self._mark_dirty(user_id, marker_name)
         
         logger.info(
             f"Reinforced prior for {marker_name} based on {len(stable_values)} stable measurements"
@@ -400,25 +502,29 @@ class PriorsDecayEngine:
     
     def get_all_priors_status(
         self,
-        current_time: Optional[datetime] = None
+        current_time: Optional[datetime] = None,
+        user_id: Optional[int] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Get status of all priors.
         
+        Args:
+            current_time: Time to decay to (default now)
+            user_id: User whose prior set to report (population if None)
+        
         Returns:
             Dictionary of marker -> prior status
         """
         current_time = current_time or datetime.utcnow()
+        priors = list(self._priors_for(user_id).values())
+        strengths, decayed_stds = decay_priors(priors, current_time)
         
         status = {}
-        for marker, prior in self.priors.items():
-            strength = prior.get_current_strength(current_time)
-            decayed_mean, decayed_std = prior.get_decayed_distribution(current_time)
-            
-            status[marker] = {
+        for prior, strength, decayed_std in zip(priors, strengths.tolist(), decayed_stds.tolist()):
+            status[prior.marker_name] = {
                 "mean": prior.mean,
                 "std": prior.std,
-                "decayed_mean": decayed_mean,
+                "decayed_mean": prior.mean,
                 "decayed_std": decayed_std,
                 "strength": strength,
                 "source": prior.source,
@@ -428,6 +534,86 @@ class PriorsDecayEngine:
             }
         
         return status
+    
+    def load_user_priors(self, db: Session, user_ids: Iterable[int]) -> int:
+        """
+        Load persisted prior sets for several users in one query.
+        
+        Markers with unsaved in-memory changes are kept as they are. The
+        requested users stay cached even past user_cache_size; older clean
+        users are evicted instead.
+        
+        Returns:
+            Number of prior rows loaded
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return 0
+        requested = set(user_ids)
+        
+        records = db.query(UserPriorStateRecord).filter(
+            UserPriorStateRecord.user_id.in_(user_ids)
+        ).all()
+        
+        loaded = 0
+        for record in records:
+            if record.marker_name in self._dirty.get(record.user_id, ()):
+                continue
+            self._priors_for(record.user_id, keep=requested)[record.marker_name] = PriorDistribution(
+                marker_name=record.marker_name,
+                mean=record.mean,
+                std=record.std,
+                source=record.source,
+                established_at=record.established_at,
+                last_measurement_date=record.last_measurement_date,
+                half_life_days=record.half_life_days
+            )
+            loaded += 1
+        
+        return loaded
+    
+    def save_user_priors(self, db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Persist changed priors (upsert per marker) for the given users, or all
+        users with unsaved changes. Caller commits.
+        
+        Returns:
+            Number of prior rows written
+        """
+        if user_ids is None:
+            pending = dict(self._dirty)
+        else:
+            pending = {u: self._dirty[u] for u in user_ids if u in self._dirty}
+        if not pending:
+            return 0
+        
+        existing = {
+            (record.user_id, record.marker_name): record
+            for record in db.query(UserPriorStateRecord).filter(
+                UserPriorStateRecord.user_id.in_(list(pending))
+            )
+        }
+        
+        written = 0
+        for user_id, markers in pending.items():
+            user_priors = self._user_priors[user_id]
+            for marker_name in markers:
+                prior = user_priors[marker_name]
+                record = existing.get((user_id, marker_name))
+                if record is None:
+                    record = UserPriorStateRecord(user_id=user_id, marker_name=marker_name)
+                    db.add(record)
+                record.mean = prior.mean
+                record.std = prior.std
+                record.source = prior.source
+                record.half_life_days = prior.half_life_days
+                record.established_at = prior.established_at
+                record.last_measurement_date = prior.last_measurement_date
+                written += 1
+            del self._dirty[user_id]
+        
+        self._evict_clean_users()
+        return written
 
 
 # Global instance
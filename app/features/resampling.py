@@ -0,0 +1,313 @@
+"""
+Regular-grid resampling for irregular series.
+
+Any (timestamps, values) series is binned onto a grid of fixed steps
+(typically 5, 15 or 60 minutes) aligned to multiples of the step since the
+epoch, so grids of different series line up. Each bin reduces its readings
+with one aggregation; bins without readings are NaN and marked in the
+observed mask, and can be forward-filled up to a time limit (marked in the
+filled mask).
+
+Several series align into one time x analyte matrix over a shared grid.
+Matrices for a submission's ISF streams are cached in-process (LRU) and
+reused until a stream is added or grows, so downstream stages all read the
+same contiguous, read-only arrays. The cache is shared by the threads that
+serve sync request handlers, so it is guarded by a lock.
+
+Reductions run on the time-sorted readings with one reduceat per bin
+boundary set, so resampling is O(n) after the sort.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.features.stream_cache import load_stream_series
+from app.features.temporal_series import Series
+from app.models.part_a_models import ISFAnalyteStream
+
+GRID_5_MIN = 300.0
+GRID_15_MIN = 900.0
+GRID_60_MIN = 3600.0
+
+AGGREGATIONS = ("mean", "median", "min", "max", "first", "last", "sum", "count")
+
+# Submission matrices kept in memory
+MATRIX_CACHE_SIZE = 32
+
+
+def grid_origin(timestamp: float, step_s: float) -> float:
+    """Start of the grid bin holding `timestamp`."""
+    return float(np.floor(timestamp / step_s) * step_s)
+
+
+def _reduce_bins(bins: np.ndarray, values: np.ndarray, n_bins: int, agg: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-bin aggregate and reading count for nondecreasing bin indices;
+    empty bins are NaN (0 for "count").
+    """
+    counts = np.bincount(bins, minlength=n_bins)
+    if agg == "count":
+        return counts.astype(np.float64), counts
+    out = np.full(n_bins, np.nan)
+    if len(bins) == 0:
+        return out, counts
+
+    starts = np.flatnonzero(np.concatenate(([True], bins[1:] != bins[:-1])))
+    occupied = bins[starts]
+    if agg == "mean":
+        out[occupied] = np.add.reduceat(values, starts) / counts[occupied]
+    elif agg == "sum":
+        out[occupied] = np.add.reduceat(values, starts)
+    elif agg == "min":
+        out[occupied] = np.minimum.reduceat(values, starts)
+    elif agg == "max":
+        out[occupied] = np.maximum.reduceat(values, starts)
+    elif agg == "first":
+        out[occupied] = values[starts]
+    elif agg == "last":
+        out[occupied] = values[np.concatenate((starts[1:], [len(values)])) - 1]
+    elif agg == "median":
+        # Values ascending within each bin; bins stay in order
+        ordered = values[np.lexsort((values, bins))]
+        c = counts[occupied]
+        out[occupied] = 0.5 * (ordered[starts + (c - 1) // 2] + ordered[starts + c // 2])
+    else:
+        raise ValueError(f"Unknown aggregation: {agg} (expected one of {AGGREGATIONS})")
+    return out, counts
+
+
+def forward_fill(
+    values: np.ndarray,
+    observed: np.ndarray,
+    step_s: float,
+    limit_s: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Carry the last observed bin forward (along axis 0) into unobserved bins
+    at most limit_s after it.
+
+    Returns:
+        (filled values, mask of bins that were filled)
+    """
+    if limit_s <= 0 or len(values) == 0:
+        return values, np.zeros(observed.shape, dtype=bool)
+    rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    last = np.maximum.accumulate(np.where(observed, rows, -1), axis=0)
+    filled = ~observed & (last >= 0) & ((rows - last) * step_s <= limit_s)
+    carried = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    return np.where(filled, carried, values), filled
+
+
+@dataclass
+class ResampledSeries:
+    """One series on a regular grid."""
+    timestamps: np.ndarray  # Bin starts
+    values: np.ndarray
+    counts: np.ndarray  # Readings per bin
+    observed: np.ndarray  # Bins with readings
+    filled: np.ndarray  # Bins forward-filled from an earlier observed bin
+    step_s: float
+
+    @property
+    def gap_mask(self) -> np.ndarray:
+        """Bins with no value (neither observed nor filled)."""
+        return ~(self.observed | self.filled)
+
+
+def resample(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    step_s: float = GRID_15_MIN,
+    agg: str = "mean",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    ffill_limit_s: float = 0.0
+) -> ResampledSeries:
+    """
+    Bin a series onto the step_s grid.
+
+    Args:
+        start, end: Grid span [start, end) in epoch seconds (default: the
+            bins holding the first and last readings); readings outside are
+            dropped
+        ffill_limit_s: Forward-fill gaps up to this long after an observed bin
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+        order = np.argsort(timestamps, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+
+    if start is None and len(timestamps) == 0:
+        empty = np.empty(0)
+        return ResampledSeries(empty, empty, np.empty(0, dtype=np.int64), empty.astype(bool),
+                               empty.astype(bool), step_s)
+    origin = grid_origin(timestamps[0] if start is None else start, step_s)
+    if end is not None:
+        stop = end
+    else:
+        stop = grid_origin(timestamps[-1], step_s) + step_s if len(timestamps) else origin
+    n_bins = max(int(np.ceil((stop - origin) / step_s)), 0)
+
+    bins = np.floor((timestamps - origin) / step_s).astype(np.int64)
+    inside = (bins >= 0) & (bins < n_bins)
+    binned, counts = _reduce_bins(bins[inside], values[inside], n_bins, agg)
+    observed = counts > 0
+    binned, filled = forward_fill(binned, observed, step_s, ffill_limit_s)
+    return ResampledSeries(
+        timestamps=origin + step_s * np.arange(n_bins),
+        values=binned,
+        counts=counts,
+        observed=observed,
+        filled=filled,
+        step_s=step_s,
+    )
+
+
+@dataclass
+class AlignedMatrix:
+    """Several series on one grid: row per bin, column per analyte."""
+    timestamps: np.ndarray  # (T,) bin starts
+    names: List[str]
+    values: np.ndarray  # (T, A)
+    counts: np.ndarray  # (T, A)
+    observed: np.ndarray  # (T, A)
+    filled: np.ndarray  # (T, A)
+    step_s: float
+    first_ts: np.ndarray  # (A,) first reading per analyte (NaN without readings)
+    last_ts: np.ndarray  # (A,) last reading per analyte
+
+    @property
+    def gap_mask(self) -> np.ndarray:
+        return ~(self.observed | self.filled)
+
+    def column(self, name: str) -> np.ndarray:
+        """Values of one analyte (a view)."""
+        return self.values[:, self.names.index(name)]
+
+    def select(self, names: Sequence[str]) -> "AlignedMatrix":
+        """Matrix restricted to the given analytes (those present, in order)."""
+        idx = [self.names.index(name) for name in names if name in self.names]
+        return AlignedMatrix(
+            timestamps=self.timestamps,
+            names=[self.names[i] for i in idx],
+            values=np.ascontiguousarray(self.values[:, idx]),
+            counts=np.ascontiguousarray(self.counts[:, idx]),
+            observed=np.ascontiguousarray(self.observed[:, idx]),
+            filled=np.ascontiguousarray(self.filled[:, idx]),
+            step_s=self.step_s,
+            first_ts=self.first_ts[idx],
+            last_ts=self.last_ts[idx],
+        )
+
+    def observed_fraction(self, name: str) -> float:
+        """Share of bins with readings between the analyte's first and last reading."""
+        observed = self.observed[:, self.names.index(name)]
+        hits = np.flatnonzero(observed)
+        if len(hits) == 0:
+            return 0.0
+        return float(len(hits)) / float(hits[-1] - hits[0] + 1)
+
+
+def align_series(
+    series: Dict[str, Series],
+    step_s: float = GRID_15_MIN,
+    agg: str = "mean",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    ffill_limit_s: float = 0.0
+) -> AlignedMatrix:
+    """
+    Resample named series onto one shared grid spanning all of them (or
+    [start, end)).
+    """
+    names = list(series)
+    firsts = [float(np.min(ts)) for ts, _ in series.values() if len(ts)]
+    lasts = [float(np.max(ts)) for ts, _ in series.values() if len(ts)]
+    if start is None:
+        start = min(firsts) if firsts else 0.0
+    if end is None:
+        end = grid_origin(max(lasts), step_s) + step_s if lasts else start
+
+    columns = [resample(ts, vals, step_s, agg, start, end) for ts, vals in series.values()]
+    n_bins = len(columns[0].timestamps) if columns else 0
+    values = np.empty((n_bins, len(names)))
+    counts = np.empty((n_bins, len(names)), dtype=np.int64)
+    for j, column in enumerate(columns):
+        values[:, j] = column.values
+        counts[:, j] = column.counts
+    observed = counts > 0
+    values, filled = forward_fill(values, observed, step_s, ffill_limit_s)
+    return AlignedMatrix(
+        timestamps=grid_origin(start, step_s) + step_s * np.arange(n_bins),
+        names=names,
+        values=np.ascontiguousarray(values),
+        counts=counts,
+        observed=observed,
+        filled=filled,
+        step_s=step_s,
+        first_ts=np.array([float(np.min(ts)) if len(ts) else np.nan for ts, _ in series.values()]),
+        last_ts=np.array([float(np.max(ts)) if len(ts) else np.nan for ts, _ in series.values()]),
+    )
+
+
+_matrix_cache_lock = threading.Lock()
+_matrix_cache: "OrderedDict[tuple, Tuple[tuple, AlignedMatrix]]" = OrderedDict()
+
+
+def _stream_fingerprint(streams: Sequence[ISFAnalyteStream]) -> tuple:
+    return tuple(sorted((s.id or 0, s.name, len(s.values_json or [])) for s in streams))
+
+
+def submission_matrix(
+    submission_id: int,
+    streams: Sequence[ISFAnalyteStream],
+    step_s: float = GRID_15_MIN,
+    agg: str = "mean",
+    ffill_limit_s: float = 0.0
+) -> AlignedMatrix:
+    """
+    Time x analyte matrix of a submission's ISF streams (streams of the
+    same analyte merged), cached per submission and grid settings.
+
+    The arrays are shared between callers and read-only; the cached matrix
+    is rebuilt when the streams' ids or value counts change. Builds run
+    outside the cache lock; concurrent misses may build the same matrix
+    twice, and the last one stored wins.
+    """
+    key = (submission_id, step_s, agg, ffill_limit_s)
+    fingerprint = _stream_fingerprint(streams)
+    with _matrix_cache_lock:
+        cached = _matrix_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            _matrix_cache.move_to_end(key)
+            return cached[1]
+
+    grouped: Dict[str, List[Series]] = {}
+    for stream in streams:
+        grouped.setdefault(stream.name, []).append(load_stream_series(stream))
+    merged = {
+        name: (np.concatenate([ts for ts, _ in parts]), np.concatenate([vals for _, vals in parts]))
+        for name, parts in sorted(grouped.items())
+    }
+    matrix = align_series(merged, step_s, agg, ffill_limit_s=ffill_limit_s)
+    for array in (matrix.timestamps, matrix.values, matrix.counts, matrix.observed, matrix.filled,
+                  matrix.first_ts, matrix.last_ts):
+        array.flags.writeable = False
+
+    with _matrix_cache_lock:
+        _matrix_cache[key] = (fingerprint, matrix)
+        _matrix_cache.move_to_end(key)
+        while len(_matrix_cache) > MATRIX_CACHE_SIZE:
+            _matrix_cache.popitem(last=False)
+    return matrix
+
+
+def clear_matrix_cache() -> None:
+    """Drop all cached submission matrices."""
+    with _matrix_cache_lock:
+        _matrix_cache.clear()
@@ -0,0 +1,326 @@
+"""
+Rolling-window kernels over 1-D float arrays.
+
+Every kernel takes either a count window (the last `window` samples) or,
+when `timestamps` is given, a time window of `window` seconds over sorted,
+possibly irregular timestamps: [t - window, t]. Windows are trailing and
+end at (and include) the current sample; leading windows are partial, and
+results are NaN wherever a window holds fewer than `min_periods` samples.
+
+Sums, means, variances and slopes come from cumulative sums (O(n)); min/max
+use a sparse table sized to the longest window, and quantiles a padded
+window matrix built with stride tricks. Values are assumed finite.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+Bounds = Tuple[np.ndarray, np.ndarray]
+
+# Cumulative log-decay spanned by one EWMA block (keeps exp() in range)
+_EWMA_BLOCK_LOG_DECAY = 50.0
+
+
+def window_bounds(n: int, window: float, timestamps: Optional[np.ndarray] = None) -> Bounds:
+    """
+    Half-open index bounds [starts, ends) of each sample's trailing window.
+
+    Args:
+        n: Number of samples
+        window: Sample count, or seconds when timestamps are given
+        timestamps: Sorted epoch seconds (length n) for time windows
+    """
+    ends = np.arange(1, n + 1)
+    if timestamps is None:
+        starts = np.maximum(ends - int(window), 0)
+    else:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        starts = np.searchsorted(timestamps, timestamps - window, side="left")
+    return starts, ends
+
+
+def _prefix(x: np.ndarray) -> np.ndarray:
+    out = np.empty(len(x) + 1)
+    out[0] = 0.0
+    np.cumsum(x, out=out[1:])
+    return out
+
+
+def _mask_short(result: np.ndarray, counts: np.ndarray, min_periods: int) -> np.ndarray:
+    if min_periods > 0:
+        result[counts < min_periods] = np.nan
+    return result
+
+
+def rolling_count(values: np.ndarray, window: float, timestamps: Optional[np.ndarray] = None) -> np.ndarray:
+    """Samples in each trailing window."""
+    starts, ends = window_bounds(len(values), window, timestamps)
+    return ends - starts
+
+
+def rolling_sum(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    min_periods: int = 1,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Trailing-window sum (written into `out` if given)."""
+    values = np.asarray(values, dtype=np.float64)
+    starts, ends = window_bounds(len(values), window, timestamps)
+    csum = _prefix(values)
+    out = np.subtract(csum[ends], csum[starts], out=out)
+    return _mask_short(out, ends - starts, min_periods)
+
+
+def rolling_mean(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    min_periods: int = 1,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Trailing-window mean (written into `out` if given)."""
+    values = np.asarray(values, dtype=np.float64)
+    starts, ends = window_bounds(len(values), window, timestamps)
+    counts = ends - starts
+    csum = _prefix(values)
+    out = np.subtract(csum[ends], csum[starts], out=out)
+    out /= np.maximum(counts, 1)
+    return _mask_short(out, counts, min_periods)
+
+
+def rolling_var(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    ddof: int = 0,
+    min_periods: int = 1,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Trailing-window variance (written into `out` if given).
+
+    Values are centered on the series mean first so the sum-of-squares
+    difference does not cancel catastrophically.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return np.empty(0) if out is None else out
+    starts, ends = window_bounds(n, window, timestamps)
+    counts = ends - starts
+
+    centered = values - values.mean()
+    csum = _prefix(centered)
+    csum_sq = _prefix(centered * centered)
+    sums = csum[ends] - csum[starts]
+
+    out = np.subtract(csum_sq[ends], csum_sq[starts], out=out)
+    out -= sums * sums / np.maximum(counts, 1)
+    # Zero anything within the prefix sums' rounding noise (e.g. flat windows)
+    out[out <= 16 * np.finfo(np.float64).eps * csum_sq[-1]] = 0.0
+    out /= np.maximum(counts - ddof, 1)
+    out[counts <= ddof] = np.nan
+    return _mask_short(out, counts, min_periods)
+
+
+def rolling_std(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    ddof: int = 0,
+    min_periods: int = 1,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Trailing-window standard deviation (written into `out` if given)."""
+    out = rolling_var(values, window, timestamps, ddof=ddof, min_periods=min_periods, out=out)
+    return np.sqrt(out, out=out)
+
+
+def _range_extreme(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, ufunc) -> np.ndarray:
+    """
+    ufunc (np.minimum / np.maximum) over values[starts:ends] for every window.
+
+    Sparse table: level k holds the extreme of each run of 2**k samples; a
+    window of length L is covered by two overlapping runs of the largest
+    2**k <= L. Only levels up to the longest window are built.
+    """
+    lengths = ends - starts
+    result = np.full(len(starts), np.nan)
+    nonempty = lengths > 0
+    if not nonempty.any():
+        return result
+
+    levels = [values]
+    max_level = int(np.log2(lengths.max()))
+    for k in range(1, max_level + 1):
+        half = 1 << (k - 1)
+        prev = levels[-1]
+        levels.append(ufunc(prev[:-half], prev[half:]))
+
+    level_of = np.zeros(len(lengths), dtype=np.int64)
+    level_of[nonempty] = np.log2(lengths[nonempty]).astype(np.int64)
+    for k in np.unique(level_of[nonempty]):
+        rows = np.flatnonzero(nonempty & (level_of == k))
+        table = levels[k]
+        result[rows] = ufunc(table[starts[rows]], table[ends[rows] - (1 << k)])
+    return result
+
+
+def rolling_min(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    min_periods: int = 1
+) -> np.ndarray:
+    """Trailing-window minimum."""
+    values = np.asarray(values, dtype=np.float64)
+    starts, ends = window_bounds(len(values), window, timestamps)
+    return _mask_short(_range_extreme(values, starts, ends, np.minimum), ends - starts, min_periods)
+
+
+def rolling_max(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    min_periods: int = 1
+) -> np.ndarray:
+    """Trailing-window maximum."""
+    values = np.asarray(values, dtype=np.float64)
+    starts, ends = window_bounds(len(values), window, timestamps)
+    return _mask_short(_range_extreme(values, starts, ends, np.maximum), ends - starts, min_periods)
+
+
+def rolling_quantile(
+    values: np.ndarray,
+    window: float,
+    q: float,
+    timestamps: Optional[np.ndarray] = None,
+    min_periods: int = 1
+) -> np.ndarray:
+    """
+    Trailing-window quantile (linear interpolation, q in [0, 1]).
+
+    Builds an (n, longest window) view, NaN-padded for shorter windows, so
+    memory grows with the longest window.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    starts, ends = window_bounds(n, window, timestamps)
+    counts = ends - starts
+    width = int(counts.max())
+
+    # Row i of the view is padded[i : i + width], ending at sample i
+    padded = np.concatenate((np.full(width - 1, np.nan), values))
+    windows = sliding_window_view(padded, width)
+    offsets = np.arange(width)
+    in_window = offsets[None, :] >= (width - counts)[:, None]
+    # NaN padding sorts last, so each row's window occupies [0, count)
+    ordered = np.sort(np.where(in_window, windows, np.nan), axis=1)
+
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    rows = np.arange(n)
+    frac = position - lower
+    result = ordered[rows, lower] * (1.0 - frac) + ordered[rows, upper] * frac
+    return _mask_short(result, counts, min_periods)
+
+
+def rolling_slope(
+    values: np.ndarray,
+    window: float,
+    timestamps: Optional[np.ndarray] = None,
+    min_periods: int = 2
+) -> np.ndarray:
+    """
+    Least-squares slope over each trailing window, per second when
+    timestamps are given, otherwise per sample. NaN where the window's
+    x-values are (numerically) all equal; windows whose time spread is tiny
+    relative to the whole series lose precision.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    x = np.arange(n, dtype=np.float64) if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+    starts, ends = window_bounds(n, window, timestamps)
+    counts = ends - starts
+    safe_counts = np.maximum(counts, 1)
+
+    xc = x - x.mean()
+    yc = values - values.mean()
+    sx = _prefix(xc)
+    sy = _prefix(yc)
+    sxx = _prefix(xc * xc)
+    sxy = _prefix(xc * yc)
+
+    win_sx = sx[ends] - sx[starts]
+    win_sy = sy[ends] - sy[starts]
+    cov = (sxy[ends] - sxy[starts]) - win_sx * win_sy / safe_counts
+    var = (sxx[ends] - sxx[starts]) - win_sx * win_sx / safe_counts
+
+    # Below the rounding noise of the prefix sums the window's x-spread is unresolvable
+    degenerate = var <= 64 * np.finfo(np.float64).eps * sxx[-1]
+    slope = cov / np.where(degenerate, 1.0, var)
+    slope[degenerate] = np.nan
+    return _mask_short(slope, counts, min_periods)
+
+
+def ewma(
+    values: np.ndarray,
+    alpha: Optional[float] = None,
+    halflife: Optional[float] = None,
+    timestamps: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Exponentially weighted moving average, y[0] = x[0] and
+    y[i] = (1 - a[i]) * y[i-1] + a[i] * x[i].
+
+    Either a constant `alpha`, or a `halflife` in samples (or in seconds
+    with timestamps, where a[i] = 1 - 0.5 ** (dt[i] / halflife) so irregular
+    gaps decay by elapsed time).
+
+    The recurrence is solved in closed form with cumulative products of the
+    decay within blocks whose total decay stays representable; only the
+    carry between blocks is sequential.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return np.empty(0)
+    if (alpha is None) == (halflife is None):
+        raise ValueError("Specify exactly one of alpha or halflife")
+
+    # log(1 - a[i]) for i >= 1
+    if alpha is not None:
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        log_decay = np.full(n - 1, np.log1p(-alpha) if alpha < 1.0 else -np.inf)
+    elif timestamps is None:
+        log_decay = np.full(n - 1, -np.log(2.0) / halflife)
+    else:
+        log_decay = -np.log(2.0) * np.diff(np.asarray(timestamps, dtype=np.float64)) / halflife
+    log_decay = np.maximum(log_decay, -_EWMA_BLOCK_LOG_DECAY)
+    weights = -np.expm1(log_decay)  # a[i]
+
+    result = np.empty(n)
+    result[0] = values[0]
+    cum_log = np.cumsum(log_decay)
+    block_ids = np.floor(-cum_log / _EWMA_BLOCK_LOG_DECAY).astype(np.int64)
+    block_starts = np.flatnonzero(np.diff(block_ids, prepend=-1)) + 1
+    block_ends = np.append(block_starts[1:], n)
+
+    for start, stop in zip(block_starts, block_ends):
+        # Within the block, y[i] = P[i] * (y[start-1] + sum_{j<=i} a[j] x[j] / P[j])
+        # with P the running decay product since start-1
+        block_log = cum_log[start - 1:stop - 1] - (cum_log[start - 2] if start > 1 else 0.0)
+        decay = np.exp(block_log)
+        contrib = np.cumsum(weights[start - 1:stop - 1] * values[start:stop] / decay)
+        result[start:stop] = decay * (result[start - 1] + contrib)
+    return result
@@ -0,0 +1,125 @@
+"""
+Per-run lookup index for RunV2.
+
+Built once per run and shared by the preprocess_v2 stages, so value lookups
+cost a dict probe instead of a scan over specimens and missingness records:
+- (specimen_type, variable) -> value, with the same first-present-specimen
+  semantics as the per-module lookup helpers it replaces
+- presence bitsets over the run's variable vocabulary, per specimen and per
+  specimen type
+- non-lab inputs flattened to dot paths ("vitals_physiology.hrv")
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from app.models.run_v2 import RunV2, SpecimenTypeEnum
+
+
+def _is_present(missingness_entry: Any) -> bool:
+    """A missingness entry without is_missing counts as missing."""
+    return not (missingness_entry.is_missing if hasattr(missingness_entry, 'is_missing') else True)
+
+
+def _flatten(obj: Any, prefix: str, out: Dict[str, Any]):
+    """Flatten nested models/dicts into dot paths; lists and scalars are leaves."""
+    if isinstance(obj, BaseModel):
+        items = ((name, getattr(obj, name, None)) for name in type(obj).model_fields)
+    elif isinstance(obj, dict):
+        items = obj.items()
+    else:
+        out[prefix] = obj
+        return
+
+    if prefix:
+        out[prefix] = obj
+    for key, value in items:
+        path = f"{prefix}.{key}" if prefix else str(key)
+        _flatten(value, path, out)
+
+
+class RunV2Index:
+    """
+    Lookup index over one RunV2.
+
+    The index snapshots the run at construction; rebuild it if the run's
+    specimens or non-lab inputs change.
+    """
+
+    def __init__(self, run_v2: RunV2):
+        self.run_v2 = run_v2
+
+        # Variable vocabulary: bit i of a presence mask is variables[i]
+        self.variables: List[str] = []
+        self.variable_bits: Dict[str, int] = {}
+
+        self.specimen_presence: List[int] = []
+        self.type_presence: Dict[SpecimenTypeEnum, int] = {}
+        self._values: Dict[Tuple[SpecimenTypeEnum, str], Any] = {}
+
+        for specimen in run_v2.specimens:
+            mask = 0
+            for var_name, missingness_entry in specimen.missingness.items():
+                bit = self._bit(var_name)
+                if _is_present(missingness_entry):
+                    mask |= bit
+                    # First specimen of the type reporting the variable wins
+                    self._values.setdefault(
+                        (specimen.specimen_type, var_name), specimen.raw_values.get(var_name)
+                    )
+            self.specimen_presence.append(mask)
+            self.type_presence[specimen.specimen_type] = self.type_presence.get(specimen.specimen_type, 0) | mask
+
+        self.nonlab: Dict[str, Any] = {}
+        _flatten(run_v2.non_lab_inputs, "", self.nonlab)
+
+    def _bit(self, var_name: str) -> int:
+        bit = self.variable_bits.get(var_name)
+        if bit is None:
+            bit = 1 << len(self.variables)
+            self.variable_bits[var_name] = bit
+            self.variables.append(var_name)
+        return bit
+
+    @staticmethod
+    def _specimen_type(specimen_type: Union[SpecimenTypeEnum, str]) -> Optional[SpecimenTypeEnum]:
+        if isinstance(specimen_type, SpecimenTypeEnum):
+            return specimen_type
+        try:
+            return SpecimenTypeEnum(specimen_type)
+        except ValueError:
+            return None
+
+    def get_value(self, specimen_type: Union[SpecimenTypeEnum, str], variable_name: str) -> Optional[float]:
+        """
+        Value of a variable from the first specimen of the given type that
+        reports it present, or None.
+        """
+        val = self._values.get((self._specimen_type(specimen_type), variable_name))
+        return float(val) if val is not None else None
+
+    def has(self, specimen_type: Union[SpecimenTypeEnum, str], variable_name: str) -> bool:
+        """Whether any specimen of the type reports the variable present."""
+        bit = self.variable_bits.get(variable_name, 0)
+        return bool(self.type_presence.get(self._specimen_type(specimen_type), 0) & bit)
+
+    def mask_for(self, variable_names: Iterable[str]) -> int:
+        """Presence mask covering the given variables (unknown names are ignored)."""
+        mask = 0
+        for var_name in variable_names:
+            mask |= self.variable_bits.get(var_name, 0)
+        return mask
+
+    def variables_in(self, mask: int) -> List[str]:
+        """Variable names whose bits are set in a mask."""
+        return [var_name for var_name in self.variables if mask & self.variable_bits[var_name]]
+
+    def get_nonlab_raw(self, path: str) -> Any:
+        """Non-lab input at a dot path (e.g. "demographics.age"), or None."""
+        return self.nonlab.get(path)
+
+    def get_nonlab(self, path: str) -> Optional[float]:
+        """Numeric non-lab input at a dot path, or None."""
+        val = self.nonlab.get(path)
+        return float(val) if val is not None else None
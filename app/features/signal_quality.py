@@ -0,0 +1,387 @@
+"""
+Signal quality measured from ISF stream data.
+
+Replaces the self-reported dropout / noise / drift scores of a submission
+with values computed from the readings themselves:
+- Dropout: gaps against the stream's expected cadence (its median
+  sampling interval), counted as the readings the gaps should have held.
+- Noise: high-frequency variance from second differences over regular
+  steps (var(d2) = 6 * var(noise) for white noise on a smooth signal),
+  as a share of the stream's total variance.
+- Drift: trend of sensor-minus-lab residuals at paired blood-lab anchors.
+- Compression artifacts: abrupt, short dips well below the local
+  (centered median) baseline that recover just as abruptly, the signature
+  of pressure on the sensor rather than physiology.
+
+Everything is array arithmetic over the stream. The state kept per stream
+is running sums plus a short tail of recent readings (the context the
+artifact detector needs), so appended readings are folded in without
+rescanning the stream. Artifact runs are settled once readings cover
+their full detection window; runs near the end count as pending until then.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.features.rolling import rolling_quantile
+from app.features.stream_cache import (
+    cached_stream_derived,
+    get_stream_derived,
+    load_stream_series,
+    parse_stream_timestamps,
+    set_stream_derived,
+)
+from app.models.part_a_models import ISFAnalyteStream, SpecimenAnalyte, SpecimenUpload
+
+# Cache key and version for persisted per-stream state
+SIGNAL_QUALITY_KIND = "signal_quality"
+SIGNAL_QUALITY_VERSION = 1
+
+# An interval longer than this many cadences is a gap
+GAP_FACTOR = 1.5
+
+# Compression artifacts: baseline is the median over +/- the half window; a
+# dip must be deeper than both thresholds and last at most ARTIFACT_MAX_S
+ARTIFACT_HALF_WINDOW_S = 3600.0
+ARTIFACT_MAX_S = 2700.0
+ARTIFACT_MIN_DROP = 0.2  # Fraction of the baseline
+ARTIFACT_NOISE_SDS = 4.0
+ARTIFACT_ABRUPT = 0.5  # Onset and recovery steps cover this share of the dip
+
+# Lab anchors pair with the mean ISF reading within this distance
+ANCHOR_TOLERANCE_S = 900.0
+# Drift score: share of the lab level the sensor would drift over a wear period
+DRIFT_WEAR_DAYS = 14.0
+DRIFT_MIN_SPAN_S = 86400.0
+
+Anchors = List[Tuple[float, float]]
+
+
+def _centered_median(timestamps: np.ndarray, values: np.ndarray, half_window: float) -> np.ndarray:
+    """Median over [t - half_window, t + half_window] (via trailing windows)."""
+    trailing = rolling_quantile(values, 2.0 * half_window, 0.5, timestamps)
+    window_end = np.searchsorted(timestamps, timestamps + half_window, side="right") - 1
+    return trailing[window_end]
+
+
+def compression_artifacts(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    cadence_s: float,
+    noise_sd: float = 0.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compression-artifact runs in a time-sorted series.
+
+    A run is a stretch of readings more than max(ARTIFACT_MIN_DROP of the
+    baseline, ARTIFACT_NOISE_SDS noise SDs) below the centered median,
+    bounded by regularly sampled readings on both sides, no longer than
+    ARTIFACT_MAX_S, entered and left in single steps covering at least
+    ARTIFACT_ABRUPT of its depth.
+
+    Returns:
+        (start timestamps, reading counts) of the runs
+    """
+    n = len(values)
+    if n < 3:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    baseline = _centered_median(timestamps, values, ARTIFACT_HALF_WINDOW_S)
+    depth = baseline - values
+    candidate = depth > np.maximum(ARTIFACT_NOISE_SDS * noise_sd, ARTIFACT_MIN_DROP * np.abs(baseline))
+
+    edges = np.diff(np.concatenate(([0], candidate.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    bounded = (starts > 0) & (ends < n)
+    starts, ends = starts[bounded], ends[bounded]
+    if len(starts) == 0:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+
+    peak = np.maximum.reduceat(depth, np.column_stack((starts, ends)).ravel())[::2]
+    onset = values[starts - 1] - values[starts]
+    recovery = values[ends] - values[ends - 1]
+    regular = GAP_FACTOR * cadence_s
+    keep = (
+        (timestamps[ends - 1] - timestamps[starts] <= ARTIFACT_MAX_S)
+        & (onset >= ARTIFACT_ABRUPT * peak)
+        & (recovery >= ARTIFACT_ABRUPT * peak)
+        & (timestamps[starts] - timestamps[starts - 1] <= regular)
+        & (timestamps[ends] - timestamps[ends - 1] <= regular)
+    )
+    return timestamps[starts][keep], (ends - starts)[keep]
+
+
+def _window_means(timestamps: np.ndarray, values: np.ndarray, centers: np.ndarray, tolerance: float) -> np.ndarray:
+    """Mean value within +/- tolerance of each center (NaN when empty)."""
+    lo = np.searchsorted(timestamps, centers - tolerance, side="left")
+    hi = np.searchsorted(timestamps, centers + tolerance, side="right")
+    prefix = np.concatenate(([0.0], np.cumsum(values)))
+    counts = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, (prefix[hi] - prefix[lo]) / counts, np.nan)
+
+
+@dataclass
+class SignalQualityState:
+    """Persisted per-stream signal-quality statistics."""
+    cadence_s: float
+    first_ts: float
+    last_ts: float
+    shift: float  # Values are summed relative to the first value
+    n: int = 0
+    value_sum: float = 0.0
+    value_sq: float = 0.0
+    gap_count: int = 0
+    missing_count: int = 0
+    longest_gap_s: float = 0.0
+    n_d2: int = 0
+    d2_sq: float = 0.0
+    settled_ts: float = 0.0  # Artifact runs starting up to here are final
+    artifact_episodes: int = 0
+    artifact_readings: int = 0
+    tail_ts: List[float] = field(default_factory=list)
+    tail_values: List[float] = field(default_factory=list)
+    anchors: List[List[Optional[float]]] = field(default_factory=list)  # [ts, lab, ISF mean or None]
+    summary: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def noise_var(self) -> float:
+        return self.d2_sq / (6.0 * self.n_d2) if self.n_d2 else 0.0
+
+    def absorb(self, timestamps: np.ndarray, values: np.ndarray) -> "SignalQualityState":
+        """Fold readings that follow last_ts into the state and refresh the summary."""
+        k = len(self.tail_ts)
+        ts = np.concatenate((self.tail_ts, timestamps))
+        vals = np.concatenate((self.tail_values, values))
+        regular = GAP_FACTOR * self.cadence_s
+
+        # Dropout over the intervals ending at new readings
+        steps = np.diff(ts[max(k - 1, 0):])
+        gaps = steps[steps > regular]
+        self.gap_count += len(gaps)
+        self.missing_count += int(np.maximum(np.rint(gaps / self.cadence_s) - 1, 1).sum())
+        self.longest_gap_s = max(self.longest_gap_s, float(gaps.max()) if len(gaps) else 0.0)
+
+        # Noise from second differences over two regular steps
+        segment_ts, segment_vals = ts[max(k - 2, 0):], vals[max(k - 2, 0):]
+        step_ok = np.diff(segment_ts) <= regular
+        d2 = np.diff(segment_vals, 2)[step_ok[1:] & step_ok[:-1]]
+        self.n_d2 += len(d2)
+        self.d2_sq += float(np.dot(d2, d2))
+
+        centered = values - self.shift
+        self.n += len(values)
+        self.value_sum += float(centered.sum())
+        self.value_sq += float(np.dot(centered, centered))
+        self.last_ts = float(ts[-1])
+
+        # Artifact runs: settle those whose detection window is now complete
+        run_starts, run_lengths = compression_artifacts(ts, vals, self.cadence_s, float(np.sqrt(self.noise_var)))
+        horizon = self.last_ts - ARTIFACT_MAX_S - ARTIFACT_HALF_WINDOW_S
+        new = run_starts > self.settled_ts
+        settle = new & (run_starts <= horizon)
+        self.artifact_episodes += int(settle.sum())
+        self.artifact_readings += int(run_lengths[settle].sum())
+        self.settled_ts = max(self.settled_ts, horizon)
+        pending = new & ~settle
+
+        self._pair_anchors(ts, vals)
+
+        keep = ts >= self.settled_ts - 2.0 * ARTIFACT_HALF_WINDOW_S
+        keep[-2:] = True
+        self.tail_ts = ts[keep].tolist()
+        self.tail_values = vals[keep].tolist()
+        self.summary = self._summarize(int(pending.sum()), int(run_lengths[pending].sum()))
+        return self
+
+    def _pair_anchors(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        open_anchors = [anchor for anchor in self.anchors if anchor[2] is None]
+        if not open_anchors:
+            return
+        centers = np.array([anchor[0] for anchor in open_anchors])
+        means = _window_means(timestamps, values, centers, ANCHOR_TOLERANCE_S)
+        for anchor, mean in zip(open_anchors, means):
+            if np.isfinite(mean):
+                anchor[2] = float(mean)
+
+    def _summarize(self, pending_episodes: int, pending_readings: int) -> Dict[str, Any]:
+        mean = self.value_sum / self.n
+        value_var = max(self.value_sq / self.n - mean ** 2, 0.0)
+        noise_var = self.noise_var
+        noise_score = min(noise_var / value_var, 1.0) if value_var > 0 else 0.0
+        dropout_pct = 100.0 * self.missing_count / (self.n + self.missing_count)
+        artifact_pct = 100.0 * (self.artifact_readings + pending_readings) / self.n
+
+        paired = np.array([anchor for anchor in self.anchors if anchor[2] is not None], dtype=np.float64)
+        bias = drift_per_day = drift_score = None
+        if len(paired):
+            residuals = paired[:, 2] - paired[:, 1]
+            bias = float(residuals.mean())
+            if len(paired) > 1 and np.ptp(paired[:, 0]) >= DRIFT_MIN_SPAN_S:
+                drift_per_day = float(np.polyfit(paired[:, 0] / 86400.0, residuals, 1)[0])
+                lab_scale = float(np.abs(paired[:, 1]).mean())
+                drift_score = min(abs(drift_per_day) * DRIFT_WEAR_DAYS / lab_scale, 1.0) if lab_scale > 0 else None
+
+        quality = (1.0 - dropout_pct / 100.0) * (1.0 - noise_score) * (1.0 - artifact_pct / 100.0)
+        if drift_score is not None:
+            quality *= 1.0 - drift_score
+        return {
+            "n": self.n,
+            "cadence_s": self.cadence_s,
+            "dropout_pct": dropout_pct,
+            "gap_count": self.gap_count,
+            "longest_gap_s": self.longest_gap_s,
+            "noise_sd": float(np.sqrt(noise_var)),
+            "noise_score": noise_score,
+            "artifact_episodes": self.artifact_episodes + pending_episodes,
+            "artifact_pct": artifact_pct,
+            "anchor_count": len(paired),
+            "lab_bias": bias,
+            "drift_per_day": drift_per_day,
+            "sensor_drift_score": drift_score,
+            "quality_score": quality,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SignalQualityState":
+        return cls(**data)
+
+
+def initial_quality_state(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    anchors: Optional[Anchors] = None
+) -> Optional[SignalQualityState]:
+    """SignalQualityState for a time-sorted series; None under two readings."""
+    if len(values) < 2:
+        return None
+    cadence = float(np.median(np.diff(timestamps)))
+    if cadence <= 0:
+        return None
+    state = SignalQualityState(
+        cadence_s=cadence,
+        first_ts=float(timestamps[0]),
+        last_ts=float(timestamps[0]),
+        shift=float(values[0]),
+        settled_ts=float(timestamps[0]) - 1.0,
+        anchors=[[float(ts), float(value), None] for ts, value in (anchors or [])],
+    )
+    return state.absorb(timestamps, values)
+
+
+def advance_quality_state(
+    state: SignalQualityState,
+    timestamps: np.ndarray,
+    values: np.ndarray
+) -> Optional[SignalQualityState]:
+    """
+    Fold appended readings into the state. None when they do not all come
+    after it, so the caller recomputes from scratch.
+    """
+    if len(values) == 0:
+        return state
+    if timestamps[0] < state.last_ts:
+        return None
+    return state.absorb(timestamps, values)
+
+
+def lab_anchors(
+    db: Session,
+    submission_id: int,
+    analyte_name: str,
+    unit: Optional[str] = None
+) -> Anchors:
+    """
+    Blood-lab (timestamp, value) anchors for an analyte in a submission,
+    time-sorted; labs in a different unit than `unit` are skipped.
+    """
+    rows = db.query(SpecimenAnalyte, SpecimenUpload).join(
+        SpecimenUpload, SpecimenAnalyte.upload_id == SpecimenUpload.id
+    ).filter(
+        SpecimenUpload.submission_id == submission_id,
+        SpecimenUpload.modality == "blood",
+        SpecimenAnalyte.name == analyte_name,
+        SpecimenAnalyte.value.isnot(None)
+    ).all()
+
+    def _norm(u: Optional[str]) -> str:
+        return (u or "").replace(" ", "").lower()
+
+    anchors = []
+    for analyte, upload in rows:
+        collected = analyte.timestamp or upload.collection_datetime
+        if collected is None or (unit and analyte.unit and _norm(analyte.unit) != _norm(unit)):
+            continue
+        anchors.append((float(parse_stream_timestamps([collected])[0]), float(analyte.value)))
+    return sorted(anchors)
+
+
+def _anchor_keys(payload: Optional[Dict[str, Any]]) -> List[Tuple[float, float]]:
+    return [(anchor[0], anchor[1]) for anchor in (payload or {}).get("anchors", [])]
+
+
+def _compute_stream_quality(stream: ISFAnalyteStream, anchors: Optional[Anchors]) -> Optional[Dict[str, Any]]:
+    state = initial_quality_state(*load_stream_series(stream), anchors)
+    return state.to_dict() if state else None
+
+
+def _advance_stream_quality(stream: ISFAnalyteStream, payload: Dict[str, Any], start: int) -> Optional[Dict[str, Any]]:
+    timestamps, values = load_stream_series(stream, start)
+    state = advance_quality_state(SignalQualityState.from_dict(payload), timestamps, values)
+    return state.to_dict() if state else None
+
+
+def stream_signal_quality(
+    stream: ISFAnalyteStream,
+    anchors: Optional[Anchors] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Persisted SignalQualityState dict for a stored stream, advanced over
+    appended readings.
+
+    Args:
+        anchors: Lab (timestamp, value) pairs for drift; a different set
+            than the stored one recomputes the state, None keeps the stored
+            anchors
+    """
+    if anchors is None:
+        anchors = [tuple(key) for key in _anchor_keys(cached_stream_derived(stream, SIGNAL_QUALITY_KIND))]
+    payload = get_stream_derived(
+        stream,
+        SIGNAL_QUALITY_KIND,
+        SIGNAL_QUALITY_VERSION,
+        lambda s: _compute_stream_quality(s, anchors),
+        _advance_stream_quality
+    )
+    if payload is not None and _anchor_keys(payload) != [tuple(a) for a in anchors]:
+        payload = set_stream_derived(
+            stream, SIGNAL_QUALITY_KIND, SIGNAL_QUALITY_VERSION, _compute_stream_quality(stream, anchors)
+        )
+    return payload
+
+
+def merged_quality_summary(streams: Sequence[ISFAnalyteStream]) -> Optional[Dict[str, float]]:
+    """
+    Reading-weighted dropout, noise, drift and quality scores across
+    streams (e.g. all glucose streams of a submission); None when no
+    stream has enough readings.
+    """
+    summaries = [payload["summary"] for payload in map(stream_signal_quality, streams) if payload]
+    if not summaries:
+        return None
+    weights = np.array([summary["n"] for summary in summaries], dtype=np.float64)
+    merged = {
+        key: float(np.average([summary[key] for summary in summaries], weights=weights))
+        for key in ("dropout_pct", "noise_score", "artifact_pct", "quality_score")
+    }
+    drift = [(summary["sensor_drift_score"], w) for summary, w in zip(summaries, weights)
+             if summary["sensor_drift_score"] is not None]
+    merged["sensor_drift_score"] = (
+        float(np.average([d for d, _ in drift], weights=[w for _, w in drift])) if drift else None
+    )
+    return merged
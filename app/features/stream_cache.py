@@ -0,0 +1,166 @@
+"""
+Stored ISF streams as arrays (per stream, or a user's history merged per
+analyte), and per-stream derived-result caching.
+
+Derived results (metrics, model state, ...) live in ISFStreamDerivedRecord
+rows keyed by (stream, kind). A cached payload is reused while its version
+and the stream's value count match. When the stream has grown, an optional
+`update` callback folds in just the appended values; otherwise the payload
+is recomputed and the row updated in place. Rows attach through the
+stream's relationship, so they persist with whatever session commits the
+stream (callers commit).
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.features.temporal_series import Series, series_key
+from app.models.part_a_models import ISFAnalyteStream, ISFStreamDerivedRecord, PartASubmission
+
+# History handed to the temporal stage per user (covers the motif search span)
+USER_SERIES_LOOKBACK_S = 90 * 86400.0
+
+
+def parse_stream_timestamps(timestamps: list) -> np.ndarray:
+    """
+    ISO strings (or datetimes) to epoch seconds of their recorded wall-clock
+    time; timezone-aware stamps keep their local time, matching the
+    hour-of-day convention in temporal_series.
+    """
+    parsed = [
+        (datetime.fromisoformat(ts) if isinstance(ts, str) else ts).replace(tzinfo=None)
+        for ts in timestamps
+    ]
+    return np.array(parsed, dtype="datetime64[us]").astype(np.int64) / 1e6
+
+
+def load_stream_series(stream: ISFAnalyteStream, start: int = 0) -> Series:
+    """
+    A stored stream (from stored position `start` on) as time-sorted
+    (timestamps, values) arrays, dropping non-finite values and values
+    without a timestamp.
+    """
+    values = np.asarray((stream.values_json or [])[start:], dtype=np.float64)
+    timestamps = parse_stream_timestamps((stream.timestamps_json or [])[start:])
+    n = min(len(values), len(timestamps))
+    timestamps, values = timestamps[:n], values[:n]
+
+    keep = np.isfinite(values)
+    timestamps, values = timestamps[keep], values[keep]
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], values[order]
+
+
+def load_user_isf_series(
+    db: Session,
+    user_id: int,
+    end: Optional[datetime] = None,
+    lookback_s: float = USER_SERIES_LOOKBACK_S,
+    utc_offset_s: float = 0.0
+) -> Dict[str, Series]:
+    """
+    A user's stored ISF streams merged per analyte across submissions and
+    devices, keyed like build_run_series (e.g. "glucose_isf").
+
+    Only readings within lookback_s before `end` (wall-clock time, default
+    the analyte's latest reading) are kept. Timestamps are shifted back by
+    utc_offset_s so they line up with a run's series (see run_utc_offset_s).
+    """
+    streams = db.query(ISFAnalyteStream).join(PartASubmission).filter(
+        PartASubmission.user_id == user_id
+    ).all()
+    grouped: Dict[str, List[Series]] = {}
+    for stream in streams:
+        grouped.setdefault(series_key(stream.name, "ISF"), []).append(load_stream_series(stream))
+
+    stop = None if end is None else float(parse_stream_timestamps([end])[0])
+    series = {}
+    for key, parts in grouped.items():
+        timestamps = np.concatenate([ts for ts, _ in parts])
+        values = np.concatenate([vals for _, vals in parts])
+        if len(timestamps) == 0:
+            continue
+        last = timestamps.max() if stop is None else stop
+        keep = (timestamps >= last - lookback_s) & (timestamps <= last)
+        order = np.argsort(timestamps[keep], kind="stable")
+        if len(order):
+            series[key] = (timestamps[keep][order] - utc_offset_s, values[keep][order])
+    return series
+
+
+def stream_value_count(stream: ISFAnalyteStream) -> int:
+    """
+    Stored reading count; taken from the SQL-side count when the readings
+    were deferred and not loaded.
+    """
+    if "values_json" in inspect(stream).unloaded and stream.value_count is not None:
+        return stream.value_count
+    return len(stream.values_json or [])
+
+
+def _derived_record(stream: ISFAnalyteStream, kind: str) -> Optional[ISFStreamDerivedRecord]:
+    return next((r for r in stream.derived_records if r.kind == kind), None)
+
+
+def cached_stream_derived(stream: ISFAnalyteStream, kind: str) -> Optional[Dict[str, Any]]:
+    """The stored `kind` payload as is (possibly stale), without computing."""
+    record = _derived_record(stream, kind)
+    return record.payload_json if record is not None else None
+
+
+def set_stream_derived(
+    stream: ISFAnalyteStream,
+    kind: str,
+    version: int,
+    payload: Optional[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Store a `kind` payload for the stream's current values."""
+    record = _derived_record(stream, kind)
+    if record is None:
+        record = ISFStreamDerivedRecord(kind=kind)
+        stream.derived_records.append(record)
+    record.version = version
+    record.source_value_count = stream_value_count(stream)
+    record.payload_json = payload
+    return payload
+
+
+def fresh_stream_derived(stream: ISFAnalyteStream, kind: str, version: int) -> Optional[Dict[str, Any]]:
+    """The stored `kind` payload if it is current, without computing."""
+    record = _derived_record(stream, kind)
+    if record is None or record.version != version or record.payload_json is None:
+        return None
+    return record.payload_json if record.source_value_count == stream_value_count(stream) else None
+
+
+def get_stream_derived(
+    stream: ISFAnalyteStream,
+    kind: str,
+    version: int,
+    compute: Callable[[ISFAnalyteStream], Optional[Dict[str, Any]]],
+    update: Optional[Callable[[ISFAnalyteStream, Dict[str, Any], int], Optional[Dict[str, Any]]]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Cached `kind` payload for a stream, recomputed with `compute(stream)`
+    when missing or stale.
+
+    Args:
+        update: Optional `update(stream, cached_payload, cached_count)` that
+            extends the cached payload with the values stored after
+            position cached_count; returning None forces a recompute
+    """
+    value_count = stream_value_count(stream)
+    record = _derived_record(stream, kind)
+    if record is not None and record.version == version and record.payload_json is not None:
+        if record.source_value_count == value_count:
+            return record.payload_json
+        if update is not None and record.source_value_count < value_count:
+            payload = update(stream, record.payload_json, record.source_value_count)
+            if payload is not None:
+                return set_stream_derived(stream, kind, version, payload)
+
+    return set_stream_derived(stream, kind, version, compute(stream))
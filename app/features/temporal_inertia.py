@@ -11,15 +11,22 @@ Enforces biological continuity by:
 Tightens ranges when stable; widens when jumps occur without plausible cause.
 """
 
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Iterable, Union
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from enum import Enum
+from operator import itemgetter
 import logging
 import math
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_US_PER_DAY = 86400 * 1_000_000
+
 
 class MarkerVelocity(str, Enum):
     """How quickly a marker can physiologically change."""
@@ -115,6 +122,152 @@ class TemporalAssessment:
         }
 
 
+def _to_epoch_us(timestamp: datetime) -> int:
+    """Naive-UTC datetime -> int microseconds since epoch (aware values are converted)."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def _from_epoch_us(epoch_us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(epoch_us))
+
+
+class MarkerHistory:
+    """
+    Time-sorted history for one marker.
+    
+    Stores int64 epoch microseconds and float64 values in parallel arrays
+    with spare capacity, so appends are amortized O(1) (binary-search insert
+    when out of order) and callers never re-sort (timestamp, value) tuples.
+    Among equal timestamps the last inserted sorts last.
+    """
+    
+    __slots__ = ("marker_name", "_epochs", "_values", "_size")
+    
+    def __init__(self, marker_name: str, capacity: int = 16):
+        self.marker_name = marker_name
+        self._epochs = np.empty(max(capacity, 1), dtype=np.int64)
+        self._values = np.empty(max(capacity, 1), dtype=np.float64)
+        self._size = 0
+    
+    @classmethod
+    def from_pairs(
+        cls,
+        marker_name: str,
+        pairs: Iterable[Tuple[datetime, float]]
+    ) -> "MarkerHistory":
+        """Build from (timestamp, value) tuples in any order."""
+        history = cls(marker_name)
+        history.extend(pairs)
+        return history
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def epochs(self) -> np.ndarray:
+        """Sorted epoch microseconds (read-only view)."""
+        view = self._epochs[:self._size]
+        view.flags.writeable = False
+        return view
+    
+    @property
+    def values(self) -> np.ndarray:
+        """Values aligned with epochs (read-only view)."""
+        view = self._values[:self._size]
+        view.flags.writeable = False
+        return view
+    
+    def _reserve(self, needed: int):
+        capacity = len(self._epochs)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        epochs = np.empty(capacity, dtype=np.int64)
+        values = np.empty(capacity, dtype=np.float64)
+        epochs[:self._size] = self._epochs[:self._size]
+        values[:self._size] = self._values[:self._size]
+        self._epochs, self._values = epochs, values
+    
+    def append(self, timestamp: datetime, value: float):
+        """Insert one observation, keeping time order."""
+        epoch = _to_epoch_us(timestamp)
+        self._reserve(self._size + 1)
+        n = self._size
+        if n == 0 or epoch >= self._epochs[n - 1]:
+            position = n
+        else:
+            position = int(np.searchsorted(self._epochs[:n], epoch, side="right"))
+            self._epochs[position + 1:n + 1] = self._epochs[position:n]
+            self._values[position + 1:n + 1] = self._values[position:n]
+        self._epochs[position] = epoch
+        self._values[position] = value
+        self._size = n + 1
+    
+    def extend(self, pairs: Iterable[Tuple[datetime, float]]):
+        """Insert many observations with one merge."""
+        pairs = list(pairs)
+        if not pairs:
+            return
+        epochs = np.fromiter((_to_epoch_us(t) for t, _ in pairs), dtype=np.int64, count=len(pairs))
+        values = np.fromiter((v for _, v in pairs), dtype=np.float64, count=len(pairs))
+        
+        n = self._size
+        self._reserve(n + len(pairs))
+        self._epochs[n:n + len(pairs)] = epochs
+        self._values[n:n + len(pairs)] = values
+        self._size = n + len(pairs)
+        
+        merged = self._epochs[:self._size]
+        if (n == 0 or epochs[0] >= self._epochs[n - 1]) and np.all(np.diff(epochs) >= 0):
+            return  # Already in order; nothing to merge
+        order = np.argsort(merged, kind="stable")
+        self._epochs[:self._size] = merged[order]
+        self._values[:self._size] = self._values[:self._size][order]
+    
+    def latest(self) -> Tuple[datetime, float]:
+        """Most recent (timestamp, value)."""
+        if self._size == 0:
+            raise IndexError(f"No history for {self.marker_name}")
+        return _from_epoch_us(self._epochs[self._size - 1]), float(self._values[self._size - 1])
+    
+    @property
+    def span_days(self) -> float:
+        if self._size < 2:
+            return 0.0
+        return float(self._epochs[self._size - 1] - self._epochs[0]) / _US_PER_DAY
+    
+    def to_pairs(self) -> List[Tuple[datetime, float]]:
+        """Time-ordered (timestamp, value) tuples."""
+        return [
+            (_from_epoch_us(e), float(v))
+            for e, v in zip(self._epochs[:self._size], self._values[:self._size])
+        ]
+
+
+HistoryInput = Union[MarkerHistory, List[Tuple[datetime, float]]]
+
+
+def _latest(history: HistoryInput) -> Tuple[datetime, float]:
+    """Most recent (timestamp, value); for tuples the first of tied timestamps."""
+    if isinstance(history, MarkerHistory):
+        return history.latest()
+    return max(history, key=itemgetter(0))
+
+
+def build_marker_histories(
+    historical_values: Dict[str, HistoryInput]
+) -> Dict[str, MarkerHistory]:
+    """Convert marker -> [(timestamp, value), ...] into MarkerHistory objects (once)."""
+    return {
+        marker: history if isinstance(history, MarkerHistory)
+        else MarkerHistory.from_pairs(marker, history)
+        for marker, history in historical_values.items()
+    }
+
+
 class TemporalInertiaEngine:
     """
     Enforces biological continuity through temporal constraints.
@@ -233,7 +386,7 @@ class TemporalInertiaEngine:
     def assess_temporal_coherence(
         self,
         current_estimates: Dict[str, Dict[str, Any]],
-        historical_values: Dict[str, List[Tuple[datetime, float]]],
+        historical_values: Dict[str, HistoryInput],
         events: Optional[List[TemporalEvent]] = None,
         current_time: Optional[datetime] = None
     ) -> TemporalAssessment:
@@ -242,7 +395,8 @@ class TemporalInertiaEngine:
         
         Args:
             current_estimates: Current estimated values (marker -> {center, range, ...})
-            historical_values: Historical measurements (marker -> [(timestamp, value), ...])
+            historical_values: Historical measurements, as MarkerHistory or
+                (marker -> [(timestamp, value), ...])
             events: List of events that may justify jumps
             current_time: Current timestamp (default: now)
         
@@ -257,39 +411,42 @@ class TemporalInertiaEngine:
         confidence_adjustments = {}
         range_adjustments = {}
         
+        # Markers with a current value and history, in estimate order
+        assessed: List[Tuple[str, float, HistoryInput]] = []
         for marker, estimate in current_estimates.items():
             # Get current estimated value
             current_value = estimate.get("center") or estimate.get("value")
             if current_value is None:
                 continue
             
-            # Get historical data
-            history = historical_values.get(marker, [])
-            if not history:
+            history = historical_values.get(marker)
+            if history is None or len(history) == 0:
                 # No history, can't assess temporal coherence
                 stability_scores[marker] = 0.5  # Neutral
                 continue
             
-            # Get most recent historical value
-            history_sorted = sorted(history, key=lambda x: x[0], reverse=True)
-            most_recent_time, most_recent_value = history_sorted[0]
-            
-            time_delta = current_time - most_recent_time
-            days_elapsed = time_delta.total_seconds() / 86400.0
-            
+            assessed.append((marker, current_value, history))
+        
+        latest = [_latest(history) for _, _, history in assessed]
+        flagged = self._screen_drift(assessed, latest, current_time)
+        
+        for (marker, current_value, history), (_, previous_value), (days_elapsed, exceeded) in zip(
+            assessed, latest, flagged
+        ):
             if days_elapsed < 0.01:  # Less than 15 minutes
                 # Too recent, skip
                 continue
             
-            # Check drift
-            violation = self._check_drift_violation(
-                marker=marker,
-                previous_value=most_recent_value,
-                current_value=current_value,
-                days_elapsed=days_elapsed,
-                events=events,
-                current_time=current_time
-            )
+            violation = None
+            if exceeded:
+                violation = self._check_drift_violation(
+                    marker=marker,
+                    previous_value=previous_value,
+                    current_value=current_value,
+                    days_elapsed=days_elapsed,
+                    events=events,
+                    current_time=current_time
+                )
             
             if violation:
                 violations.append(violation)
@@ -317,6 +474,52 @@ class TemporalInertiaEngine:
             range_adjustments=range_adjustments
         )
     
+    def _screen_drift(
+        self,
+        assessed: List[Tuple[str, float, HistoryInput]],
+        latest: List[Tuple[datetime, float]],
+        current_time: datetime
+    ) -> List[Tuple[float, bool]]:
+        """
+        Vectorized drift-limit check over all markers at once.
+        
+        Returns:
+            (days_elapsed, limit_exceeded) per assessed marker. Only exceeded
+            markers go through _check_drift_violation (events, severity, text).
+        """
+        if not assessed:
+            return []
+        
+        now = _to_epoch_us(current_time)
+        count = len(assessed)
+        last_epochs = np.empty(count, dtype=np.int64)
+        previous = np.empty(count, dtype=np.float64)
+        current = np.empty(count, dtype=np.float64)
+        fraction_limits = np.full(count, np.nan)
+        absolute_limits = np.full(count, np.inf)
+        
+        for i, ((marker, current_value, _), (last_time, last_value)) in enumerate(zip(assessed, latest)):
+            last_epochs[i] = _to_epoch_us(last_time)
+            previous[i] = last_value
+            current[i] = current_value
+            kinetics = self.marker_kinetics.get(marker)
+            if kinetics:
+                fraction_limits[i] = kinetics.max_daily_drift_fraction
+                if kinetics.max_daily_drift_absolute:
+                    absolute_limits[i] = kinetics.max_daily_drift_absolute
+        
+        days_elapsed = (now - last_epochs) / _US_PER_DAY
+        absolute_change = np.abs(current - previous)
+        relative_change = absolute_change / np.maximum(np.abs(previous), 1e-6)
+        
+        # Markers without kinetics (NaN limits) never compare as exceeded
+        with np.errstate(invalid="ignore"):
+            exceeded = (relative_change > fraction_limits * days_elapsed) | (
+                absolute_change > absolute_limits * days_elapsed
+            )
+        
+        return list(zip(days_elapsed.tolist(), exceeded.tolist()))
+    
     def _check_drift_violation(
         self,
         marker: str,
@@ -414,7 +617,7 @@ class TemporalInertiaEngine:
     def _compute_stability_score(
         self,
         marker: str,
-        history: List[Tuple[datetime, float]]
+        history: HistoryInput
     ) -> float:
         """
         Compute stability score from historical values.
@@ -431,21 +634,26 @@ class TemporalInertiaEngine:
             return 0.5
         
         # Need minimum baseline period
-        history_sorted = sorted(history, key=lambda x: x[0])
-        time_span = (history_sorted[-1][0] - history_sorted[0][0]).total_seconds() / 86400.0
+        if isinstance(history, MarkerHistory):
+            time_span = history.span_days
+            values = history.values
+        else:
+            # Plain tuples: min/max instead of sorting
+            time_span = (
+                max(history, key=itemgetter(0))[0] - min(history, key=itemgetter(0))[0]
+            ).total_seconds() / 86400.0
+            values = np.fromiter((v for _, v in history), dtype=np.float64, count=len(history))
         
         if time_span < kinetics.min_baseline_days:
             return 0.5  # Not enough data
         
         # Compute coefficient of variation
-        values = [v for _, v in history]
-        mean_val = sum(values) / len(values)
+        mean_val = float(values.mean())
         
         if mean_val == 0:
             return 0.5
         
-        variance = sum((v - mean_val) ** 2 for v in values) / len(values)
-        std_dev = math.sqrt(variance)
+        std_dev = float(values.std())
         cv = std_dev / abs(mean_val)
         
         # Compare to stability threshold
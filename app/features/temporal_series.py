@@ -0,0 +1,330 @@
+"""
+Time-series kernels for the temporal feature stage.
+
+Rolling volatility uses the time-window kernels in app.features.rolling,
+so a 90-day 5-minute stream costs O(n) per window.
+Motif search uses a z-normalized matrix profile computed in row blocks
+with matrix products over sliding-window views, on a coarser regular grid
+(15 minutes by default) so hours-long motifs stay affordable.
+
+Series are passed as (timestamps, values) arrays with timestamps in epoch
+seconds; naive datetimes are read as UTC. Hour-of-day is taken in local
+time by shifting epoch seconds by the run's UTC offset (run_utc_offset_s),
+which is zero for naive datetimes, so it is the wall-clock hour either way.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.features.rolling import rolling_std
+from app.models.run_v2 import RunV2
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+# Trailing windows for rolling volatility (seconds)
+VOLATILITY_WINDOWS_S = {"5m": 300.0, "30m": 1800.0, "2h": 7200.0}
+
+# Motif search defaults
+MOTIF_GRID_STEP_S = 900.0
+MOTIF_WINDOW_S = 4 * 3600.0
+MP_BLOCK_ROWS = 512
+# Motif search covers only the most recent span, bounding the O(T^2) profile
+MOTIF_MAX_SPAN_S = 30 * 86400.0
+
+
+def _epoch_seconds(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def run_utc_offset_s(run_v2: RunV2) -> float:
+    """
+    UTC offset (seconds) of the run's local time, from its most recent
+    tz-aware specimen timestamp; 0 when all timestamps are naive.
+    """
+    aware = [s.collected_at for s in run_v2.specimens if s.collected_at.tzinfo is not None]
+    if not aware:
+        return 0.0
+    return max(aware).utcoffset().total_seconds()
+
+
+def series_key(var_name: str, specimen_type: Any) -> str:
+    """Stream key for a variable in a specimen type, e.g. "glucose_isf"."""
+    type_str = specimen_type.value if hasattr(specimen_type, 'value') else str(specimen_type)
+    return f"{var_name}_{type_str.lower()}"
+
+
+def build_run_series(run_v2: RunV2) -> Dict[str, Series]:
+    """
+    Gather each (variable, specimen type) reported across a run's specimens
+    into a time-ordered series.
+
+    Only values marked present and convertible to float are included.
+    """
+    times: Dict[str, List[float]] = {}
+    values: Dict[str, List[float]] = {}
+    for specimen in run_v2.specimens:
+        collected_at = _epoch_seconds(specimen.collected_at)
+        for var_name, missingness_entry in specimen.missingness.items():
+            if missingness_entry.is_missing:
+                continue
+            try:
+                value = float(specimen.raw_values.get(var_name))
+            except (TypeError, ValueError):
+                continue
+            key = series_key(var_name, specimen.specimen_type)
+            times.setdefault(key, []).append(collected_at)
+            values.setdefault(key, []).append(value)
+
+    series = {}
+    for key, key_times in times.items():
+        ts = np.asarray(key_times, dtype=np.float64)
+        order = np.argsort(ts, kind="stable")
+        series[key] = (ts[order], np.asarray(values[key], dtype=np.float64)[order])
+    return series
+
+
+def rolling_volatility(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    windows: Dict[str, float] = VOLATILITY_WINDOWS_S
+) -> Dict[str, Optional[float]]:
+    """
+    Mean trailing-window std per window label; None when no window holds
+    two or more points.
+    """
+    volatility = {}
+    for label, window_s in windows.items():
+        std = rolling_std(values, window_s, timestamps, min_periods=2)
+        valid = std[~np.isnan(std)]
+        volatility[label] = float(valid.mean()) if len(valid) else None
+    return volatility
+
+
+def trend_direction(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    window_s: float = 7200.0,
+    tolerance: Optional[float] = None
+) -> str:
+    """
+    "up" / "down" / "stable" from the least-squares slope over the last
+    window_s seconds.
+
+    The fitted change across the window must exceed `tolerance` (default:
+    the residual std of the fit) to count as a trend.
+    """
+    if len(values) < 2:
+        return "stable"
+    in_window = timestamps > timestamps[-1] - window_s
+    t = timestamps[in_window]
+    y = values[in_window]
+    if len(t) < 2 or t[-1] == t[0]:
+        return "stable"
+
+    t_centered = t - t.mean()
+    slope = float(np.dot(t_centered, y - y.mean()) / np.dot(t_centered, t_centered))
+    change = slope * (t[-1] - t[0])
+    if tolerance is None:
+        residuals = y - y.mean() - slope * t_centered
+        tolerance = float(residuals.std())
+
+    if change > tolerance:
+        return "up"
+    if change < -tolerance:
+        return "down"
+    return "stable"
+
+
+def resample_mean(timestamps: np.ndarray, values: np.ndarray, step_s: float) -> Series:
+    """
+    Bin a series onto a regular grid by mean; empty bins are NaN.
+
+    Returns:
+        (grid_start_timestamps, binned_values)
+    """
+    from app.features.resampling import resample
+
+    resampled = resample(timestamps, values, step_s)
+    return resampled.timestamps, resampled.values
+
+
+def _normalized_windows(values: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Z-normalized sliding windows (n_windows, m) and a validity mask.
+
+    Windows containing NaN or with (near) zero variance are invalid.
+    """
+    windows = sliding_window_view(values, m)
+    mean = windows.mean(axis=1)
+    std = windows.std(axis=1)
+    finite = np.isfinite(values)
+    scale = float(np.abs(values[finite]).max()) if finite.any() else 1.0
+    valid = np.isfinite(mean) & (std > 1e-8 * max(1.0, scale))
+
+    normalized = np.zeros(windows.shape)
+    normalized[valid] = (windows[valid] - mean[valid, None]) / std[valid, None]
+    return normalized, valid
+
+
+def matrix_profile(
+    values: np.ndarray,
+    m: int,
+    exclusion: Optional[int] = None,
+    block_rows: int = MP_BLOCK_ROWS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Self-join matrix profile with z-normalized Euclidean distance.
+
+    Args:
+        values: Regularly sampled series (NaN marks gaps)
+        m: Subsequence length in samples
+        exclusion: Trivial-match half-width (default m // 2)
+        block_rows: Rows of the distance matrix computed per matrix product
+
+    Returns:
+        (profile, profile_index); invalid windows have profile inf, index -1
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_windows = len(values) - m + 1
+    if m < 2 or n_windows < 2:
+        return np.full(max(n_windows, 0), np.inf), np.full(max(n_windows, 0), -1, dtype=np.int64)
+    exclusion = m // 2 if exclusion is None else exclusion
+
+    normalized, valid = _normalized_windows(values, m)
+    profile = np.full(n_windows, np.inf)
+    profile_index = np.full(n_windows, -1, dtype=np.int64)
+    # Distance falls as correlation rises, so search the max correlation in
+    # float32 (3x faster products) with invalid columns pushed to -inf, then
+    # recompute the winning pair's distance in float64
+    normalized32 = normalized.astype(np.float32)
+    column_penalty = np.where(valid, 0.0, -np.inf).astype(np.float32)
+
+    for start in range(0, n_windows, block_rows):
+        stop = min(start + block_rows, n_windows)
+        corr = normalized32[start:stop] @ normalized32.T
+        corr += column_penalty
+        for row in range(start, stop):
+            corr[row - start, max(0, row - exclusion):row + exclusion + 1] = -np.inf
+
+        best = np.argmax(corr, axis=1)
+        found = np.isfinite(corr[np.arange(stop - start), best]) & valid[start:stop]
+        rows = np.arange(start, stop)[found]
+        best_corr = np.einsum("ij,ij->i", normalized[rows], normalized[best[found]]) / m
+        profile[rows] = np.sqrt(2.0 * m * np.maximum(1.0 - best_corr, 0.0))
+        profile_index[rows] = best[found]
+
+    return profile, profile_index
+
+
+@dataclass
+class SeriesMotif:
+    """A recurring subsequence and its non-overlapping occurrences."""
+    start_ts: List[float]  # Occurrence start times (epoch seconds)
+    distance: float  # Matrix-profile distance of the seed pair
+    shape: np.ndarray  # Mean raw-valued occurrence, length m
+    step_s: float
+    hours_of_day: List[int] = field(default_factory=list)
+
+    @property
+    def n_occurrences(self) -> int:
+        return len(self.start_ts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start_ts": self.start_ts,
+            "distance": self.distance,
+            "shape": self.shape.tolist(),
+            "step_s": self.step_s,
+            "hours_of_day": self.hours_of_day,
+            "n_occurrences": self.n_occurrences,
+        }
+
+
+def find_motifs(
+    timestamps: np.ndarray,
+    values: np.ndarray,
+    window_s: float = MOTIF_WINDOW_S,
+    step_s: float = MOTIF_GRID_STEP_S,
+    max_motifs: int = 4,
+    radius_factor: float = 2.0,
+    min_correlation: float = 0.95,
+    utc_offset_s: float = 0.0,
+    max_span_s: Optional[float] = MOTIF_MAX_SPAN_S
+) -> List[SeriesMotif]:
+    """
+    Top recurring motifs of a series.
+
+    The series is mean-binned onto a step_s grid; the lowest matrix-profile
+    pair seeds each motif, occurrences are the windows within
+    radius_factor x the seed distance (widened to at least the distance of
+    min_correlation), and their zones are excluded before the next motif is
+    picked.
+
+    Only the last max_span_s of readings is searched, and the matrix
+    profile is skipped when fewer than two grid windows are fully observed.
+    hours_of_day are local hours for readings at utc_offset_s.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    m = int(round(window_s / step_s))
+    observed = np.isfinite(timestamps) & np.isfinite(values)
+    if m < 2 or np.count_nonzero(observed) < 2:
+        return []
+    timestamps, values = timestamps[observed], values[observed]
+    if max_span_s is not None:
+        recent = timestamps >= timestamps.max() - max_span_s
+        timestamps, values = timestamps[recent], values[recent]
+
+    grid_ts, grid_values = resample_mean(timestamps, values, step_s)
+    # Windows with every bin observed, from a running count of observed bins
+    filled = np.concatenate(([0], np.cumsum(np.isfinite(grid_values))))
+    if len(grid_values) < m or np.count_nonzero(filled[m:] - filled[:-m] == m) < 2:
+        return []
+
+    profile, _ = matrix_profile(grid_values, m)
+    if not np.isfinite(profile).any():
+        return []
+
+    normalized, valid = _normalized_windows(grid_values, m)
+    raw_windows = sliding_window_view(grid_values, m)
+    exclusion = m // 2
+    available = valid & np.isfinite(profile)
+    motifs = []
+
+    while len(motifs) < max_motifs and available.any():
+        seed = int(np.argmin(np.where(available, profile, np.inf)))
+        seed_distance = float(profile[seed])
+        dist = np.sqrt(np.maximum(2.0 * m * (1.0 - normalized @ normalized[seed] / m), 0.0))
+        radius = max(radius_factor * seed_distance, np.sqrt(2.0 * m * (1.0 - min_correlation)))
+
+        # Greedy non-overlapping occurrences, nearest first
+        candidates = np.flatnonzero(available & (dist <= radius))
+        occurrences = []
+        blocked = np.zeros(len(dist), dtype=bool)
+        for idx in candidates[np.argsort(dist[candidates], kind="stable")]:
+            if not blocked[idx]:
+                occurrences.append(int(idx))
+                blocked[max(0, idx - exclusion):idx + exclusion + 1] = True
+        if len(occurrences) < 2:
+            available[seed] = False
+            continue
+
+        occurrences.sort()
+        for idx in occurrences:
+            available[max(0, idx - exclusion):idx + exclusion + 1] = False
+        starts = grid_ts[occurrences]
+        motifs.append(SeriesMotif(
+            start_ts=starts.tolist(),
+            distance=seed_distance,
+            shape=raw_windows[occurrences].mean(axis=0),
+            step_s=step_s,
+            hours_of_day=(((starts + utc_offset_s) % 86400) // 3600).astype(int).tolist(),
+        ))
+
+    return motifs
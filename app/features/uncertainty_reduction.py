@@ -23,8 +23,12 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Dict, List, Optional, Set, Tuple
+import heapq
 import math
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+from scipy import sparse
 
 
 class MeasurementType(str, Enum):
@@ -154,6 +158,9 @@ class UncertaintyReductionPlanner:
     5. Return top 3 recommendations with explanations
     """
     
+    # Candidate catalogs whose impact structure is kept in memory
+    IMPACT_STRUCTURE_CACHE_SIZE = 16
+    
     def __init__(self):
         # Measurement impact graph: measurement -> outputs affected
         self.measurement_impact_graph = self._build_measurement_impact_graph()
@@ -163,6 +170,9 @@ class UncertaintyReductionPlanner:
         
         # Constraint graph for indirect effects
         self.constraint_graph = self._build_constraint_dependencies()
+        
+        # Sparse candidate -> output structure, cached per candidate catalog (LRU)
+        self._impact_structure_cache: "OrderedDict[Tuple, Tuple[sparse.csr_matrix, List[str]]]" = OrderedDict()
     
     def plan_uncertainty_reduction(
         self,
@@ -261,6 +271,208 @@ class UncertaintyReductionPlanner:
             "overall_uncertainty_score": overall_score
         }
     
+    def plan_measurement_bundle(
+        self,
+        current_estimates: Dict[str, Dict],
+        measured_anchors: Dict[str, any],
+        historical_data: Dict[str, List[Dict]],
+        metadata: Dict[str, any],
+        budget: float = 1.0,
+        candidates: Optional[List[MeasurementCandidate]] = None
+    ) -> Dict[str, any]:
+        """
+        Select a bundle of measurements under a relative-cost budget.
+        
+        Each output benefits from the best range tightening any selected
+        measurement offers (weighted by output importance), which makes the
+        bundle value monotone submodular. Selection is lazy-greedy on
+        marginal gain per cost over a sparse candidate x output impact
+        matrix; explanations are only built for selected measurements.
+        
+        Returns:
+        {
+            "selected_bundle": [...],
+            "bundle_cost": float,
+            "bundle_weighted_impact": float,
+            "budget": float,
+            "candidates_considered": int
+        }
+        """
+        profiles = self._analyze_uncertainty_profiles(
+            current_estimates, measured_anchors, historical_data, metadata
+        )
+        if candidates is None:
+            candidates = self._generate_measurement_candidates(
+                profiles, measured_anchors, historical_data
+            )
+        
+        impact, outputs = self._impact_matrix(candidates, profiles)
+        weights = np.array([self.output_importance.get(o, 1.0) for o in outputs])
+        costs = np.array([c.relative_cost for c in candidates], dtype=np.float64)
+        selected = self._lazy_greedy_select(impact, weights, costs, budget)
+        
+        # Explanations and details for the selected items only
+        coverage = np.zeros(len(outputs))
+        bundle = []
+        for rank, row in enumerate(selected, 1):
+            candidate = candidates[row]
+            start, end = impact.indptr[row], impact.indptr[row + 1]
+            columns, reductions = impact.indices[start:end], impact.data[start:end]
+            marginal = float(np.dot(weights[columns], np.maximum(reductions - coverage[columns], 0.0)))
+            coverage[columns] = np.maximum(coverage[columns], reductions)
+            
+            improved = [(outputs[j], float(r)) for j, r in zip(columns, reductions) if r > 0]
+            direct = [o for o, _ in improved if o in candidate.direct_biomarkers]
+            indirect = [o for o, _ in improved if o not in direct]
+            top_outputs = sorted(improved, key=lambda x: x[1], reverse=True)[:3]
+            
+            bundle.append({
+                "rank": rank,
+                "measurement_id": candidate.measurement_id,
+                "measurement": candidate.measurement_name,
+                "type": candidate.measurement_type.value,
+                "relative_cost": candidate.relative_cost,
+                "outputs_affected": direct + indirect,
+                "marginal_weighted_impact": marginal,
+                "reason": self._generate_recommendation_explanation(
+                    candidate, direct, indirect, top_outputs
+                ),
+                "days_since_last": candidate.days_since_last
+            })
+        
+        return {
+            "selected_bundle": bundle,
+            "bundle_cost": float(costs[selected].sum()) if selected else 0.0,
+            "bundle_weighted_impact": float(np.dot(weights, coverage)),
+            "budget": budget,
+            "candidates_considered": len(candidates)
+        }
+    
+    def _impact_structure(
+        self,
+        candidates: List[MeasurementCandidate]
+    ) -> Tuple[sparse.csr_matrix, List[str]]:
+        """
+        Sparse candidate x output matrix of effect kinds (1 = direct,
+        2 = indirect; indirect wins, as in _estimate_information_gain).
+        Cached by catalog contents (the IMPACT_STRUCTURE_CACHE_SIZE most
+        recent catalogs).
+        """
+        key = tuple(
+            (c.measurement_id, tuple(c.direct_biomarkers), tuple(c.indirect_outputs))
+            for c in candidates
+        )
+        cached = self._impact_structure_cache.get(key)
+        if cached is not None:
+            self._impact_structure_cache.move_to_end(key)
+            return cached
+        
+        columns: Dict[str, int] = {}
+        rows, cols, kinds = [], [], []
+        for row, candidate in enumerate(candidates):
+            effects = {o: 1 for o in candidate.direct_biomarkers}
+            effects.update({o: 2 for o in candidate.indirect_outputs})
+            for output_id, kind in effects.items():
+                rows.append(row)
+                cols.append(columns.setdefault(output_id, len(columns)))
+                kinds.append(kind)
+        
+        structure = sparse.csr_matrix(
+            (np.array(kinds, dtype=np.int8), (rows, cols)),
+            shape=(len(candidates), len(columns))
+        )
+        structure.sort_indices()
+        outputs = list(columns)
+        self._impact_structure_cache[key] = (structure, outputs)
+        while len(self._impact_structure_cache) > self.IMPACT_STRUCTURE_CACHE_SIZE:
+            self._impact_structure_cache.popitem(last=False)
+        return structure, outputs
+    
+    def _impact_matrix(
+        self,
+        candidates: List[MeasurementCandidate],
+        profiles: Dict[str, UncertaintyProfile]
+    ) -> Tuple[sparse.csr_matrix, List[str]]:
+        """Expected range tightening per (candidate, output), vectorized over the sparse structure."""
+        structure, outputs = self._impact_structure(candidates)
+        
+        # Per-output reductions; outputs without a profile gain nothing
+        direct = np.zeros(len(outputs))
+        indirect = np.zeros(len(outputs))
+        for j, output_id in enumerate(outputs):
+            profile = profiles.get(output_id)
+            if profile is None:
+                continue
+            direct[j] = self._estimate_range_tightening(profile, None)
+            indirect[j] = self._estimate_confidence_delta(profile, None, indirect=True) * 0.5
+        
+        kinds = structure.data
+        columns = structure.indices
+        data = np.where(kinds == 1, direct[columns], indirect[columns])
+        return sparse.csr_matrix((data, columns, structure.indptr), shape=structure.shape), outputs
+    
+    def _lazy_greedy_select(
+        self,
+        impact: sparse.csr_matrix,
+        weights: np.ndarray,
+        costs: np.ndarray,
+        budget: float
+    ) -> List[int]:
+        """
+        Lazy-greedy cost-benefit selection for a weighted max-coverage objective.
+        
+        Marginal gains only shrink as coverage grows, so stale heap entries
+        are upper bounds; a candidate is re-scored only when it reaches the
+        top. The result is compared with the best single affordable
+        candidate (standard guarantee for budgeted submodular selection).
+        """
+        effective_costs = np.maximum(costs, 0.1)
+        gains = impact @ weights  # all initial gains in one sparse product
+        coverage = np.zeros(impact.shape[1])
+        
+        def marginal(row: int) -> float:
+            start, end = impact.indptr[row], impact.indptr[row + 1]
+            columns = impact.indices[start:end]
+            return float(np.dot(
+                weights[columns],
+                np.maximum(impact.data[start:end] - coverage[columns], 0.0)
+            ))
+        
+        heap = [
+            (-gains[row] / effective_costs[row], row)
+            for row in range(impact.shape[0])
+            if gains[row] > 0 and costs[row] <= budget
+        ]
+        heapq.heapify(heap)
+        
+        selected: List[int] = []
+        spent = 0.0
+        total = 0.0
+        while heap:
+            _, row = heapq.heappop(heap)
+            if spent + costs[row] > budget:
+                continue
+            gain = marginal(row)
+            if gain <= 0:
+                continue
+            ratio = gain / effective_costs[row]
+            if heap and ratio < -heap[0][0]:
+                heapq.heappush(heap, (-ratio, row))  # stale; re-queue with fresh bound
+                continue
+            selected.append(row)
+            spent += costs[row]
+            total += gain
+            start, end = impact.indptr[row], impact.indptr[row + 1]
+            columns = impact.indices[start:end]
+            coverage[columns] = np.maximum(coverage[columns], impact.data[start:end])
+        
+        affordable = np.flatnonzero(costs <= budget)
+        if affordable.size:
+            best_single = int(affordable[np.argmax(gains[affordable])])
+            if gains[best_single] > total:
+                return [best_single]
+        return selected
+    
     def _analyze_uncertainty_profiles(
         self,
         estimates: Dict[str, Dict],
@@ -634,7 +846,7 @@ class UncertaintyReductionPlanner:
     def _estimate_confidence_delta(
         self,
         profile: UncertaintyProfile,
-        candidate: MeasurementCandidate,
+        candidate: Optional[MeasurementCandidate],
         indirect: bool = False
     ) -> float:
         """Estimate confidence increase from measurement."""
@@ -655,7 +867,7 @@ class UncertaintyReductionPlanner:
     def _estimate_range_tightening(
         self,
         profile: UncertaintyProfile,
-        candidate: MeasurementCandidate
+        candidate: Optional[MeasurementCandidate]
     ) -> float:
         """Estimate range tightening percentage (0-1)."""
         current_width = profile.current_range_width_percent
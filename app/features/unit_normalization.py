@@ -9,11 +9,16 @@ Implements Requirement A2.2: Unit and reference normalization.
 - Existing calculations continue to function unchanged (additive only)
 """
 
-from typing import Dict, Optional, Tuple, Any
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Any, Union
+from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 from pydantic import BaseModel, Field
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -201,6 +206,112 @@ REFERENCE_INTERVALS: Dict[str, list[ReferenceInterval]] = {
 }
 
 
+# ============================================================================
+# PRE-INDEXED REFERENCE INTERVALS AND MEMOIZED NORMALIZATION PLANS
+# ============================================================================
+
+class _StratumReferences(NamedTuple):
+    """Reference intervals for one (variable, sex, pregnancy) stratum."""
+    references: Tuple[ReferenceInterval, ...]
+    age_min: np.ndarray
+    age_max: np.ndarray
+    bmi_min: np.ndarray
+    bmi_max: np.ndarray
+
+
+class _NormalizationPlan(NamedTuple):
+    """Everything needed to normalize a value of one (variable, unit, stratum)."""
+    std_unit: Optional[str]
+    conversion_factor: float
+    conversion_method: str
+    references: Tuple[ReferenceInterval, ...]
+    primary_low: Optional[float]
+    primary_high: Optional[float]
+
+
+def _bounds(values: List[Optional[float]], fill: float) -> np.ndarray:
+    return np.array([fill if v is None else v for v in values], dtype=float)
+
+
+@lru_cache(maxsize=None)
+def _stratum_references(
+    variable_name: str,
+    patient_sex: Optional[str],
+    is_pregnant: Optional[bool],
+) -> _StratumReferences:
+    """
+    Reference intervals of a variable filtered by sex and pregnancy.
+    
+    Priority order of REFERENCE_INTERVALS is preserved (first applicable
+    interval is the primary one); age/BMI bounds are kept as arrays so the
+    remaining filters are a single vectorized mask.
+    """
+    refs = tuple(
+        ref for ref in REFERENCE_INTERVALS.get(variable_name, [])
+        if not (ref.sex and ref.sex != "all" and patient_sex and ref.sex != patient_sex)
+        and not (ref.is_pregnant is not None and is_pregnant is not None and ref.is_pregnant != is_pregnant)
+    )
+    return _StratumReferences(
+        references=refs,
+        age_min=_bounds([r.age_min for r in refs], -np.inf),
+        age_max=_bounds([r.age_max for r in refs], np.inf),
+        bmi_min=_bounds([r.bmi_min for r in refs], -np.inf),
+        bmi_max=_bounds([r.bmi_max for r in refs], np.inf),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _normalization_plan(
+    variable_name: str,
+    raw_unit: Optional[str],
+    patient_age: Optional[int],
+    patient_sex: Optional[str],
+    is_pregnant: Optional[bool],
+    patient_bmi: Optional[float],
+) -> _NormalizationPlan:
+    """Resolve conversion and applicable references, memoized by (variable, unit, stratum)."""
+    conversion_info = UNIT_CONVERSIONS.get(variable_name, {}).get(raw_unit)
+    
+    if conversion_info:
+        canonical_unit, conversion_factor = conversion_info
+        std_unit = canonical_unit.value
+        conversion_method = f"multiply_by_{conversion_factor}"
+    else:
+        # No conversion available - pass through
+        std_unit = raw_unit
+        conversion_factor = 1.0
+        conversion_method = "passthrough"
+        logger.debug(f"No conversion found for {variable_name} in {raw_unit}, using passthrough")
+    
+    stratum = _stratum_references(variable_name, patient_sex or None, is_pregnant)
+    mask = np.ones(len(stratum.references), dtype=bool)
+    if patient_age is not None:
+        mask &= (stratum.age_min <= patient_age) & (patient_age <= stratum.age_max)
+    if patient_bmi is not None:
+        mask &= (stratum.bmi_min <= patient_bmi) & (patient_bmi <= stratum.bmi_max)
+    applicable_refs = tuple(ref for ref, keep in zip(stratum.references, mask) if keep)
+    
+    # Use first applicable reference (could be improved to use most specific)
+    primary_low = primary_high = None
+    if applicable_refs and applicable_refs[0].low is not None and applicable_refs[0].high is not None:
+        primary_low, primary_high = applicable_refs[0].low, applicable_refs[0].high
+    
+    return _NormalizationPlan(
+        std_unit=std_unit,
+        conversion_factor=conversion_factor,
+        conversion_method=conversion_method,
+        references=applicable_refs,
+        primary_low=primary_low,
+        primary_high=primary_high,
+    )
+
+
+def clear_normalization_cache() -> None:
+    """Drop memoized plans; call after mutating UNIT_CONVERSIONS or REFERENCE_INTERVALS."""
+    _stratum_references.cache_clear()
+    _normalization_plan.cache_clear()
+
+
 def normalize_value(
     variable_name: str,
     raw_value: float,
@@ -225,82 +336,45 @@ def normalize_value(
     Returns:
         NormalizedValue with standardized value and applicable references
     """
-    # Get conversion if available
-    conversion_info = UNIT_CONVERSIONS.get(variable_name, {}).get(raw_unit)
-    
-    if conversion_info:
-        canonical_unit, conversion_factor = conversion_info
-        std_value = raw_value * conversion_factor
-        std_unit = canonical_unit.value
-        conversion_method = f"multiply_by_{conversion_factor}"
-    else:
-        # No conversion available - pass through
-        std_value = raw_value
-        std_unit = raw_unit
-        conversion_factor = 1.0
-        conversion_method = "passthrough"
-        logger.debug(f"No conversion found for {variable_name} in {raw_unit}, using passthrough")
-    
-    # Get applicable reference intervals
-    all_refs = REFERENCE_INTERVALS.get(variable_name, [])
-    applicable_refs = []
-    
-    for ref in all_refs:
-        # Check if reference applies to this patient
-        applicable = True
-        
-        if ref.sex and ref.sex != "all" and patient_sex:
-            if ref.sex != patient_sex:
-                applicable = False
-        
-        if ref.age_min is not None and patient_age is not None:
-            if patient_age < ref.age_min:
-                applicable = False
-        
-        if ref.age_max is not None and patient_age is not None:
-            if patient_age > ref.age_max:
-                applicable = False
-        
-        if ref.is_pregnant is not None and is_pregnant is not None:
-            if ref.is_pregnant != is_pregnant:
-                applicable = False
-        
-        if ref.bmi_min is not None and patient_bmi is not None:
-            if patient_bmi < ref.bmi_min:
-                applicable = False
-        
-        if ref.bmi_max is not None and patient_bmi is not None:
-            if patient_bmi > ref.bmi_max:
-                applicable = False
-        
-        if applicable:
-            applicable_refs.append(ref)
+    return _build_normalized_value(
+        variable_name,
+        raw_value,
+        raw_unit,
+        _normalization_plan(variable_name, raw_unit, patient_age, patient_sex, is_pregnant, patient_bmi),
+        datetime.utcnow().isoformat(),
+    )
+
+
+def _build_normalized_value(
+    variable_name: str,
+    raw_value: float,
+    raw_unit: str,
+    plan: _NormalizationPlan,
+    timestamp: str,
+) -> NormalizedValue:
+    """Materialize a NormalizedValue from a resolved plan."""
+    std_value = raw_value * plan.conversion_factor if plan.conversion_method != "passthrough" else raw_value
     
     # Determine if within reference range
     is_within_reference = None
     distance_from_midpoint = None
     
-    if applicable_refs:
-        # Use first applicable reference (could be improved to use most specific)
-        primary_ref = applicable_refs[0]
-        if primary_ref.low is not None and primary_ref.high is not None:
-            is_within_reference = (primary_ref.low <= std_value <= primary_ref.high)
-            midpoint = (primary_ref.low + primary_ref.high) / 2.0
-            range_width = primary_ref.high - primary_ref.low
-            distance_from_midpoint = abs(std_value - midpoint) / (range_width / 2.0) if range_width > 0 else 0.0
-    
-    from datetime import datetime
+    if plan.primary_low is not None:
+        is_within_reference = (plan.primary_low <= std_value <= plan.primary_high)
+        midpoint = (plan.primary_low + plan.primary_high) / 2.0
+        range_width = plan.primary_high - plan.primary_low
+        distance_from_midpoint = abs(std_value - midpoint) / (range_width / 2.0) if range_width > 0 else 0.0
     
     return NormalizedValue(
         variable_name=variable_name,
         raw_value=raw_value,
         raw_unit=raw_unit,
         std_value=std_value,
-        std_unit=std_unit,
-        applicable_references=applicable_refs,
-        conversion_factor=conversion_factor,
-        conversion_method=conversion_method,
-        normalization_timestamp=datetime.utcnow().isoformat(),
+        std_unit=plan.std_unit,
+        applicable_references=list(plan.references),
+        conversion_factor=plan.conversion_factor,
+        conversion_method=plan.conversion_method,
+        normalization_timestamp=timestamp,
         is_within_reference=is_within_reference,
         distance_from_midpoint=distance_from_midpoint,
     )
@@ -329,44 +403,161 @@ def normalize_specimen_values(
         Dict of variable_name -> NormalizedValue
     """
     normalized = {}
+    timestamp = datetime.utcnow().isoformat()
     
     for var_name, var_value in specimen_values.items():
         if var_value is None:
             continue
         
-        # Determine unit
-        if specimen_units and var_name in specimen_units:
-            var_unit = specimen_units[var_name]
-        else:
-            # Default to canonical unit for that variable
-            var_unit = _get_default_unit(var_name)
-        
-        normalized[var_name] = normalize_value(
-            variable_name=var_name,
-            raw_value=var_value,
-            raw_unit=var_unit,
-            patient_age=patient_age,
-            patient_sex=patient_sex,
-            is_pregnant=is_pregnant,
-            patient_bmi=patient_bmi,
-        )
+        var_unit = _resolve_unit(var_name, specimen_units)
+        plan = _normalization_plan(var_name, var_unit, patient_age, patient_sex, is_pregnant, patient_bmi)
+        normalized[var_name] = _build_normalized_value(var_name, var_value, var_unit, plan, timestamp)
     
     return normalized
 
 
+@dataclass
+class NormalizedBatch:
+    """
+    Columnar result of normalize_many.
+    
+    Values of all variables are stored in flat arrays; variable i occupies
+    the slice offsets[i]:offsets[i + 1]. A specimen dict has one value per
+    variable, a time series one row per timepoint.
+    """
+    variable_names: List[str]
+    raw_units: List[Optional[str]]
+    std_units: List[Optional[str]]
+    conversion_factors: np.ndarray
+    conversion_methods: List[str]
+    applicable_references: List[Tuple[ReferenceInterval, ...]]
+    offsets: np.ndarray
+    
+    raw_values: np.ndarray
+    std_values: np.ndarray
+    has_reference: np.ndarray  # bool, per value
+    is_within_reference: np.ndarray  # bool, only meaningful where has_reference
+    distance_from_midpoint: np.ndarray  # NaN where no reference
+    
+    def slice_for(self, variable_name: str) -> slice:
+        i = self.variable_names.index(variable_name)
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+    
+    def std_values_for(self, variable_name: str) -> np.ndarray:
+        return self.std_values[self.slice_for(variable_name)]
+    
+    def to_normalized_values(self) -> Dict[str, NormalizedValue]:
+        """Materialize NormalizedValue objects (last value per variable) for legacy callers."""
+        timestamp = datetime.utcnow().isoformat()
+        result = {}
+        for i, name in enumerate(self.variable_names):
+            end = int(self.offsets[i + 1])
+            if end == int(self.offsets[i]):
+                continue
+            k = end - 1
+            result[name] = NormalizedValue(
+                variable_name=name,
+                raw_value=float(self.raw_values[k]),
+                raw_unit=self.raw_units[i],
+                std_value=float(self.std_values[k]),
+                std_unit=self.std_units[i],
+                applicable_references=list(self.applicable_references[i]),
+                conversion_factor=float(self.conversion_factors[i]),
+                conversion_method=self.conversion_methods[i],
+                normalization_timestamp=timestamp,
+                is_within_reference=bool(self.is_within_reference[k]) if self.has_reference[k] else None,
+                distance_from_midpoint=float(self.distance_from_midpoint[k]) if self.has_reference[k] else None,
+            )
+        return result
+
+
+def normalize_many(
+    values: Dict[str, Union[float, Sequence[float], np.ndarray]],
+    units: Optional[Dict[str, str]] = None,
+    patient_age: Optional[int] = None,
+    patient_sex: Optional[str] = None,
+    is_pregnant: Optional[bool] = None,
+    patient_bmi: Optional[float] = None,
+) -> NormalizedBatch:
+    """
+    Normalize a whole specimen dict or a set of time series in one vectorized pass.
+    
+    Args:
+        values: variable_name -> scalar value or array of values over time
+            (None / NaN entries are kept as NaN)
+        units: Optional variable_name -> unit (defaults to canonical)
+        patient_age: Patient age
+        patient_sex: Patient sex
+        is_pregnant: Pregnancy status
+        patient_bmi: Patient BMI
+    
+    Returns:
+        NormalizedBatch with flat std_value / reference-check arrays
+    """
+    names = [name for name, v in values.items() if v is not None]
+    raw_units = [_resolve_unit(name, units) for name in names]
+    plans = [
+        _normalization_plan(name, unit, patient_age, patient_sex, is_pregnant, patient_bmi)
+        for name, unit in zip(names, raw_units)
+    ]
+    columns = [np.atleast_1d(np.asarray(values[name], dtype=float)) for name in names]
+    lengths = np.array([len(c) for c in columns], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    
+    factors = np.array([p.conversion_factor for p in plans], dtype=float)
+    lows = np.array([np.nan if p.primary_low is None else p.primary_low for p in plans], dtype=float)
+    highs = np.array([np.nan if p.primary_high is None else p.primary_high for p in plans], dtype=float)
+    
+    raw = np.concatenate(columns) if columns else np.empty(0)
+    low = np.repeat(lows, lengths)
+    high = np.repeat(highs, lengths)
+    std = raw * np.repeat(factors, lengths)
+    
+    has_reference = ~np.isnan(low)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        half_width = (high - low) / 2.0
+        distance = np.where(half_width > 0, np.abs(std - (low + high) / 2.0) / half_width, 0.0)
+        within = (low <= std) & (std <= high)
+    distance[~has_reference] = np.nan
+    
+    return NormalizedBatch(
+        variable_names=names,
+        raw_units=raw_units,
+        std_units=[p.std_unit for p in plans],
+        conversion_factors=factors,
+        conversion_methods=[p.conversion_method for p in plans],
+        applicable_references=[p.references for p in plans],
+        offsets=offsets,
+        raw_values=raw,
+        std_values=std,
+        has_reference=has_reference,
+        is_within_reference=within,
+        distance_from_midpoint=distance,
+    )
+
+
+_DEFAULT_UNITS: Dict[str, str] = {
+    "glucose": "mg/dL",
+    "creatinine": "mg/dL",
+    "bun": "mg/dL",
+    "sodium_na": "mmol/L",
+    "potassium_k": "mmol/L",
+    "chloride_cl": "mmol/L",
+    "chol_total": "mg/dL",
+    "ldl": "mg/dL",
+    "hdl": "mg/dL",
+    "triglycerides": "mg/dL",
+    "a1c": "%",
+}
+
+
+def _resolve_unit(variable_name: str, units: Optional[Dict[str, str]]) -> str:
+    if units and variable_name in units:
+        return units[variable_name]
+    # Default to canonical unit for that variable
+    return _get_default_unit(variable_name)
+
+
 def _get_default_unit(variable_name: str) -> str:
     """Get default unit for a variable (simplified)."""
-    defaults = {
-        "glucose": "mg/dL",
-        "creatinine": "mg/dL",
-        "bun": "mg/dL",
-        "sodium_na": "mmol/L",
-        "potassium_k": "mmol/L",
-        "chloride_cl": "mmol/L",
-        "chol_total": "mg/dL",
-        "ldl": "mg/dL",
-        "hdl": "mg/dL",
-        "triglycerides": "mg/dL",
-        "a1c": "%",
-    }
-    return defaults.get(variable_name, "unit")
+    return _DEFAULT_UNITS.get(variable_name, "unit")
@@ -2,7 +2,7 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
-from app.api import auth, data, ai, reports, runs, part_a, data_quality, part_b, a2
+from app.api import auth, data, ai, reports, runs, part_a, data_quality, part_b, a2, provenance
 from app.db.base import Base
 from app.db.session import engine
 import logging
@@ -45,6 +45,12 @@ def startup_event():
         # Allow failures in test environments
         pass
 
+# Drain write-behind provenance before exit
+@app.on_event("shutdown")
+def shutdown_event():
+    from app.services.provenance_writer import provenance_writer
+    provenance_writer.stop()
+
 # Health check
 @app.get("/health")
 def health_check():
@@ -66,6 +72,7 @@ app.include_router(part_a.router)
 app.include_router(data_quality.router)
 app.include_router(part_b.router)
 app.include_router(a2.router)
+app.include_router(provenance.router)
 
 # Serve frontend demo UI (does not interfere with existing API routes)
 UI_DIR = Path(__file__).parent.parent / "ui" / "demo"
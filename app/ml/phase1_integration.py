@@ -33,6 +33,7 @@ from app.features.derived_features import (
 from app.features.conflict_detection import (
     detect_conflicts, ConflictDetectionReport
 )
+from app.ml.stage_graph import StageGraph
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +46,49 @@ class Phase1Integrator:
     
     def __init__(self):
         """Initialize Phase 1 integrator."""
-        pass
+        self.stage_graph = self._build_stage_graph()
+    
+    # integrate_phase1 result keys in report order
+    RESULT_KEYS = ("coverage_truth", "conflict_report", "enhanced_values", "derived_features")
+    
+    def _build_stage_graph(self) -> StageGraph:
+        """
+        Declare Phase 1 stages.
+        
+        Coverage truth only reads the run, so it is independent of the
+        normalization -> derived features -> conflicts chain; the output
+        stage reads all of them. The stages are light and the output stage
+        rewrites the inferred values in place, so the graph runs serially
+        and nothing is memoized; it still provides per-stage timing.
+        """
+        graph = StageGraph("phase1", max_workers=1)
+        patient = ("patient_age", "patient_sex", "is_pregnant")
+        graph.add_stage(
+            "coverage_truth", self._stage_coverage_truth,
+            inputs=("run_v2", "lookback_days"),
+            outputs=("coverage_truth",)
+        )
+        graph.add_stage(
+            "unit_normalization", self._stage_unit_normalization,
+            inputs=("run_v2", "bmi") + patient,
+            outputs=("normalized_values",)
+        )
+        graph.add_stage(
+            "derived_features", self._stage_derived_features,
+            inputs=("run_v2", "normalized_values", "patient_race") + patient,
+            outputs=("derived_features",)
+        )
+        graph.add_stage(
+            "conflict_detection", self._stage_conflict_detection,
+            inputs=("run_v2", "normalized_values", "derived_features"),
+            outputs=("conflict_report",)
+        )
+        graph.add_stage(
+            "output_enhancement", self._stage_output_enhancement,
+            inputs=("inferred_values", "coverage_truth", "conflict_report", "derived_features"),
+            outputs=("enhanced_values",)
+        )
+        return graph
     
     def compute_coverage_truth(
         self,
@@ -92,11 +135,12 @@ class Phase1Integrator:
         for specimen in run_v2.specimens:
             specimen_id = specimen.specimen_id
             normalized[specimen_id] = normalize_specimen_values(
-                specimen=specimen,
+                specimen_values=specimen.raw_values,
+                specimen_units=specimen.units,
                 patient_age=patient_age,
                 patient_sex=patient_sex,
                 is_pregnant=is_pregnant,
-                bmi=bmi
+                patient_bmi=bmi
             )
         
         return normalized
@@ -168,12 +212,23 @@ class Phase1Integrator:
         """
         logger.info(f"Detecting conflicts for run_id {run_v2.run_id}")
         
-        # Flatten normalized values for conflict detection
+        # Flatten standardized values (and per-specimen values for cross-specimen checks)
         all_values = {}
-        for specimen_values in normalized_values.values():
+        specimens_data = []
+        for specimen in run_v2.specimens:
+            specimen_values = {
+                var_name: norm_val.std_value
+                for var_name, norm_val in normalized_values.get(specimen.specimen_id, {}).items()
+                if norm_val.std_value is not None
+            }
             all_values.update(specimen_values)
+            specimens_data.append({
+                "specimen_id": specimen.specimen_id,
+                "specimen_type": specimen.specimen_type.value,
+                "values": specimen_values
+            })
         
-        # Flatten derived features to list
+        # Derived features are checked alongside the measured values
         all_derived = []
         if derived_features.renal_features:
             all_derived.extend(derived_features.renal_features)
@@ -183,11 +238,13 @@ class Phase1Integrator:
             all_derived.extend(derived_features.lipid_features)
         if derived_features.blood_pressure_features:
             all_derived.extend(derived_features.blood_pressure_features)
+        for feature in all_derived:
+            if feature.value is not None:
+                all_values[feature.feature_name] = feature.value
         
-        return detect_conflicts(
-            normalized_values=all_values,
-            derived_features=all_derived
-        )
+        report = detect_conflicts(values=all_values, specimens_data=specimens_data)
+        report.run_id = run_v2.run_id
+        return report
     
     def assign_evidence_grade(
         self,
@@ -377,7 +434,7 @@ class Phase1Integrator:
                     recommendations.append(f"Collect more {specimen_type} measurements")
         
         # Conflict recommendations
-        if conflict_report.conflicts:
+        if conflict_report.conflicts_detected:
             recommendations.append("Resolve physiologic conflicts before interpreting")
         
         # Grade-specific recommendations
@@ -432,41 +489,84 @@ class Phase1Integrator:
                 - conflict_report: ConflictDetectionReport
                 - enhanced_values: List[InferredValue] with Phase 1 enhancements
                 - derived_features: DerivedFeaturePack
+                - stage_report: per-stage status and timing
         """
         logger.info(f"Starting Phase 1 integration for run_id {run_v2.run_id}")
         
-        # A.1: Compute coverage truth
-        coverage_truth = self.compute_coverage_truth(run_v2, lookback_days=lookback_days)
-        
-        # A.2: Normalize units
-        normalized_values = self.normalize_specimen_units(
-            run_v2=run_v2,
-            patient_age=patient_age,
-            patient_sex=patient_sex,
-            is_pregnant=is_pregnant,
-            bmi=bmi
-        )
+        context = {
+            "run_v2": run_v2,
+            "inferred_values": inferred_values,
+            "patient_age": patient_age,
+            "patient_sex": patient_sex,
+            "patient_race": patient_race,
+            "is_pregnant": is_pregnant,
+            "bmi": bmi,
+            "lookback_days": lookback_days
+        }
+        run = self.stage_graph.run(context, targets=self.RESULT_KEYS, parallel=False)
         
-        # A.3: Compute derived features
-        derived_features = self.compute_derived_features(
-            run_v2=run_v2,
-            normalized_values=normalized_values,
-            patient_age=patient_age,
-            patient_sex=patient_sex,
-            patient_race=patient_race,
-            is_pregnant=is_pregnant
+        enhanced_values = run.values["enhanced_values"]
+        conflict_report = run.values["conflict_report"]
+        derived_features = run.values["derived_features"]
+        logger.info(
+            f"Phase 1 integration complete: "
+            f"{len(enhanced_values)} outputs enhanced, "
+            f"{len(conflict_report.conflicts_detected)} conflicts detected, "
+            f"{derived_features.features_computed} derived features computed"
         )
         
-        # A.4: Detect conflicts
-        conflict_report = self.detect_physiologic_conflicts(
-            run_v2=run_v2,
-            normalized_values=normalized_values,
-            derived_features=derived_features
-        )
+        result = {key: run.values[key] for key in self.RESULT_KEYS}
+        result["stage_report"] = run.to_dict()
+        return result
+    
+    # ===== A.1-A.4 =====
+    def _stage_coverage_truth(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "coverage_truth": self.compute_coverage_truth(
+                inputs["run_v2"], lookback_days=inputs["lookback_days"]
+            )
+        }
+    
+    def _stage_unit_normalization(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "normalized_values": self.normalize_specimen_units(
+                run_v2=inputs["run_v2"],
+                patient_age=inputs["patient_age"],
+                patient_sex=inputs["patient_sex"],
+                is_pregnant=inputs["is_pregnant"],
+                bmi=inputs["bmi"]
+            )
+        }
+    
+    def _stage_derived_features(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "derived_features": self.compute_derived_features(
+                run_v2=inputs["run_v2"],
+                normalized_values=inputs["normalized_values"],
+                patient_age=inputs["patient_age"],
+                patient_sex=inputs["patient_sex"],
+                patient_race=inputs["patient_race"],
+                is_pregnant=inputs["is_pregnant"]
+            )
+        }
+    
+    def _stage_conflict_detection(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "conflict_report": self.detect_physiologic_conflicts(
+                run_v2=inputs["run_v2"],
+                normalized_values=inputs["normalized_values"],
+                derived_features=inputs["derived_features"]
+            )
+        }
+    
+    # ===== B.5-B.7: Enhance each output =====
+    def _stage_output_enhancement(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        coverage_truth = inputs["coverage_truth"]
+        conflict_report = inputs["conflict_report"]
+        derived_features = inputs["derived_features"]
         
-        # B.5-B.7: Enhance each output
         enhanced_values = []
-        for inferred_value in inferred_values:
+        for inferred_value in inputs["inferred_values"]:
             # B.5: Assign evidence grade
             inferred_value.evidence_grade = self.assign_evidence_grade(
                 inferred_value=inferred_value,
@@ -490,16 +590,4 @@ class Phase1Integrator:
             
             enhanced_values.append(inferred_value)
         
-        logger.info(
-            f"Phase 1 integration complete: "
-            f"{len(enhanced_values)} outputs enhanced, "
-            f"{len(conflict_report.conflicts)} conflicts detected, "
-            f"{derived_features.features_computed} derived features computed"
-        )
-        
-        return {
-            "coverage_truth": coverage_truth,
-            "conflict_report": conflict_report,
-            "enhanced_values": enhanced_values,
-            "derived_features": derived_features,
-        }
+        return {"enhanced_values": enhanced_values}
@@ -18,6 +18,8 @@ from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 import logging
 
+from sqlalchemy.orm import Session
+
 from app.models.run_v2 import RunV2
 from app.models.inference_pack_v2 import EvidenceGrade
 
@@ -32,6 +34,7 @@ from app.features.confidence_calibration import (
     get_confidence_calibrator, ConfidenceComponents
 )
 from app.features.anchor_gating import get_anchor_strength_gate
+from app.ml.stage_graph import StageGraph
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +68,8 @@ class Phase2Integrator:
         self.priors = get_priors_decay_engine()
         self.calibrator = get_confidence_calibrator()
         self.anchor_gate = get_anchor_strength_gate()
+        
+        self.stage_graph = self._build_stage_graph()
     
     @classmethod
     def set_feature_flag(cls, flag_name: str, enabled: bool):
@@ -73,6 +78,79 @@ class Phase2Integrator:
             cls.FEATURE_FLAGS[flag_name] = enabled
             logger.info(f"Feature flag {flag_name} set to {enabled}")
     
+    # phase2_metadata keys in report order
+    METADATA_KEYS = (
+        "constraint_evaluations",
+        "reconciliation",
+        "temporal_inertia",
+        "personal_baselines",
+        "priors_status",
+        "anchor_gating"
+    )
+    
+    # Stage name -> feature flag
+    STAGE_FLAGS = {
+        "constraints": "enable_phase2_constraints",
+        "reconciliation": "enable_phase2_reconciliation",
+        "temporal_inertia": "enable_phase2_temporal_inertia",
+        "personal_baselines": "enable_phase2_personal_baselines",
+        "multi_solver": "enable_phase2_multi_solver",
+        "priors_decay": "enable_phase2_priors_decay",
+        "confidence_calibration": "enable_phase2_confidence_calibration",
+        "anchor_gating": "enable_phase2_anchor_gating"
+    }
+    
+    def _build_stage_graph(self) -> StageGraph:
+        """
+        Declare Phase 2 stages.
+        
+        Each stage after the constraint lattice rewrites "estimates" (several
+        in place), so the graph runs serially; it still provides per-stage
+        timing and skips stages whose outputs are not requested.
+        """
+        graph = StageGraph("phase2", max_workers=1)
+        graph.add_stage(
+            "constraints", self._stage_constraints,
+            inputs=("estimates", "measured_anchors", "metadata"),
+            outputs=("constraint_evaluations",)
+        )
+        graph.add_stage(
+            "reconciliation", self._stage_reconciliation,
+            inputs=("estimates", "measured_anchors", "metadata"),
+            outputs=("estimates", "reconciliation")
+        )
+        graph.add_stage(
+            "temporal_inertia", self._stage_temporal_inertia,
+            inputs=("estimates", "historical_data", "events"),
+            outputs=("estimates", "temporal_inertia")
+        )
+        graph.add_stage(
+            "personal_baselines", self._stage_personal_baselines,
+            inputs=("estimates", "historical_data", "db", "user_id"),
+            outputs=("estimates", "personal_baselines")
+        )
+        graph.add_stage(
+            "multi_solver", self._stage_multi_solver,
+            inputs=("estimates", "measured_anchors", "metadata"),
+            outputs=("estimates",)
+        )
+        graph.add_stage(
+            "priors_decay", self._stage_priors_decay,
+            inputs=("estimates", "measured_anchors", "db", "user_id"),
+            outputs=("estimates", "priors_status")
+        )
+        graph.add_stage(
+            "confidence_calibration", self._stage_confidence_calibration,
+            inputs=("estimates", "temporal_inertia", "constraint_evaluations"),
+            outputs=("estimates",)
+        )
+        graph.add_stage(
+            "anchor_gating", self._stage_anchor_gating,
+            inputs=("estimates", "measured_anchors", "historical_data", "temporal_inertia"),
+            outputs=("estimates", "anchor_gating")
+        )
+        return graph
+    
     def integrate_phase2(
         self,
         run_v2: RunV2,
@@ -80,7 +158,10 @@ class Phase2Integrator:
         measured_anchors: Optional[Dict[str, float]] = None,
         historical_data: Optional[Dict[str, List[Tuple[datetime, float]]]] = None,
         events: Optional[List[TemporalEvent]] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        outputs: Optional[List[str]] = None,
+        db: Optional[Session] = None,
+        user_id: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Apply all Phase 2 enhancements to estimates.
@@ -92,262 +173,330 @@ class Phase2Integrator:
             historical_data: Historical measurements for temporal/baseline analysis
             events: List of events (illness, meds changes, etc.)
             metadata: Additional metadata (age, sex, medications, etc.)
+            outputs: Keys to produce ("estimates" and/or phase2_metadata keys;
+                default: all); stages not needed for them are skipped
+            db: Session for per-user state (personal baselines, prior
+                posteriors); without it nothing is persisted. Caller commits.
+            user_id: User the run belongs to (default: run_v2.user_id when
+                numeric)
         
         Returns:
             Enhanced estimates with Phase 2 adjustments
         """
-        measured_anchors = measured_anchors or {}
-        historical_data = historical_data or {}
-        events = events or []
-        metadata = metadata or {}
-        
         logger.info("=" * 60)
         logger.info("PHASE 2 INTEGRATION START")
         logger.info("=" * 60)
         
-        # Start with estimates
-        enhanced = estimates.copy()
-        phase2_metadata = {}
+        context = {
+            "estimates": estimates.copy(),
+            "measured_anchors": measured_anchors or {},
+            "historical_data": historical_data or {},
+            "events": events or [],
+            "metadata": metadata or {},
+            "db": db,
+            "user_id": user_id if user_id is not None else self._run_user_id(run_v2)
+        }
+        enabled = {
+            stage: self.FEATURE_FLAGS[flag]
+            for stage, flag in self.STAGE_FLAGS.items()
+        }
         
-        # ===== A2.1: Constraint Lattice Evaluation =====
-        if self.FEATURE_FLAGS["enable_phase2_constraints"]:
-            logger.info("Applying constraint lattice evaluation...")
-            
-            # Extract values for constraint checking
-            all_values = {**measured_anchors}
-            for marker, est in enhanced.items():
-                if "center" in est:
-                    all_values[marker] = est["center"]
-                elif "value" in est:
-                    all_values[marker] = est["value"]
-            
-            constraint_evals = self.lattice.evaluate_constraints(all_values, metadata)
-            constraint_summary = self.lattice.summarize_evaluations(constraint_evals)
-            
-            phase2_metadata["constraint_evaluations"] = constraint_summary
-            logger.info(f"Constraints: {constraint_summary['violated_constraints']} violations")
+        run = self.stage_graph.run(
+            context,
+            targets=outputs if outputs is not None else ("estimates",) + self.METADATA_KEYS,
+            enabled=enabled,
+            parallel=False
+        )
         
-        # ===== A2.2: Cross-Domain Reconciliation =====
-        if self.FEATURE_FLAGS["enable_phase2_reconciliation"]:
-            logger.info("Applying cross-domain reconciliation...")
-            
-            reconciliation_result = self.reconciliation.reconcile_with_anchor_priority(
-                estimates=enhanced,
-                measured_anchors=measured_anchors,
-                metadata=metadata
-            )
-            
-            enhanced = reconciliation_result.reconciled_estimates
-            phase2_metadata["reconciliation"] = reconciliation_result.to_dict()
-            logger.info(
-                f"Reconciliation: {reconciliation_result.range_adjustments_applied} adjustments"
-            )
+        logger.info("=" * 60)
+        logger.info("PHASE 2 INTEGRATION COMPLETE")
+        logger.info("=" * 60)
         
-        # ===== A2.3: Temporal Inertia Enforcement =====
-        if self.FEATURE_FLAGS["enable_phase2_temporal_inertia"] and historical_data:
-            logger.info("Applying temporal inertia enforcement...")
-            
-            temporal_assessment = self.temporal.assess_temporal_coherence(
-                current_estimates=enhanced,
-                historical_values=historical_data,
-                events=events
-            )
-            
-            enhanced = self.temporal.apply_temporal_adjustments(
-                estimates=enhanced,
-                assessment=temporal_assessment
-            )
-            
-            phase2_metadata["temporal_inertia"] = temporal_assessment.to_dict()
-            logger.info(
-                f"Temporal: {len(temporal_assessment.violations)} violations detected"
-            )
+        return {
+            "estimates": run.values["estimates"],
+            "phase2_metadata": {
+                key: run.values[key] for key in self.METADATA_KEYS if key in run.values
+            },
+            "stage_report": run.to_dict()
+        }
+    
+    @staticmethod
+    def _run_user_id(run_v2: RunV2) -> Optional[int]:
+        """Numeric user id of a run, if it has one."""
+        user_id = str(run_v2.user_id)
+        return int(user_id) if user_id.isdigit() else None
+    
+    # ===== A2.1: Constraint Lattice Evaluation =====
+    def _stage_constraints(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Applying constraint lattice evaluation...")
         
-        # ===== A2.4: Personal Baseline Modeling =====
-        if self.FEATURE_FLAGS["enable_phase2_personal_baselines"] and historical_data:
-            logger.info("Computing personal baselines...")
-            
+        # Extract values for constraint checking
+        all_values = {**inputs["measured_anchors"]}
+        for marker, est in inputs["estimates"].items():
+            if "center" in est:
+                all_values[marker] = est["center"]
+            elif "value" in est:
+                all_values[marker] = est["value"]
+        
+        constraint_evals = self.lattice.evaluate_constraints(all_values, inputs["metadata"])
+        constraint_summary = self.lattice.summarize_evaluations(constraint_evals)
+        
+        logger.info(f"Constraints: {constraint_summary['violated_constraints']} violations")
+        return {"constraint_evaluations": constraint_summary}
+    
+    # ===== A2.2: Cross-Domain Reconciliation =====
+    def _stage_reconciliation(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Applying cross-domain reconciliation...")
+        
+        reconciliation_result = self.reconciliation.reconcile_with_anchor_priority(
+            estimates=inputs["estimates"],
+            measured_anchors=inputs["measured_anchors"],
+            metadata=inputs["metadata"]
+        )
+        
+        logger.info(
+            f"Reconciliation: {reconciliation_result.range_adjustments_applied} adjustments"
+        )
+        return {
+            "estimates": reconciliation_result.reconciled_estimates,
+            "reconciliation": reconciliation_result.to_dict()
+        }
+    
+    # ===== A2.3: Temporal Inertia Enforcement =====
+    def _stage_temporal_inertia(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        historical_data = inputs["historical_data"]
+        if not historical_data:
+            return {}
+        logger.info("Applying temporal inertia enforcement...")
+        
+        temporal_assessment = self.temporal.assess_temporal_coherence(
+            current_estimates=inputs["estimates"],
+            historical_values=historical_data,
+            events=inputs["events"]
+        )
+        
+        enhanced = self.temporal.apply_temporal_adjustments(
+            estimates=inputs["estimates"],
+            assessment=temporal_assessment
+        )
+        
+        logger.info(
+            f"Temporal: {len(temporal_assessment.violations)} violations detected"
+        )
+        return {
+            "estimates": enhanced,
+            "temporal_inertia": temporal_assessment.to_dict()
+        }
+    
+    # ===== A2.4: Personal Baseline Modeling =====
+    def _stage_personal_baselines(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        historical_data = inputs["historical_data"]
+        if not historical_data:
+            return {}
+        logger.info("Computing personal baselines...")
+        
+        enhanced = inputs["estimates"]
+        db, user_id = inputs.get("db"), inputs.get("user_id")
+        if db is not None and user_id is not None:
+            # Fold the run's new observations into the user's persisted state
+            baselines = self.baselines.sync_baseline_states(
+                db=db,
+                user_id=user_id,
+                historical_data=historical_data
+            )
+        else:
             baselines = self.baselines.compute_baselines_batch(
                 historical_data=historical_data
             )
-            
-            # Compare current estimates to baselines
-            baseline_comparisons = {}
-            for marker, baseline in baselines.items():
-                if marker in enhanced:
-                    current_value = enhanced[marker].get("center") or enhanced[marker].get("value")
-                    if current_value is not None:
-                        comparison = self.baselines.compare_to_baseline(baseline, current_value)
-                        baseline_comparisons[marker] = comparison
-                        
-                        # Add baseline metadata to estimate
-                        enhanced[marker]["personal_baseline"] = baseline.to_dict()
-                        enhanced[marker]["baseline_deviation"] = comparison["deviation"]
-            
-            phase2_metadata["personal_baselines"] = {
+        
+        # Compare current estimates to baselines
+        baseline_comparisons = {}
+        for marker, baseline in baselines.items():
+            if marker in enhanced:
+                current_value = enhanced[marker].get("center") or enhanced[marker].get("value")
+                if current_value is not None:
+                    comparison = self.baselines.compare_to_baseline(baseline, current_value)
+                    baseline_comparisons[marker] = comparison
+                    
+                    # Add baseline metadata to estimate
+                    enhanced[marker]["personal_baseline"] = baseline.to_dict()
+                    enhanced[marker]["baseline_deviation"] = comparison["deviation"]
+        
+        logger.info(f"Personal baselines: {len(baselines)} computed")
+        return {
+            "estimates": enhanced,
+            "personal_baselines": {
                 "computed": len(baselines),
                 "comparisons": baseline_comparisons
             }
-            logger.info(f"Personal baselines: {len(baselines)} computed")
+        }
+    
+    # ===== A2.5: Multi-Solver Agreement =====
+    def _stage_multi_solver(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Computing multi-solver agreement...")
         
-        # ===== A2.5: Multi-Solver Agreement =====
-        if self.FEATURE_FLAGS["enable_phase2_multi_solver"]:
-            logger.info("Computing multi-solver agreement...")
-            
-            # Extract available inputs
-            inputs = {**measured_anchors}
-            for marker, est in enhanced.items():
-                if "center" in est:
-                    inputs[marker] = est["center"]
-            
-            enhanced = self.multi_solver.apply_solver_agreement(
-                estimates=enhanced,
-                inputs=inputs,
-                metadata=metadata
-            )
-            
-            logger.info("Multi-solver agreement applied")
+        # Extract available inputs
+        solver_inputs = {**inputs["measured_anchors"]}
+        for marker, est in inputs["estimates"].items():
+            if "center" in est:
+                solver_inputs[marker] = est["center"]
         
-        # ===== B.6: Priors and Decay Logic =====
-        if self.FEATURE_FLAGS["enable_phase2_priors_decay"]:
-            logger.info("Applying priors and decay logic...")
-            
-            # Update posteriors with any new measurements
-            for marker, value in measured_anchors.items():
-                # Assume measurement uncertainty of 5% by default
-                uncertainty = abs(value) * 0.05
-                self.priors.update_posterior(
-                    marker_name=marker,
-                    measurement_value=value,
-                    measurement_uncertainty=uncertainty
-                )
-            
-            # Get prior status for all markers
-            priors_status = self.priors.get_all_priors_status()
-            phase2_metadata["priors_status"] = priors_status
-            
-            # For markers without direct measurements, incorporate priors
-            for marker, est in enhanced.items():
-                if marker not in measured_anchors:
-                    prior = self.priors.get_prior(marker, apply_decay=True)
-                    if prior:
-                        # Blend estimate with decayed prior
-                        # (More sophisticated blending could be done here)
-                        est["prior_mean"] = prior.mean
-                        est["prior_std"] = prior.std
-                        est["prior_strength"] = prior.get_current_strength()
-            
-            logger.info(f"Priors: {len(priors_status)} priors available")
+        enhanced = self.multi_solver.apply_solver_agreement(
+            estimates=inputs["estimates"],
+            inputs=solver_inputs,
+            metadata=inputs["metadata"]
+        )
         
-        # ===== B.7: Confidence Calibration =====
-        if self.FEATURE_FLAGS["enable_phase2_confidence_calibration"]:
-            logger.info("Calibrating confidence...")
-            
-            # Build confidence components for each estimate
-            components_map = {}
-            evidence_grades = {}
-            
-            for marker, est in enhanced.items():
-                # Extract component values from Phase 2 metadata
-                data_adequacy = 0.7  # Default, would compute from coverage
-                anchor_strength_score = 0.5  # Default
-                solver_agreement_score = 0.5  # Default
-                temporal_stability_score = 0.5  # Default
-                constraint_consistency_score = 0.5  # Default
-                conflict_penalty = 0.0
-                
-                # Extract from metadata if available
-                if "solver_agreement" in est:
-                    solver_agreement_score = est["solver_agreement"].get("agreement_score", 0.5)
-                
-                if "temporal_inertia" in phase2_metadata:
-                    stab_scores = phase2_metadata["temporal_inertia"].get("stability_scores", {})
-                    if marker in stab_scores:
-                        temporal_stability_score = stab_scores[marker]
-                
-                if "constraint_evaluations" in phase2_metadata:
-                    violations = phase2_metadata["constraint_evaluations"].get("violated_constraints", 0)
-                    constraint_consistency_score = max(0.3, 1.0 - (violations * 0.1))
-                
-                components = ConfidenceComponents(
-                    data_adequacy=data_adequacy,
-                    anchor_strength=anchor_strength_score,
-                    solver_agreement=solver_agreement_score,
-                    temporal_stability=temporal_stability_score,
-                    constraint_consistency=constraint_consistency_score,
-                    input_conflict_penalty=conflict_penalty
-                )
-                
-                components_map[marker] = components
-                
-                # Determine evidence grade (default to B for inferred)
-                evidence_grade = est.get("evidence_grade", EvidenceGrade.B)
-                if isinstance(evidence_grade, str):
-                    evidence_grade = EvidenceGrade(evidence_grade)
-                evidence_grades[marker] = evidence_grade
-            
-            # Calibrate
-            calibrated = self.calibrator.calibrate_batch(
-                estimates=enhanced,
-                components_map=components_map,
-                evidence_grades=evidence_grades
-            )
-            
-            enhanced = self.calibrator.apply_calibrated_confidence(
-                estimates=enhanced,
-                calibrated_map=calibrated
+        logger.info("Multi-solver agreement applied")
+        return {"estimates": enhanced}
+    
+    # ===== B.6: Priors and Decay Logic =====
+    def _stage_priors_decay(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Applying priors and decay logic...")
+        measured_anchors = inputs["measured_anchors"]
+        enhanced = inputs["estimates"]
+        db, user_id = inputs.get("db"), inputs.get("user_id")
+        persist = db is not None and user_id is not None
+        
+        # Start from the user's persisted posteriors
+        if persist:
+            self.priors.load_user_priors(db, [user_id])
+        
+        # Update posteriors with any new measurements
+        for marker, value in measured_anchors.items():
+            # Assume measurement uncertainty of 5% by default
+            uncertainty = abs(value) * 0.05
+            self.priors.update_posterior(
+                marker_name=marker,
+                measurement_value=value,
+                measurement_uncertainty=uncertainty,
+                user_id=user_id
             )
-            
-            logger.info(f"Confidence calibrated for {len(calibrated)} estimates")
         
-        # ===== B.8: Anchor Strength Gating =====
-        if self.FEATURE_FLAGS["enable_phase2_anchor_gating"]:
-            logger.info("Applying anchor strength gating...")
+        # Get prior status for all markers (decayed in one vectorized pass)
+        priors_status = self.priors.get_all_priors_status(user_id=user_id)
+        
+        # For markers without direct measurements, incorporate decayed priors
+        for marker, est in enhanced.items():
+            if marker not in measured_anchors and marker in priors_status:
+                # Blend estimate with decayed prior
+                # (More sophisticated blending could be done here)
+                status = priors_status[marker]
+                est["prior_mean"] = status["decayed_mean"]
+                est["prior_std"] = status["decayed_std"]
+                est["prior_strength"] = status["strength"]
+        
+        if persist:
+            self.priors.save_user_priors(db, [user_id])
+        
+        logger.info(f"Priors: {len(priors_status)} priors available")
+        return {"estimates": enhanced, "priors_status": priors_status}
+    
+    # ===== B.7: Confidence Calibration =====
+    def _stage_confidence_calibration(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Calibrating confidence...")
+        enhanced = inputs["estimates"]
+        
+        # Build confidence components for each estimate
+        components_map = {}
+        evidence_grades = {}
+        
+        for marker, est in enhanced.items():
+            # Extract component values from Phase 2 metadata
+            data_adequacy = 0.7  # Default, would compute from coverage
+            anchor_strength_score = 0.5  # Default
+            solver_agreement_score = 0.5  # Default
+            temporal_stability_score = 0.5  # Default
+            constraint_consistency_score = 0.5  # Default
+            conflict_penalty = 0.0
             
-            # Build coverage and temporal info
-            coverage_info = {}
-            temporal_info = {}
+            # Extract from metadata if available
+            if "solver_agreement" in est:
+                solver_agreement_score = est["solver_agreement"].get("agreement_score", 0.5)
             
-            # Extract from historical data
-            for marker, history in historical_data.items():
-                if history:
-                    # Simple coverage score based on data density
-                    days_covered = len(set(t.date() for t, _ in history))
-                    coverage_info[marker] = min(1.0, days_covered / 30.0)  # 30 days = full coverage
+            if "temporal_inertia" in inputs:
+                stab_scores = inputs["temporal_inertia"].get("stability_scores", {})
+                if marker in stab_scores:
+                    temporal_stability_score = stab_scores[marker]
             
-            # Get temporal stability from phase 2 metadata
-            if "temporal_inertia" in phase2_metadata:
-                temporal_info = phase2_metadata["temporal_inertia"].get("stability_scores", {})
+            if "constraint_evaluations" in inputs:
+                violations = inputs["constraint_evaluations"].get("violated_constraints", 0)
+                constraint_consistency_score = max(0.3, 1.0 - (violations * 0.1))
             
-            # Assess anchor strength for all markers
-            markers_to_assess = list(enhanced.keys())
-            assessments = self.anchor_gate.assess_batch(
-                markers=markers_to_assess,
-                available_data={**measured_anchors, **{k: v.get("center", 0) for k, v in enhanced.items()}},
-                coverage_info=coverage_info,
-                temporal_info=temporal_info
+            components = ConfidenceComponents(
+                data_adequacy=data_adequacy,
+                anchor_strength=anchor_strength_score,
+                solver_agreement=solver_agreement_score,
+                temporal_stability=temporal_stability_score,
+                constraint_consistency=constraint_consistency_score,
+                input_conflict_penalty=conflict_penalty
             )
             
-            # Apply gating
-            enhanced = self.anchor_gate.apply_anchor_gating(
-                estimates=enhanced,
-                assessments=assessments
-            )
+            components_map[marker] = components
             
-            phase2_metadata["anchor_gating"] = {
-                marker: assessment.to_dict()
-                for marker, assessment in assessments.items()
-            }
-            
-            logger.info(f"Anchor gating: {len(enhanced)} outputs passed")
+            # Determine evidence grade (default to B for inferred)
+            evidence_grade = est.get("evidence_grade", EvidenceGrade.B)
+            if isinstance(evidence_grade, str):
+                evidence_grade = EvidenceGrade(evidence_grade)
+            evidence_grades[marker] = evidence_grade
         
-        logger.info("=" * 60)
-        logger.info("PHASE 2 INTEGRATION COMPLETE")
-        logger.info("=" * 60)
+        # Calibrate
+        calibrated = self.calibrator.calibrate_batch(
+            estimates=enhanced,
+            components_map=components_map,
+            evidence_grades=evidence_grades
+        )
+        
+        enhanced = self.calibrator.apply_calibrated_confidence(
+            estimates=enhanced,
+            calibrated_map=calibrated
+        )
+        
+        logger.info(f"Confidence calibrated for {len(calibrated)} estimates")
+        return {"estimates": enhanced}
+    
+    # ===== B.8: Anchor Strength Gating =====
+    def _stage_anchor_gating(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Applying anchor strength gating...")
+        enhanced = inputs["estimates"]
+        
+        # Build coverage and temporal info
+        coverage_info = {}
+        temporal_info = {}
+        
+        # Extract from historical data
+        for marker, history in inputs["historical_data"].items():
+            if history:
+                # Simple coverage score based on data density
+                days_covered = len(set(t.date() for t, _ in history))
+                coverage_info[marker] = min(1.0, days_covered / 30.0)  # 30 days = full coverage
         
+        # Get temporal stability from phase 2 metadata
+        if "temporal_inertia" in inputs:
+            temporal_info = inputs["temporal_inertia"].get("stability_scores", {})
+        
+        # Assess anchor strength for all markers
+        markers_to_assess = list(enhanced.keys())
+        assessments = self.anchor_gate.assess_batch(
+            markers=markers_to_assess,
+            available_data={**inputs["measured_anchors"], **{k: v.get("center", 0) for k, v in enhanced.items()}},
+            coverage_info=coverage_info,
+            temporal_info=temporal_info
+        )
+        
+        # Apply gating
+        enhanced = self.anchor_gate.apply_anchor_gating(
+            estimates=enhanced,
+            assessments=assessments
+        )
+        
+        logger.info(f"Anchor gating: {len(enhanced)} outputs passed")
         return {
             "estimates": enhanced,
-            "phase2_metadata": phase2_metadata
+            "anchor_gating": {
+                marker: assessment.to_dict()
+                for marker, assessment in assessments.items()
+            }
         }
     
     def get_phase2_summary(self, integration_result: Dict[str, Any]) -> Dict[str, Any]:
@@ -18,6 +18,7 @@ from app.features.provider_summary import get_provider_summary_generator
 from app.features.cost_care_impact import get_cost_care_impact_analyzer
 from app.features.explainability import get_explainability_engine
 from app.features.language_control import get_language_controller
+from app.ml.stage_graph import StageGraph
 
 
 @dataclass
@@ -51,6 +52,29 @@ class Phase3Integrator:
     
     FEATURE_FLAGS = Phase3FeatureFlags()
     
+    # phase3_metadata keys in report order
+    METADATA_KEYS = (
+        "uncertainty_reduction",
+        "top_recommendations",
+        "cohort_match",
+        "change_point_analysis",
+        "explanations",
+        "provider_summary",
+        "cost_impact",
+        "language_violations"
+    )
+    
+    # Stage name -> feature flag attribute
+    STAGE_FLAGS = {
+        "uncertainty_reduction": "enable_uncertainty_reduction_planner",
+        "cohort_matching": "enable_cohort_matching",
+        "change_point_detection": "enable_change_point_detection",
+        "explainability": "enable_tight_explainability",
+        "provider_summary": "enable_provider_summary",
+        "cost_impact": "enable_cost_impact_modules",
+        "language_control": "enable_language_control"
+    }
+    
     def __init__(self):
         # A2 Processing components
         self.uncertainty_planner = get_uncertainty_reduction_planner()
@@ -62,6 +86,61 @@ class Phase3Integrator:
         self.impact_analyzer = get_cost_care_impact_analyzer()
         self.explainability_engine = get_explainability_engine()
         self.language_controller = get_language_controller()
+        
+        self.stage_graph = self._build_stage_graph()
+    
+    def _build_stage_graph(self) -> StageGraph:
+        """
+        Declare Phase 3 stages.
+        
+        Uncertainty planning, cohort matching and change-point detection only
+        read the request inputs, so they run concurrently. Cohort matching is
+        memoized; the other two report ages relative to the wall clock and are
+        always recomputed. The B Output stages read their predecessors'
+        metadata and run in order.
+        """
+        graph = StageGraph("phase3")
+        request = ("estimates", "measured_anchors", "historical_data")
+        a2_keys = ("uncertainty_reduction", "top_recommendations", "cohort_match", "change_point_analysis")
+        
+        graph.add_stage(
+            "uncertainty_reduction", self._stage_uncertainty_reduction,
+            inputs=request + ("run_id",),
+            outputs=("uncertainty_reduction", "top_recommendations")
+        )
+        graph.add_stage(
+            "cohort_matching", self._stage_cohort_matching,
+            inputs=request, outputs=("cohort_match",), memoize=True
+        )
+        graph.add_stage(
+            "change_point_detection", self._stage_change_point_detection,
+            inputs=("historical_data", "phase2_metadata"),
+            outputs=("change_point_analysis",)
+        )
+        graph.add_stage(
+            "explainability", self._stage_explainability,
+            inputs=("estimates", "phase2_metadata") + a2_keys,
+            outputs=("explanations",)
+        )
+        graph.add_stage(
+            "provider_summary", self._stage_provider_summary,
+            inputs=request + ("patient_id", "phase2_metadata", "previous_report") + a2_keys + ("explanations",),
+            outputs=("provider_summary",)
+        )
+        graph.add_stage(
+            "cost_impact", self._stage_cost_impact,
+            inputs=request + ("phase2_metadata",) + a2_keys + ("explanations", "provider_summary"),
+            outputs=("cost_impact",)
+        )
+        graph.add_stage(
+            "language_control", self._stage_language_control,
+            inputs=("provider_summary",), outputs=("language_violations",)
+        )
+        return graph
+    
+    def clear_stage_cache(self):
+        """Drop memoized stage outputs (e.g. after reconfiguring an engine)."""
+        self.stage_graph.clear_cache()
     
     def integrate_phase3(
         self,
@@ -72,7 +151,9 @@ class Phase3Integrator:
         historical_data: Dict[str, List[Dict]],
         events: Optional[List[Dict]],
         phase2_metadata: Optional[Dict],
-        previous_report: Optional[Dict] = None
+        previous_report: Optional[Dict] = None,
+        outputs: Optional[List[str]] = None,
+        parallel: bool = True
     ) -> Dict[str, any]:
         """
         Main Phase 3 integration method.
@@ -88,6 +169,9 @@ class Phase3Integrator:
             events: Optional events (illness, medications, etc.)
             phase2_metadata: Metadata from Phase 2
             previous_report: Previous report for comparison
+            outputs: phase3_metadata keys to produce (default: all); stages
+                not needed for them are skipped
+            parallel: Run independent stages concurrently
         
         Returns:
             {
@@ -99,33 +183,67 @@ class Phase3Integrator:
                     "explanations": {...},
                     "provider_summary": {...},
                     "cost_impact": {...}
-                }
+                },
+                "stage_report": {...}  # Per-stage status and timing
             }
         """
-        phase3_metadata = {}
-        
-        # ===== A2 PROCESSING =====
+        context = {
+            "patient_id": patient_id,
+            "run_id": run_v2.run_id if hasattr(run_v2, 'run_id') else None,
+            "estimates": estimates,
+            "measured_anchors": measured_anchors,
+            "historical_data": historical_data,
+            "phase2_metadata": phase2_metadata,
+            "previous_report": previous_report
+        }
+        enabled = {
+            stage: getattr(self.FEATURE_FLAGS, flag)
+            for stage, flag in self.STAGE_FLAGS.items()
+        }
         
-        # 1. Uncertainty Reduction Planning
-        if self.FEATURE_FLAGS.enable_uncertainty_reduction_planner:
-            uncertainty_plan = self.uncertainty_planner.plan_uncertainty_reduction(
-                current_estimates=estimates,
-                measured_anchors=measured_anchors,
-                historical_data=historical_data,
-                metadata={"run_id": run_v2.run_id if hasattr(run_v2, 'run_id') else None}
-            )
-            phase3_metadata["uncertainty_reduction"] = uncertainty_plan
-            phase3_metadata["top_recommendations"] = uncertainty_plan.get("top_recommendations", [])
+        run = self.stage_graph.run(
+            context,
+            targets=outputs if outputs is not None else list(self.METADATA_KEYS),
+            enabled=enabled,
+            parallel=parallel
+        )
         
-        # 2. Cohort Matching
-        if self.FEATURE_FLAGS.enable_cohort_matching:
-            cohort_match = self.cohort_engine.match_cohort(
-                current_estimates=estimates,
-                measured_anchors=measured_anchors,
-                historical_data=historical_data,
-                user_metadata={"age": None, "sex": None, "medications": []}  # Would get from run_v2
-            )
-            phase3_metadata["cohort_match"] = {
+        # Return enhanced output
+        return {
+            "estimates": estimates,  # Unchanged
+            "phase3_metadata": self._partial_metadata(run.values),
+            "stage_report": run.to_dict()
+        }
+    
+    def _partial_metadata(self, values: Dict[str, any]) -> Dict[str, any]:
+        """phase3_metadata view of whichever stage outputs are available."""
+        return {key: values[key] for key in self.METADATA_KEYS if key in values}
+    
+    # ===== A2 PROCESSING =====
+    
+    def _stage_uncertainty_reduction(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """1. Uncertainty Reduction Planning"""
+        uncertainty_plan = self.uncertainty_planner.plan_uncertainty_reduction(
+            current_estimates=inputs["estimates"],
+            measured_anchors=inputs["measured_anchors"],
+            historical_data=inputs["historical_data"],
+            metadata={"run_id": inputs["run_id"]}
+        )
+        return {
+            "uncertainty_reduction": uncertainty_plan,
+            "top_recommendations": uncertainty_plan.get("top_recommendations", [])
+        }
+    
+    def _stage_cohort_matching(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """2. Cohort Matching"""
+        cohort_match = self.cohort_engine.match_cohort(
+            current_estimates=inputs["estimates"],
+            measured_anchors=inputs["measured_anchors"],
+            historical_data=inputs["historical_data"],
+            user_metadata={"age": None, "sex": None, "medications": []}  # Would get from run_v2
+        )
+        return {
+            "cohort_match": {
                 "matched_cohort_id": cohort_match.matched_cohort_id,
                 "matched_cohort_name": cohort_match.matched_cohort_name,
                 "overall_similarity_score": cohort_match.overall_similarity_score,
@@ -135,53 +253,57 @@ class Phase3Integrator:
                 "cohort_diabetes_prevalence": cohort_match.cohort_diabetes_prevalence,
                 "cohort_cvd_prevalence": cohort_match.cohort_cvd_prevalence
             }
+        }
+    
+    def _stage_change_point_detection(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """3. Change Point Detection (for key markers)"""
+        historical_data = inputs["historical_data"]
+        phase2_metadata = inputs["phase2_metadata"]
+        change_analyses = {}
+        key_markers = ["glucose", "a1c", "ldl", "triglycerides", "blood_pressure_systolic"]
         
-        # 3. Change Point Detection (for key markers)
-        if self.FEATURE_FLAGS.enable_change_point_detection:
-            change_analyses = {}
-            key_markers = ["glucose", "a1c", "ldl", "triglycerides", "blood_pressure_systolic"]
-            
-            for marker in key_markers:
-                if marker in historical_data and historical_data[marker]:
-                    analysis = self.change_detector.detect_change_points(
-                        marker_id=marker,
-                        historical_data=historical_data[marker],
-                        marker_kinetics=phase2_metadata.get("temporal_kinetics", {}).get(marker) if phase2_metadata else None
-                    )
-                    
-                    change_analyses[marker] = {
-                        "events_count": len(analysis.events),
-                        "recent_events": [
-                            {
-                                "timestamp": e.change_point_timestamp.isoformat(),
-                                "change_type": e.change_type.value,
-                                "direction": e.direction.value,
-                                "magnitude": e.magnitude,
-                                "clinical_relevance": e.clinical_relevance.value,
-                                "days_ago": e.days_ago
-                            }
-                            for e in analysis.recent_events
-                        ],
-                        "current_phase": analysis.current_phase,
-                        "phase_confidence": analysis.phase_confidence,
-                        "overall_trend": analysis.overall_trend,
-                        "early_warning_flags": analysis.early_warning_flags,
-                        "recovery_signals": analysis.recovery_signals
-                    }
-            
-            phase3_metadata["change_point_analysis"] = change_analyses
+        for marker in key_markers:
+            if marker in historical_data and historical_data[marker]:
+                analysis = self.change_detector.detect_change_points(
+                    marker_id=marker,
+                    historical_data=historical_data[marker],
+                    marker_kinetics=phase2_metadata.get("temporal_kinetics", {}).get(marker) if phase2_metadata else None
+                )
+                
+                change_analyses[marker] = {
+                    "events_count": len(analysis.events),
+                    "recent_events": [
+                        {
+                            "timestamp": e.change_point_timestamp.isoformat(),
+                            "change_type": e.change_type.value,
+                            "direction": e.direction.value,
+                            "magnitude": e.magnitude,
+                            "clinical_relevance": e.clinical_relevance.value,
+                            "days_ago": e.days_ago
+                        }
+                        for e in analysis.recent_events
+                    ],
+                    "current_phase": analysis.current_phase,
+                    "phase_confidence": analysis.phase_confidence,
+                    "overall_trend": analysis.overall_trend,
+                    "early_warning_flags": analysis.early_warning_flags,
+                    "recovery_signals": analysis.recovery_signals
+                }
         
-        # ===== B OUTPUT =====
+        return {"change_point_analysis": change_analyses}
+    
+    # ===== B OUTPUT =====
+    
+    def _stage_explainability(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """4. Tight Explainability"""
+        explanations = self.explainability_engine.explain_batch(
+            estimates=inputs["estimates"],
+            phase2_metadata=inputs["phase2_metadata"],
+            phase3_metadata=self._partial_metadata(inputs)
+        )
         
-        # 4. Tight Explainability
-        if self.FEATURE_FLAGS.enable_tight_explainability:
-            explanations = self.explainability_engine.explain_batch(
-                estimates=estimates,
-                phase2_metadata=phase2_metadata,
-                phase3_metadata=phase3_metadata
-            )
-            
-            phase3_metadata["explanations"] = {
+        return {
+            "explanations": {
                 output_id: {
                     "confidence_bar": exp.confidence_bar,
                     "confidence_interpretation": exp.confidence_interpretation,
@@ -199,20 +321,22 @@ class Phase3Integrator:
                 }
                 for output_id, exp in explanations.items()
             }
+        }
+    
+    def _stage_provider_summary(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """5. Provider Summary"""
+        provider_summary = self.summary_generator.generate_summary(
+            patient_id=inputs["patient_id"],
+            estimates=inputs["estimates"],
+            measured_anchors=inputs["measured_anchors"],
+            historical_data=inputs["historical_data"],
+            phase2_metadata=inputs["phase2_metadata"],
+            phase3_metadata=self._partial_metadata(inputs),
+            previous_report=inputs["previous_report"]
+        )
         
-        # 5. Provider Summary
-        if self.FEATURE_FLAGS.enable_provider_summary:
-            provider_summary = self.summary_generator.generate_summary(
-                patient_id=patient_id,
-                estimates=estimates,
-                measured_anchors=measured_anchors,
-                historical_data=historical_data,
-                phase2_metadata=phase2_metadata,
-                phase3_metadata=phase3_metadata,
-                previous_report=previous_report
-            )
-            
-            phase3_metadata["provider_summary"] = {
+        return {
+            "provider_summary": {
                 "report_date": provider_summary.report_date.isoformat(),
                 "data_quality_grade": provider_summary.data_quality_grade,
                 "what_changed": {
@@ -242,19 +366,21 @@ class Phase3Integrator:
                 },
                 "formatted_text": self.summary_generator.format_for_display(provider_summary)
             }
+        }
+    
+    def _stage_cost_impact(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """6. Cost & Care Impact Analysis"""
+        impact_modules = self.impact_analyzer.analyze_impact(
+            estimates=inputs["estimates"],
+            measured_anchors=inputs["measured_anchors"],
+            historical_data=inputs["historical_data"],
+            phase2_metadata=inputs["phase2_metadata"],
+            phase3_metadata=self._partial_metadata(inputs),
+            user_metadata={}
+        )
         
-        # 6. Cost & Care Impact Analysis
-        if self.FEATURE_FLAGS.enable_cost_impact_modules:
-            impact_modules = self.impact_analyzer.analyze_impact(
-                estimates=estimates,
-                measured_anchors=measured_anchors,
-                historical_data=historical_data,
-                phase2_metadata=phase2_metadata,
-                phase3_metadata=phase3_metadata,
-                user_metadata={}
-            )
-            
-            phase3_metadata["cost_impact"] = {
+        return {
+            "cost_impact": {
                 module_id: {
                     "should_render": module.should_render,
                     "suppression_reason": module.suppression_reason,
@@ -271,28 +397,28 @@ class Phase3Integrator:
                 }
                 for module_id, module in impact_modules.items()
             }
+        }
+    
+    def _stage_language_control(self, inputs: Dict[str, any]) -> Dict[str, any]:
+        """7. Language Control Validation"""
+        # Validate provider summary text
+        if "provider_summary" not in inputs:
+            return {}
         
-        # 7. Language Control Validation
-        if self.FEATURE_FLAGS.enable_language_control:
-            # Validate provider summary text
-            if "provider_summary" in phase3_metadata:
-                summary_text = phase3_metadata["provider_summary"].get("formatted_text", "")
-                violations = self.language_controller.validate_text(summary_text)
-                
-                if violations:
-                    phase3_metadata["language_violations"] = [
-                        {
-                            "type": v.violation_type.value,
-                            "phrase": v.violating_phrase,
-                            "severity": v.severity
-                        }
-                        for v in violations
-                    ]
+        summary_text = inputs["provider_summary"].get("formatted_text", "")
+        violations = self.language_controller.validate_text(summary_text)
+        if not violations:
+            return {}
         
-        # Return enhanced output
         return {
-            "estimates": estimates,  # Unchanged
-            "phase3_metadata": phase3_metadata
+            "language_violations": [
+                {
+                    "type": v.violation_type.value,
+                    "phrase": v.violating_phrase,
+                    "severity": v.severity
+                }
+                for v in violations
+            ]
         }
 
 
@@ -0,0 +1,274 @@
+"""
+Stage Graph Executor
+
+Declarative pipeline graph used by the Phase 1/2/3 integrators.
+
+Each stage declares the context keys it reads and the keys it writes. A key
+may be rewritten by a later stage (e.g. "estimates" passing through Phase 2);
+a reader always sees the latest earlier writer that is enabled and actually
+produced the key. From these declarations the executor:
+- prunes stages whose outputs nobody consumes,
+- runs independent stages concurrently on a worker pool,
+- memoizes pure stages by a fingerprint of their inputs,
+- records per-stage timing.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+
+class StageStatus:
+    """Outcome of a stage within one graph run."""
+    RAN = "ran"
+    CACHED = "cached"
+    DISABLED = "disabled"
+    PRUNED = "pruned"
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step.
+
+    `fn` receives a dict of the declared inputs that are available and returns
+    a dict of (a subset of) its declared outputs; an omitted output means the
+    stage did not produce it and readers fall back to the previous writer.
+    Only stages without side effects should set `memoize`.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Dict[str, Any]]
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    memoize: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "inputs": list(self.inputs),
+            "outputs": list(self.outputs),
+            "memoize": self.memoize
+        }
+
+
+@dataclass
+class StageReport:
+    """Timing and status for one stage."""
+    name: str
+    status: str
+    duration_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 3)
+        }
+
+
+@dataclass
+class GraphRunResult:
+    """Final value of every key plus per-stage reports."""
+    values: Dict[str, Any]
+    stages: List[StageReport] = field(default_factory=list)
+    total_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": [s.to_dict() for s in self.stages],
+            "total_ms": round(self.total_ms, 3)
+        }
+
+
+def _fingerprint_default(value: Any) -> Any:
+    """JSON fallback for fingerprinting non-JSON inputs."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def fingerprint(values: Dict[str, Any]) -> str:
+    """Stable digest of stage inputs."""
+    payload = json.dumps(values, sort_keys=True, default=_fingerprint_default)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageGraph:
+    """
+    Ordered collection of stages executed as a dependency graph.
+
+    Registration order defines which writer a reader binds to when several
+    stages write the same key.
+    """
+
+    def __init__(self, name: str, max_workers: int = 4, cache_size: int = 64):
+        self.name = name
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.stages: List[Stage] = []
+        self._cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+    def add_stage(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        memoize: bool = False
+    ) -> Stage:
+        """Register a stage (after any stage it should read from)."""
+        if any(s.name == name for s in self.stages):
+            raise ValueError(f"Duplicate stage name: {name}")
+        stage = Stage(name=name, fn=fn, inputs=tuple(inputs), outputs=tuple(outputs), memoize=memoize)
+        self.stages.append(stage)
+        return stage
+
+    def clear_cache(self):
+        """Drop all memoized stage outputs."""
+        self._cache.clear()
+
+    def run(
+        self,
+        context: Dict[str, Any],
+        targets: Optional[Sequence[str]] = None,
+        enabled: Optional[Dict[str, bool]] = None,
+        parallel: bool = True
+    ) -> GraphRunResult:
+        """
+        Execute the graph.
+
+        Args:
+            context: Initial key values (graph inputs)
+            targets: Keys the caller needs; None means every stage output
+            enabled: Stage name -> enabled (missing names are enabled)
+            parallel: Run independent stages concurrently
+
+        Returns:
+            GraphRunResult with the final value of each key
+        """
+        start = time.perf_counter()
+        enabled = enabled or {}
+        active = [i for i, s in enumerate(self.stages) if enabled.get(s.name, True)]
+
+        # Candidate writers for each (stage, input): enabled earlier writers, latest first
+        writers: Dict[int, Dict[str, List[int]]] = {}
+        latest: Dict[str, List[int]] = {}
+        for i in active:
+            stage = self.stages[i]
+            writers[i] = {key: list(latest.get(key, [])) for key in stage.inputs}
+            for key in stage.outputs:
+                latest[key] = [i] + latest.get(key, [])
+
+        needed = self._needed_stages(active, writers, latest, targets)
+
+        reports = {
+            s.name: StageReport(s.name, StageStatus.DISABLED)
+            for i, s in enumerate(self.stages) if i not in writers
+        }
+        for i in active:
+            if i not in needed:
+                reports[self.stages[i].name] = StageReport(self.stages[i].name, StageStatus.PRUNED)
+
+        results: Dict[int, Dict[str, Any]] = {}
+
+        def resolve(candidates: List[int], key: str) -> Any:
+            for writer in candidates:
+                if key in results.get(writer, {}):
+                    return True, results[writer][key]
+            if key in context:
+                return True, context[key]
+            return False, None
+
+        def execute(i: int) -> Dict[str, Any]:
+            stage = self.stages[i]
+            inputs = {}
+            for key in stage.inputs:
+                found, value = resolve(writers[i][key], key)
+                if found:
+                    inputs[key] = value
+
+            stage_start = time.perf_counter()
+            status = StageStatus.RAN
+            cache_key = None
+            if stage.memoize:
+                cache_key = (stage.name, fingerprint(inputs))
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    self._cache.move_to_end(cache_key)
+                    output = copy.deepcopy(cached)
+                    status = StageStatus.CACHED
+            if status == StageStatus.RAN:
+                output = stage.fn(inputs) or {}
+                if cache_key is not None:
+                    self._cache[cache_key] = copy.deepcopy(output)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+            elapsed = (time.perf_counter() - stage_start) * 1000
+            reports[stage.name] = StageReport(stage.name, status, elapsed)
+            logger.debug(f"[{self.name}] stage {stage.name} {status} in {elapsed:.2f} ms")
+            return {k: v for k, v in output.items() if k in stage.outputs}
+
+        # Wave scheduling: a stage is ready once every candidate writer finished
+        pending = sorted(needed)
+        deps = {i: {w for ws in writers[i].values() for w in ws if w in needed} for i in pending}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers) if parallel and self.max_workers > 1 else None
+        try:
+            while pending:
+                ready = [i for i in pending if deps[i] <= results.keys()]
+                if executor is not None and len(ready) > 1:
+                    outputs = list(executor.map(execute, ready))
+                else:
+                    outputs = [execute(i) for i in ready]
+                for i, output in zip(ready, outputs):
+                    results[i] = output
+                pending = [i for i in pending if i not in results]
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        values = dict(context)
+        for key, candidates in latest.items():
+            found, value = resolve(candidates, key)
+            if found:
+                values[key] = value
+
+        return GraphRunResult(
+            values=values,
+            stages=[reports[s.name] for s in self.stages],
+            total_ms=(time.perf_counter() - start) * 1000
+        )
+
+    def _needed_stages(
+        self,
+        active: List[int],
+        writers: Dict[int, Dict[str, List[int]]],
+        latest: Dict[str, List[int]],
+        targets: Optional[Sequence[str]]
+    ) -> Set[int]:
+        """Stages whose outputs reach a target, walking readers back to writers."""
+        if targets is None:
+            targets = list(latest)
+
+        needed: Set[int] = set()
+        frontier = [w for key in targets for w in latest.get(key, [])]
+        while frontier:
+            i = frontier.pop()
+            if i in needed:
+                continue
+            needed.add(i)
+            for candidates in writers[i].values():
+                frontier.extend(candidates)
+        return needed
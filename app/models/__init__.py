@@ -6,6 +6,7 @@ from app.models.part_a_models import (
     SpecimenUpload,
     SpecimenAnalyte,
     ISFAnalyteStream,
+    ISFStreamDerivedRecord,
     VitalsRecord,
     SOAPProfileRecord,
     QualitativeEncodingRecord
@@ -17,13 +18,16 @@ from app.models.a2_models import (
     A2Artifact,
     A2StatusEnum
 )
+from app.models.baseline_models import PersonalBaselineStateRecord
+from app.models.prior_models import UserPriorStateRecord
 
 __all__ = [
     "User", "RawSensorData", "CalibratedFeatures", "InferenceResult", 
     "RunV2Record", "FeaturePackV2",
     "PartASubmission", "SpecimenUpload", "SpecimenAnalyte",
-    "ISFAnalyteStream", "VitalsRecord", "SOAPProfileRecord",
+    "ISFAnalyteStream", "ISFStreamDerivedRecord", "VitalsRecord", "SOAPProfileRecord",
     "QualitativeEncodingRecord",
     "InferenceProvenance", "ProvenanceHelper",
-    "A2Run", "A2Summary", "A2Artifact", "A2StatusEnum"
+    "A2Run", "A2Summary", "A2Artifact", "A2StatusEnum",
+    "PersonalBaselineStateRecord", "UserPriorStateRecord"
 ]
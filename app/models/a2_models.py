@@ -41,7 +41,7 @@ class A2Run(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Metadata
-    triggered_by = Column(String, default="auto", comment="auto/manual/retry")
+    triggered_by = Column(String, default="auto", comment="auto/manual/retry/batch")
     superseded = Column(Boolean, default=False, comment="True if superseded by a newer run")
     computation_time_ms = Column(Integer, nullable=True)
     
@@ -0,0 +1,30 @@
+"""
+Personal Baseline State Models
+
+Persisted streaming baseline state (quantile sketches + running moments)
+per user and marker. Additive-only, non-breaking extension to existing schema.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, UniqueConstraint
+from app.db.base import Base
+
+
+class PersonalBaselineStateRecord(Base):
+    """Incremental personal baseline state for one (user, marker) pair."""
+    __tablename__ = "personal_baseline_states"
+    __table_args__ = (
+        UniqueConstraint("user_id", "marker_name", name="uq_personal_baseline_user_marker"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    marker_name = Column(String, nullable=False, index=True)
+    stream_type = Column(String, nullable=True)
+
+    # Serialized StreamingBaselineState (bounded size regardless of history length)
+    state_json = Column(JSON, nullable=False)
+    observation_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
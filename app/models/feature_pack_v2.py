@@ -24,6 +24,8 @@ class MotifEnum(str, Enum):
     GLUCOSE_LACTATE_UP_MEAL = "glucose_lactate_up_meal"
     DEHYDRATION_STRESS = "dehydration_stress"
     INFLAMMATORY_SLEEP_FRAGMENTATION = "inflammatory_sleep_fragmentation"
+    POSTPRANDIAL_SPIKE = "postprandial_spike"
+    NOCTURNAL_DIP = "nocturnal_dip"
     UNKNOWN = "unknown"
 
 
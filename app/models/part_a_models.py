@@ -5,8 +5,8 @@ Non-breaking extension to existing schema.
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, JSON, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text, JSON, UniqueConstraint, Enum as SQLEnum, func
+from sqlalchemy.orm import column_property, relationship
 from app.db.base import Base
 import enum
 
@@ -124,6 +124,8 @@ class ISFAnalyteStream(Base):
     # Time-series data (JSON arrays)
     values_json = Column(JSON, nullable=False, comment="Array of float values")
     timestamps_json = Column(JSON, nullable=False, comment="Array of ISO timestamps")
+    # Reading count computed in SQL, so a stream can be sized without loading its arrays
+    value_count = column_property(func.json_array_length(values_json))
     
     # Signal quality
     calibration_status = Column(String, nullable=True)
@@ -135,6 +137,29 @@ class ISFAnalyteStream(Base):
     
     # Relationships
     submission = relationship("PartASubmission", back_populates="isf_streams")
+    derived_records = relationship("ISFStreamDerivedRecord", back_populates="stream", cascade="all, delete-orphan")
+
+
+class ISFStreamDerivedRecord(Base):
+    """Cached result derived from one ISF stream (metrics, model state, etc.)."""
+    __tablename__ = "isf_stream_derived"
+    __table_args__ = (
+        UniqueConstraint("stream_id", "kind", name="uq_isf_stream_derived_stream_kind"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    stream_id = Column(Integer, ForeignKey("isf_analyte_streams.id"), nullable=False, index=True)
+    
+    kind = Column(String, nullable=False, comment="glycemic_metrics, etc.")
+    version = Column(Integer, nullable=False, default=1, comment="Bumped when the derivation changes")
+    source_value_count = Column(Integer, nullable=False, comment="Stream length the payload was computed from")
+    payload_json = Column(JSON, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    stream = relationship("ISFAnalyteStream", back_populates="derived_records")
 
 
 class VitalsRecord(Base):
@@ -0,0 +1,33 @@
+"""
+User Prior State Models
+
+Persisted per-user prior/posterior state for the priors decay engine, one row
+per (user, marker). Additive-only, non-breaking extension to existing schema.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint
+from app.db.base import Base
+
+
+class UserPriorStateRecord(Base):
+    """Current prior (or learned posterior) for one (user, marker) pair."""
+    __tablename__ = "user_prior_states"
+    __table_args__ = (
+        UniqueConstraint("user_id", "marker_name", name="uq_user_prior_user_marker"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    marker_name = Column(String, nullable=False)
+
+    # Gaussian prior parameters (undecayed; decay is applied at read time)
+    mean = Column(Float, nullable=False)
+    std = Column(Float, nullable=False)
+    source = Column(String, nullable=False)
+    half_life_days = Column(Float, nullable=False)
+    established_at = Column(DateTime, nullable=False)
+    last_measurement_date = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -5,8 +5,12 @@ Additive database models for storing inference provenance and audit trails.
 Enables full explainability and debugging of all computed outputs.
 """
 
+import base64
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import (
+    Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Index, insert, and_, or_
+)
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -20,6 +24,11 @@ class InferenceProvenance(Base):
     explainability of all outputs shown to users.
     """
     __tablename__ = "inference_provenance"
+    __table_args__ = (
+        # Audit queries: filter by user/panel/metric, page newest-first by (created_at, id)
+        Index("ix_provenance_user_panel_metric_created", "user_id", "panel_name", "metric_name", "created_at", "id"),
+        Index("ix_provenance_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -131,40 +140,272 @@ class ProvenanceHelper:
         Returns:
             Created InferenceProvenance record
         """
-        # Extract summary fields from payloads
-        confidence_percent = confidence_payload.get('confidence_percent', 0.0)
-        gating_allowed = gating_payload.get('recommended_range_width', 'unknown')
-        
-        provenance = InferenceProvenance(
+        provenance = InferenceProvenance(**ProvenanceHelper.build_provenance_row(
             user_id=user_id,
             output_id=output_id,
             panel_name=panel_name,
             metric_name=metric_name,
             output_type=output_type,
-            time_window_start=time_window_start,
-            time_window_end=time_window_end,
-            time_window_days=time_window_days,
             input_chain=input_chain,
             raw_input_refs=raw_input_refs,
-            derived_features=derived_features,
-            methodologies_used=methodologies_used[:4],  # Cap at 4
-            method_why=method_why,
+            methodologies_used=methodologies_used,
             confidence_payload=confidence_payload,
-            confidence_percent=confidence_percent,
             gating_payload=gating_payload,
-            gating_allowed=gating_allowed,
             output_value=output_value,
             output_range_low=output_range_low,
             output_range_high=output_range_high,
             output_units=output_units,
+            time_window_start=time_window_start,
+            time_window_end=time_window_end,
+            time_window_days=time_window_days,
+            derived_features=derived_features,
+            method_why=method_why,
             computation_time_ms=computation_time_ms
-        )
+        ))
         
         session.add(provenance)
         session.flush()  # Get ID without committing
         
         return provenance
     
+    @staticmethod
+    def build_provenance_row(
+        user_id: int,
+        output_id: str,
+        panel_name: str,
+        metric_name: str,
+        output_type: str,
+        input_chain: str,
+        raw_input_refs: dict,
+        methodologies_used: list,
+        confidence_payload: dict,
+        gating_payload: dict,
+        output_value: float = None,
+        output_range_low: float = None,
+        output_range_high: float = None,
+        output_units: str = None,
+        time_window_start: datetime = None,
+        time_window_end: datetime = None,
+        time_window_days: int = None,
+        derived_features: dict = None,
+        method_why: str = None,
+        computation_time_ms: int = None
+    ) -> Dict[str, Any]:
+        """
+        Build the column values for a provenance record without touching the DB.
+        
+        Takes the same arguments as create_provenance_record (minus session).
+        
+        Returns:
+            Dict of InferenceProvenance column values
+        """
+        # Extract summary fields from payloads
+        confidence_percent = confidence_payload.get('confidence_percent', 0.0)
+        gating_allowed = gating_payload.get('recommended_range_width', 'unknown')
+        
+        return {
+            "user_id": user_id,
+            "output_id": output_id,
+            "panel_name": panel_name,
+            "metric_name": metric_name,
+            "output_type": output_type,
+            "time_window_start": time_window_start,
+            "time_window_end": time_window_end,
+            "time_window_days": time_window_days,
+            "input_chain": input_chain,
+            "raw_input_refs": raw_input_refs,
+            "derived_features": derived_features,
+            "methodologies_used": methodologies_used[:4],  # Cap at 4
+            "method_why": method_why,
+            "confidence_payload": confidence_payload,
+            "confidence_percent": confidence_percent,
+            "gating_payload": gating_payload,
+            "gating_allowed": gating_allowed,
+            "output_value": output_value,
+            "output_range_low": output_range_low,
+            "output_range_high": output_range_high,
+            "output_units": output_units,
+            "computation_time_ms": computation_time_ms
+        }
+    
+    @staticmethod
+    def create_provenance_records(session, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Insert many provenance rows in one batched INSERT.
+        
+        Args:
+            session: SQLAlchemy session (caller commits)
+            rows: Column dicts from build_provenance_row
+        
+        Returns:
+            Created record IDs, in the same order as `rows`
+        """
+        if not rows:
+            return []
+        
+        result = session.execute(
+            insert(InferenceProvenance).returning(
+                InferenceProvenance.id, sort_by_parameter_order=True
+            ),
+            rows
+        )
+        return list(result.scalars())
+    
+    @staticmethod
+    def encode_cursor(record: InferenceProvenance) -> str:
+        """Opaque keyset cursor positioned after `record`."""
+        raw = f"{record.created_at.isoformat()}|{record.id}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """
+        Parse a cursor from encode_cursor.
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            created_at, record_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+            return datetime.fromisoformat(created_at), int(record_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    @staticmethod
+    def query_provenance_records(
+        session,
+        user_id: int,
+        panel_name: str = None,
+        metric_name: str = None,
+        created_after: datetime = None,
+        created_before: datetime = None,
+        min_confidence: float = None,
+        max_confidence: float = None,
+        cursor: str = None,
+        limit: int = 100
+    ) -> Tuple[List[InferenceProvenance], Optional[str]]:
+        """
+        Filtered, keyset-paginated provenance records (newest first).
+        
+        Pages seek on (created_at, id) via the composite indexes, so deep
+        pages cost the same as the first one.
+        
+        Args:
+            session: SQLAlchemy session
+            user_id: User ID
+            panel_name: Optional panel filter
+            metric_name: Optional metric filter
+            created_after: Inclusive lower bound on created_at
+            created_before: Exclusive upper bound on created_at
+            min_confidence: Inclusive lower bound on confidence_percent
+            max_confidence: Inclusive upper bound on confidence_percent
+            cursor: next_cursor from the previous page
+            limit: Page size
+        
+        Returns:
+            (records, next_cursor); next_cursor is None on the last page
+        """
+        query = session.query(InferenceProvenance).filter(
+            InferenceProvenance.user_id == user_id
+        )
+        
+        if panel_name:
+            query = query.filter(InferenceProvenance.panel_name == panel_name)
+        if metric_name:
+            query = query.filter(InferenceProvenance.metric_name == metric_name)
+        if created_after is not None:
+            query = query.filter(InferenceProvenance.created_at >= created_after)
+        if created_before is not None:
+            query = query.filter(InferenceProvenance.created_at < created_before)
+        if min_confidence is not None:
+            query = query.filter(InferenceProvenance.confidence_percent >= min_confidence)
+        if max_confidence is not None:
+            query = query.filter(InferenceProvenance.confidence_percent <= max_confidence)
+        
+        if cursor:
+            cursor_created_at, cursor_id = ProvenanceHelper.decode_cursor(cursor)
+            query = query.filter(or_(
+                InferenceProvenance.created_at < cursor_created_at,
+                and_(
+                    InferenceProvenance.created_at == cursor_created_at,
+                    InferenceProvenance.id < cursor_id
+                )
+            ))
+        
+        query = query.order_by(
+            InferenceProvenance.created_at.desc(),
+            InferenceProvenance.id.desc()
+        )
+        
+        # Fetch one extra row to know whether another page exists
+        records = query.limit(limit + 1).all()
+        if len(records) <= limit:
+            return records, None
+        records = records[:limit]
+        return records, ProvenanceHelper.encode_cursor(records[-1])
+    
+    @staticmethod
+    def iter_provenance_records(
+        session,
+        user_id: int,
+        batch_size: int = 1000,
+        **filters
+    ) -> Iterator[InferenceProvenance]:
+        """
+        Stream every matching record page by page (newest first).
+        
+        Each page's records are detached from the session once consumed, so
+        memory stays bounded by `batch_size` however many rows match; other
+        objects in the session (e.g. the current user) stay attached.
+        
+        Args:
+            session: SQLAlchemy session
+            user_id: User ID
+            batch_size: Rows per keyset page
+            **filters: Same filters as query_provenance_records
+        """
+        cursor = None
+        while True:
+            records, cursor = ProvenanceHelper.query_provenance_records(
+                session, user_id, cursor=cursor, limit=batch_size, **filters
+            )
+            yield from records
+            for record in records:
+                session.expunge(record)
+            if cursor is None:
+                return
+    
+    @staticmethod
+    def to_dict(record: InferenceProvenance) -> Dict[str, Any]:
+        """JSON-serializable view of a provenance record."""
+        return {
+            "id": record.id,
+            "user_id": record.user_id,
+            "output_id": record.output_id,
+            "panel_name": record.panel_name,
+            "metric_name": record.metric_name,
+            "output_type": record.output_type,
+            "time_window_start": record.time_window_start.isoformat() if record.time_window_start else None,
+            "time_window_end": record.time_window_end.isoformat() if record.time_window_end else None,
+            "time_window_days": record.time_window_days,
+            "input_chain": record.input_chain,
+            "raw_input_refs": record.raw_input_refs,
+            "derived_features": record.derived_features,
+            "methodologies_used": record.methodologies_used,
+            "method_why": record.method_why,
+            "confidence_payload": record.confidence_payload,
+            "confidence_percent": record.confidence_percent,
+            "gating_payload": record.gating_payload,
+            "gating_allowed": record.gating_allowed,
+            "output_value": record.output_value,
+            "output_range_low": record.output_range_low,
+            "output_range_high": record.output_range_high,
+            "output_units": record.output_units,
+            "schema_version": record.schema_version,
+            "created_at": record.created_at.isoformat() if record.created_at else None,
+            "computation_time_ms": record.computation_time_ms
+        }
+    
     @staticmethod
     def get_user_provenance_records(
         session,
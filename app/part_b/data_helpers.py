@@ -19,6 +19,9 @@ from app.models.part_a_models import (
     SOAPProfileRecord,
     QualitativeEncodingRecord
 )
+from app.features.glycemic_metrics import merged_glycemic_metrics
+from app.features.state_space import stream_kalman_state
+from app.features.signal_quality import merged_quality_summary, stream_signal_quality
 
 
 class PartADataHelper:
@@ -67,8 +70,16 @@ class PartADataHelper:
         """
         Get aggregated ISF data for a specific analyte.
         
+        Kalman/RTS state per stream (persisted, advanced incrementally) adds
+        the smoothed mean, innovation-based noise and level drift. Quality
+        scores are measured from the data (dropout, noise, artifacts, drift
+        vs labs; also persisted per stream), falling back to the submitted
+        noise_score, then to the innovation-based noise.
+        
         Returns:
-            Dict with: mean, std, min, max, cv, days_of_data, value_count, quality_score
+            Dict with: mean, std, min, max, cv, days_of_data, value_count, quality_score,
+            smoothed_mean, innovation_noise_sd, innovation_noise_score, drift_per_day,
+            dropout_pct, sensor_drift_score, artifact_pct
         """
         streams = PartADataHelper.get_isf_streams(
             db, submission_id, [analyte_name], days_back
@@ -80,6 +91,7 @@ class PartADataHelper:
         # Aggregate across all streams for this analyte
         all_values = []
         quality_scores = []
+        smoothing = []
         earliest_time = None
         latest_time = None
         
@@ -88,9 +100,19 @@ class PartADataHelper:
                 values = stream.values_json if isinstance(stream.values_json, list) else []
                 all_values.extend(values)
                 
-                # Quality scores from fields
-                if stream.noise_score is not None:
+                state = stream_kalman_state(stream)
+                if state:
+                    smoothing.append(state['summary'])
+                
+                quality = stream_signal_quality(stream)
+                
+                # Measured quality, else the submitted fields, else the innovation-based noise
+                if quality:
+                    quality_scores.append(quality['summary']['quality_score'])
+                elif stream.noise_score is not None:
                     quality_scores.append(1.0 - min(stream.noise_score, 1.0))
+                elif state:
+                    quality_scores.append(1.0 - state['summary']['noise_score'])
                 
                 # Get timestamps to determine time range
                 if stream.timestamps_json:
@@ -121,6 +143,16 @@ class PartADataHelper:
         if earliest_time and latest_time:
             days_of_data = (latest_time - earliest_time).days + 1
         
+        # Reading-weighted smoothing summaries across streams
+        smoothed = {}
+        if smoothing:
+            weights = np.array([summary['n'] for summary in smoothing], dtype=float)
+            for key in ('smoothed_mean', 'noise_sd', 'noise_score', 'drift_per_day'):
+                smoothed[key] = float(np.average([summary[key] for summary in smoothing], weights=weights))
+        
+        # Reading-weighted measured signal quality across streams
+        signal = merged_quality_summary(streams) or {}
+        
         return {
             'analyte_name': analyte_name,
             'mean': mean_val,
@@ -133,9 +165,38 @@ class PartADataHelper:
             'value_count': len(all_values),
             'avg_quality_score': np.mean(quality_scores) if quality_scores else None,
             'earliest_time': earliest_time,
-            'latest_time': latest_time
+            'latest_time': latest_time,
+            'smoothed_mean': smoothed.get('smoothed_mean'),
+            'innovation_noise_sd': smoothed.get('noise_sd'),
+            'innovation_noise_score': smoothed.get('noise_score'),
+            'drift_per_day': smoothed.get('drift_per_day'),
+            'dropout_pct': signal.get('dropout_pct'),
+            'sensor_drift_score': signal.get('sensor_drift_score'),
+            'artifact_pct': signal.get('artifact_pct')
         }
     
+    @staticmethod
+    def get_isf_glycemic_metrics(
+        db: Session,
+        submission_id: int,
+        days_back: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Glycemic variability metrics (TIR/TAR/TBR, GMI, MAGE, CONGA, MODD,
+        LBGI/HBGI, AGP) over the full-resolution ISF glucose streams.
+        
+        Single-stream results come from the per-stream cache (filled at
+        ingest, or here for older streams; persisted when the session commits).
+        
+        Returns:
+            GlycemicMetrics dict, or None without glucose data
+        """
+        streams = PartADataHelper.get_isf_streams(db, submission_id, ['glucose'], days_back)
+        streams = [stream for stream in streams if stream.values_json]
+        if not streams:
+            return None
+        return merged_glycemic_metrics(streams)
+    
     @staticmethod
     def get_specimen_analytes(
         db: Session,
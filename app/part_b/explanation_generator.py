@@ -28,6 +28,21 @@ from app.part_b.clinical_mental_model import (
     get_metric_definition
 )
 from app.part_b.schemas.output_schemas import OutputLineItem
+from app.features.language_control import PhraseScanner
+
+
+FORBIDDEN_PHRASES = [
+    "you have",
+    "diagnosed",
+    "confirms",
+    "indicates disease",
+    "definitive",
+    "null",
+    "n/a",
+    "not available"
+]
+
+_FORBIDDEN_SCANNER = PhraseScanner(FORBIDDEN_PHRASES, literal=True)
 
 
 def generate_lab_analog_explanation(
@@ -210,30 +225,40 @@ def check_forbidden_phrases(text: str) -> List[str]:
     Check text for forbidden phrases.
     Returns list of forbidden phrases found (empty if clean).
     """
-    forbidden = [
-        "you have",
-        "diagnosed",
-        "confirms",
-        "indicates disease",
-        "definitive",
-        "null",
-        "n/a",
-        "not available"
+    return [FORBIDDEN_PHRASES[i] for i in _FORBIDDEN_SCANNER.found(text)]
+
+
+def check_forbidden_phrases_many(texts: List[str]) -> List[List[str]]:
+    """
+    Check many texts in a single scan.
+    Returns one list of forbidden phrases per text.
+    """
+    return [
+        [FORBIDDEN_PHRASES[i] for i in found]
+        for found in _FORBIDDEN_SCANNER.found_many(texts)
     ]
-    
-    text_lower = text.lower()
-    found = []
-    for phrase in forbidden:
-        if phrase in text_lower:
-            found.append(phrase)
-    
-    return found
 
 
-def validate_explanation_quality(explanation: LabAnalogExplanation) -> List[str]:
+def explanation_text(explanation: LabAnalogExplanation) -> str:
+    """All user-facing text of an explanation, as checked for forbidden phrases."""
+    return " ".join([
+        explanation.what_this_represents,
+        explanation.lab_correspondence,
+        " ".join(explanation.why_we_believe_this),
+        explanation.what_would_tighten_estimate
+    ])
+
+
+def validate_explanation_quality(
+    explanation: LabAnalogExplanation,
+    forbidden_found: Optional[List[str]] = None
+) -> List[str]:
     """
     Validate explanation meets quality standards.
     Returns list of issues (empty if valid).
+    
+    forbidden_found may be passed in when the explanation text was already
+    scanned as part of a batch (see check_forbidden_phrases_many).
     """
     issues = []
     
@@ -245,14 +270,8 @@ def validate_explanation_quality(explanation: LabAnalogExplanation) -> List[str]
         issues.append("Missing 'analog' reference in lab_correspondence")
     
     # Check forbidden phrases
-    all_text = " ".join([
-        explanation.what_this_represents,
-        explanation.lab_correspondence,
-        " ".join(explanation.why_we_believe_this),
-        explanation.what_would_tighten_estimate
-    ])
-    
-    forbidden_found = check_forbidden_phrases(all_text)
+    if forbidden_found is None:
+        forbidden_found = check_forbidden_phrases(explanation_text(explanation))
     if forbidden_found:
         issues.append(f"Forbidden phrases found: {', '.join(forbidden_found)}")
     
@@ -46,6 +46,7 @@ class MetabolicRegulationInference:
         glucose_data = PartADataHelper.get_isf_analyte_data(
             db, submission.id, 'glucose', days_back=30
         )
+        glycemic = PartADataHelper.get_isf_glycemic_metrics(db, submission.id, days_back=30)
         
         # Get prior HbA1c lab
         prior_a1c = PartADataHelper.get_most_recent_lab(
@@ -87,10 +88,21 @@ class MetabolicRegulationInference:
                 gating_payload=gating_result
             )
         
-        # Method 1: GMI-style regression (mean glucose → HbA1c estimate)
-        # GMI formula: HbA1c ≈ (mean_glucose_mg/dL + 46.7) / 28.7
-        mean_glucose = glucose_data.get('mean', 100) if glucose_data else 100
-        estimated_a1c = (mean_glucose + 46.7) / 28.7
+        # Method 3: Time-series smoothing (Kalman/RTS), applied to the mean fed to Method 1.
+        # The smoothed-to-raw ratio carries the correction into the metrics' mg/dL units.
+        smoothing_ratio = 1.0
+        if glucose_data and glucose_data.get('smoothed_mean') and glucose_data.get('mean'):
+            smoothing_ratio = glucose_data['smoothed_mean'] / glucose_data['mean']
+        
+        # Method 1: GMI regression (mean glucose → HbA1c estimate)
+        # GMI formula: HbA1c ≈ 3.31 + 0.02392 × mean_glucose_mg/dL
+        if glycemic:
+            mean_glucose = glycemic['mean_mg_dl'] * smoothing_ratio
+            estimated_a1c = 3.31 + 0.02392 * mean_glucose
+        else:
+            # eAG inversion when no stream metrics: (mean_glucose + 46.7) / 28.7
+            mean_glucose = (glucose_data.get('mean', 100) if glucose_data else 100) * smoothing_ratio
+            estimated_a1c = (mean_glucose + 46.7) / 28.7
         
         # Method 2: Bayesian calibration to prior HbA1c
         if prior_a1c and prior_a1c.get('value') is not None:
@@ -98,9 +110,6 @@ class MetabolicRegulationInference:
             prior_weight = max(0.3, 1.0 - (anchor_days / 180)) if anchor_days else 0.3
             estimated_a1c = prior_weight * prior_a1c['value'] + (1 - prior_weight) * estimated_a1c
         
-        # Method 3: Time-series smoothing (simple moving average for stability)
-        # Already applied via mean calculation
-        
         # Method 4: Constraint rules
         # Check for anemia/CKD from PMH that would affect HbA1c
         pmh_conditions = soap.get('pmh', []) if soap else []
@@ -129,8 +138,12 @@ class MetabolicRegulationInference:
         
         # Build input chain string
         input_chain_parts = [
-            f"ISF glucose ({glucose_data.get('days_of_data', 0)}d, mean {mean_glucose:.1f} mg/dL)" if glucose_data else "No glucose data"
+            f"ISF glucose ({glucose_data.get('days_of_data', 0)}d, {'smoothed ' if smoothing_ratio != 1.0 else ''}mean {mean_glucose:.1f} mg/dL)" if glucose_data else "No glucose data"
         ]
+        if glycemic:
+            input_chain_parts.append(
+                f"GMI {glycemic['gmi_pct']:.1f}% (TIR {glycemic['time_in_range_pct']:.0f}%)"
+            )
         if prior_a1c:
             input_chain_parts.append(f"prior HbA1c lab ({anchor_days}d old, {prior_a1c['value']:.1f}%)")
         if soap and soap.get('age'):
@@ -156,13 +169,14 @@ class MetabolicRegulationInference:
             input_chain=input_chain,
             input_references={
                 'isf_glucose_stream': True,
+                'glycemic_metrics': glycemic is not None,
                 'prior_a1c_upload_id': prior_a1c['upload_id'] if prior_a1c else None,
                 'soap_profile_id': submission.id
             },
             methodologies_used=[
                 "GMI-style regression (glucose → HbA1c)",
                 "Bayesian calibration to prior HbA1c",
-                "Time-series smoothing (moving average)",
+                "Time-series smoothing (Kalman/RTS)",
                 "Constraint rules (RBC turnover modifiers)"
             ],
             method_why=[
@@ -356,6 +370,7 @@ class MetabolicRegulationInference:
         
         # Get glucose data (for post-meal excursions)
         glucose_data = PartADataHelper.get_isf_analyte_data(db, submission.id, 'glucose', days_back=30)
+        glycemic = PartADataHelper.get_isf_glycemic_metrics(db, submission.id, days_back=30)
         
         # Get vitals (HR, HRV)
         hr_vitals = PartADataHelper.get_vitals_summary(db, submission.id, 'heart_rate', days_back=30)
@@ -395,12 +410,17 @@ class MetabolicRegulationInference:
             flexibility_score += 10
         
         # Glucose variability (moderate is better than very high)
-        glucose_cv = glucose_data.get('cv', 0.4)
+        glucose_cv = glycemic['cv'] if glycemic else glucose_data.get('cv', 0.4)
         if glucose_cv < 0.30:
             flexibility_score += 15
         elif glucose_cv < 0.40:
             flexibility_score += 8
         
+        # Excursion clearance: hourly glucose change (CONGA) small relative to swing size (MAGE)
+        if glycemic and glycemic.get('conga') is not None and glycemic.get('mage'):
+            if glycemic['conga'] < 0.5 * glycemic['mage']:
+                flexibility_score += 5
+        
         # Activity level bonus
         if soap and soap.get('activity_level') in ['moderate', 'high', 'very_high']:
             flexibility_score += 10
@@ -412,6 +432,10 @@ class MetabolicRegulationInference:
         # Method 3: Population baseline (normalize to 0-100)
         flexibility_score = min(100, max(0, flexibility_score))
         
+        glucose_desc = f"CV {glucose_cv:.2f}"
+        if glycemic and glycemic.get('mage') is not None:
+            glucose_desc += f", MAGE {glycemic['mage']:.0f} mg/dL"
+        
         # Confidence
         confidence_result = confidence_engine.compute_confidence(
             output_type=OutputType.INFERRED_WIDE,  # No direct lab anchor
@@ -433,7 +457,7 @@ class MetabolicRegulationInference:
             confidence_top_3_drivers=confidence_result['top_3_drivers'][:3],
             what_increases_confidence=confidence_result['what_increases_confidence'] + ["Add workout timestamps and meal labels for better segmentation"],
             safe_action_suggestion="Good metabolic flexibility (>70) suggests efficient fuel switching. If low (<50), focus on consistent activity, balanced meals, and adequate sleep.",
-            input_chain=f"ISF lactate (CV {lactate_cv:.2f}) + ISF glucose (CV {glucose_cv:.2f}) + activity level + sleep",
+            input_chain=f"ISF lactate (CV {lactate_cv:.2f}) + ISF glucose ({glucose_desc}) + activity level + sleep",
             input_references={
                 'isf_lactate_stream': True,
                 'isf_glucose_stream': True,
@@ -474,6 +498,7 @@ class MetabolicRegulationInference:
         submission = PartADataHelper.get_submission(db, submission_id, user_id)
         
         glucose_data = PartADataHelper.get_isf_analyte_data(db, submission.id, 'glucose', days_back=30)
+        glycemic = PartADataHelper.get_isf_glycemic_metrics(db, submission.id, days_back=30)
         soap = PartADataHelper.get_soap_profile(db, submission.id)
         
         if not glucose_data or glucose_data.get('days_of_data', 0) < 14:
@@ -498,13 +523,28 @@ class MetabolicRegulationInference:
         # Simple phenotype classification based on glucose patterns
         phenotype = "normal_clearance"  # Default
         
-        # Check for high post-meal spikes (early peak phenotype)
-        if glucose_data and glucose_data.get('max') is not None and glucose_data.get('cv') is not None and glucose_data['max'] > 160 and glucose_data['cv'] > 0.25:
-            phenotype = "early_peak"
-        
-        # Check for nocturnal elevation using mean as proxy
-        if glucose_data and glucose_data.get('mean') is not None and glucose_data['mean'] > 110:
-            phenotype = "delayed_clearance"
+        if glycemic:
+            # Large swings (MAGE) → early peaks; sustained time above range → delayed clearance
+            if glycemic.get('mage') is not None and glycemic['mage'] > 60:
+                phenotype = "early_peak"
+            if glycemic['time_above_range_pct'] > 10:
+                phenotype = "delayed_clearance"
+            
+            # Nocturnal elevation: AGP median overnight (00-06h) above the daytime median
+            median_profile = glycemic['agp'].get('p50', [])
+            night_bins = len(median_profile) // 4
+            night = [v for v in median_profile[:night_bins] if v is not None]
+            day = [v for v in median_profile[night_bins:] if v is not None]
+            if night and day and np.median(night) - np.median(day) > 10:
+                phenotype = "nocturnal_elevation"
+        else:
+            # Check for high post-meal spikes (early peak phenotype)
+            if glucose_data and glucose_data.get('max') is not None and glucose_data.get('cv') is not None and glucose_data['max'] > 160 and glucose_data['cv'] > 0.25:
+                phenotype = "early_peak"
+            
+            # Check for nocturnal elevation using mean as proxy
+            if glucose_data and glucose_data.get('mean') is not None and glucose_data['mean'] > 110:
+                phenotype = "delayed_clearance"
         
         # Late meal context from SOAP
         diet_pattern = soap.get('diet_pattern') if soap else None
@@ -530,8 +570,10 @@ class MetabolicRegulationInference:
             confidence_top_3_drivers=confidence_result['top_3_drivers'][:3],
             what_increases_confidence=confidence_result['what_increases_confidence'] + ["Add meal timestamps for better phenotyping"],
             safe_action_suggestion="If abnormal patterns persist, consider CGM review with dietitian to optimize meal timing and composition.",
-            input_chain=f"ISF glucose ({glucose_data['days_of_data']}d, CV {glucose_data['cv']:.2f}) + diet pattern",
-            input_references={'isf_glucose_stream': True, 'soap_profile_id': submission.id},
+            input_chain=f"ISF glucose ({glucose_data['days_of_data']}d, CV {glucose_data['cv']:.2f}"
+                        + (f", TAR {glycemic['time_above_range_pct']:.0f}%, AGP" if glycemic else "")
+                        + ") + diet pattern",
+            input_references={'isf_glucose_stream': True, 'glycemic_metrics': glycemic is not None, 'soap_profile_id': submission.id},
             methodologies_used=[
                 "Pattern clustering (early peak vs delayed vs nocturnal)",
                 "Rule constraints (late meals → nocturnal shift)",
@@ -8,6 +8,7 @@ integrating with A2 services (gating, confidence, provenance), and assembling fi
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
+import os
 import time
 
 from app.part_b.schemas.output_schemas import (
@@ -27,8 +28,8 @@ from app.part_b.inference.inflammatory_immune import InflammatoryImmuneInference
 from app.part_b.inference.endocrine_neurohormonal import EndocrineNeurohormonalInference
 from app.part_b.inference.renal_hydration import RenalHydrationInference
 from app.part_b.inference.comprehensive_integrated import ComprehensiveIntegratedInference
-from app.models.provenance import ProvenanceHelper
 from app.services.a2_orchestrator import a2_orchestrator
+from app.services.provenance_writer import ProvenanceBatch, provenance_writer
 
 
 class PartBOrchestrator:
@@ -43,6 +44,9 @@ class PartBOrchestrator:
     5. Return structured response
     """
     
+    # Queue provenance to the background writer instead of inserting in-request
+    PROVENANCE_WRITE_BEHIND = os.getenv("PROVENANCE_WRITE_BEHIND", "false").lower() == "true"
+    
     @staticmethod
     def generate_report(
         db: Session,
@@ -216,12 +220,13 @@ class PartBOrchestrator:
             data_quality_summary=requirements
         )
         
-        # Step 5: Persist provenance records for successful outputs
+        # Step 5: Persist provenance records for successful outputs (one batched INSERT)
+        batch = ProvenanceBatch()
+        batch_outputs = []
         for output in all_outputs:
             if output.status == OutputStatus.SUCCESS:
                 try:
-                    provenance = ProvenanceHelper.create_provenance_record(
-                        session=db,
+                    batch.add(
                         user_id=user_id,
                         output_id=output.output_id,
                         panel_name=output.panel_name,
@@ -239,10 +244,26 @@ class PartBOrchestrator:
                         output_units=output.units,
                         time_window_days=request.time_window_days
                     )
-                    output.provenance_id = provenance.id
+                    batch_outputs.append(output)
                 except Exception as e:
                     warnings.append(f"Failed to create provenance for {output.metric_name}: {str(e)}")
         
+        # Write-behind leaves provenance_id unset; records are keyed by output_id
+        if not (PartBOrchestrator.PROVENANCE_WRITE_BEHIND and provenance_writer.enqueue(batch)):
+            try:
+                # A failing row is retried alone, so it only loses its own record
+                provenance_ids = provenance_writer.write(db, batch)
+                for position, (output, provenance_id) in enumerate(zip(batch_outputs, provenance_ids)):
+                    if provenance_id is None:
+                        warnings.append(
+                            f"Failed to create provenance for {output.metric_name}: {batch.errors.get(position)}"
+                        )
+                    else:
+                        output.provenance_id = provenance_id
+            except Exception as e:
+                metrics = ", ".join(output.metric_name for output in batch_outputs)
+                warnings.append(f"Failed to create provenance for {metrics}: {str(e)}")
+        
         generation_time_ms = int((time.time() - start_time) * 1000)
         
         return PartBGenerationResponse(
@@ -12,6 +12,8 @@ from pydantic import BaseModel, Field
 from enum import Enum
 import math
 
+from app.features.language_control import PhraseScanner
+
 
 class MetricCategory(str, Enum):
     """Metric categories with different rendering rules."""
@@ -95,6 +97,8 @@ DISALLOWED_PHRASES = [
     "stop medication"
 ]
 
+_DISALLOWED_SCANNER = PhraseScanner(DISALLOWED_PHRASES, literal=True)
+
 
 def compute_confidence_score(
     model_certainty: float,
@@ -265,14 +269,18 @@ def validate_no_diagnostic_language(text: str) -> List[str]:
     Check text for disallowed diagnostic phrases.
     Returns list of violations (empty if clean).
     """
-    text_lower = text.lower()
-    violations = []
-    
-    for phrase in DISALLOWED_PHRASES:
-        if phrase in text_lower:
-            violations.append(phrase)
-    
-    return violations
+    return [DISALLOWED_PHRASES[i] for i in _DISALLOWED_SCANNER.found(text)]
+
+
+def validate_no_diagnostic_language_many(texts: List[str]) -> List[List[str]]:
+    """
+    Check many texts (e.g. every text of a report) in a single scan.
+    Returns one violation list per text.
+    """
+    return [
+        [DISALLOWED_PHRASES[i] for i in found]
+        for found in _DISALLOWED_SCANNER.found_many(texts)
+    ]
 
 
 # ============================================================================
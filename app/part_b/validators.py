@@ -9,6 +9,8 @@ from app.part_b.clinical_mental_model import METRIC_REGISTRY, validate_all_metri
 from app.part_b.schemas.output_schemas import OutputLineItem, PartBReport
 from app.part_b.explanation_generator import (
     check_forbidden_phrases,
+    check_forbidden_phrases_many,
+    explanation_text,
     validate_explanation_quality,
     generate_lab_analog_explanation
 )
@@ -96,6 +98,7 @@ def validate_report_quality(report: PartBReport) -> List[str]:
         )
     
     # Check each output
+    explanations = []
     for panel in [
         report.metabolic_regulation,
         report.lipid_cardiometabolic,
@@ -110,23 +113,32 @@ def validate_report_quality(report: PartBReport) -> List[str]:
             null_issues = validate_no_null_values(output)
             all_issues.extend(null_issues)
             
-            # Generate and validate explanation
+            # Generate explanation
             try:
-                explanation = generate_lab_analog_explanation(
+                explanations.append((
                     output.metric_name,
-                    output,
-                    output.confidence_percent
-                )
-                explanation_issues = validate_explanation_quality(explanation)
-                if explanation_issues:
-                    all_issues.append(
-                        f"Metric {output.metric_name}: {', '.join(explanation_issues)}"
+                    generate_lab_analog_explanation(
+                        output.metric_name,
+                        output,
+                        output.confidence_percent
                     )
+                ))
             except Exception as e:
                 all_issues.append(
                     f"Metric {output.metric_name}: Failed to generate explanation: {str(e)}"
                 )
     
+    # Validate explanations; forbidden phrases for the whole report in one scan
+    forbidden_per_explanation = check_forbidden_phrases_many(
+        [explanation_text(explanation) for _, explanation in explanations]
+    )
+    for (metric_name, explanation), forbidden_found in zip(explanations, forbidden_per_explanation):
+        explanation_issues = validate_explanation_quality(explanation, forbidden_found)
+        if explanation_issues:
+            all_issues.append(
+                f"Metric {metric_name}: {', '.join(explanation_issues)}"
+            )
+    
     return all_issues
 
 
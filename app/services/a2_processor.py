@@ -8,6 +8,7 @@ derived features, anchor strength, and produces the canonical A2 Summary record.
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 from sqlalchemy.orm import Session
 
 from app.models import (
@@ -21,6 +22,8 @@ from app.models import (
     A2Artifact,
     A2StatusEnum
 )
+from app.features.resampling import AlignedMatrix, grid_origin, submission_matrix
+from app.features.signal_quality import merged_quality_summary
 from app.services.confidence import confidence_engine
 from app.services.gating import gating_engine
 from app.services.priors import priors_service
@@ -121,6 +124,57 @@ class A2Processor:
         logger.info(f"A2 processing completed for submission {submission_id}")
         return summary_data
     
+    @staticmethod
+    def _measured_stream_quality(
+        streams: List[ISFAnalyteStream],
+        matrix: AlignedMatrix,
+        name: str
+    ) -> Tuple[float, float]:
+        """
+        (missing_rate, quality_score) for ISF streams: dropout against each
+        stream's own cadence and the combined measured quality (persisted
+        per stream). Streams too short to measure fall back to the share of
+        the submission matrix's 15-minute bins holding a reading over the
+        days covered.
+        """
+        measured = merged_quality_summary(streams)
+        if measured:
+            return measured["dropout_pct"] / 100.0, measured["quality_score"]
+        column = matrix.names.index(name)
+        first, last = matrix.first_ts[column], matrix.last_ts[column]
+        in_days = (
+            (matrix.timestamps >= grid_origin(first, 86400.0)) &
+            (matrix.timestamps < grid_origin(last, 86400.0) + 86400.0)
+        )
+        bins_per_day = int(round(86400.0 / matrix.step_s))
+        n_days = int(round((grid_origin(last, 86400.0) - grid_origin(first, 86400.0)) / 86400.0)) + 1
+        quality_score = float(np.count_nonzero(matrix.observed[in_days, column])) / (n_days * bins_per_day)
+        return 1.0 - quality_score, quality_score
+    
+    @staticmethod
+    def _isf_stream_coverage(
+        streams: List[ISFAnalyteStream],
+        matrix: Optional[AlignedMatrix],
+        name: str
+    ) -> Dict[str, Any]:
+        """
+        Coverage of one ISF analyte from the submission matrix: days spanned
+        by its readings, last reading (wall-clock time) and quality.
+        """
+        named = [s for s in streams if s.name == name]
+        if matrix is None or name not in matrix.names or not np.isfinite(matrix.last_ts[matrix.names.index(name)]):
+            return {"days_covered": 0, "missing_rate": 1.0, "last_seen_ts": None, "quality_score": 0.0}
+        
+        column = matrix.names.index(name)
+        first, last = float(matrix.first_ts[column]), float(matrix.last_ts[column])
+        missing_rate, quality_score = A2Processor._measured_stream_quality(named, matrix, name)
+        return {
+            "days_covered": int((last - first) // 86400.0) + 1,
+            "missing_rate": missing_rate,
+            "last_seen_ts": datetime.utcfromtimestamp(last).isoformat(),
+            "quality_score": quality_score
+        }
+    
     @staticmethod
     def _compute_stream_coverage(
         db: Session,
@@ -135,83 +189,13 @@ class A2Processor:
         """
         coverage = {}
         
-        # ISF Glucose
-        glucose_streams = db.query(ISFAnalyteStream).filter(
-            ISFAnalyteStream.submission_id == submission.id,
-            ISFAnalyteStream.name == "glucose"
+        # ISF Glucose / Lactate, from the submission's cached 15-minute matrix
+        isf_streams = db.query(ISFAnalyteStream).filter(
+            ISFAnalyteStream.submission_id == submission.id
         ).all()
-        if glucose_streams:
-            all_timestamps = []
-            for s in glucose_streams:
-                if s.timestamps_json:
-                    # timestamps_json is an array of ISO strings, convert to datetime
-                    from datetime import datetime
-                    timestamps = [datetime.fromisoformat(ts.replace('Z', '+00:00')) for ts in s.timestamps_json]
-                    all_timestamps.extend(timestamps)
-            
-            if all_timestamps:
-                days_covered = (max(all_timestamps) - min(all_timestamps)).days + 1
-                last_seen = max(all_timestamps)
-                # Simple quality: completeness
-                expected_readings = days_covered * 96  # 15-min intervals
-                actual_readings = sum(len(s.values_json) for s in glucose_streams if s.values_json)
-                quality_score = min(1.0, actual_readings / max(expected_readings, 1))
-                missing_rate = 1.0 - quality_score
-            else:
-                days_covered = 0
-                last_seen = None
-                quality_score = 0.0
-                missing_rate = 1.0
-        else:
-            days_covered = 0
-            last_seen = None
-            quality_score = 0.0
-            missing_rate = 1.0
-        
-        coverage["glucose"] = {
-            "days_covered": days_covered,
-            "missing_rate": missing_rate,
-            "last_seen_ts": last_seen.isoformat() if last_seen else None,
-            "quality_score": quality_score
-        }
-        
-        # ISF Lactate
-        lactate_streams = db.query(ISFAnalyteStream).filter(
-            ISFAnalyteStream.submission_id == submission.id,
-            ISFAnalyteStream.name == "lactate"
-        ).all()
-        if lactate_streams:
-            all_timestamps = []
-            for s in lactate_streams:
-                if s.timestamps_json:
-                    from datetime import datetime
-                    timestamps = [datetime.fromisoformat(ts.replace('Z', '+00:00')) for ts in s.timestamps_json]
-                    all_timestamps.extend(timestamps)
-            
-            if all_timestamps:
-                days_covered = (max(all_timestamps) - min(all_timestamps)).days + 1
-                last_seen = max(all_timestamps)
-                expected_readings = days_covered * 96
-                actual_readings = sum(len(s.values_json) for s in lactate_streams if s.values_json)
-                quality_score = min(1.0, actual_readings / max(expected_readings, 1))
-                missing_rate = 1.0 - quality_score
-            else:
-                days_covered = 0
-                last_seen = None
-                quality_score = 0.0
-                missing_rate = 1.0
-        else:
-            days_covered = 0
-            last_seen = None
-            quality_score = 0.0
-            missing_rate = 1.0
-        
-        coverage["lactate"] = {
-            "days_covered": days_covered,
-            "missing_rate": missing_rate,
-            "last_seen_ts": last_seen.isoformat() if last_seen else None,
-            "quality_score": quality_score
-        }
+        matrix = submission_matrix(submission.id, isf_streams) if isf_streams else None
+        coverage["glucose"] = A2Processor._isf_stream_coverage(isf_streams, matrix, "glucose")
+        coverage["lactate"] = A2Processor._isf_stream_coverage(isf_streams, matrix, "lactate")
         
         # Vitals
         vitals = db.query(VitalsRecord).filter(
@@ -0,0 +1,273 @@
+"""
+Provenance Writer Service
+
+Collects the provenance rows for one report and inserts them with a single
+batched INSERT. Optionally hands them to a background flusher (write-behind)
+so provenance writes leave the report latency path.
+
+Write-behind guarantees:
+- Bounded memory: at most `max_pending_rows` rows wait in the queue; when it
+  is full, enqueue() refuses the batch and the caller writes synchronously.
+- At-least-once: a row stays pending until the transaction holding it
+  commits; failed flushes are retried with backoff. A failure after a
+  commit succeeded can therefore produce a duplicate row.
+- No poison rows: after `max_flush_attempts` failed flushes a chunk is
+  retried row by row, and a row whose own insert keeps failing is
+  dead-lettered (logged and kept in `dead_letters`) instead of blocking
+  the queue.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.provenance import ProvenanceHelper
+
+logger = logging.getLogger(__name__)
+
+
+class ProvenanceBatch:
+    """Provenance rows collected for one report."""
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+        # Row position -> error, for rows a synchronous write() could not insert
+        self.errors: Dict[int, str] = {}
+
+    def add(self, **fields) -> int:
+        """
+        Add a record (same arguments as ProvenanceHelper.create_provenance_record,
+        minus session).
+
+        Returns:
+            Position of the row in this batch
+        """
+        self.rows.append(ProvenanceHelper.build_provenance_row(**fields))
+        return len(self.rows) - 1
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class ProvenanceWriter:
+    """
+    Batched provenance writer with an optional background flusher.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_pending_rows: int = 10000,
+        max_flush_rows: int = 500,
+        flush_interval_s: float = 0.5,
+        retry_backoff_s: float = 1.0,
+        max_backoff_s: float = 30.0,
+        max_flush_attempts: int = 3,
+        max_dead_letters: int = 1000
+    ):
+        self.session_factory = session_factory
+        self.max_flush_rows = max_flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.retry_backoff_s = retry_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_flush_attempts = max_flush_attempts
+
+        # Rows dropped after repeated failures, with their last error
+        self.dead_letters: Deque[Tuple[Dict[str, Any], str]] = deque(maxlen=max_dead_letters)
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_pending_rows)
+        self._enqueue_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, session: Session, batch: ProvenanceBatch) -> List[Optional[int]]:
+        """
+        Insert a batch synchronously in the caller's session (caller commits).
+
+        The batch goes in as one INSERT inside a savepoint. If that fails,
+        each row is retried in its own savepoint, so a bad row loses only its
+        own record; its error is recorded in batch.errors.
+
+        Returns:
+            Record IDs aligned with batch rows (None for rows that failed)
+        """
+        try:
+            with session.begin_nested():
+                return ProvenanceHelper.create_provenance_records(session, batch.rows)
+        except Exception as e:
+            logger.warning(f"Batched provenance insert of {len(batch)} rows failed ({e}); inserting rows one by one")
+
+        ids: List[Optional[int]] = []
+        for position, row in enumerate(batch.rows):
+            try:
+                with session.begin_nested():
+                    ids.extend(ProvenanceHelper.create_provenance_records(session, [row]))
+            except Exception as e:
+                batch.errors[position] = str(e)
+                ids.append(None)
+        return ids
+
+    def enqueue(self, batch: ProvenanceBatch) -> bool:
+        """
+        Hand a batch to the background flusher.
+
+        Returns:
+            True if queued; False if the queue lacks room for the whole batch
+            (nothing is queued, so the caller should fall back to write())
+        """
+        if not batch.rows:
+            return True
+        self._ensure_started()
+
+        # All-or-nothing: only this method adds rows, so checking free space
+        # under the lock guarantees the puts below never block
+        with self._enqueue_lock:
+            if self._queue.maxsize - self._queue.qsize() < len(batch.rows):
+                logger.warning(f"Provenance queue full; refusing {len(batch.rows)} rows")
+                return False
+            for row in batch.rows:
+                self._queue.put_nowait(row)
+        return True
+
+    def pending(self) -> int:
+        """Rows queued or in flight (not yet committed)."""
+        return self._queue.unfinished_tasks
+
+    def flush_pending(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued row is committed.
+
+        Returns:
+            True if the queue drained within the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Drain outstanding rows and stop the flusher thread.
+
+        Returns:
+            True if everything queued was committed
+        """
+        drained = self.flush_pending(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_s * 2)
+            self._thread = None
+        if not drained:
+            logger.error(f"Provenance writer stopped with {self.pending()} rows uncommitted")
+        return drained
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._enqueue_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="provenance-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Flusher loop: gather up to max_flush_rows rows, commit, ack."""
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                continue
+
+            rows = [first]
+            while len(rows) < self.max_flush_rows:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._flush_with_retry(rows)
+            for _ in rows:
+                self._queue.task_done()
+
+    def _flush_with_retry(self, rows: List[Dict[str, Any]]):
+        """
+        Commit rows, retrying with exponential backoff.
+
+        The first max_flush_attempts attempts insert the whole chunk. After
+        that each attempt inserts every remaining row in its own savepoint
+        and commits the rows that went in; a row whose own insert has failed
+        max_flush_attempts times is dead-lettered.
+        """
+        backoff = self.retry_backoff_s
+        attempts = 0
+        # [row, failed row-level inserts]
+        remaining = [[row, 0] for row in rows]
+        while remaining:
+            session = None
+            try:
+                session = self.session_factory()
+                if attempts < self.max_flush_attempts:
+                    ProvenanceHelper.create_provenance_records(session, [row for row, _ in remaining])
+                    session.commit()
+                    return
+                row_errors = {}
+                for position, (row, _) in enumerate(remaining):
+                    try:
+                        with session.begin_nested():
+                            ProvenanceHelper.create_provenance_records(session, [row])
+                    except Exception as e:
+                        row_errors[position] = str(e)
+                session.commit()
+
+                # Row failures only count once the rows that went in are committed
+                still_failing = []
+                for position, error in row_errors.items():
+                    entry = remaining[position]
+                    entry[1] += 1
+                    if entry[1] >= self.max_flush_attempts:
+                        self._dead_letter(entry[0], error)
+                    else:
+                        still_failing.append(entry)
+                remaining = still_failing
+                if not remaining:
+                    return
+                failure = f"{len(remaining)} rows failed individually"
+            except Exception as e:
+                if session is not None:
+                    session.rollback()
+                failure = str(e)
+            finally:
+                if session is not None:
+                    session.close()
+
+            attempts += 1
+            logger.warning(
+                f"Provenance flush of {len(remaining)} rows failed ({failure}); retrying in {backoff:.1f}s"
+            )
+            if self._stop.wait(backoff):
+                logger.error(f"Provenance writer stopping; {len(remaining)} rows not committed")
+                return
+            backoff = min(backoff * 2, self.max_backoff_s)
+
+    def _dead_letter(self, row: Dict[str, Any], error: str):
+        """Drop a row that keeps failing, keeping it for inspection."""
+        logger.error(
+            f"Dropping provenance row {row.get('output_id')} ({row.get('metric_name')}) "
+            f"after {self.max_flush_attempts} failed inserts: {error}"
+        )
+        self.dead_letters.append((row, error))
+
+
+# Singleton instance
+provenance_writer = ProvenanceWriter()
@@ -4,10 +4,19 @@ Maps dropdown selections to standardized codes, numeric weights, time windows, a
 Implements exact rules from PART A specification A5.
 """
 
-from typing import Dict, List, Optional, Literal
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Literal, Tuple
+
+import numpy as np
 from pydantic import BaseModel, Field
 from schemas.part_a.v1.main_schema import QualitativeEncodingRule
 
+# Number of distinct SOAP profiles whose encoding results are kept in memory
+ENCODING_CACHE_SIZE = 256
+
 
 class EncodingRegistry:
     """
@@ -17,6 +26,19 @@ class EncodingRegistry:
 
     def __init__(self):
         self.rules: Dict[str, Dict[str, QualitativeEncodingRule]] = {}
+
+        # Compiled form (built lazily, invalidated by register_rule)
+        self._lookup: Optional[Dict[Tuple[str, str], int]] = None
+        self._compiled_rules: List[QualitativeEncodingRule] = []
+        self._rule_positions: Dict[int, int] = {}
+        self._output_keys: List[str] = []
+        self._effect_matrix: np.ndarray = np.zeros((0, 0))
+        self._effect_mask: np.ndarray = np.zeros((0, 0), dtype=bool)
+
+        # canonical SOAP hash -> indices of applied rules
+        self._cache: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
         self._initialize_builtin_rules()
 
     def _initialize_builtin_rules(self):
@@ -527,79 +549,148 @@ class EncodingRegistry:
         if input_field not in self.rules:
             self.rules[input_field] = {}
         self.rules[input_field][input_value.lower()] = rule
+        self._invalidate()
 
     def get_rule(self, input_field: str, input_value: str) -> Optional[QualitativeEncodingRule]:
         """Retrieve an encoding rule."""
         field_rules = self.rules.get(input_field, {})
         return field_rules.get(input_value.lower())
 
-    def encode_qualitative_inputs(self, soap_profile: dict) -> List[QualitativeEncodingRule]:
+    def _invalidate(self):
+        """Drop the compiled tables and cached encodings after a rule change."""
+        self._lookup = None
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _compile(self):
         """
-        Process a complete SOAP profile and return all applicable encoding rules.
-        This is the main entry point for qualitative encoding.
+        Compile registered rules into a flat (field, value) -> index table and a
+        dense rules x output-keys effect matrix.
         """
-        applied_rules = []
+        compiled_rules = []
+        lookup = {}
+        for input_field, field_rules in self.rules.items():
+            for input_value, rule in field_rules.items():
+                lookup[(input_field, input_value)] = len(compiled_rules)
+                compiled_rules.append(rule)
+
+        output_keys = sorted({key for rule in compiled_rules for key in rule.direction_of_effect})
+        key_index = {key: i for i, key in enumerate(output_keys)}
+
+        effect_matrix = np.zeros((len(compiled_rules), len(output_keys)))
+        effect_mask = np.zeros((len(compiled_rules), len(output_keys)), dtype=bool)
+        for i, rule in enumerate(compiled_rules):
+            for key, effect_value in rule.direction_of_effect.items():
+                effect_matrix[i, key_index[key]] = effect_value
+                effect_mask[i, key_index[key]] = True
 
+        self._compiled_rules = compiled_rules
+        self._rule_positions = {id(rule): i for i, rule in enumerate(compiled_rules)}
+        self._output_keys = output_keys
+        self._effect_matrix = effect_matrix
+        self._effect_mask = effect_mask
+        self._lookup = lookup
+
+    @staticmethod
+    def _profile_hash(soap_profile: dict) -> str:
+        """Canonical hash of a SOAP profile (key order independent)."""
+        canonical = json.dumps(soap_profile, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _iter_field_values(soap_profile: dict) -> Iterator[Tuple[str, str]]:
+        """Yield (input_field, raw value) pairs eligible for encoding, in rule-application order."""
         # Process diet fields
-        if "diet" in soap_profile:
-            diet = soap_profile["diet"]
+        diet = soap_profile.get("diet")
+        if diet:
             for field_name in ["sodium_intake", "hydration_intake", "caffeine", "alcohol", "pattern", "meal_timing"]:
-                if field_name in diet and diet[field_name]:
-                    rule = self.get_rule(f"diet.{field_name}", str(diet[field_name]))
-                    if rule:
-                        applied_rules.append(rule)
+                if diet.get(field_name):
+                    yield f"diet.{field_name}", str(diet[field_name])
 
         # Process activity/lifestyle fields
-        if "activity_lifestyle" in soap_profile:
-            lifestyle = soap_profile["activity_lifestyle"]
+        lifestyle = soap_profile.get("activity_lifestyle")
+        if lifestyle:
             for field_name in ["activity_level", "sleep_schedule_consistency", "nicotine_tobacco", "shift_work"]:
-                if field_name in lifestyle and lifestyle[field_name] is not None:
-                    value = str(lifestyle[field_name])
-                    rule = self.get_rule(f"activity_lifestyle.{field_name}", value)
-                    if rule:
-                        applied_rules.append(rule)
+                if lifestyle.get(field_name) is not None:
+                    yield f"activity_lifestyle.{field_name}", str(lifestyle[field_name])
 
         # Process medical history conditions
-        if "medical_history" in soap_profile and "conditions" in soap_profile["medical_history"]:
-            for condition in soap_profile["medical_history"]["conditions"]:
-                rule = self.get_rule("medical_history.conditions", condition)
-                if rule:
-                    applied_rules.append(rule)
+        medical_history = soap_profile.get("medical_history")
+        if medical_history:
+            for condition in medical_history.get("conditions") or []:
+                yield "medical_history.conditions", condition
 
         # Process medication special flags
-        if "medications_supplements" in soap_profile:
-            meds = soap_profile["medications_supplements"]
-            if "medications" in meds:
-                for med in meds["medications"]:
-                    if "special_flags" in med:
-                        for flag in med["special_flags"]:
-                            rule = self.get_rule("medications.special_flags", flag)
-                            if rule:
-                                applied_rules.append(rule)
+        meds = soap_profile.get("medications_supplements")
+        if meds:
+            for med in meds.get("medications") or []:
+                for flag in med.get("special_flags") or []:
+                    yield "medications.special_flags", flag
 
         # Process demographics (pregnancy)
-        if "demographics_anthropometrics" in soap_profile:
-            demo = soap_profile["demographics_anthropometrics"]
-            if "pregnancy_status" in demo and demo["pregnancy_status"]:
-                rule = self.get_rule("demographics.pregnancy_status", demo["pregnancy_status"])
-                if rule:
-                    applied_rules.append(rule)
+        demo = soap_profile.get("demographics_anthropometrics")
+        if demo and demo.get("pregnancy_status"):
+            yield "demographics.pregnancy_status", demo["pregnancy_status"]
+
+    def _encode_indices(self, soap_profile: dict) -> Tuple[int, ...]:
+        """Indices of compiled rules applied to a SOAP profile (cached by profile hash)."""
+        if self._lookup is None:
+            self._compile()
 
-        return applied_rules
+        profile_hash = self._profile_hash(soap_profile)
+        with self._cache_lock:
+            cached = self._cache.get(profile_hash)
+            if cached is not None:
+                self._cache.move_to_end(profile_hash)
+                return cached
+
+        lookup = self._lookup
+        indices = tuple(
+            index
+            for input_field, value in self._iter_field_values(soap_profile)
+            if (index := lookup.get((input_field, value.lower()))) is not None
+        )
+
+        with self._cache_lock:
+            self._cache[profile_hash] = indices
+            if len(self._cache) > ENCODING_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return indices
+
+    def encode_qualitative_inputs(self, soap_profile: dict) -> List[QualitativeEncodingRule]:
+        """
+        Process a complete SOAP profile and return all applicable encoding rules.
+        This is the main entry point for qualitative encoding.
+        """
+        indices = self._encode_indices(soap_profile)
+        return [self._compiled_rules[i] for i in indices]
 
     def compute_aggregate_modifiers(self, applied_rules: List[QualitativeEncodingRule]) -> Dict[str, float]:
         """
         Compute aggregate modifiers from all applied encoding rules.
         Returns a dictionary of output_key -> total_modifier.
         """
+        if self._lookup is None:
+            self._compile()
+
+        indices = []
         aggregate = {}
-        
         for rule in applied_rules:
+            index = self._rule_positions.get(id(rule))
+            if index is not None:
+                indices.append(index)
+                continue
+            # Rule not in this registry: accumulate directly
             for output_key, effect_value in rule.direction_of_effect.items():
-                if output_key not in aggregate:
-                    aggregate[output_key] = 0.0
-                aggregate[output_key] += effect_value
-        
+                aggregate[output_key] = aggregate.get(output_key, 0.0) + effect_value
+
+        if indices:
+            totals = self._effect_matrix[indices].sum(axis=0)
+            present = self._effect_mask[indices].any(axis=0)
+            for key_index in np.flatnonzero(present):
+                output_key = self._output_keys[key_index]
+                aggregate[output_key] = aggregate.get(output_key, 0.0) + float(totals[key_index])
+
         return aggregate
 
 
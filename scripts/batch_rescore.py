@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Batch Re-Scoring Runner
+
+Regenerates A2 summaries and Part B reports for many Part A submissions
+offline, sharding the work across a process pool. Intended for nightly
+re-scoring after an engine update.
+
+Each worker process:
+    - opens its own database engine/session (no connections are shared
+      across the fork boundary)
+    - warms the priors_service, confidence_engine and gating_engine
+      singletons once, before handling its first shard
+    - writes the A2 runs/summaries/artifacts of a whole shard in a single
+      transaction, and the Part B provenance of the shard in a second one
+    - writes the shard's Part B reports to an NDJSON file named after the
+      run and the shard (part_b_reports/<run_id>-shard-<n>.ndjson), so a
+      resumed run never overwrites an earlier run's reports
+
+The parent process records completed submissions in a checkpoint file after
+every shard so an interrupted run can be resumed with --resume. With
+--skip-part-b, submissions are recorded as A2-only and are still picked up
+by a later full run.
+
+Usage:
+    python scripts/batch_rescore.py --all
+    python scripts/batch_rescore.py --since 2026-01-01 --until 2026-02-01
+    python scripts/batch_rescore.py --user-id 12 --user-id 40 --workers 8
+    python scripts/batch_rescore.py --all --resume --output-dir rescore_output
+
+Options:
+    --all: Re-score every submission
+    --since / --until: Filter by submission timestamp (ISO date or datetime)
+    --user-id: Restrict to a user (repeatable)
+    --workers: Number of worker processes (default: CPU count)
+    --batch-size: Submissions per shard (default: 25)
+    --skip-part-b: Only regenerate A2 summaries
+    --time-window-days: Part B data window (default: 30)
+    --output-dir: Where Part B reports and the checkpoint are written
+    --resume: Skip submissions already recorded in the checkpoint
+
+The database is taken from DATABASE_URL (falls back to sqlite:///./monitor.db,
+same as app.db.session).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models import A2Run, A2Summary, A2Artifact, A2StatusEnum, PartASubmission
+
+DEFAULT_DATABASE_URL = "sqlite:///./monitor.db"
+
+# Per-worker state, populated by _init_worker
+_worker_session_factory = None
+
+
+def _database_url() -> str:
+    return os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URL
+
+
+def _make_session_factory(database_url: str) -> sessionmaker:
+    """Create an engine/session factory owned by the calling process."""
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, poolclass=NullPool, connect_args=connect_args)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date/datetime: {value}")
+
+
+# ============================================================================
+# SELECTION AND CHECKPOINTING (parent process)
+# ============================================================================
+
+def select_submissions(
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_ids: Optional[List[int]] = None
+) -> List[Tuple[str, int]]:
+    """
+    Select (submission_id, user_id) pairs matching the filter.
+
+    Ordered by primary key so shards are stable across resumed runs.
+    """
+    query = db.query(PartASubmission.submission_id, PartASubmission.user_id)
+
+    if since:
+        query = query.filter(PartASubmission.submission_timestamp >= since)
+    if until:
+        query = query.filter(PartASubmission.submission_timestamp < until)
+    if user_ids:
+        query = query.filter(PartASubmission.user_id.in_(user_ids))
+
+    return [(row.submission_id, row.user_id) for row in query.order_by(PartASubmission.id)]
+
+
+def shard(items: List[Tuple[str, int]], batch_size: int) -> List[List[Tuple[str, int]]]:
+    """Split work items into shards of at most batch_size."""
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def load_checkpoint(path: Path) -> Dict:
+    """Load checkpoint file, or an empty checkpoint if it does not exist."""
+    if not path.exists():
+        return {"completed": [], "failed": {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: Path, checkpoint: Dict) -> None:
+    """Write checkpoint atomically so an interrupted run never leaves it truncated."""
+    checkpoint["updated_at"] = datetime.utcnow().isoformat()
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def _init_worker(database_url: str) -> None:
+    """Process-pool initializer: own DB session factory + warmed singletons."""
+    global _worker_session_factory
+    _worker_session_factory = _make_session_factory(database_url)
+
+    from app.services.priors import priors_service
+    from app.services.confidence import confidence_engine, OutputType
+    from app.services.gating import gating_engine, RangeWidth
+
+    # Force lazy tables to load once per worker instead of once per submission
+    priors_service._load_vitals_percentiles()
+    priors_service._load_lab_reference_intervals()
+    priors_service._load_calibration_constants()
+    # Touch the engines' parameter tables through their public API
+    confidence_engine.compute_confidence(
+        output_type=OutputType.MEASURED,
+        completeness_score=1.0,
+        anchor_quality=1.0,
+        recency_days=0.0
+    )
+    gating_engine.get_minimum_window("default")
+    gating_engine.get_quality_threshold(RangeWidth.TIGHT)
+
+
+def _build_a2_rows(summary_data: Dict, computation_time_ms: int) -> List:
+    """Build A2Run, A2Summary and completeness artifact rows for one summary."""
+    now = datetime.utcnow()
+    run = A2Run(
+        a2_run_id=summary_data["a2_run_id"],
+        submission_id=summary_data["submission_id"],
+        user_id=summary_data["user_id"],
+        status=A2StatusEnum.COMPLETED,
+        progress=1.0,
+        triggered_by="batch",
+        created_at=now,
+        started_at=now,
+        completed_at=now,
+        computation_time_ms=computation_time_ms
+    )
+    artifact = A2Artifact(
+        a2_run_id=summary_data["a2_run_id"],
+        submission_id=summary_data["submission_id"],
+        user_id=summary_data["user_id"],
+        artifact_type="completeness_check",
+        artifact_data={
+            "status": "completed",
+            "completed_at": now.isoformat(),
+            "stream_coverage": summary_data["stream_coverage"],
+            "gating": summary_data["gating"]
+        }
+    )
+    return [run, A2Summary(**summary_data), artifact]
+
+
+def rescore_shard(
+    shard_index: int,
+    items: List[Tuple[str, int]],
+    output_dir: str,
+    skip_part_b: bool = False,
+    time_window_days: int = 30,
+    run_id: str = "run"
+) -> Dict:
+    """
+    Re-score one shard of submissions inside a worker process.
+
+    Returns:
+        Dict with completed submission IDs (A2 and Part B both regenerated),
+        A2-only submission IDs (--skip-part-b), per-submission failures and
+        timing
+    """
+    from app.services.a2_processor import a2_processor
+    from app.part_b.orchestrator import PartBOrchestrator
+    from app.part_b.schemas.output_schemas import PartBGenerationRequest
+
+    start = time.time()
+    failed: Dict[str, str] = {}
+    db = _worker_session_factory()
+
+    try:
+        # Step 1: compute A2 summaries (read-only), then write them in one transaction
+        rows = []
+        a2_done = []
+        for submission_id, user_id in items:
+            sub_start = time.time()
+            try:
+                summary_data = a2_processor.process_submission(
+                    db=db,
+                    a2_run_id=str(uuid.uuid4()),
+                    submission_id=submission_id,
+                    user_id=user_id
+                )
+            except Exception as e:
+                failed[submission_id] = f"A2: {e}"
+                continue
+            rows.extend(_build_a2_rows(summary_data, int((time.time() - sub_start) * 1000)))
+            a2_done.append((submission_id, user_id))
+
+        if a2_done:
+            db.query(A2Run).filter(
+                A2Run.submission_id.in_([s for s, _ in a2_done]),
+                A2Run.superseded == False
+            ).update({A2Run.superseded: True}, synchronize_session=False)
+            db.add_all(rows)
+            db.commit()
+
+        if skip_part_b:
+            return {
+                "shard": shard_index,
+                "completed": [],
+                "a2_completed": [s for s, _ in a2_done],
+                "failed": failed,
+                "elapsed_s": time.time() - start
+            }
+
+        # Step 2: Part B reports; provenance for the shard is committed once
+        report_lines = []
+        part_b_done = []
+        for submission_id, user_id in a2_done:
+            try:
+                response = PartBOrchestrator.generate_report(
+                    db=db,
+                    user_id=user_id,
+                    request=PartBGenerationRequest(
+                        submission_id=submission_id,
+                        time_window_days=time_window_days
+                    )
+                )
+            except Exception as e:
+                failed[submission_id] = f"Part B: {e}"
+                continue
+            if response.status == "error":
+                failed[submission_id] = "Part B: " + "; ".join(response.errors)
+                continue
+            report_lines.append(response.model_dump_json())
+            part_b_done.append(submission_id)
+
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for submission_id in part_b_done:
+                failed[submission_id] = f"Part B provenance commit: {e}"
+            part_b_done = []
+            report_lines = []
+
+        if report_lines:
+            reports_path = Path(output_dir) / "part_b_reports" / f"{run_id}-shard-{shard_index:05d}.ndjson"
+            reports_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(reports_path, 'a') as f:
+                f.write("\n".join(report_lines) + "\n")
+
+        return {
+            "shard": shard_index,
+            "completed": part_b_done,
+            "a2_completed": [],
+            "failed": failed,
+            "elapsed_s": time.time() - start
+        }
+    finally:
+        db.close()
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Batch re-score A2 summaries and Part B reports")
+    parser.add_argument("--all", action="store_true", help="Re-score every submission")
+    parser.add_argument("--since", type=_parse_timestamp, help="Submissions at or after this timestamp")
+    parser.add_argument("--until", type=_parse_timestamp, help="Submissions before this timestamp")
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids", help="Restrict to user (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--skip-part-b", action="store_true", help="Only regenerate A2 summaries")
+    parser.add_argument("--time-window-days", type=int, default=30)
+    parser.add_argument("--output-dir", type=Path, default=Path("rescore_output"))
+    parser.add_argument("--resume", action="store_true", help="Skip submissions recorded in the checkpoint")
+
+    args = parser.parse_args(argv)
+    if not (args.all or args.since or args.until or args.user_ids):
+        parser.error("Specify a filter (--since/--until, --user-id) or --all")
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error("--workers and --batch-size must be positive")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    database_url = _database_url()
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = args.output_dir / "checkpoint.json"
+
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else {"completed": [], "failed": {}}
+    checkpoint.setdefault("a2_completed", [])
+    completed = set(checkpoint["completed"])
+    if args.skip_part_b:
+        # An A2-only run can skip what an earlier A2-only run already did
+        completed |= set(checkpoint["a2_completed"])
+
+    run_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    checkpoint.setdefault("runs", []).append(run_id)
+
+    session_factory = _make_session_factory(database_url)
+    db = session_factory()
+    try:
+        items = select_submissions(db, since=args.since, until=args.until, user_ids=args.user_ids)
+    finally:
+        db.close()
+        session_factory.kw["bind"].dispose()
+
+    pending = [item for item in items if item[0] not in completed]
+    shards = shard(pending, args.batch_size)
+
+    print(f"Selected {len(items)} submissions ({len(items) - len(pending)} already completed)")
+    print(f"Dispatching {len(pending)} submissions in {len(shards)} shards to {args.workers} workers")
+
+    start = time.time()
+    done_count = 0
+    failed_count = 0
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(database_url,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                rescore_shard,
+                shard_index,
+                shard_items,
+                str(args.output_dir),
+                args.skip_part_b,
+                args.time_window_days,
+                run_id
+            )
+            for shard_index, shard_items in enumerate(shards)
+        ]
+
+        for future in as_completed(futures):
+            result = future.result()
+            ok = result["completed"] + result["a2_completed"]
+            checkpoint["completed"].extend(result["completed"])
+            checkpoint["a2_completed"].extend(result["a2_completed"])
+            for submission_id in ok:
+                checkpoint["failed"].pop(submission_id, None)
+            checkpoint["failed"].update(result["failed"])
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            done_count += len(ok)
+            failed_count += len(result["failed"])
+            elapsed = time.time() - start
+            print(
+                f"  shard {result['shard']:>5}: {len(ok)} ok, "
+                f"{len(result['failed'])} failed in {result['elapsed_s']:.2f}s "
+                f"| total {done_count + failed_count}/{len(pending)} "
+                f"({(done_count + failed_count) / max(elapsed, 1e-9):.1f} submissions/s)"
+            )
+
+    elapsed = time.time() - start
+    print()
+    print(f"✅ Completed: {done_count}")
+    print(f"❌ Failed:    {failed_count}")
+    print(f"⏱  Elapsed:   {elapsed:.1f}s ({done_count / max(elapsed, 1e-9):.1f} submissions/s)")
+    if not args.skip_part_b:
+        print(f"📄 Reports:    {args.output_dir / 'part_b_reports'}/{run_id}-shard-*.ndjson")
+    print(f"📄 Checkpoint: {checkpoint_path}")
+
+    return 0 if failed_count == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
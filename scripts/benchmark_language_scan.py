@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Forbidden-Phrase Scan Benchmark
+
+Compares report sanitization cost of the legacy scan (one re.finditer per
+forbidden pattern per text) against the shared single-pass PhraseScanner,
+both per text and batched over a whole report.
+
+Usage:
+    python scripts/benchmark_language_scan.py [--texts 400] [--repeat 20]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.features.language_control import LanguageController
+from app.part_b.render_rules import (
+    DISALLOWED_PHRASES,
+    validate_no_diagnostic_language,
+    validate_no_diagnostic_language_many
+)
+
+SENTENCES = [
+    "Estimated glucose range: 95-105 mg/dL (moderate confidence).",
+    "Pattern consistent with elevated fasting glucose over the last 30 days.",
+    "This is an estimate, not a direct blood draw.",
+    "Closest clinical analog is a fasting HbA1c panel.",
+    "Consider discussing these patterns with your healthcare provider.",
+    "Sodium intake is high and hydration is low on most days.",
+    "The trajectory suggests glucose will rise if the current trend continues.",
+    "Recent lab anchors confirm the estimated range.",
+    "Additional glucose monitoring would strengthen confidence in metabolic estimates.",
+    "Variability is likely due to late meals and inconsistent sleep.",
+]
+
+
+def legacy_validate(controller: LanguageController, text: str) -> int:
+    """Pre-scanner implementation: one regex pass per pattern."""
+    count = 0
+    for patterns in controller.forbidden_patterns.values():
+        for pattern, _ in patterns:
+            for _ in re.finditer(pattern, text, re.IGNORECASE):
+                count += 1
+    return count
+
+
+def legacy_disallowed(text: str) -> int:
+    text_lower = text.lower()
+    return sum(1 for phrase in DISALLOWED_PHRASES if phrase in text_lower)
+
+
+def timeit(fn, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark forbidden-phrase scanning")
+    parser.add_argument("--texts", type=int, default=400, help="Report texts per run")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    texts = [" ".join(random.choices(SENTENCES, k=random.randint(1, 4))) for _ in range(args.texts)]
+    controller = LanguageController()
+
+    rows = [
+        ("LanguageController legacy", lambda: [legacy_validate(controller, t) for t in texts]),
+        ("LanguageController scanner", lambda: [controller.validate_text(t) for t in texts]),
+        ("LanguageController batch", lambda: controller.validate_texts(texts)),
+        ("render_rules legacy", lambda: [legacy_disallowed(t) for t in texts]),
+        ("render_rules scanner", lambda: [validate_no_diagnostic_language(t) for t in texts]),
+        ("render_rules batch", lambda: validate_no_diagnostic_language_many(texts)),
+    ]
+
+    print(f"{len(texts)} texts, best of {args.repeat}")
+    for name, fn in rows:
+        print(f"  {name:<30} {timeit(fn, args.repeat):8.2f} ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Reference Population Builder Script
+
+Builds data/priors_pack/reference_population.npz, the anonymized reference
+population the cohort matching engine uses for k-NN matching
+(app.features.cohort_matching.REFERENCE_POPULATION_PATH). The engine loads
+it at startup when present; without it, cohort matching falls back to the
+built-in reference cohorts.
+
+Two sources:
+- --source CSV: a participant-level extract (e.g. NHANES demographics,
+  body measures and lab files merged on SEQN) with columns age, bmi,
+  glucose, a1c, total_cholesterol, hdl, plus optional sex (M/F) and
+  diabetes / cvd (0/1). Empty cells are kept as missing.
+- Default: a synthetic population sampled from the vendored priors pack
+  (BMI percentiles by age/sex stratum, lab reference intervals), for
+  development only. Labs are drawn independently except glucose, which
+  follows A1c through the ADAG relation; diabetes is A1c >= 6.5% or
+  glucose >= 126 mg/dL. No cvd outcome is generated.
+
+Usage:
+    python scripts/build_reference_population.py
+    python scripts/build_reference_population.py --source nhanes_extract.csv
+    python scripts/build_reference_population.py --size 200000 --seed 7 --force
+
+Options:
+    --source: Participant-level CSV to convert (default: synthetic)
+    --size: Synthetic population size (default: 100000)
+    --missing-rate: Share of synthetic lab/BMI values left missing (default: 0.1)
+    --seed: Random seed for the synthetic population (default: 0)
+    --output: Output path (default: the engine's REFERENCE_POPULATION_PATH)
+    --force: Overwrite an existing output file
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.features.cohort_matching import REFERENCE_POPULATION_PATH, ReferencePopulationIndex
+
+PRIORS_DIR = Path(__file__).parent.parent / "data" / "priors_pack"
+VITALS_PATH = PRIORS_DIR / "nhanes_vitals_percentiles.csv"
+LABS_PATH = PRIORS_DIR / "nhanes_lab_reference_intervals.csv"
+
+PERCENTILE_COLUMNS = ["p5", "p10", "p25", "p50", "p75", "p90", "p95"]
+PERCENTILE_LEVELS = np.array([0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95])
+
+AGE_RANGE = (18.0, 85.0)
+
+
+def _reference_interval(labs: pd.DataFrame, analyte: str, sex: str = "ALL"):
+    """(mean, sd) treating the reference interval as the central 95%."""
+    rows = labs[(labs["analyte"] == analyte) & (labs["sex"].isin([sex, "ALL"]))]
+    row = rows.iloc[0]
+    return (row["ref_low"] + row["ref_high"]) / 2.0, (row["ref_high"] - row["ref_low"]) / 3.92
+
+
+def _sample_bmi(vitals: pd.DataFrame, age: np.ndarray, sex: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Draw BMI per person from the percentiles of their age/sex stratum."""
+    bmi = np.full(len(age), np.nan)
+    strata = vitals[vitals["metric"] == "bmi"]
+    u = rng.uniform(PERCENTILE_LEVELS[0], PERCENTILE_LEVELS[-1], len(age))
+    for _, stratum in strata.iterrows():
+        members = (sex == stratum["sex"]) & (age >= stratum["age_min"]) & (age < stratum["age_max"] + 1)
+        bmi[members] = np.interp(u[members], PERCENTILE_LEVELS, stratum[PERCENTILE_COLUMNS].to_numpy(dtype=float))
+    return bmi
+
+
+def build_synthetic(size: int, missing_rate: float, seed: int) -> ReferencePopulationIndex:
+    """Synthetic reference population from the priors pack (development only)."""
+    rng = np.random.default_rng(seed)
+    vitals = pd.read_csv(VITALS_PATH)
+    labs = pd.read_csv(LABS_PATH)
+
+    age = rng.uniform(*AGE_RANGE, size)
+    sex = rng.choice(["M", "F"], size)
+    bmi = _sample_bmi(vitals, age, sex, rng)
+
+    a1c_mean, a1c_sd = _reference_interval(labs, "hemoglobin_a1c")
+    # Right tail for the diabetic range
+    a1c = rng.normal(a1c_mean, a1c_sd, size) + rng.exponential(0.3, size)
+    _, glucose_sd = _reference_interval(labs, "glucose")
+    glucose = 28.7 * a1c - 46.7 + rng.normal(0.0, glucose_sd, size)
+    chol_mean, chol_sd = _reference_interval(labs, "total_cholesterol")
+    total_cholesterol = rng.normal(chol_mean, chol_sd, size)
+    hdl = np.empty(size)
+    for code in ("M", "F"):
+        members = sex == code
+        hdl_mean, hdl_sd = _reference_interval(labs, "hdl_cholesterol", code)
+        hdl[members] = rng.normal(hdl_mean, hdl_sd, members.sum())
+
+    diabetes = ((a1c >= 6.5) | (glucose >= 126.0)).astype(float)
+
+    features = np.column_stack([age, bmi, glucose, a1c, total_cholesterol, hdl])
+    # Age is always known; other values go missing at random
+    missing = rng.random(features.shape) < missing_rate
+    missing[:, 0] = False
+    features[missing] = np.nan
+    return ReferencePopulationIndex(features, sex=sex, outcomes={"diabetes": diabetes})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the cohort matching reference population")
+    parser.add_argument("--source", type=Path, help="Participant-level CSV (default: synthetic)")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--missing-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=REFERENCE_POPULATION_PATH)
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing output file")
+    args = parser.parse_args()
+
+    if args.output.exists() and not args.force:
+        print(f"⚠️  {args.output} already exists. Use --force to rebuild.")
+        sys.exit(0)
+
+    if args.source:
+        print(f"Converting {args.source}...")
+        index = ReferencePopulationIndex.from_csv(args.source)
+    else:
+        print(f"⚠️  Sampling a synthetic population of {args.size} from the priors pack (development only)")
+        index = build_synthetic(args.size, args.missing_rate, args.seed)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    index.save_npz(args.output)
+
+    observed = index.observed.mean(axis=0)
+    print(f"✅ Wrote {index.size} rows to {args.output}")
+    for name, share in zip(ReferencePopulationIndex.FEATURES, observed):
+        print(f"   {name:<18} {100 * share:5.1f}% observed")
+
+
+if __name__ == "__main__":
+    main()
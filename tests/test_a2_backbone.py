@@ -17,6 +17,7 @@ from app.services.priors import priors_service
 from app.services.confidence import confidence_engine, OutputType
 from app.services.gating import gating_engine, RangeWidth
 from app.models.provenance import InferenceProvenance, ProvenanceHelper
+from app.services.provenance_writer import ProvenanceBatch, ProvenanceWriter
 from app.models.user import User
 
 
@@ -516,6 +517,147 @@ class TestProvenanceModel:
         )
         
         assert all(r.panel_name == 'cardiovascular' for r in records)
+    
+    def test_batched_provenance_insert(self, db: Session, test_user: User):
+        """Test batched insert returns IDs in row order."""
+        batch = ProvenanceBatch()
+        for i in range(5):
+            batch.add(
+                user_id=test_user.id,
+                output_id=f'test_batch_{i}',
+                panel_name='metabolic',
+                metric_name=f'metric_{i}',
+                output_type='inferred',
+                input_chain='ISF glucose',
+                raw_input_refs={'glucose_stream_id': i},
+                methodologies_used=['M1', 'M2', 'M3', 'M4', 'M5'],
+                confidence_payload={'confidence_percent': 70 + i},
+                gating_payload={'recommended_range_width': 'wide'}
+            )
+        
+        ids = ProvenanceWriter().write(db, batch)
+        db.commit()
+        
+        assert len(ids) == 5
+        records = [db.get(InferenceProvenance, record_id) for record_id in ids]
+        assert [r.output_id for r in records] == [f'test_batch_{i}' for i in range(5)]
+        assert [r.confidence_percent for r in records] == [70, 71, 72, 73, 74]
+        assert all(len(r.methodologies_used) == 4 for r in records)
+        assert all(r.created_at is not None for r in records)
+    
+    def test_batched_provenance_insert_isolates_failing_rows(self, db: Session, test_user: User):
+        """Test a failing row loses only its own record."""
+        batch = ProvenanceBatch()
+        for i in range(3):
+            batch.add(
+                user_id=test_user.id,
+                output_id=f'test_isolated_{i}',
+                panel_name='metabolic',
+                metric_name=f'metric_{i}',
+                output_type='inferred',
+                input_chain='ISF glucose',
+                raw_input_refs={},
+                methodologies_used=['M1'],
+                confidence_payload={'confidence_percent': 70},
+                gating_payload={'recommended_range_width': 'wide'}
+            )
+        batch.rows[1]['metric_name'] = None  # violates NOT NULL
+        
+        ids = ProvenanceWriter().write(db, batch)
+        db.commit()
+        
+        assert ids[1] is None
+        assert list(batch.errors) == [1]
+        assert [db.get(InferenceProvenance, ids[i]).output_id for i in (0, 2)] == [
+            'test_isolated_0', 'test_isolated_2'
+        ]
+    
+    def test_write_behind_retries_until_committed(self, tmp_path):
+        """Test write-behind flushes in the background and retries failed flushes."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'provenance.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session_ = sessionmaker(bind=engine)
+        attempts = []
+        
+        def flaky_session():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("database unavailable")
+            return Session_()
+        
+        writer = ProvenanceWriter(
+            session_factory=flaky_session, flush_interval_s=0.01, retry_backoff_s=0.01
+        )
+        batch = ProvenanceBatch()
+        for i in range(3):
+            batch.add(
+                user_id=1,
+                output_id=f'wb_{i}',
+                panel_name='metabolic',
+                metric_name='glucose_mean',
+                output_type='measured',
+                input_chain='ISF glucose',
+                raw_input_refs={},
+                methodologies_used=['Direct measurement'],
+                confidence_payload={'confidence_percent': 90},
+                gating_payload={'recommended_range_width': 'tight'}
+            )
+        
+        assert writer.enqueue(batch)
+        assert writer.stop(timeout=5)
+        
+        check = Session_()
+        assert check.query(InferenceProvenance).count() == 3
+        check.close()
+        assert len(attempts) >= 2
+    
+    def test_write_behind_dead_letters_failing_row(self, tmp_path):
+        """Test a row that always fails is dead-lettered instead of blocking the queue."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'provenance.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session_ = sessionmaker(bind=engine)
+        writer = ProvenanceWriter(
+            session_factory=Session_, flush_interval_s=0.01, retry_backoff_s=0.01, max_flush_attempts=2
+        )
+        batch = ProvenanceBatch()
+        for i in range(3):
+            batch.add(
+                user_id=1, output_id=f'dl_{i}', panel_name='metabolic', metric_name=f'metric_{i}',
+                output_type='measured', input_chain='ISF glucose', raw_input_refs={},
+                methodologies_used=[], confidence_payload={}, gating_payload={}
+            )
+        batch.rows[1]['metric_name'] = None  # violates NOT NULL
+        
+        assert writer.enqueue(batch)
+        assert writer.stop(timeout=5)
+        
+        check = Session_()
+        assert sorted(r.output_id for r in check.query(InferenceProvenance).all()) == ['dl_0', 'dl_2']
+        check.close()
+        assert [row['output_id'] for row, _ in writer.dead_letters] == ['dl_1']
+    
+    def test_write_behind_bounded_queue(self):
+        """Test a full queue refuses the whole batch."""
+        writer = ProvenanceWriter(max_pending_rows=2)
+        writer._ensure_started = lambda: None  # keep rows queued
+        batch = ProvenanceBatch()
+        for i in range(3):
+            batch.add(
+                user_id=1, output_id=f'q_{i}', panel_name='p', metric_name='m',
+                output_type='measured', input_chain='x', raw_input_refs={},
+                methodologies_used=[], confidence_payload={}, gating_payload={}
+            )
+        
+        assert not writer.enqueue(batch)
+        assert writer.pending() == 0
 
 
 # Fixtures
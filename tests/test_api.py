@@ -935,3 +935,253 @@ class TestM4ContractUnification:
             json={}
         )
         assert response.status_code == 422
+
+
+class TestProvenanceQuery:
+    """Test filtered, keyset-paginated provenance queries and NDJSON export."""
+    
+    def setup_method(self):
+        """Create a user with provenance records across two panels."""
+        from datetime import datetime, timedelta
+        from app.models.provenance import ProvenanceHelper
+        
+        _, self.token = signup_and_get_token()
+        self.user_id = user_id = client.get("/auth/profile", headers=auth_headers(self.token)).json()["user_id"]
+        # Other test modules may re-point get_db; write through whichever override is active
+        db_gen = app.dependency_overrides.get(get_db, get_db)()
+        db = next(db_gen)
+        try:
+            base = datetime(2026, 1, 1)
+            rows = []
+            for i in range(25):
+                rows.append(ProvenanceHelper.build_provenance_row(
+                    user_id=user_id,
+                    output_id=f"out_{i}",
+                    panel_name="metabolic" if i % 2 == 0 else "renal",
+                    metric_name="glucose" if i % 2 == 0 else "creatinine",
+                    output_type="estimate",
+                    time_window_start=base,
+                    time_window_end=base + timedelta(days=30),
+                    input_chain="raw > features > model",
+                    raw_input_refs={},
+                    methodologies_used=["population_prior"],
+                    confidence_payload={"confidence_percent": float(i * 4)},
+                    gating_payload={}
+                ))
+                # Timestamp collisions exercise the id tie-breaker
+                rows[-1]["created_at"] = base + timedelta(hours=i // 3)
+            ProvenanceHelper.create_provenance_records(db, rows)
+            db.commit()
+        finally:
+            db_gen.close()
+    
+    def test_keyset_pages_cover_all_records_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 7}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/provenance/records", headers=auth_headers(self.token), params=params)
+            assert response.status_code == 200
+            data = response.json()
+            seen.extend(data["items"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert len(seen) == 25
+        assert len({item["id"] for item in seen}) == 25
+        keys = [(item["created_at"], item["id"]) for item in seen]
+        assert keys == sorted(keys, reverse=True)
+    
+    def test_filters(self):
+        response = client.get(
+            "/provenance/records",
+            headers=auth_headers(self.token),
+            params={
+                "panel_name": "metabolic",
+                "metric_name": "glucose",
+                "min_confidence": 20,
+                "max_confidence": 80,
+                "created_before": "2026-01-01T06:00:00"
+            }
+        )
+        assert response.status_code == 200
+        items = response.json()["items"]
+        # Even i with 5 <= i <= 17 (hour = i // 3 < 6)
+        assert sorted(item["output_id"] for item in items) == sorted(f"out_{i}" for i in (6, 8, 10, 12, 14, 16))
+        assert all(item["panel_name"] == "metabolic" for item in items)
+    
+    def test_records_scoped_to_user(self):
+        _, other_token = signup_and_get_token()
+        response = client.get("/provenance/records", headers=auth_headers(other_token))
+        assert response.status_code == 200
+        assert response.json()["items"] == []
+    
+    def test_invalid_cursor_rejected(self):
+        response = client.get(
+            "/provenance/records",
+            headers=auth_headers(self.token),
+            params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+    
+    def test_ndjson_export(self):
+        import json
+        
+        response = client.get(
+            "/provenance/export",
+            headers=auth_headers(self.token),
+            params={"panel_name": "renal"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 12
+        assert all(line["metric_name"] == "creatinine" for line in lines)
+    
+    def test_iterator_detaches_only_yielded_records(self):
+        from app.models.provenance import ProvenanceHelper
+        from app.models.user import User
+        
+        db_gen = app.dependency_overrides.get(get_db, get_db)()
+        db = next(db_gen)
+        try:
+            user = db.get(User, self.user_id)
+            records = list(ProvenanceHelper.iter_provenance_records(db, self.user_id, batch_size=4))
+            
+            assert len(records) == 25
+            assert not any(record in db for record in records)
+            assert user in db
+        finally:
+            db_gen.close()
+
+
+class TestSubmissionStreamQuery:
+    """Test downsampled ISF stream queries for charts."""
+    
+    def setup_method(self):
+        """Create a submission with 90 days of 5-minute glucose in two streams."""
+        from datetime import datetime, timedelta
+        from app.models.part_a_models import ISFAnalyteStream, PartASubmission, SubmissionStatusEnum
+        from app.features.downsampling import stream_pyramid
+        
+        _, self.token = signup_and_get_token()
+        user_id = client.get("/auth/profile", headers=auth_headers(self.token)).json()["user_id"]
+        self.submission_id = f"sub_{uuid.uuid4().hex[:8]}"
+        db_gen = app.dependency_overrides.get(get_db, get_db)()
+        db = next(db_gen)
+        try:
+            submission = PartASubmission(
+                submission_id=self.submission_id,
+                user_id=user_id,
+                status=SubmissionStatusEnum.COMPLETED,
+                submission_timestamp=datetime(2026, 4, 1)
+            )
+            db.add(submission)
+            db.flush()
+            start = datetime(2026, 1, 1)
+            for day_offset in (0, 45):
+                minutes = range(day_offset * 1440, (day_offset + 45) * 1440, 5)
+                stream = ISFAnalyteStream(
+                    submission_id=submission.id,
+                    name="glucose",
+                    unit="mg/dL",
+                    values_json=[100.0 + (m // 5) % 50 for m in minutes],
+                    timestamps_json=[(start + timedelta(minutes=m)).isoformat() for m in minutes]
+                )
+                stream_pyramid(stream)
+                db.add(stream)
+            db.commit()
+        finally:
+            db_gen.close()
+    
+    def _get(self, analyte="glucose", **params):
+        return client.get(
+            f"/part-a/submissions/{self.submission_id}/streams/{analyte}",
+            headers=auth_headers(self.token),
+            params=params
+        )
+    
+    def test_lttb_uses_pyramid_over_full_range(self):
+        response = self._get(points=300)
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["n_points"] == 300
+        assert len(data["timestamps"]) == len(data["values"]) == 300
+        assert all(level > 0 for level in data["source_levels"])
+        assert data["source_points"] <= 4 * 300 * 2
+        assert data["timestamps"] == sorted(data["timestamps"])
+        assert data["timestamps"][0] == "2026-01-01T00:00:00"
+    
+    def test_minmax_keeps_extremes_within_range(self):
+        response = self._get(method="minmax", points=200, start="2026-01-10T00:00:00", end="2026-01-11T00:00:00")
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["source_levels"] == [0]  # One day of one stream, from raw readings
+        assert min(data["values"]) == 100.0 and max(data["values"]) == 149.0
+        assert "2026-01-10T00:00:00" <= data["timestamps"][0] <= data["timestamps"][-1] <= "2026-01-11T00:00:00"
+        assert data["n_points"] <= 200
+    
+    def test_long_range_reads_only_pyramids(self):
+        from sqlalchemy import inspect
+        from sqlalchemy.orm import defer
+        from app.models.part_a_models import ISFAnalyteStream, PartASubmission
+        from app.features.downsampling import chart_series
+        
+        db_gen = app.dependency_overrides.get(get_db, get_db)()
+        db = next(db_gen)
+        try:
+            streams = db.query(ISFAnalyteStream).options(
+                defer(ISFAnalyteStream.values_json),
+                defer(ISFAnalyteStream.timestamps_json)
+            ).join(PartASubmission).filter(PartASubmission.submission_id == self.submission_id).all()
+            series = chart_series(streams, 300)
+            
+            assert len(series.values) == 300
+            assert all(stream.value_count == 45 * 288 for stream in streams)
+            assert all("values_json" in inspect(stream).unloaded for stream in streams)
+            assert not db.new and not db.dirty
+        finally:
+            db_gen.close()
+    
+    def test_missing_pyramid_is_not_saved_on_read(self):
+        from app.models.part_a_models import ISFAnalyteStream, ISFStreamDerivedRecord, PartASubmission
+        from app.features.downsampling import PYRAMID_KIND
+        
+        db_gen = app.dependency_overrides.get(get_db, get_db)()
+        db = next(db_gen)
+        try:
+            stream_ids = [stream_id for stream_id, in db.query(ISFAnalyteStream.id).join(PartASubmission).filter(
+                PartASubmission.submission_id == self.submission_id
+            )]
+            records = db.query(ISFStreamDerivedRecord).filter(
+                ISFStreamDerivedRecord.stream_id.in_(stream_ids),
+                ISFStreamDerivedRecord.kind == PYRAMID_KIND
+            ).all()
+            assert len(records) == 2
+            for record in records:
+                db.delete(record)
+            db.commit()
+            
+            response = self._get(points=300)
+            assert response.status_code == 200
+            assert response.json()["n_points"] == 300
+            db.expire_all()
+            assert db.query(ISFStreamDerivedRecord).filter(
+                ISFStreamDerivedRecord.stream_id.in_(stream_ids)
+            ).count() == 0
+        finally:
+            db_gen.close()
+    
+    def test_errors(self):
+        assert self._get(method="spline").status_code == 400
+        assert self._get(analyte="lactate").status_code == 404
+        _, other_token = signup_and_get_token()
+        response = client.get(
+            f"/part-a/submissions/{self.submission_id}/streams/glucose", headers=auth_headers(other_token)
+        )
+        assert response.status_code == 404
@@ -127,5 +127,890 @@ class TestBackwardCompatibility:
         assert hasattr(app, 'openapi')
 
 
+
+class TestRunV2Index:
+    """Test the per-run lookup index shared by preprocess_v2 stages."""
+    
+    def _run(self):
+        from datetime import datetime
+        from app.models.run_v2 import (
+            RunV2, SpecimenRecord, MissingnessRecord, NonLabInputs,
+            VitalsPhysiologyInputs, SleepActivityInputs
+        )
+        
+        def specimen(specimen_id, specimen_type, values, missing=()):
+            return SpecimenRecord(
+                specimen_id=specimen_id,
+                specimen_type=specimen_type,
+                collected_at=datetime(2026, 1, 1),
+                raw_values=values,
+                units={},
+                missingness={
+                    k: MissingnessRecord(is_missing=k in missing, provenance="measured")
+                    for k in values
+                },
+            )
+        
+        return RunV2(
+            run_id="run_idx",
+            user_id="user_1",
+            created_at=datetime(2026, 1, 1),
+            specimens=[
+                specimen("isf_1", "ISF", {"glucose": 140.0, "lactate": 1.0}, missing={"glucose"}),
+                specimen("isf_2", "ISF", {"glucose": 150.0}),
+                specimen("blood_1", "BLOOD_VENOUS", {"glucose": 110.0, "crp": 4.0}),
+            ],
+            non_lab_inputs=NonLabInputs(
+                vitals_physiology=VitalsPhysiologyInputs(hrv=35.0),
+                sleep_activity=SleepActivityInputs(activity_level_0_10=8),
+            ),
+        )
+    
+    def test_value_lookup_skips_missing_specimens(self):
+        from app.features.run_v2_index import RunV2Index
+        from app.models.run_v2 import SpecimenTypeEnum
+        
+        index = RunV2Index(self._run())
+        
+        # isf_1 reports glucose missing, so isf_2 supplies it
+        assert index.get_value(SpecimenTypeEnum.ISF, "glucose") == 150.0
+        assert index.get_value("ISF", "lactate") == 1.0
+        assert index.get_value(SpecimenTypeEnum.SALIVA, "cortisol_morning") is None
+        assert index.get_value("NOT_A_TYPE", "glucose") is None
+    
+    def test_presence_bitsets(self):
+        from app.features.run_v2_index import RunV2Index
+        from app.models.run_v2 import SpecimenTypeEnum
+        
+        index = RunV2Index(self._run())
+        
+        assert index.has(SpecimenTypeEnum.BLOOD_VENOUS, "crp")
+        assert not index.has(SpecimenTypeEnum.ISF, "crp")
+        assert index.variables_in(index.specimen_presence[0]) == ["lactate"]
+        assert set(index.variables_in(index.type_presence[SpecimenTypeEnum.ISF])) == {"glucose", "lactate"}
+        assert index.mask_for(["glucose", "unknown"]) == index.variable_bits["glucose"]
+    
+    def test_flattened_nonlab(self):
+        from app.features.run_v2_index import RunV2Index
+        
+        index = RunV2Index(self._run())
+        
+        assert index.get_nonlab("vitals_physiology.hrv") == 35.0
+        assert index.get_nonlab("sleep_activity.activity_level_0_10") == 8.0
+        assert index.get_nonlab("sleep_activity.sleep_quality_0_10") is None
+        assert index.get_nonlab("intake_exposure.fluid_intake_ml_24h") is None
+    
+    def test_preprocess_v2_runs_on_shared_index(self):
+        pack = preprocess_v2(self._run())
+        
+        # ISF glucose 150 vs blood 110 differs by >20%
+        assert "blood_glucose_differs_from_isf_by_>20pct" in pack.discordance_detection.discordance_flags
+        assert len(pack.derived_temporal_features) == 3
+
+
+class TestMissingnessArrays:
+    """Test array-based missingness features and the batch matrix."""
+    
+    def _run(self, run_id, specimens):
+        from datetime import datetime
+        from app.models.run_v2 import RunV2, SpecimenRecord, MissingnessRecord, NonLabInputs
+        
+        return RunV2(
+            run_id=run_id,
+            user_id="user_1",
+            created_at=datetime(2026, 1, 1),
+            specimens=[
+                SpecimenRecord(
+                    specimen_id=specimen_id,
+                    specimen_type="BLOOD_VENOUS",
+                    collected_at=datetime(2026, 1, 1),
+                    raw_values={k: 1.0 for k in records},
+                    units={},
+                    missingness={
+                        k: MissingnessRecord(
+                            is_missing=missing_type is not None,
+                            missing_type=missing_type,
+                            provenance="measured",
+                        )
+                        for k, missing_type in records.items()
+                    },
+                )
+                for specimen_id, records in specimens
+            ],
+            non_lab_inputs=NonLabInputs(),
+        )
+    
+    def test_feature_vector(self):
+        from app.features.missingness_features import compute_missingness_feature_vector
+        
+        run = self._run("run_m1", [
+            ("s1", {"glucose": None, "lactate": "sensor_unavailable", "custom_marker": None}),
+            ("s2", {"glucose": "not_collected", "sodium_na": None, "potassium_k": None}),
+        ])
+        vector = compute_missingness_feature_vector(run)
+        
+        assert vector.specimen_variable_present_flags["s1"] == {
+            "glucose": True, "lactate": False, "custom_marker": True
+        }
+        assert vector.missing_type_embeddings["s1"]["lactate"] == [0, 0, 0, 0, 1, 0]
+        assert vector.missing_type_embeddings["s2"]["glucose"] == [1, 0, 0, 0, 0, 0]
+        # metabolic: glucose x2 + lactate, one present of three
+        assert vector.domain_missingness_scores["metabolic"] == pytest.approx(2 / 3)
+        assert vector.domain_missingness_scores["renal"] == 1.0
+        # Anchors must be present in every specimen
+        assert vector.domain_critical_missing_flags["metabolic"] is True
+        assert vector.domain_critical_missing_flags["electrolyte"] is True
+        assert vector.domain_critical_missing_flags["renal"] is True
+        assert vector.aggregate_missingness_0_1 == pytest.approx(2 / 6)
+    
+    def test_encode_run_arrays(self):
+        from app.features.missingness_features import (
+            encode_run_missingness, DOMAIN_VARIABLES, MISSING_TYPES
+        )
+        
+        run = self._run("run_m2", [("s1", {"glucose": None, "custom_marker": "user_skipped"})])
+        arrays = encode_run_missingness(run)
+        
+        assert arrays.variables[:len(DOMAIN_VARIABLES)] == DOMAIN_VARIABLES
+        assert arrays.variables[-1] == "custom_marker"
+        glucose, custom = DOMAIN_VARIABLES.index("glucose"), len(arrays.variables) - 1
+        assert arrays.recorded.sum() == 2
+        assert arrays.present[0, glucose] and not arrays.present[0, custom]
+        onehot = arrays.missing_type_onehot()
+        assert onehot.shape == (1, len(arrays.variables), len(MISSING_TYPES))
+        assert onehot[0, custom].tolist() == [0, 1, 0, 0, 0, 0]
+        assert onehot[0, glucose].sum() == 0
+    
+    def test_batch_matches_per_run(self):
+        from app.features.missingness_features import (
+            compute_missingness_feature_vector, compute_missingness_matrix, DOMAIN_NAMES
+        )
+        
+        runs = [
+            self._run("run_a", [("s1", {"glucose": None, "creatinine": "not_collected"})]),
+            self._run("run_b", [("s1", {"hgb": None, "wbc": None, "extra": None})]),
+            self._run("run_c", []),
+        ]
+        matrix = compute_missingness_matrix(runs)
+        
+        assert matrix.run_ids == ["run_a", "run_b", "run_c"]
+        assert matrix.present.shape == (3, len(matrix.variables))
+        assert matrix.present[1, matrix.variables.index("extra")]
+        assert not matrix.present[0, matrix.variables.index("creatinine")]
+        assert matrix.recorded[0, matrix.variables.index("creatinine")]
+        for row, run in enumerate(runs):
+            vector = compute_missingness_feature_vector(run)
+            assert matrix.domain_missingness[row].tolist() == [
+                vector.domain_missingness_scores[d] for d in DOMAIN_NAMES
+            ]
+            assert matrix.domain_critical_missing[row].tolist() == [
+                vector.domain_critical_missing_flags[d] for d in DOMAIN_NAMES
+            ]
+            assert matrix.aggregate_missingness[row] == pytest.approx(vector.aggregate_missingness_0_1)
+        assert matrix.to_dict()["domains"] == DOMAIN_NAMES
+    
+    def test_domain_presence_requires_raw_value(self):
+        from app.features.missingness_features import get_domain_presence_summary
+        
+        run = self._run("run_m3", [("s1", {"crp": None, "ast": "not_collected", "glucose": None})])
+        run.specimens[0].raw_values.pop("crp")
+        summary = get_domain_presence_summary(run)
+        
+        assert summary["inflammation"] is False
+        assert summary["liver"] is False
+        assert summary["metabolic"] is True
+
+
+class TestTemporalSeries:
+    """Test rolling volatility and matrix-profile motif search over streams."""
+    
+    def _daily_glucose(self, days=10, step_s=300.0):
+        import numpy as np
+        
+        rng = np.random.default_rng(7)
+        t = 1.7e9 + np.arange(int(days * 86400 / step_s)) * step_s
+        hour = (t % 86400) / 3600
+        glucose = 105 + rng.normal(0, 2, len(t))
+        for meal_hour in (8, 13, 19):
+            since_meal = np.clip(hour - meal_hour, 0, 3)
+            glucose += 60 * np.sin(np.pi * since_meal / 3)
+        glucose -= np.where((hour > 2) & (hour < 5), 25 * np.sin(np.pi * (hour - 2) / 3), 0)
+        return t, glucose
+    
+    def test_matrix_profile_matches_brute_force(self):
+        import numpy as np
+        from numpy.lib.stride_tricks import sliding_window_view
+        from app.features.temporal_series import matrix_profile
+        
+        rng = np.random.default_rng(2)
+        x = rng.normal(size=120)
+        x[40:45] = np.nan
+        profile, profile_index = matrix_profile(x, 8, block_rows=16)
+        
+        windows = sliding_window_view(x, 8)
+        valid = ~np.isnan(windows).any(axis=1)
+        z = np.where(valid[:, None], windows - windows.mean(axis=1, keepdims=True), 0)
+        z[valid] /= windows[valid].std(axis=1, keepdims=True)
+        for i in np.flatnonzero(valid):
+            dist = np.linalg.norm(z - z[i], axis=1)
+            dist[~valid | (np.abs(np.arange(len(dist)) - i) <= 4)] = np.inf
+            assert profile[i] == pytest.approx(dist.min(), abs=1e-6)
+        assert np.isinf(profile[~valid]).all() and (profile_index[~valid] == -1).all()
+    
+    def test_volatility_and_trend_from_stream(self):
+        import numpy as np
+        from app.features.temporal_series import rolling_volatility, trend_direction
+        
+        t = np.arange(0, 4 * 3600, 300.0)
+        rising = 100 + t / 60.0
+        volatility = rolling_volatility(t, rising)
+        
+        assert volatility["5m"] == pytest.approx(2.5)
+        assert volatility["5m"] < volatility["30m"] < volatility["2h"]
+        assert trend_direction(t, rising) == "up"
+        assert trend_direction(t, -rising) == "down"
+        assert trend_direction(t, np.full(len(t), 100.0)) == "stable"
+        assert rolling_volatility(t[:1], rising[:1])["2h"] is None
+    
+    def test_find_motifs_skips_profile_for_sparse_series(self, monkeypatch):
+        import numpy as np
+        from app.features import temporal_series
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("matrix profile should not run")
+        
+        monkeypatch.setattr(temporal_series, "matrix_profile", fail)
+        # A year of daily fingersticks never fills a 4-hour window of 15-minute bins
+        t = 1.7e9 + np.arange(365) * 86400.0
+        assert temporal_series.find_motifs(t, np.full(len(t), 100.0)) == []
+        assert temporal_series.find_motifs(t[:1], np.array([100.0])) == []
+        assert temporal_series.find_motifs(t[:3], np.array([np.nan, 100.0, np.nan])) == []
+    
+    def test_find_motifs_reports_local_hours(self):
+        import numpy as np
+        from app.features.temporal_series import find_motifs
+        
+        # The same wall-clock pattern recorded at UTC-08:00
+        t, glucose = self._daily_glucose()
+        offset = -8 * 3600.0
+        utc_motifs = find_motifs(t, glucose)
+        local_motifs = find_motifs(t - offset, glucose, utc_offset_s=offset)
+        
+        assert [m.hours_of_day for m in local_motifs] == [m.hours_of_day for m in utc_motifs]
+        assert local_motifs[0].start_ts == pytest.approx((np.array(utc_motifs[0].start_ts) - offset).tolist())
+    
+    def test_find_motifs_searches_recent_span(self):
+        from app.features.temporal_series import find_motifs
+        
+        t, glucose = self._daily_glucose(days=10)
+        motifs = find_motifs(t, glucose, max_span_s=3 * 86400.0)
+        
+        assert motifs
+        assert min(min(m.start_ts) for m in motifs) >= t[-1] - 3 * 86400.0
+    
+    def test_preprocess_detects_recurring_motifs(self):
+        from datetime import datetime
+        from app.models.run_v2 import RunV2, SpecimenRecord, MissingnessRecord, NonLabInputs
+        from app.models.feature_pack_v2 import MotifEnum
+        
+        run = RunV2(
+            run_id="run_series",
+            user_id="user_1",
+            created_at=datetime(2026, 1, 1),
+            specimens=[SpecimenRecord(
+                specimen_id="isf_1",
+                specimen_type="ISF",
+                collected_at=datetime(2026, 1, 1),
+                raw_values={"glucose": 120.0},
+                units={},
+                missingness={"glucose": MissingnessRecord(is_missing=False, provenance="measured")},
+            )],
+            non_lab_inputs=NonLabInputs(),
+        )
+        pack = preprocess_v2(run, series={"glucose_isf": self._daily_glucose()})
+        
+        motifs = {m.motif_type: m for m in pack.pattern_combination_features.detected_motifs}
+        assert MotifEnum.POSTPRANDIAL_SPIKE in motifs
+        assert motifs[MotifEnum.POSTPRANDIAL_SPIKE].supporting_variables == ["glucose_isf"]
+        assert MotifEnum.NOCTURNAL_DIP in motifs
+        
+        temporal = pack.derived_temporal_features[0]
+        # Stream-derived, not the ISF static estimate (5.0)
+        assert temporal.volatility_5m != 5.0
+        assert temporal.volatility_5m < temporal.volatility_2h
+        
+        # Without a stream the single reading falls back to static estimates
+        assert preprocess_v2(run).derived_temporal_features[0].volatility_5m == 5.0
+    
+    def test_load_user_isf_series_merges_submissions(self):
+        from datetime import datetime, timedelta, timezone
+        import numpy as np
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        from app.models.part_a_models import ISFAnalyteStream, PartASubmission
+        from app.features.stream_cache import load_user_isf_series
+        
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        
+        start = datetime(2026, 1, 1)
+        stamps = lambda first, n: [(start + timedelta(days=first, hours=i)).isoformat() for i in range(n)]
+        for index, (user_id, first) in enumerate([(1, 10), (1, 0), (2, 5)]):
+            submission = PartASubmission(submission_id=f"sub_{index}", user_id=user_id)
+            db.add(submission)
+            db.flush()
+            db.add(ISFAnalyteStream(
+                submission_id=submission.id, name="glucose", unit="mg/dL",
+                values_json=[100.0 + first] * 3, timestamps_json=stamps(first, 3),
+            ))
+        db.commit()
+        
+        series = load_user_isf_series(db, 1)
+        t, y = series["glucose_isf"]
+        assert np.all(np.diff(t) > 0)
+        assert y.tolist() == [100.0] * 3 + [110.0] * 3
+        
+        # Window ends at `end` and reaches back lookback_s; offset shifts to UTC
+        end = start + timedelta(days=10, hours=1)
+        t, y = load_user_isf_series(db, 1, end=end, lookback_s=86400.0, utc_offset_s=3600.0)["glucose_isf"]
+        assert y.tolist() == [110.0, 110.0]
+        assert t[-1] == end.replace(tzinfo=timezone.utc).timestamp() - 3600.0
+        assert load_user_isf_series(db, 3) == {}
+        db.close()
+
+
+class TestRollingKernels:
+    """Test rolling-window kernels against direct per-window computation."""
+    
+    def _series(self):
+        import numpy as np
+        
+        rng = np.random.default_rng(1)
+        t = np.cumsum(rng.uniform(60, 600, 200))
+        t[50:53] = t[50]  # Duplicate timestamps
+        return np.sort(t), rng.normal(100, 10, 200)
+    
+    @pytest.mark.parametrize("window,timed", [(1, False), (7, False), (1800.0, True)])
+    def test_kernels_match_direct_windows(self, window, timed):
+        import numpy as np
+        from app.features import rolling
+        
+        t, y = self._series()
+        timestamps = t if timed else None
+        starts, ends = rolling.window_bounds(len(y), window, timestamps)
+        windows = [y[a:b] for a, b in zip(starts, ends)]
+        
+        cases = [
+            (rolling.rolling_sum(y, window, timestamps), np.sum),
+            (rolling.rolling_mean(y, window, timestamps), np.mean),
+            (rolling.rolling_std(y, window, timestamps), np.std),
+            (rolling.rolling_min(y, window, timestamps), np.min),
+            (rolling.rolling_max(y, window, timestamps), np.max),
+            (rolling.rolling_quantile(y, window, 0.25, timestamps), lambda w: np.quantile(w, 0.25)),
+        ]
+        for result, direct in cases:
+            np.testing.assert_allclose(result, [direct(w) for w in windows], rtol=1e-9, atol=1e-9)
+        
+        if timed:
+            # Samples in [t - window, t] up to and including the current one
+            for i in range(len(t)):
+                assert (t[:i + 1] >= t[i] - window).sum() == ends[i] - starts[i]
+    
+    def test_slope_and_min_periods(self):
+        import numpy as np
+        from app.features.rolling import rolling_slope, rolling_std
+        
+        t = np.arange(0, 3600, 300.0)
+        y = 5.0 + 0.01 * t
+        slope = rolling_slope(y, 1200.0, t)
+        
+        assert np.isnan(slope[0])
+        np.testing.assert_allclose(slope[1:], 0.01)
+        np.testing.assert_allclose(rolling_slope(y, 4)[1:], 3.0)
+        assert np.isnan(rolling_std(y, 3, min_periods=3)[:2]).all()
+        assert np.isnan(rolling_std(y, 3, ddof=1)[0])
+    
+    def test_ewma_matches_recurrence(self):
+        import numpy as np
+        from app.features.rolling import ewma
+        
+        t, y = self._series()
+        result = ewma(y, halflife=900.0, timestamps=t)
+        
+        expected = [y[0]]
+        for i in range(1, len(y)):
+            a = 1.0 - 0.5 ** ((t[i] - t[i - 1]) / 900.0)
+            expected.append((1.0 - a) * expected[-1] + a * y[i])
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
+        np.testing.assert_allclose(ewma(y, alpha=1.0), y)
+        with pytest.raises(ValueError):
+            ewma(y)
+    
+    def test_legacy_derived_helpers(self):
+        from app.features.derived import compute_moving_average, compute_rolling_std
+        
+        assert compute_moving_average([1.0, 2.0, 6.0, 7.0], window=3) == pytest.approx([1.0, 2.0, 3.0, 5.0])
+        assert compute_moving_average([1.0, 2.0], window=3) == [1.0, 2.0]
+        assert compute_rolling_std([1.0, 3.0, 3.0, 3.0], window=2) == pytest.approx([0.0, 1.0, 0.0, 0.0])
+        assert compute_rolling_std([1.0], window=2) == [0.0]
+
+
+class TestGlycemicMetrics:
+    """Test CGM glycemic variability metrics and their per-stream cache."""
+
+    def test_range_and_summary_metrics(self):
+        import numpy as np
+        from app.features.glycemic_metrics import compute_glycemic_metrics
+
+        values = np.array([50.0, 60.0, 100.0, 150.0, 190.0, 260.0, 120.0, 110.0])
+        metrics = compute_glycemic_metrics(np.arange(8) * 300.0, values)
+
+        assert metrics.time_very_low_pct == pytest.approx(12.5)
+        assert metrics.time_below_range_pct == pytest.approx(25.0)
+        assert metrics.time_in_range_pct == pytest.approx(50.0)
+        assert metrics.time_above_range_pct == pytest.approx(25.0)
+        assert metrics.time_very_high_pct == pytest.approx(12.5)
+        assert metrics.gmi_pct == pytest.approx(3.31 + 0.02392 * values.mean())
+        assert metrics.lbgi > 0 and metrics.hbgi > 0
+        assert metrics.modd is None
+        assert compute_glycemic_metrics(np.empty(0), np.empty(0)) is None
+
+    def test_variability_metrics(self):
+        import numpy as np
+        from app.features.glycemic_metrics import compute_glycemic_metrics, mage
+
+        # Daily-periodic stream: identical days give MODD 0, CONGA from hourly change
+        t = np.arange(0, 3 * 86400, 300.0)
+        y = 120.0 + 40.0 * np.sin(2 * np.pi * t / 86400.0)
+        metrics = compute_glycemic_metrics(t, y)
+
+        assert metrics.modd == pytest.approx(0.0, abs=1e-9)
+        hourly = y[12:] - y[:-12]
+        assert metrics.conga == pytest.approx(hourly.std(ddof=1))
+        assert metrics.mage == pytest.approx(80.0, rel=1e-3)
+
+        # Sub-threshold wiggles do not split a swing; unconfirmed end swings are dropped
+        assert mage(np.array([100.0, 150.0, 145.0, 200.0, 100.0, 200.0, 190.0]), 50.0) == pytest.approx(100.0)
+        assert mage(np.array([100.0, 150.0, 100.0])) is None
+
+    def test_ambulatory_profile_matches_percentiles(self):
+        import numpy as np
+        from app.features.glycemic_metrics import ambulatory_profile
+
+        rng = np.random.default_rng(3)
+        t = np.sort(rng.uniform(0, 14 * 86400, 3000))
+        y = rng.normal(110, 20, 3000)
+        profile = ambulatory_profile(t, y, bin_s=3600.0)
+
+        hours = (t % 86400) // 3600
+        for hour in (0, 7, 23):
+            in_bin = y[hours == hour]
+            assert profile["counts"][hour] == len(in_bin)
+            assert profile["p50"][hour] == pytest.approx(np.percentile(in_bin, 50), abs=0.01)
+            assert profile["p5"][hour] == pytest.approx(np.percentile(in_bin, 5), abs=0.01)
+        assert ambulatory_profile(t[:1], y[:1], bin_s=3600.0)["p95"][1] is None
+
+    def test_stream_cache_reuse_and_refresh(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        from app.models.part_a_models import ISFAnalyteStream, ISFStreamDerivedRecord
+        from app.features.glycemic_metrics import stream_glycemic_metrics
+
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+
+        start = datetime(2026, 1, 1)
+        stream = ISFAnalyteStream(
+            submission_id=1, name="glucose", unit="mmol/L",
+            values_json=[5.0, 6.0, 7.0],
+            timestamps_json=[(start + timedelta(minutes=5 * i)).isoformat() for i in range(3)],
+        )
+        first = stream_glycemic_metrics(stream)
+        db.add(stream)
+        db.commit()
+
+        assert first["mean_mg_dl"] == pytest.approx(6.0 * 18.016)
+        record = db.query(ISFStreamDerivedRecord).one()
+        assert record.source_value_count == 3
+
+        # Cached payload is reused until the stream grows
+        record.payload_json = dict(first, mean_mg_dl=-1.0)
+        assert stream_glycemic_metrics(stream)["mean_mg_dl"] == -1.0
+        stream.values_json = stream.values_json + [8.0]
+        stream.timestamps_json = stream.timestamps_json + [(start + timedelta(minutes=15)).isoformat()]
+        assert stream_glycemic_metrics(stream)["n_readings"] == 4
+        db.commit()
+        assert db.query(ISFStreamDerivedRecord).count() == 1
+        db.close()
+
+
+class TestStateSpace:
+    """Test the batched Kalman filter / RTS smoother and its persisted state."""
+
+    def _series(self, n, seed):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        t = np.cumsum(rng.uniform(200, 400, n))
+        t[n // 2:] += 20000.0  # Gap
+        return t, 100 + 20 * np.sin(t / 20000.0) + rng.normal(0, 3, n)
+
+    def _sequential(self, t, y, params):
+        """Textbook per-sample Kalman filter + RTS smoother."""
+        import numpy as np
+
+        var0 = max(np.var(y), params.r)
+        m = np.array([y[0], 0.0])
+        P = np.diag([var0, var0 / 3600.0 ** 2 if params.trend else 0.0])
+        filt, pred = [], []
+        for k in range(len(y)):
+            dt = t[k] - t[k - 1] if k else 0.0
+            F = np.array([[1.0, dt], [0.0, 1.0]])
+            qs = params.q_slope
+            Q = np.array([[params.q_level * dt + qs * dt ** 3 / 3, qs * dt ** 2 / 2], [qs * dt ** 2 / 2, qs * dt]])
+            m, P = F @ m, F @ P @ F.T + Q
+            pred.append((F, m, P))
+            S = P[0, 0] + params.r
+            K = P[:, 0] / S
+            m, P = m + K * (y[k] - m[0]), P - np.outer(K, K) * S
+            filt.append((m, P))
+        smooth = [filt[-1]]
+        for k in range(len(y) - 2, -1, -1):
+            (mf, Pf), (F, mp, Pp), (ms, Ps) = filt[k], pred[k + 1], smooth[0]
+            E = Pf @ F.T @ np.linalg.pinv(Pp)
+            smooth.insert(0, (mf + E @ (ms - mp), Pf + E @ (Ps - Pp) @ E.T))
+        return np.array([m[0] for m, _ in filt]), np.array([m for m, _ in smooth]), np.array([P[0, 0] for _, P in smooth])
+
+    @pytest.mark.parametrize("trend", [True, False])
+    def test_batched_scan_matches_sequential(self, trend):
+        import numpy as np
+        from app.features.state_space import run_smoother
+
+        series = [self._series(n, seed) for seed, n in enumerate((300, 117, 1))]
+        results = run_smoother(series, trend=trend)
+
+        for (t, y), result in zip(series, results):
+            filtered, smoothed, level_var = self._sequential(t, y, result.params)
+            np.testing.assert_allclose(result.filtered_level, filtered, atol=1e-9)
+            np.testing.assert_allclose(result.level, smoothed[:, 0], atol=1e-9)
+            np.testing.assert_allclose(result.slope, smoothed[:, 1], atol=1e-12)
+            np.testing.assert_allclose(result.level_var, level_var, rtol=1e-9)
+            if not trend:
+                assert not result.slope.any()
+
+        # Uncertainty peaks inside the gap
+        gap = len(series[0][1]) // 2
+        assert results[0].level_var[gap - 1] > np.median(results[0].level_var)
+
+    def test_incremental_state_matches_full_run(self):
+        import numpy as np
+        from app.features.state_space import advance_state, initial_states, run_smoother
+
+        t, y = self._series(400, 7)
+        full, = run_smoother([(t, y)])
+        state, = initial_states(run_smoother([(t[:250], y[:250])], params=[full.params]))
+        state = advance_state(state, t[250:], y[250:])
+
+        np.testing.assert_allclose(state.mean, full.end_mean, atol=1e-9)
+        assert state.n == 400
+        assert state.summary["noise_sd"] == pytest.approx(3.0, rel=0.25)
+        assert state.summary["smoothed_mean"] == pytest.approx(full.level.mean(), rel=1e-3)
+        assert advance_state(state, t[:5], y[:5]) is None  # Not an append
+
+    def test_stream_state_is_persisted_and_advanced(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        from app.models.part_a_models import ISFAnalyteStream, ISFStreamDerivedRecord
+        from app.features.state_space import KALMAN_STATE_KIND, seed_kalman_states, stream_kalman_state
+
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+
+        t, y = self._series(200, 3)
+        start = datetime(2026, 1, 1)
+        stamps = [(start + timedelta(seconds=float(s))).isoformat() for s in t]
+        streams = [
+            ISFAnalyteStream(submission_id=1, name=name, unit="u",
+                             values_json=[float(v) for v in y[:150]], timestamps_json=stamps[:150])
+            for name in ("glucose", "lactate")
+        ]
+        assert seed_kalman_states(streams) == 2
+        db.add_all(streams)
+        db.commit()
+        assert db.query(ISFStreamDerivedRecord).filter_by(kind=KALMAN_STATE_KIND).count() == 2
+
+        stream = streams[0]
+        stream.values_json = stream.values_json + [float(v) for v in y[150:]]
+        stream.timestamps_json = stream.timestamps_json + stamps[150:]
+        state = stream_kalman_state(stream)
+        db.commit()
+
+        assert state["n"] == 200
+        assert state["last_ts"] == pytest.approx(t[-1] + (start - datetime(1970, 1, 1)).total_seconds())
+        db.close()
+
+
+class TestSignalQuality:
+    """Test data-derived signal quality and its incremental state."""
+
+    def _glucose(self, days=10, seed=1):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        t = np.arange(0, days * 86400, 300.0)
+        v = 120 + 30 * np.sin(2 * np.pi * t / 86400) + rng.normal(0, 2, len(t))
+        for start in (500, 1500, 2500):
+            v[start:start + 4] -= 50  # 20-minute compression lows
+        keep = np.ones(len(t), dtype=bool)
+        keep[1000:1036] = False  # 3-hour dropout
+        return t[keep], v[keep]
+
+    def _anchors(self, drift_per_day):
+        import numpy as np
+
+        times = [day * 86400 + 3600.0 for day in range(1, 9)]
+        return [(ts, float(120 + 30 * np.sin(2 * np.pi * ts / 86400)) - drift_per_day * ts / 86400) for ts in times]
+
+    def test_measures_dropout_noise_artifacts_and_drift(self):
+        from app.features.signal_quality import initial_quality_state
+
+        t, v = self._glucose()
+        summary = initial_quality_state(t, v, self._anchors(2.0)).summary
+
+        assert summary["cadence_s"] == 300.0
+        assert summary["gap_count"] == 1
+        assert summary["dropout_pct"] == pytest.approx(100 * 36 / (len(t) + 36), rel=0.05)
+        assert summary["noise_sd"] == pytest.approx(2.0, rel=0.3)
+        assert summary["artifact_episodes"] == 3
+        assert summary["anchor_count"] == 8
+        assert summary["drift_per_day"] == pytest.approx(2.0, rel=0.1)
+        assert 0 < summary["sensor_drift_score"] < 1
+        assert 0 < summary["quality_score"] < 1
+
+    def test_gradual_dip_is_not_an_artifact(self):
+        import numpy as np
+        from app.features.signal_quality import initial_quality_state
+
+        t = np.arange(0, 86400, 300.0)
+        v = 120 - 50 * np.exp(-((t - 43200) / 1800.0) ** 2)  # Physiological low
+        assert initial_quality_state(t, v).summary["artifact_episodes"] == 0
+
+    def test_incremental_state_matches_full_run(self):
+        from app.features.signal_quality import advance_quality_state, initial_quality_state
+
+        t, v = self._glucose()
+        anchors = self._anchors(1.0)
+        full = initial_quality_state(t, v, anchors).summary
+        state = initial_quality_state(t[:1200], v[:1200], anchors)
+        for a, b in ((1200, 1210), (1210, 2000), (2000, len(t))):
+            state = advance_quality_state(state, t[a:b], v[a:b])
+
+        for key, value in full.items():
+            assert state.summary[key] == pytest.approx(value), key
+        assert len(state.tail_ts) < 100
+        assert advance_quality_state(state, t[:3], v[:3]) is None
+
+    def test_stream_quality_uses_lab_anchors_and_persists(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        from app.models.part_a_models import ISFAnalyteStream, SpecimenAnalyte, SpecimenUpload
+        from app.features.signal_quality import lab_anchors, stream_signal_quality
+
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+
+        start = datetime(2026, 1, 1)
+        for ts, value in self._anchors(2.0):
+            upload = SpecimenUpload(submission_id=1, modality="blood", source_format="manual_entry",
+                                    collection_datetime=start + timedelta(seconds=ts))
+            upload.analytes.append(SpecimenAnalyte(name="glucose", value=value, unit="mg/dL"))
+            db.add(upload)
+        db.commit()
+        anchors = lab_anchors(db, 1, "glucose", "mg/dL")
+        assert len(anchors) == 8
+        assert lab_anchors(db, 1, "glucose", "mmol/L") == []
+
+        t, v = self._glucose()
+        stamps = [(start + timedelta(seconds=float(s))).isoformat() for s in t]
+        stream = ISFAnalyteStream(submission_id=1, name="glucose", unit="mg/dL",
+                                  values_json=[float(x) for x in v[:2000]], timestamps_json=stamps[:2000])
+        db.add(stream)
+        assert stream_signal_quality(stream, anchors)["summary"]["anchor_count"] == 7
+        db.commit()
+
+        stream.values_json = stream.values_json + [float(x) for x in v[2000:]]
+        stream.timestamps_json = stream.timestamps_json + stamps[2000:]
+        summary = stream_signal_quality(stream)["summary"]
+        assert summary["n"] == len(v)
+        assert summary["anchor_count"] == 8
+        assert summary["drift_per_day"] == pytest.approx(2.0, rel=0.1)
+        db.close()
+
+    def test_ingest_keeps_submitted_quality_scores(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.api.part_a import _store_isf_streams
+        from app.db.base import Base
+        from app.models.part_a_models import ISFAnalyteStream, ISFStreamDerivedRecord
+        from app.features.signal_quality import SIGNAL_QUALITY_KIND
+        from schemas.part_a.v1.main_schema import ISFMonitorData, SignalQuality
+        from schemas.part_a.v1.main_schema import ISFAnalyteStream as ISFAnalyteStreamSchema
+
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+
+        start = datetime(2026, 1, 1)
+        t, v = self._glucose()
+        isf_data = ISFMonitorData(
+            core_analytes=[ISFAnalyteStreamSchema(
+                name="glucose", unit="mg/dL", values=[float(x) for x in v],
+                timestamps=[start + timedelta(seconds=float(s)) for s in t],
+            )],
+            signal_quality=SignalQuality(
+                calibration_status="recent", sensor_drift_score=0.1, noise_score=0.05, dropout_percentage=2.0
+            ),
+        )
+        _store_isf_streams(db, 1, isf_data)
+        db.commit()
+
+        stream = db.query(ISFAnalyteStream).one()
+        assert (stream.noise_score, stream.dropout_percentage, stream.sensor_drift_score) == (0.05, 2.0, 0.1)
+        record = db.query(ISFStreamDerivedRecord).filter_by(stream_id=stream.id, kind=SIGNAL_QUALITY_KIND).one()
+        assert record.payload_json["summary"]["gap_count"] == 1
+        db.close()
+
+
+class TestResampling:
+    """Test regular-grid resampling and the per-submission matrix cache."""
+
+    def test_aggregations_match_per_bin_reference(self):
+        import numpy as np
+        from app.features.resampling import resample
+
+        rng = np.random.default_rng(0)
+        t = rng.uniform(1000, 1000 + 86400, 600)  # Unsorted, irregular
+        v = rng.normal(100, 10, len(t))
+        order = np.argsort(t)
+        reducers = {"mean": np.mean, "median": np.median, "min": np.min, "max": np.max, "sum": np.sum,
+                    "first": lambda a: a[0], "last": lambda a: a[-1], "count": len}
+
+        for agg, reducer in reducers.items():
+            result = resample(t, v, 900, agg)
+            bins = ((t[order] - result.timestamps[0]) // 900).astype(int)
+            assert result.timestamps[0] % 900 == 0
+            assert len(result.values) == bins[-1] + 1
+            for i in range(len(result.values)):
+                chunk = v[order][bins == i]
+                if len(chunk):
+                    assert result.values[i] == pytest.approx(reducer(chunk))
+                elif agg != "count":
+                    assert np.isnan(result.values[i])
+
+    def test_forward_fill_limit_and_gap_mask(self):
+        import numpy as np
+        from app.features.resampling import resample
+
+        t = np.array([0.0, 300.0, 3600.0])
+        result = resample(t, [1.0, 2.0, 3.0], 300, ffill_limit_s=600)
+
+        assert len(result.values) == 13
+        assert result.values[:4].tolist() == [1.0, 2.0, 2.0, 2.0] and np.isnan(result.values[4])
+        assert result.filled.tolist()[:5] == [False, False, True, True, False]
+        assert result.gap_mask.sum() == 13 - 3 - 2
+        assert result.values[-1] == 3.0
+
+    def test_submission_matrix_is_aligned_and_cached(self):
+        import numpy as np
+        from datetime import datetime, timedelta
+        from app.features.resampling import GRID_5_MIN, clear_matrix_cache, submission_matrix
+        from app.models.part_a_models import ISFAnalyteStream
+
+        clear_matrix_cache()
+        start = datetime(2026, 1, 1)
+
+        def stream(stream_id, name, minutes):
+            return ISFAnalyteStream(id=stream_id, submission_id=1, name=name, unit="u",
+                                    values_json=[float(m) for m in minutes],
+                                    timestamps_json=[(start + timedelta(minutes=m)).isoformat() for m in minutes])
+
+        streams = [stream(1, "glucose", range(0, 120, 5)), stream(2, "lactate", range(30, 60, 15)),
+                   stream(3, "glucose", range(120, 180, 5))]
+        matrix = submission_matrix(1, streams, GRID_5_MIN)
+
+        assert matrix.names == ["glucose", "lactate"]
+        assert matrix.values.shape == (36, 2) and matrix.values.flags.c_contiguous
+        assert matrix.observed[:, 0].all() and matrix.observed[:, 1].sum() == 2
+        assert matrix.observed_fraction("lactate") == pytest.approx(2 / 4)
+        assert np.isnan(matrix.column("lactate")[0])
+        assert not matrix.values.flags.writeable
+        assert submission_matrix(1, streams, GRID_5_MIN) is matrix
+
+        streams[2].values_json = streams[2].values_json + [180.0]
+        streams[2].timestamps_json = streams[2].timestamps_json + [(start + timedelta(minutes=180)).isoformat()]
+        rebuilt = submission_matrix(1, streams, GRID_5_MIN)
+        assert rebuilt is not matrix and rebuilt.values.shape == (37, 2)
+        assert rebuilt.select(["lactate"]).names == ["lactate"]
+        assert rebuilt.last_ts[0] == matrix.last_ts[0] + 300.0
+        assert rebuilt.select(["lactate"]).first_ts.tolist() == [matrix.first_ts[1]]
+
+    def test_submission_matrix_cache_is_thread_safe(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from datetime import datetime, timedelta
+        from app.features import resampling
+        from app.models.part_a_models import ISFAnalyteStream
+
+        resampling.clear_matrix_cache()
+        start = datetime(2026, 1, 1)
+
+        def build(submission_id):
+            stream = ISFAnalyteStream(id=submission_id, submission_id=submission_id, name="glucose", unit="u",
+                                      values_json=[100.0] * 12,
+                                      timestamps_json=[(start + timedelta(minutes=5 * i)).isoformat() for i in range(12)])
+            return resampling.submission_matrix(submission_id, [stream])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            matrices = list(pool.map(build, [i % 48 for i in range(400)]))
+
+        assert all(m.observed.sum() == 4 for m in matrices)
+        assert len(resampling._matrix_cache) == resampling.MATRIX_CACHE_SIZE
+
+    def test_a2_isf_coverage_reads_submission_matrix(self, monkeypatch):
+        from datetime import datetime, timedelta
+        from app.features.resampling import clear_matrix_cache, submission_matrix
+        from app.models.part_a_models import ISFAnalyteStream
+        from app.services import a2_processor
+        from app.services.a2_processor import A2Processor
+
+        # Exercise the grid fallback rather than cadence-measured quality
+        monkeypatch.setattr(a2_processor, "merged_quality_summary", lambda streams: None)
+        clear_matrix_cache()
+        start = datetime(2026, 1, 1, 23, 0)
+        minutes = list(range(0, 120, 15)) + [2 * 1440]
+        streams = [ISFAnalyteStream(id=1, submission_id=7, name="glucose", unit="mg/dL",
+                                    values_json=[100.0] * len(minutes),
+                                    timestamps_json=[(start + timedelta(minutes=m)).isoformat() for m in minutes])]
+        matrix = submission_matrix(7, streams)
+
+        coverage = A2Processor._isf_stream_coverage(streams, matrix, "glucose")
+        assert coverage["days_covered"] == 3
+        assert coverage["last_seen_ts"] == (start + timedelta(days=2)).isoformat()
+        # 9 observed 15-minute bins over the 3 calendar days touched
+        assert coverage["quality_score"] == pytest.approx(9 / (3 * 96))
+        assert A2Processor._isf_stream_coverage(streams, matrix, "lactate")["missing_rate"] == 1.0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -26,12 +26,13 @@ from schemas.part_a.v1.main_schema import (
     ActivityLifestyle,
     Symptoms,
     QualitativeEncoding,
+    QualitativeEncodingRule,
     FileFormatEnum,
     FastingStatusEnum,
     SpecimenModalityEnum
 )
 
-from encoding.qualitative_to_quantitative import get_encoding_registry
+from encoding.qualitative_to_quantitative import EncodingRegistry, get_encoding_registry
 from ingestion.specimens.blood import parse_blood_specimen
 
 
@@ -270,6 +271,46 @@ def test_qualitative_encoding_aggregate_modifiers():
     assert aggregate["dehydration_risk"] == pytest.approx(1.05, abs=0.01)
 
 
+def test_qualitative_encoding_cached_by_profile_hash():
+    """Equivalent SOAP profiles (any key order) reuse the cached encoding."""
+    registry = EncodingRegistry()
+
+    profile_a = {"diet": {"sodium_intake": "HIGH", "caffeine": "high"}, "medical_history": {"conditions": ["CKD"]}}
+    profile_b = {"medical_history": {"conditions": ["CKD"]}, "diet": {"caffeine": "high", "sodium_intake": "HIGH"}}
+
+    first = registry.encode_qualitative_inputs(profile_a)
+    assert len(registry._cache) == 1
+    second = registry.encode_qualitative_inputs(profile_b)
+    assert len(registry._cache) == 1
+    assert [r.standardized_code for r in first] == [r.standardized_code for r in second]
+    assert [r.standardized_code for r in first] == ["DIET_SODIUM_HIGH", "CAFFEINE_HIGH", "DX_CKD"]
+
+
+def test_qualitative_encoding_register_rule_invalidates_cache():
+    """Registering a rule recompiles the lookup table and drops cached encodings."""
+    registry = EncodingRegistry()
+    profile = {"diet": {"meal_timing": "late"}}
+    assert registry.encode_qualitative_inputs(profile) == []
+
+    registry.register_rule(
+        input_field="diet.meal_timing",
+        input_value="late",
+        rule=QualitativeEncodingRule(
+            input_field="diet.meal_timing",
+            input_value="late",
+            standardized_code="MEAL_TIMING_LATE",
+            numeric_weight=1.1,
+            time_window="chronic",
+            direction_of_effect={"glucose_variability": 0.1, "dehydration_risk": 0.05}
+        )
+    )
+
+    applied = registry.encode_qualitative_inputs(profile)
+    assert [r.standardized_code for r in applied] == ["MEAL_TIMING_LATE"]
+    aggregate = registry.compute_aggregate_modifiers(applied)
+    assert aggregate == pytest.approx({"glucose_variability": 0.1, "dehydration_risk": 0.05})
+
+
 def test_blood_parser_csv():
     """Test blood specimen CSV parsing."""
     csv_content = """name,value,unit,ref_low,ref_high,flag
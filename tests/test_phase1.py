@@ -12,7 +12,7 @@ Tests for Phase 1 A2 Processing + B Output enhancements:
 """
 
 import pytest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List
 
 from app.models.run_v2 import RunV2, SpecimenRecord, SpecimenTypeEnum
@@ -21,8 +21,12 @@ from app.models.inference_pack_v2 import (
     SupportTypeEnum, ProvenanceTypeEnum
 )
 from app.ml.phase1_integration import Phase1Integrator
-from app.features.coverage_truth import compute_coverage_truth_pack
-from app.features.unit_normalization import normalize_value
+import numpy as np
+
+from app.features.coverage_truth import (
+    compute_coverage_truth_pack, compute_stream_coverage, compute_stream_coverage_arrays
+)
+from app.features.unit_normalization import normalize_value, normalize_many, _get_default_unit
 from app.features.derived_features import compute_derived_features
 from app.features.conflict_detection import detect_conflicts
 
@@ -96,6 +100,96 @@ class TestCoverageTruth:
         assert coverage.stream_coverages["glucose_isf"].quality_score >= 0.0
         assert coverage.stream_coverages["glucose_isf"].quality_score <= 1.0
         assert coverage.stream_coverages["glucose_isf"].missing_rate <= 1.0
+    
+    def test_array_path_matches_dict_path(self):
+        """Epoch arrays and timestamp dicts should yield identical coverage."""
+        base = datetime(2026, 1, 1)
+        offsets_h = [0, 5, 30, 31, 100, 250, 251, 400]
+        points = [{"timestamp": (base + timedelta(hours=h)).isoformat(), "value": 1.0} for h in offsets_h]
+        epoch = np.array([(base + timedelta(hours=h)).replace(tzinfo=timezone.utc).timestamp() for h in offsets_h])
+        
+        from_dicts = compute_stream_coverage("glucose_isf", points, window_days=30.0)
+        from_arrays = compute_stream_coverage_arrays("glucose_isf", epoch[::-1], window_days=30.0)
+        
+        assert from_arrays.days_covered == from_dicts.days_covered
+        assert from_arrays.data_points == from_dicts.data_points
+        assert from_arrays.consistency_score == pytest.approx(from_dicts.consistency_score)
+        assert from_arrays.coverage_gaps == from_dicts.coverage_gaps
+        assert from_arrays.first_seen_ts == base
+    
+    def test_days_bucket_on_local_dates(self):
+        """Days covered count local dates, not UTC dates, for tz-aware series."""
+        pacific = timezone(timedelta(hours=-8))
+        # Two local dates that both fall on 2026-01-02 in UTC
+        local = [datetime(2026, 1, 1, 20, 0, tzinfo=pacific), datetime(2026, 1, 2, 10, 0, tzinfo=pacific)]
+        points = [{"timestamp": ts.isoformat(), "value": 1.0} for ts in local]
+        epoch = np.array([ts.timestamp() for ts in local])
+        
+        from_dicts = compute_stream_coverage("glucose_isf", points, window_days=7.0)
+        from_arrays = compute_stream_coverage_arrays(
+            "glucose_isf", epoch, window_days=7.0, utc_offsets_s=-8 * 3600.0
+        )
+        
+        assert from_dicts.days_covered == 2
+        assert from_arrays.days_covered == 2
+        assert from_dicts.first_seen_ts == local[0]
+        # Without offsets, arrays are bucketed on UTC dates
+        assert compute_stream_coverage_arrays("glucose_isf", epoch, window_days=7.0).days_covered == 1
+    
+    def test_array_path_gap_metrics_and_masks(self):
+        """Masked/NaN samples are dropped; gaps are histogrammed."""
+        ts = np.array([0.0, 600.0, 7200.0, 86400.0 * 2, 86400.0 * 10, 86400.0 * 11])
+        values = np.array([1.0, np.nan, 1.0, 1.0, 1.0, 1.0])
+        mask = np.array([True, True, True, True, True, False])
+        
+        coverage = compute_stream_coverage_arrays(
+            "lactate_isf", ts, values=values, mask=mask, window_days=14.0, expected_interval_s=3600.0
+        )
+        
+        assert coverage.data_points == 4
+        assert coverage.days_covered == 3
+        assert coverage.expected_data_points == 14 * 24
+        assert coverage.longest_gap_days == pytest.approx(8.0)
+        assert coverage.gap_histogram == {
+            "<1h": 0, "1h-6h": 1, "6h-1d": 0, "1d-3d": 1, "3d-7d": 0, ">7d": 1
+        }
+        assert len(coverage.coverage_gaps) == 1
+    
+    def test_array_path_empty_stream(self):
+        coverage = compute_stream_coverage_arrays("hba1c_blood", np.array([]))
+        assert coverage.data_points == 0
+        assert coverage.max_confidence_allowed == 0.0
+        assert coverage.last_seen_ts is None
+    
+    def test_pack_groups_repeat_specimens_per_stream(self):
+        """Repeated specimens of one type feed a single stream's coverage."""
+        now = datetime(2026, 3, 1)
+        run = RunV2(
+            run_id="test_run",
+            user_id="user_1",
+            created_at=now,
+            specimens=[
+                SpecimenRecord(
+                    specimen_id=f"isf_{i}",
+                    specimen_type=SpecimenTypeEnum.ISF,
+                    collected_at=now - timedelta(days=i * 10),
+                    raw_values={"glucose": 100.0 + i},
+                    units={"glucose": "mg/dL"},
+                    missingness={}
+                )
+                for i in range(3)
+            ],
+            non_lab_inputs={}
+        )
+        
+        coverage = compute_coverage_truth_pack(run, lookback_days=90)
+        
+        stream = coverage.stream_coverages["glucose_isf"]
+        assert stream.data_points == 3
+        assert stream.days_covered == 3
+        assert stream.days_in_window == 90.0
+        assert stream.first_seen_ts == now - timedelta(days=20)
+        assert stream.last_seen_ts == now
 
 
 class TestUnitNormalization:
@@ -130,6 +224,40 @@ class TestUnitNormalization:
         assert normalized.std_value == 200.0
         assert normalized.std_unit == "mg/dL"
 
+    def test_sex_stratified_reference_selection(self):
+        """Sex-specific intervals are selected; unknown sex keeps all strata."""
+        male = normalize_value("creatinine", 1.2, "mg/dL", patient_sex="M")
+        female = normalize_value("creatinine", 1.2, "mg/dL", patient_sex="F")
+        unknown = normalize_value("creatinine", 1.2, "mg/dL")
+
+        assert [r.sex for r in male.applicable_references] == ["M"]
+        assert [r.sex for r in female.applicable_references] == ["F"]
+        assert len(unknown.applicable_references) == 2
+        assert male.is_within_reference is True
+        assert female.is_within_reference is False
+
+    def test_normalize_many_matches_normalize_value(self):
+        """Vectorized specimen normalization agrees with the scalar path."""
+        values = {"glucose": 5.5, "creatinine": 1.2, "hdl": 45.0, "lactate": 1.1}
+        units = {"glucose": "mmol/L"}
+
+        batch = normalize_many(values, units=units, patient_sex="F")
+
+        for name, value in values.items():
+            scalar = normalize_value(name, value, units.get(name, _get_default_unit(name)), patient_sex="F")
+            assert batch.std_values_for(name)[0] == pytest.approx(scalar.std_value)
+        legacy = batch.to_normalized_values()
+        assert legacy["glucose"].std_value == pytest.approx(99.0)
+        assert legacy["hdl"].is_within_reference is False
+        assert legacy["lactate"].is_within_reference is None
+
+    def test_normalize_many_time_series(self):
+        """A time series is converted and range-checked in one call."""
+        batch = normalize_many({"glucose": [3.5, 5.0, 9.0]}, units={"glucose": "mmol/L"})
+
+        assert batch.std_values_for("glucose") == pytest.approx([63.0, 90.0, 162.0])
+        assert batch.is_within_reference.tolist() == [False, True, False]
+
 
 class TestDerivedFeatures:
     """Test Requirement A.3: Derived features."""
@@ -181,6 +309,63 @@ class TestDerivedFeatures:
         ag = [f for f in pack.electrolyte_features if f.feature_name == "Anion_Gap"]
         assert len(ag) == 1
         assert ag[0].value == 16.0  # 140 - (100 + 24)
+    
+    def test_array_features_match_scalar_per_draw(self):
+        """Columnar calculators agree with the per-draw calculators."""
+        from app.features.derived_features import compute_derived_features_arrays
+        
+        rng = np.random.default_rng(11)
+        n = 100
+        bounds = {
+            "creatinine": (0.3, 6), "bun": (3, 80), "sodium_na": (120, 160),
+            "chloride_cl": (85, 120), "co2_bicarb": (10, 35), "albumin": (2, 5.5),
+            "glucose": (50, 400), "chol_total": (100, 320), "hdl": (20, 100),
+            "ldl": (40, 220), "triglycerides": (40, 600),
+            "blood_pressure_systolic": (80, 200), "blood_pressure_diastolic": (40, 120),
+        }
+        labs = {}
+        for name, (lo, hi) in bounds.items():
+            column = rng.uniform(lo, hi, n)
+            column[rng.random(n) < 0.2] = np.nan
+            labs[name] = column
+        ages = rng.integers(20, 90, n)
+        sexes = rng.choice(["F", "M"], n)
+        
+        columns = compute_derived_features_arrays(labs, {"age": ages, "sex": sexes})
+        
+        for i in range(n):
+            draw = {k: float(v[i]) for k, v in labs.items() if not np.isnan(v[i])}
+            pack = compute_derived_features(draw, {"age": int(ages[i]), "sex": str(sexes[i])})
+            scalar = {
+                f.feature_name: f
+                for group in (pack.renal_features, pack.electrolyte_features, pack.lipid_features, pack.blood_pressure_features)
+                for f in group
+            }
+            for name, values in columns.values.items():
+                if name in scalar:
+                    assert values[i] == pytest.approx(scalar[name].value, abs=1e-9)
+                    assert columns.is_within_normal[name][i] == scalar[name].is_within_normal
+                else:
+                    assert np.isnan(values[i])
+    
+    def test_array_features_trajectory(self):
+        """A single user's history yields an eGFR trajectory over defined draws."""
+        from app.features.derived_features import compute_derived_features_arrays
+        
+        ts = np.array([0.0, 86400.0, 172800.0])
+        columns = compute_derived_features_arrays(
+            {"creatinine": [0.9, np.nan, 1.4], "triglycerides": [150, 160, 170], "hdl": [50, 40, 0]},
+            {"age": 50, "sex": "M"},
+            timestamps=ts,
+        )
+        
+        egfr_ts, egfr = columns.trajectory("eGFR_CKD_EPI")
+        assert list(egfr_ts) == [0.0, 172800.0]
+        assert egfr[0] > egfr[1]
+        # Division by zero HDL is undefined, not inf
+        assert np.isnan(columns.values["TG_HDL_Ratio"][2])
+        assert columns.values["TG_HDL_Ratio"][0] == 3.0
+        assert "BUN_Creatinine_Ratio" not in columns.values
 
 
 class TestConflictDetection:
@@ -199,6 +384,74 @@ class TestConflictDetection:
         
         # Should detect that 5 mg/dL glucose is impossibly low
         assert len(conflicts) >= 1  # Should detect the violation
+    
+    def test_scan_conflicts_returns_intervals(self):
+        """Consecutive flagged points collapse into one interval per rule."""
+        from app.features.conflict_detection import scan_conflicts, ConflictSeverity
+        
+        ts = np.arange(8) * 300.0
+        series = {
+            "glucose": np.array([100, 5, 5, 5, 100, 100, 1200, 100], dtype=float),
+            "blood_pressure_systolic": np.array([120, 120, 90, np.nan, 90, 120, 120, 120], dtype=float),
+            "blood_pressure_diastolic": np.array([80, 80, 95, 95, 95, 80, 80, 80], dtype=float),
+        }
+        
+        report = scan_conflicts(ts, series)
+        spans = [(i.rule, i.start_index, i.end_index) for i in report.intervals]
+        
+        assert spans == [
+            ("range_glucose", 1, 3),
+            ("bp_inversion", 2, 2),
+            ("bp_narrow_pulse_pressure", 2, 2),
+            ("bp_inversion", 4, 4),
+            ("bp_narrow_pulse_pressure", 4, 4),
+            ("range_glucose", 6, 6),
+        ]
+        assert report.intervals[0].start_ts == 300.0
+        assert report.intervals[0].end_ts == 900.0
+        assert report.intervals[0].severity == ConflictSeverity.CRITICAL
+        assert report.flagged_timepoints == 5
+    
+    def test_scan_conflicts_matches_snapshot_checks(self):
+        """Every time point gets exactly the rules the snapshot checks fire."""
+        from app.features.conflict_detection import (
+            scan_conflicts, check_physiologic_ranges, check_electrolyte_balance,
+            check_blood_pressure_consistency
+        )
+        
+        rng = np.random.default_rng(7)
+        n = 200
+        bounds = {
+            "glucose": (5, 1100), "sodium_na": (100, 180), "potassium_k": (1, 10),
+            "chloride_cl": (80, 140), "co2_bicarb": (5, 40),
+            "blood_pressure_systolic": (30, 320), "blood_pressure_diastolic": (10, 210),
+        }
+        series = {}
+        for name, (lo, hi) in bounds.items():
+            values = rng.uniform(lo, hi, n)
+            values[rng.random(n) < 0.2] = np.nan
+            series[name] = values
+        
+        report = scan_conflicts(np.arange(n, dtype=float), series)
+        flagged = [set() for _ in range(n)]
+        for interval in report.intervals:
+            for i in range(interval.start_index, interval.end_index + 1):
+                flagged[i].add(interval.rule)
+        
+        for i in range(n):
+            snapshot = {k: float(v[i]) for k, v in series.items() if not np.isnan(v[i])}
+            expected = check_physiologic_ranges(snapshot) + check_electrolyte_balance(snapshot) + check_blood_pressure_consistency(snapshot)
+            assert flagged[i] == {c.conflict_id for c in expected}
+    
+    def test_scan_conflicts_splits_on_time_gap(self):
+        from app.features.conflict_detection import scan_conflicts
+        
+        ts = np.array([0.0, 300.0, 86400.0, 86700.0])
+        series = {"glucose": np.full(4, 2000.0)}
+        
+        assert len(scan_conflicts(ts, series).intervals) == 1
+        split = scan_conflicts(ts, series, max_gap_s=3600.0)
+        assert [(i.start_index, i.end_index) for i in split.intervals] == [(0, 1), (2, 3)]
 
 
 class TestEvidenceGrading:
@@ -432,6 +685,48 @@ class TestPhase1Integration:
         assert formatted.range_low == 90.0
         assert formatted.range_high == 110.0
         assert formatted.confidence_percent == 80
+    
+    def test_integrate_phase1_runs_stage_graph(self):
+        """Test the full pipeline runs every stage and enhances each output."""
+        integrator = Phase1Integrator()
+        run = RunV2(
+            run_id="test_run_phase1",
+            user_id="user_1",
+            created_at=datetime.utcnow(),
+            specimens=[
+                SpecimenRecord(
+                    specimen_id="blood_1",
+                    specimen_type=SpecimenTypeEnum.BLOOD_CAPILLARY,
+                    collected_at=datetime.utcnow(),
+                    raw_values={"glucose": 105.0, "hba1c": 5.6},
+                    units={"glucose": "mg/dL", "hba1c": "%"},
+                    missingness={}
+                )
+            ],
+            non_lab_inputs={}
+        )
+        iv = InferredValue(
+            key="glucose",
+            value=105.0,
+            range_lower=95.0,
+            range_upper=115.0,
+            confidence_0_1=0.99,
+            support_type=SupportTypeEnum.DIRECT,
+            provenance=ProvenanceTypeEnum.MEASURED
+        )
+        
+        result = integrator.integrate_phase1(run, None, [iv], patient_age=45, patient_sex="M")
+        
+        assert "glucose_blood_capillary" in result["coverage_truth"].stream_coverages
+        assert result["enhanced_values"] == [iv]
+        assert iv.range_low == 95.0
+        assert iv.confidence_0_1 <= EVIDENCE_GRADE_CAPS[iv.evidence_grade]
+        statuses = {s["name"]: s["status"] for s in result["stage_report"]["stages"]}
+        assert set(statuses.values()) == {"ran"}
+        assert list(statuses) == [
+            "coverage_truth", "unit_normalization", "derived_features",
+            "conflict_detection", "output_enhancement"
+        ]
 
 
 if __name__ == "__main__":
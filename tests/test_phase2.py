@@ -16,16 +16,24 @@ Comprehensive tests for all Phase 2 components:
 import pytest
 from datetime import datetime, timedelta
 from typing import Dict, List
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 
+from app.db.base import Base
+import app.models  # noqa: F401  (register tables on Base.metadata)
 # Phase 2 modules
 from app.features.constraint_lattice import (
     get_constraint_lattice, ConstraintDomain, ConstraintType
 )
 from app.features.reconciliation import get_reconciliation_engine
-from app.features.temporal_inertia import get_temporal_inertia_engine
-from app.features.personal_baselines import get_personal_baseline_engine
-from app.features.multi_solver import get_multi_solver_engine
-from app.features.priors_decay import get_priors_decay_engine
+from app.features.temporal_inertia import (
+    get_temporal_inertia_engine, MarkerHistory, build_marker_histories
+)
+from app.features.personal_baselines import get_personal_baseline_engine, PersonalBaselineEngine
+from app.features.multi_solver import (
+    get_multi_solver_engine, MultiSolverEngine, SolverOutput, SolverType
+)
+from app.features.priors_decay import get_priors_decay_engine, PriorsDecayEngine, decay_priors
 from app.features.confidence_calibration import (
     get_confidence_calibrator, ConfidenceComponents
 )
@@ -165,6 +173,42 @@ class TestTemporalInertia:
         # Should detect violation
         assert len(assessment.violations) > 0
 
+    
+    def test_marker_history_keeps_time_order(self):
+        """Test out-of-order appends and merges stay sorted."""
+        base_time = datetime(2026, 1, 1)
+        history = MarkerHistory("glucose")
+        
+        history.append(base_time + timedelta(days=2), 102.0)
+        history.append(base_time, 100.0)
+        history.extend([(base_time + timedelta(days=3), 103.0), (base_time + timedelta(days=1), 101.0)])
+        
+        assert len(history) == 4
+        assert list(history.values) == [100.0, 101.0, 102.0, 103.0]
+        assert history.latest() == (base_time + timedelta(days=3), 103.0)
+        assert history.span_days == 3.0
+    
+    def test_marker_history_matches_tuple_input(self):
+        """Test assessment is identical for MarkerHistory and tuple lists."""
+        engine = get_temporal_inertia_engine()
+        
+        now = datetime(2026, 3, 1)
+        history = {
+            "glucose": [(now - timedelta(days=i), 95.0 + (i % 3)) for i in range(30)],
+            "hemoglobin_a1c": [(now - timedelta(days=7), 5.5)],
+        }
+        current_estimates = {
+            "glucose": {"center": 97.0},
+            "hemoglobin_a1c": {"center": 9.0},
+        }
+        
+        from_tuples = engine.assess_temporal_coherence(current_estimates, history, current_time=now)
+        from_arrays = engine.assess_temporal_coherence(
+            current_estimates, build_marker_histories(history), current_time=now
+        )
+        
+        assert from_arrays.to_dict() == from_tuples.to_dict()
+        assert [v.marker_name for v in from_arrays.violations] == ["hemoglobin_a1c"]
 
 class TestPersonalBaselines:
     """Test personal baseline modeling."""
@@ -215,7 +259,104 @@ class TestPersonalBaselines:
         # Test deviation - use a value that actually differs from baseline
         deviation = baseline.deviation_from_baseline(105.0)
         assert abs(deviation) >= 0  # Deviation can be 0 or positive
+    
+    def test_streaming_baseline_tracks_batch(self):
+        """Test streaming sketches approximate the full-history baseline."""
+        engine = PersonalBaselineEngine()
+        
+        base_time = datetime(2026, 1, 1)
+        history = [
+            (base_time + timedelta(hours=5 * i), 90.0 + (i * 7) % 21)
+            for i in range(400)
+        ]
+        
+        # Arrives in chunks; only new observations are folded in
+        for start in range(0, len(history), 50):
+            engine.update_baseline_state(1, "glucose", history[start:start + 50], "glucose")
+        
+        batch = engine.compute_baseline("glucose", history, "glucose")
+        streaming = engine.get_streaming_baseline(1, "glucose")
+        
+        assert streaming is not None
+        assert streaming.data_points_count == batch.data_points_count
+        assert streaming.confidence == batch.confidence
+        assert abs(streaming.center - batch.center) < 1.5
+        assert abs(streaming.band_lower - batch.band_lower) < 2.0
+        assert abs(streaming.band_upper - batch.band_upper) < 2.0
+        assert streaming.weekday_baseline is not None
+        assert streaming.weekend_baseline is not None
+    
+    def test_streaming_baseline_insufficient_data(self):
+        """Test streaming state below requirements yields no baseline."""
+        engine = PersonalBaselineEngine()
+        
+        engine.update_baseline_state(1, "glucose", [(datetime.utcnow(), 95.0)], "glucose")
+        
+        assert engine.get_streaming_baseline(1, "glucose") is None
+        assert engine.get_streaming_baseline(2, "glucose") is None
+    
+    def test_streaming_state_persistence(self):
+        """Test baseline state round-trips through the database."""
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        
+        base_time = datetime(2026, 1, 1)
+        history = [(base_time + timedelta(days=i), 95.0 + (i % 5)) for i in range(60)]
+        
+        engine = PersonalBaselineEngine()
+        engine.update_baseline_state(7, "glucose", history, "glucose")
+        assert engine.save_baseline_states(db, 7) == 1
+        db.commit()
+        
+        restored = PersonalBaselineEngine()
+        assert restored.load_baseline_states(db, 7) == 1
+        
+        original = engine.get_streaming_baseline(7, "glucose")
+        reloaded = restored.get_streaming_baseline(7, "glucose")
+        assert reloaded.center == original.center
+        assert reloaded.band_width == original.band_width
+        assert reloaded.data_points_count == 60
+        db.close()
 
+    
+    def test_sync_reloads_states_committed_by_other_workers(self):
+        """Test each sync builds on the latest committed state, not a stale in-memory copy."""
+        from app.models.baseline_models import PersonalBaselineStateRecord
+        
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        
+        base_time = datetime(2026, 1, 1)
+        history = [(base_time + timedelta(hours=12 * i), 95.0 + (i % 5)) for i in range(80)]
+        worker_a = PersonalBaselineEngine()
+        worker_b = PersonalBaselineEngine()
+        
+        for worker, observations in ((worker_a, history[:30]), (worker_b, history[30:60]), (worker_a, history[60:])):
+            worker.sync_baseline_states(db, 11, {"glucose": observations}, {"glucose": "glucose"})
+            db.commit()
+        
+        record = db.query(PersonalBaselineStateRecord).filter_by(user_id=11, marker_name="glucose").one()
+        assert record.observation_count == 80
+        db.close()
+    
+    def test_streaming_state_cache_is_bounded(self):
+        """Test saved users are evicted past user_cache_size; unsaved users are kept."""
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        engine = PersonalBaselineEngine(user_cache_size=2)
+        observations = {"glucose": [(datetime(2026, 1, 1), 95.0)]}
+        
+        for user_id in (1, 2, 3):
+            engine.sync_baseline_states(db, user_id, observations)
+        engine.update_baseline_state(4, "glucose", observations["glucose"])
+        engine.update_baseline_state(5, "glucose", observations["glucose"])
+        
+        assert list(engine._states) == [4, 5]
+        assert engine.get_baseline_state(5, "glucose").data_points == 1
+        db.close()
 
 class TestMultiSolver:
     """Test multi-solver agreement system."""
@@ -248,6 +389,50 @@ class TestMultiSolver:
         # Should have at least deterministic and prior solvers
         assert len(agreement.solver_outputs) > 0
 
+    
+    def test_batch_agreement_matches_per_marker(self):
+        """Test batch agreement matches compute_agreement for every marker."""
+        engine = get_multi_solver_engine()
+        
+        markers = ["egfr", "glucose", "crp", "unknown_marker"]
+        inputs = {"creatinine": 1.2, "glucose": 100.0}
+        metadata = {"age": 55, "sex": "F"}
+        
+        batch = engine.compute_agreement_batch(markers, inputs, metadata, parallel=True)
+        
+        assert list(batch) == markers
+        for marker in markers:
+            expected = engine.compute_agreement(marker, inputs, metadata)
+            result = batch[marker]
+            assert result.agreement_score == pytest.approx(expected.agreement_score)
+            assert result.convergence_flag == expected.convergence_flag
+            assert result.consensus_center == pytest.approx(expected.consensus_center)
+            assert result.consensus_range == pytest.approx(expected.consensus_range)
+            assert result.notes == expected.notes
+            assert result.solver_weights == pytest.approx(expected.solver_weights)
+    
+    def test_batch_agreement_scalar_solver_fallback(self):
+        """Test solvers without an array form still run in batch mode."""
+        engine = MultiSolverEngine()
+        
+        def latent_solver(marker_name, inputs, metadata):
+            if marker_name == "crp":
+                raise ValueError("no factor loading")
+            return SolverOutput(
+                solver_type=SolverType.LATENT_FACTOR,
+                estimate_center=100.0,
+                estimate_range=12.0,
+                confidence=0.6
+            )
+        
+        engine.register_solver(SolverType.LATENT_FACTOR, latent_solver)
+        
+        batch = engine.compute_agreement_batch(["glucose", "crp"], {"glucose": 98.0})
+        
+        glucose_solvers = [s.solver_type for s in batch["glucose"].solver_outputs]
+        assert glucose_solvers == [SolverType.POPULATION_PRIOR, SolverType.LATENT_FACTOR]
+        assert batch["glucose"].consensus_range == pytest.approx(21.0)
+        assert [s.solver_type for s in batch["crp"].solver_outputs] == [SolverType.POPULATION_PRIOR]
 
 class TestPriorsDecay:
     """Test priors and decay logic."""
@@ -298,6 +483,91 @@ class TestPriorsDecay:
         
         # Mean should have shifted toward measurement
         assert updated.mean != initial_mean
+    
+    def test_user_priors_isolated_from_population(self):
+        """Test per-user posterior updates leave population and other users untouched."""
+        engine = PriorsDecayEngine()
+        population_mean = engine.get_prior("glucose", apply_decay=False).mean
+        
+        engine.update_posterior("glucose", 140.0, 5.0, user_id=1)
+        
+        assert engine.get_prior("glucose", apply_decay=False, user_id=1).mean > population_mean
+        assert engine.get_prior("glucose", apply_decay=False).mean == population_mean
+        assert engine.get_prior("glucose", apply_decay=False, user_id=2).mean == population_mean
+    
+    def test_vectorized_decay_matches_scalar(self):
+        """Test batched decay agrees with per-prior decay."""
+        engine = PriorsDecayEngine()
+        now = datetime(2026, 6, 1)
+        engine.set_prior("recent", 10.0, 1.0, established_at=now + timedelta(days=1), half_life_days=30)
+        engine.set_prior("stale", 10.0, 1.0, established_at=now - timedelta(days=2000), half_life_days=30)
+        priors = list(engine.priors.values())
+        
+        strengths, decayed_stds = decay_priors(priors, now)
+        
+        for prior, strength, decayed_std in zip(priors, strengths, decayed_stds):
+            assert strength == pytest.approx(prior.get_current_strength(now))
+            assert decayed_std == pytest.approx(prior.get_decayed_distribution(now)[1])
+    
+    def test_user_priors_persistence(self):
+        """Test posteriors accumulate across engines through the database."""
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        measured_at = datetime(2026, 1, 1)
+        
+        engine = PriorsDecayEngine()
+        engine.update_posterior("hemoglobin_a1c", 6.1, 0.2, measurement_date=measured_at, user_id=7)
+        engine.update_posterior("ldl_cholesterol", 150.0, 8.0, measurement_date=measured_at, user_id=8)
+        assert engine.save_user_priors(db) == 2
+        assert engine.save_user_priors(db) == 0  # nothing left unsaved
+        db.commit()
+        
+        restored = PriorsDecayEngine()
+        assert restored.load_user_priors(db, [7, 8]) == 2
+        original = engine.get_prior("hemoglobin_a1c", apply_decay=False, user_id=7)
+        reloaded = restored.get_prior("hemoglobin_a1c", apply_decay=False, user_id=7)
+        assert reloaded.mean == pytest.approx(original.mean)
+        assert reloaded.std == pytest.approx(original.std)
+        assert reloaded.last_measurement_date == measured_at
+        
+        # A second submission builds on the persisted posterior
+        later = measured_at + timedelta(days=1)
+        restored.update_posterior("hemoglobin_a1c", 6.1, 0.2, measurement_date=later, user_id=7)
+        assert restored.save_user_priors(db, [7]) == 1
+        db.commit()
+        assert restored.get_prior("hemoglobin_a1c", apply_decay=False, user_id=7).std < original.std
+        db.close()
+    
+    def test_user_cache_keeps_unsaved_users(self):
+        """Test LRU eviction drops clean users but never unsaved ones."""
+        engine = PriorsDecayEngine(user_cache_size=2)
+        engine.update_posterior("glucose", 120.0, 5.0, user_id=1)
+        engine.get_prior("glucose", user_id=2)
+        engine.get_prior("glucose", user_id=3)
+        engine.get_prior("glucose", user_id=4)
+        
+        assert 1 in engine._user_priors
+        assert len(engine._user_priors) <= 3
+    
+    def test_load_user_priors_keeps_requested_users(self):
+        """Test loading more users than the cache holds keeps every requested user."""
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        
+        writer = PriorsDecayEngine()
+        for user_id in (1, 2, 3):
+            writer.update_posterior("glucose", 100.0 + user_id, 5.0, user_id=user_id)
+        writer.save_user_priors(db)
+        db.commit()
+        
+        engine = PriorsDecayEngine(user_cache_size=2)
+        engine.get_prior("glucose", user_id=9)  # older clean user, evicted first
+        assert engine.load_user_priors(db, [1, 2, 3]) == 3
+        
+        assert set(engine._user_priors) == {1, 2, 3}
+        db.close()
 
 
 class TestConfidenceCalibration:
@@ -465,6 +735,110 @@ class TestPhase2Integration:
         # Re-enable flags for other tests
         for flag in integrator.FEATURE_FLAGS:
             integrator.set_feature_flag(flag, True)
+    
+    def test_integration_requested_outputs(self):
+        """Test only stages feeding the requested outputs run."""
+        integrator = get_phase2_integrator()
+        
+        from app.models.run_v2 import RunV2
+        run_v2 = RunV2(
+            run_id="run_test_outputs",
+            submission_id="test_outputs",
+            user_id="test_user",
+            created_at=datetime.utcnow(),
+            specimens=[],
+            non_lab_inputs={}
+        )
+        
+        base_time = datetime.utcnow()
+        result = integrator.integrate_phase2(
+            run_v2=run_v2,
+            estimates={"glucose": {"center": 95.0, "range": 10.0, "confidence": 0.75}},
+            historical_data={"glucose": [(base_time - timedelta(days=i), 95.0) for i in range(10)]},
+            outputs=["constraint_evaluations"]
+        )
+        
+        assert list(result["phase2_metadata"]) == ["constraint_evaluations"]
+        statuses = {s["name"]: s["status"] for s in result["stage_report"]["stages"]}
+        assert statuses["constraints"] == "ran"
+        assert statuses["priors_decay"] == "pruned"
+        assert statuses["anchor_gating"] == "pruned"
+    
+    def test_integration_persists_baseline_state(self):
+        """Test runs with a session fold only new observations into the user's stored baseline."""
+        from app.models.baseline_models import PersonalBaselineStateRecord
+        from app.models.run_v2 import RunV2
+        
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        integrator = get_phase2_integrator()
+        run_v2 = RunV2(
+            run_id="run_test_baseline_state",
+            submission_id="test_baseline_state",
+            user_id="9301",
+            created_at=datetime.utcnow(),
+            specimens=[],
+            non_lab_inputs={}
+        )
+        
+        base_time = datetime(2026, 1, 1)
+        history = [(base_time + timedelta(hours=12 * i), 95.0 + (i % 5)) for i in range(80)]
+        
+        # Second run re-sends the first run's history plus 20 new observations
+        for observations in (history[:60], history):
+            result = integrator.integrate_phase2(
+                run_v2=run_v2,
+                estimates={"glucose": {"center": 97.0, "range": 10.0, "confidence": 0.75}},
+                historical_data={"glucose": observations},
+                outputs=["personal_baselines"],
+                db=db
+            )
+            db.commit()
+        
+        record = db.query(PersonalBaselineStateRecord).filter_by(user_id=9301, marker_name="glucose").one()
+        assert record.observation_count == 80
+        assert result["phase2_metadata"]["personal_baselines"]["computed"] == 1
+        db.close()
+    
+    def test_integration_persists_user_priors(self):
+        """Test runs with a session build on the user's stored posteriors."""
+        from app.models.prior_models import UserPriorStateRecord
+        from app.models.run_v2 import RunV2
+        
+        db_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=db_engine)
+        db = sessionmaker(bind=db_engine)()
+        integrator = get_phase2_integrator()
+        run_v2 = RunV2(
+            run_id="run_test_user_priors",
+            submission_id="test_user_priors",
+            user_id="9302",
+            created_at=datetime.utcnow(),
+            specimens=[],
+            non_lab_inputs={}
+        )
+        
+        stds = []
+        for _ in range(2):
+            result = integrator.integrate_phase2(
+                run_v2=run_v2,
+                estimates={"ldl_cholesterol": {"center": 120.0, "range": 20.0, "confidence": 0.6}},
+                measured_anchors={"hemoglobin_a1c": 6.1},
+                outputs=["priors_status"],
+                db=db
+            )
+            db.commit()
+            stds.append(db.query(UserPriorStateRecord).filter_by(
+                user_id=9302, marker_name="hemoglobin_a1c"
+            ).one().std)
+        
+        assert stds[1] < stds[0]
+        assert result["phase2_metadata"]["priors_status"]["hemoglobin_a1c"]["std"] == pytest.approx(stds[1])
+        # Population priors are untouched by per-user updates
+        population = get_priors_decay_engine().get_prior("hemoglobin_a1c", apply_decay=False)
+        assert population.std > stds[0]
+        db.close()
 
 
 # Import statement for EVIDENCE_GRADE_CAPS
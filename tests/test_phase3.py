@@ -12,16 +12,22 @@ Tests all Phase 3 components:
 - Phase 3 integration
 """
 
+import re
 import pytest
 from datetime import datetime, timedelta
 from app.features.uncertainty_reduction import (
     get_uncertainty_reduction_planner,
-    UncertaintySource
+    UncertaintySource,
+    MeasurementCandidate,
+    MeasurementType
 )
 from app.features.cohort_matching import (
     get_cohort_matching_engine,
-    CohortMatchingProfile
+    CohortMatchingEngine,
+    CohortMatchingProfile,
+    ReferencePopulationIndex
 )
+import numpy as np
 from app.features.change_point_detection import (
     get_change_point_detector,
     ChangePointType,
@@ -35,10 +41,12 @@ from app.features.cost_care_impact import (
 from app.features.explainability import get_explainability_engine
 from app.features.language_control import (
     get_language_controller,
-    LanguageViolationType
+    LanguageViolationType,
+    PhraseScanner
 )
 from app.ml.phase3_integration import (
     get_phase3_integrator,
+    Phase3Integrator,
     Phase3FeatureFlags
 )
 
@@ -190,6 +198,69 @@ class TestUncertaintyReductionPlanner:
         assert "range_width_percent" in glucose_profile
         assert "primary_source" in glucose_profile
         assert "anchor_strength" in glucose_profile
+    
+    def test_plan_measurement_bundle_respects_budget(self, sample_estimates, sample_measured_anchors, sample_historical_data):
+        """Test bundle selection stays within budget and explains only selected items."""
+        planner = get_uncertainty_reduction_planner()
+        
+        plan = planner.plan_measurement_bundle(
+            current_estimates=sample_estimates,
+            measured_anchors=sample_measured_anchors,
+            historical_data=sample_historical_data,
+            metadata={},
+            budget=0.5
+        )
+        
+        assert plan["bundle_cost"] <= 0.5
+        assert len(plan["selected_bundle"]) > 0
+        ids = [item["measurement_id"] for item in plan["selected_bundle"]]
+        assert len(ids) == len(set(ids))
+        for item in plan["selected_bundle"]:
+            assert item["reason"]
+            assert item["marginal_weighted_impact"] > 0
+    
+    def test_impact_structure_cache_is_bounded(self):
+        """Test the per-catalog impact structure cache evicts least recently used catalogs."""
+        planner = get_uncertainty_reduction_planner()
+        size = planner.IMPACT_STRUCTURE_CACHE_SIZE
+        catalogs = [
+            [MeasurementCandidate(f"m{i}", "M", MeasurementType.SINGLE_BIOMARKER, ["a"], [], None, None, 0.3, 0.1)]
+            for i in range(size + 5)
+        ]
+        
+        for catalog in catalogs:
+            planner._impact_structure(catalog)
+        planner._impact_structure(catalogs[-size])  # touch the oldest survivor
+        planner._impact_structure(catalogs[0])
+        
+        assert len(planner._impact_structure_cache) == size
+        keys = [entry[0][0] for entry in planner._impact_structure_cache]
+        assert "m5" in keys and "m6" not in keys
+        assert keys[-1] == "m0"
+    
+    def test_plan_measurement_bundle_submodular_coverage(self):
+        """Test overlapping measurements are not double-counted."""
+        planner = get_uncertainty_reduction_planner()
+        estimates = {
+            name: {"confidence": 0.3, "anchor_strength": "NONE"}
+            for name in ["a", "b", "c"]
+        }
+        candidates = [
+            MeasurementCandidate("ab", "AB", MeasurementType.LAB_PANEL, ["a", "b"], [], None, None, 0.3, 0.1),
+            MeasurementCandidate("ab2", "AB copy", MeasurementType.LAB_PANEL, ["a", "b"], [], None, None, 0.3, 0.1),
+            MeasurementCandidate("c", "C", MeasurementType.SINGLE_BIOMARKER, ["c"], [], None, None, 0.3, 0.1),
+        ]
+        
+        plan = planner.plan_measurement_bundle(
+            estimates, {}, {}, {}, budget=0.6, candidates=candidates
+        )
+        
+        ids = [item["measurement_id"] for item in plan["selected_bundle"]]
+        assert "c" in ids
+        assert not ("ab" in ids and "ab2" in ids)
+        assert plan["bundle_weighted_impact"] == pytest.approx(
+            sum(item["marginal_weighted_impact"] for item in plan["selected_bundle"])
+        )
 
 
 # ===== Cohort Matching Tests =====
@@ -232,6 +303,127 @@ class TestCohortMatching:
         
         # Should have suppression flag
         assert hasattr(match, "suppress_cohort_claims")
+    
+    def _reference_population(self, n=5000):
+        rng = np.random.default_rng(0)
+        features = np.column_stack([
+            rng.uniform(18, 85, n),
+            rng.normal(27, 5, n),
+            rng.normal(100, 20, n),
+            rng.normal(5.6, 0.7, n),
+            rng.normal(195, 35, n),
+            rng.normal(55, 14, n),
+        ])
+        features[rng.random(features.shape) < 0.05] = np.nan
+        sex = rng.choice(["M", "F"], n)
+        diabetes = (np.nan_to_num(features[:, 3]) > 6.4).astype(float)
+        return features, sex, diabetes
+    
+    def _profile(self, **overrides):
+        fields = dict(
+            age=50, sex="M", bmi=29.0, glucose_mean=110.0, a1c=None,
+            cholesterol_total=210.0, hdl=45.0, creatinine=None,
+            glucose_trend_slope=None, weight_trend_slope=None, activity_level=None,
+            medication_count=0, takes_metformin=False, takes_statins=False
+        )
+        fields.update(overrides)
+        return CohortMatchingProfile(**fields)
+    
+    def test_reference_index_matches_brute_force(self):
+        """Test KD-tree neighbours equal exhaustive search on observed dimensions."""
+        features, sex, diabetes = self._reference_population()
+        index = ReferencePopulationIndex(features, sex=sex, outcomes={"diabetes": diabetes})
+        
+        neighbors = index.match(self._profile(), k=25)
+        
+        # a1c is missing for this user, so it is not a matching dimension
+        assert neighbors.dimensions_used == ["age", "bmi", "glucose", "total_cholesterol", "hdl"]
+        assert all(sex[i] == "M" for i in neighbors.neighbor_indices)
+        
+        # Reference rows are compared on their observed dimensions only
+        dims = [0, 1, 2, 4, 5]
+        rows = np.flatnonzero(sex == "M")
+        point = (index.profile_vector(self._profile())[dims] - index.means[dims]) / index.stds[dims]
+        observed = index.observed[np.ix_(rows, dims)]
+        squared = np.where(observed, (index.standardized[np.ix_(rows, dims)] - point) ** 2, 0.0).sum(axis=1)
+        distances = np.sqrt(squared * len(dims) / observed.sum(axis=1))
+        expected = set(rows[np.argsort(distances)[:25]].tolist())
+        
+        assert set(neighbors.neighbor_indices) == expected
+        assert 0.0 <= neighbors.diabetes_prevalence <= 1.0
+        assert 0.0 < neighbors.similarity <= 1.0
+    
+    def test_reference_index_partial_row_trees_match_brute_force(self):
+        """Test per-mask KD-trees over partial rows give the exhaustive neighbours."""
+        features, sex, _ = self._reference_population()
+        features[np.random.default_rng(1).random(features.shape) < 0.15] = np.nan
+        index = ReferencePopulationIndex(features, sex=sex)
+        index.MIN_TREE_ROWS = 16  # give partial-row groups their own trees
+        values = index.profile_vector(self._profile(a1c=5.9))
+        
+        distances, indices, dims = index.query(values, k=40, sex="F")
+        
+        assert len(index._candidate_rows("F", dims).groups) > 1
+        rows = np.flatnonzero(sex == "F")
+        point = (values[list(dims)] - index.means[list(dims)]) / index.stds[list(dims)]
+        observed = index.observed[np.ix_(rows, dims)]
+        squared = np.where(observed, (index.standardized[np.ix_(rows, dims)] - point) ** 2, 0.0).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = np.sqrt(squared * len(dims) / observed.sum(axis=1))
+        expected = np.sort(expected[observed.any(axis=1)])[:40]
+        
+        assert distances == pytest.approx(expected)
+        assert all(sex[i] == "F" for i in indices)
+    
+    def test_reference_index_masks_missing_reference_values(self):
+        """Test a reference row missing a dimension is not pulled toward the mean on it."""
+        features = np.array([
+            [50.0, 27.0, 100.0, 5.5, 190.0, 50.0],
+            [50.0, 27.0, np.nan, 5.5, 190.0, 50.0],  # glucose missing, rest identical
+            [50.0, 27.0, 140.0, 5.5, 190.0, 50.0],
+            [30.0, 22.0, 80.0, 5.0, 160.0, 60.0],
+            [np.nan] * 6,
+        ])
+        index = ReferencePopulationIndex(features)
+        
+        distances, indices, dims = index.query(np.array([50.0, 27.0, 140.0, 5.5, 190.0, 50.0]), k=5)
+        
+        assert dims == (0, 1, 2, 3, 4, 5)
+        assert indices.tolist()[:2] == [2, 1]
+        assert distances[:2] == pytest.approx([0.0, 0.0])
+        assert 4 not in indices.tolist()  # nothing observed to compare on
+    
+    def test_reference_index_percentile(self):
+        """Test population percentile lookup."""
+        features = np.column_stack([np.arange(1, 101, dtype=float)] + [np.full(100, 1.0)] * 5)
+        index = ReferencePopulationIndex(features)
+        
+        assert index.percentile("age", 50.5) == pytest.approx(50.0)
+        assert index.percentile("age", 0.0) == 0.0
+        assert index.percentile("age", 1000.0) == 100.0
+    
+    def test_reference_population_roundtrip(self, tmp_path):
+        """Test NPZ save/load and engine integration."""
+        features, sex, diabetes = self._reference_population(n=2000)
+        index = ReferencePopulationIndex(features, sex=sex, outcomes={"diabetes": diabetes})
+        path = tmp_path / "reference_population.npz"
+        index.save_npz(path)
+        
+        engine = CohortMatchingEngine()
+        loaded = engine.load_reference_population(path)
+        assert loaded.size == 2000
+        
+        match = engine.match_cohort(
+            current_estimates={},
+            measured_anchors={"glucose": 110.0, "hdl": 45.0},
+            historical_data={},
+            user_metadata={"age": 50, "sex": "F"}
+        )
+        
+        assert match.neighbor_cohort is not None
+        assert match.neighbor_cohort.dimensions_used == ["age", "glucose", "hdl"]
+        assert match.glucose_percentile == match.neighbor_cohort.percentiles["glucose"]
+        assert match.cohort_diabetes_prevalence == match.neighbor_cohort.diabetes_prevalence
 
 
 # ===== Change Point Detection Tests =====
@@ -453,6 +645,61 @@ class TestLanguageControl:
         
         assert isinstance(phrase, str)
         assert len(phrase) > 0
+    
+    def test_overlapping_patterns_all_reported(self):
+        """Test single-pass scan still reports overlapping pattern hits."""
+        controller = get_language_controller()
+        
+        violations = controller.validate_text("Glucose will develop into a problem")
+        types = {v.violation_type for v in violations}
+        
+        assert LanguageViolationType.DEFINITIVE_STATEMENT in types
+        assert LanguageViolationType.PREDICTIVE_CERTAINTY in types
+    
+    def test_validate_texts_matches_per_text(self):
+        """Test batch validation matches validating each text."""
+        controller = get_language_controller()
+        texts = ["You have diabetes", "", "Levels certainly rise due to diet", "Consider retesting"]
+        
+        batch = controller.validate_texts(texts)
+        
+        assert len(batch) == len(texts)
+        for text, violations in zip(texts, batch):
+            expected = controller.validate_text(text)
+            assert [(v.violating_phrase, v.violation_type) for v in violations] == \
+                [(v.violating_phrase, v.violation_type) for v in expected]
+    
+    def test_literal_scanner_case_insensitive(self):
+        """Test literal phrase scanning ignores case."""
+        scanner = PhraseScanner(["diagnosis", "you have"], literal=True)
+        
+        assert scanner.found("No DIAGNOSIS here. You Have data.") == [0, 1]
+        assert scanner.found_many(["diagnosis", "nothing"]) == [[0], []]
+    
+    def test_literal_scanner_matches_substring_checks(self):
+        """Test literal scanning finds the same phrases as substring checks, overlaps included."""
+        phrases = ["you have", "have", "not available", "n/a", "confirms"]
+        scanner = PhraseScanner(phrases, literal=True)
+        texts = ["You have N/A values", "Data not available", "Confirms nothing", "", "behave"]
+        
+        for text in texts:
+            expected = [i for i, phrase in enumerate(phrases) if phrase in text.lower()]
+            assert scanner.found(text) == expected
+        assert scanner.found_many(texts) == [scanner.found(text) for text in texts]
+    
+    def test_scanner_patterns_with_capturing_groups(self):
+        """Test capturing groups inside patterns don't shift match attribution."""
+        patterns = [r"(ab)c", "x", r"(?:y)(z)+"]
+        scanner = PhraseScanner(patterns)
+        text = "abc x yzz abc"
+        
+        expected = sorted(
+            (i, m.start(), m.end())
+            for i, pattern in enumerate(patterns)
+            for m in re.finditer(pattern, text, re.IGNORECASE)
+        )
+        assert scanner.scan(text) == expected
+        assert scanner.found("x only") == [1]
 
 
 # ===== Phase 3 Integration Tests =====
@@ -538,6 +785,54 @@ class TestPhase3Integration:
         # Enabled features should be present
         assert "change_point_analysis" in metadata
         assert "provider_summary" in metadata
+    
+    def test_requested_outputs_prune_stages(self, sample_estimates, sample_measured_anchors, sample_historical_data):
+        """Test stages whose outputs are not requested are skipped."""
+        integrator = Phase3Integrator()
+        
+        class MockRun:
+            run_id = "test_run_123"
+        
+        result = integrator.integrate_phase3(
+            patient_id="test_patient",
+            run_v2=MockRun(),
+            estimates=sample_estimates,
+            measured_anchors=sample_measured_anchors,
+            historical_data=sample_historical_data,
+            events=None,
+            phase2_metadata=None,
+            outputs=["cohort_match"]
+        )
+        
+        assert list(result["phase3_metadata"]) == ["cohort_match"]
+        statuses = {s["name"]: s["status"] for s in result["stage_report"]["stages"]}
+        assert statuses["cohort_matching"] == "ran"
+        assert statuses["explainability"] == "pruned"
+        assert statuses["provider_summary"] == "pruned"
+    
+    def test_cohort_stage_memoized(self, sample_estimates, sample_measured_anchors, sample_historical_data):
+        """Test repeated runs reuse memoized cohort matching and match serial output."""
+        integrator = Phase3Integrator()
+        
+        class MockRun:
+            run_id = "test_run_123"
+        
+        kwargs = dict(
+            patient_id="test_patient",
+            run_v2=MockRun(),
+            estimates=sample_estimates,
+            measured_anchors=sample_measured_anchors,
+            historical_data=sample_historical_data,
+            events=None,
+            phase2_metadata=None
+        )
+        first = integrator.integrate_phase3(**kwargs, parallel=False)
+        second = integrator.integrate_phase3(**kwargs)
+        
+        statuses = {s["name"]: s["status"] for s in second["stage_report"]["stages"]}
+        assert statuses["cohort_matching"] == "cached"
+        assert second["phase3_metadata"]["cohort_match"] == first["phase3_metadata"]["cohort_match"]
+        assert list(second["phase3_metadata"]) == list(first["phase3_metadata"])
 
 
 # ===== Backward Compatibility Tests =====
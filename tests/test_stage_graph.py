@@ -0,0 +1,93 @@
+"""
+Tests for the declarative stage graph executor used by the phase integrators.
+"""
+
+import threading
+
+import pytest
+
+from app.ml.stage_graph import StageGraph, fingerprint
+
+
+def test_rewritten_key_binds_to_latest_enabled_writer():
+    """Readers see the latest earlier writer; disabled writers are bypassed."""
+    graph = StageGraph("test")
+    graph.add_stage("double", lambda i: {"x": i["x"] * 2}, inputs=("x",), outputs=("x",))
+    graph.add_stage("add_one", lambda i: {"x": i["x"] + 1}, inputs=("x",), outputs=("x",))
+    graph.add_stage("report", lambda i: {"y": f"x={i['x']}"}, inputs=("x",), outputs=("y",))
+
+    assert graph.run({"x": 3}).values["y"] == "x=7"
+    assert graph.run({"x": 3}, enabled={"double": False}).values["y"] == "x=4"
+
+
+def test_omitted_output_falls_back_to_previous_writer():
+    """A stage that skips an output leaves the previous value visible."""
+    graph = StageGraph("test")
+    graph.add_stage("maybe", lambda i: {}, inputs=("x",), outputs=("x",))
+    graph.add_stage("read", lambda i: {"y": i["x"]}, inputs=("x",), outputs=("y",))
+
+    assert graph.run({"x": 5}).values["y"] == 5
+
+
+def test_unconsumed_stages_pruned():
+    """Stages not on a path to the targets never run."""
+    calls = []
+    graph = StageGraph("test")
+    graph.add_stage("a", lambda i: calls.append("a") or {"a": 1}, outputs=("a",))
+    graph.add_stage("b", lambda i: calls.append("b") or {"b": 2}, outputs=("b",))
+    graph.add_stage("c", lambda i: calls.append("c") or {"c": i["a"] + 1}, inputs=("a",), outputs=("c",))
+
+    result = graph.run({}, targets=["c"])
+
+    assert result.values["c"] == 2
+    assert sorted(calls) == ["a", "c"]
+    assert {s.name: s.status for s in result.stages}["b"] == "pruned"
+
+
+def test_independent_stages_run_concurrently():
+    """Independent stages share a wave and execute on the worker pool."""
+    barrier = threading.Barrier(3, timeout=5)
+
+    def stage(name):
+        def fn(inputs):
+            barrier.wait()  # deadlocks unless all three run at once
+            return {name: True}
+        return fn
+
+    graph = StageGraph("test", max_workers=3)
+    for name in ("a", "b", "c"):
+        graph.add_stage(name, stage(name), inputs=("seed",), outputs=(name,))
+
+    values = graph.run({"seed": 0}).values
+    assert values["a"] and values["b"] and values["c"]
+
+
+def test_memoized_stage_reuses_output_by_fingerprint():
+    """Memoized stages run once per distinct input and hand out copies."""
+    calls = []
+    graph = StageGraph("test")
+    graph.add_stage(
+        "expensive", lambda i: calls.append(1) or {"out": {"v": i["x"]}},
+        inputs=("x",), outputs=("out",), memoize=True
+    )
+
+    first = graph.run({"x": 1})
+    first.values["out"]["v"] = 99
+    second = graph.run({"x": 1})
+    graph.run({"x": 2})
+
+    assert len(calls) == 2
+    assert second.values["out"] == {"v": 1}
+    assert second.stages[0].status == "cached"
+
+
+def test_duplicate_stage_name_rejected():
+    graph = StageGraph("test")
+    graph.add_stage("a", lambda i: {}, outputs=("a",))
+    with pytest.raises(ValueError):
+        graph.add_stage("a", lambda i: {}, outputs=("a",))
+
+
+def test_fingerprint_stable_across_key_order():
+    assert fingerprint({"a": 1, "b": [1, 2]}) == fingerprint({"b": [1, 2], "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})